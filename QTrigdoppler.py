@@ -5,277 +5,154 @@
 #
 #   v0.4 and beyond: Extended, partly rewritten and adapted from hamlib to direct radio control by DL3JOP Joshua Petry
 
+import sys
+# --profile-startup prints where startup time goes, see lib/startup_profile.py
+from lib.startup_profile import StartupProfiler
+profiler = StartupProfiler()
+
+# Frozen builds start the post-pass analysis workers (lib/pass_analysis.py) through this
+# executable, freeze_support() runs the worker instead of another instance of the program
+if getattr(sys, 'frozen', False):
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+# The headless daemon runs the tracking engine without importing the Qt stack below
+if __name__ == '__main__' and '--headless' in sys.argv:
+    from lib import headless
+    sys.exit(headless.main(profiler))
+
 ### Mandatory imports
+# Optional features import their dependencies where they are used, so a disabled feature costs
+# nothing at startup: sounddevice/numpy (pass recording), requests/certifi (TLE and doppler.sqf
+# downloads), pynmea2 (GPS), Flask (web API) and socketio (remote server)
 import ephem
-import socket
-import sys
 import math
 import time
 import re
-import requests
-import certifi
 import traceback
-from lib import icom
 import os
-import numpy as np
 import threading
 from time import gmtime, strftime
 from datetime import datetime, timedelta, timezone
 from configparser import ConfigParser
+import logging
+import logging.handlers
+profiler.mark("python modules, ephem")
 from PySide6.QtGui import *
 from PySide6.QtWidgets import *
 from PySide6.QtCore import *
+profiler.mark("PySide6")
 from qt_material import apply_stylesheet,list_themes
+profiler.mark("qt-material")
 from serial.tools import list_ports
-from lib.pass_recorder import PassRecorder
-import sounddevice as sd
-from lib import rotator
+from lib.tracking_engine import TrackingEngine, SUBTONE_LIST
+from lib.tracking_session import SHUTDOWN_TIME_TARGET
+from lib.app_logging import setup_logging
 from lib.sat_utils import *
-import pynmea2
-import serial
-import logging
-import logging.handlers
-import os
-
-def setup_logging():
-    """Set up logging configuration from config file"""
-    # Default logging settings (used if config file is not available)
-    default_level = logging.INFO
-    default_log_to_file = True
-    default_log_file = 'logs/qtrigdoppler.log'
-    default_max_size_mb = 10
-    default_backup_count = 5
-    default_console_output = False
-    
+profiler.mark("tracking engine modules")
+
+# The program starts here. Not when multiprocessing's spawn imports this file to start
+# a post-pass analysis worker, which only needs the definitions
+if __name__ == '__main__':
+    # Set up logging
+    log_file_path, log_level = setup_logging()
+
+    # Log startup message
+    logging.info("=" * 50)
+    logging.info("QTrigdoppler starting up")
+    logging.info(f"Logging configured - Level: {logging.getLevelName(log_level)}, File: {log_file_path}")
+    logging.info("=" * 50)
+
+    ### Read config and import additional libraries if needed
+    # parsing config file
     try:
-        # Try to read logging config from config.ini
-        from configparser import ConfigParser
-        config = ConfigParser()
-        config.read('config.ini')
-        
-        if config.has_section('logging'):
-            log_level_str = config.get('logging', 'level', fallback='INFO')
-            log_to_file = config.getboolean('logging', 'log_to_file', fallback=True)
-            log_file = config.get('logging', 'log_file', fallback='logs/qtrigdoppler.log')
-            max_size_mb = config.getint('logging', 'max_file_size_mb', fallback=10)
-            backup_count = config.getint('logging', 'backup_count', fallback=5)
-            console_output = config.getboolean('logging', 'console_output', fallback=False)
-        else:
-            # Use defaults if no logging section
-            log_level_str = 'INFO'
-            log_to_file = default_log_to_file
-            log_file = default_log_file
-            max_size_mb = default_max_size_mb
-            backup_count = default_backup_count
-            console_output = default_console_output
-            
-        # Convert log level string to logging constant
-        log_level = getattr(logging, log_level_str.upper(), logging.INFO)
-        
-    except Exception:
-        # If config reading fails, use defaults
-        log_level = default_level
-        log_to_file = default_log_to_file
-        log_file = default_log_file
-        max_size_mb = default_max_size_mb
-        backup_count = default_backup_count
-        console_output = default_console_output
-    
-    # Clear any existing handlers
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-    
-    handlers = []
-    
-    # Set up file logging if enabled
-    if log_to_file:
-        # Create logs directory if it doesn't exist
-        log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        
-        # Create rotating file handler
-        file_handler = logging.handlers.RotatingFileHandler(
-            log_file, maxBytes=max_size_mb*1024*1024, backupCount=backup_count
-        )
-        file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s')
-        file_handler.setFormatter(file_formatter)
-        handlers.append(file_handler)
-    
-    # Set up console logging
-    console_handler = logging.StreamHandler()
-    if console_output:
-        # Show all logs in console if enabled
-        console_handler.setLevel(log_level)
+        with open('config.ini') as f:
+            f.close()
+            configur = ConfigParser()
+            configur.read('config.ini')
+    except IOError:
+        logging.critical("Failed to find configuration file!")
+        sys.exit()
+    profiler.mark("logging, config.ini")
+
+    # Set environment variables
+    LATITUDE = configur.get('qth','latitude', fallback=0.0)
+    LONGITUDE = configur.get('qth','longitude', fallback=0.0)
+    ALTITUDE = configur.getfloat('qth','altitude', fallback=0.0)
+    STEP_RX = configur.getint('qth','step_rx', fallback=1)
+    MAX_OFFSET_RX = configur.getint('qth','max_offset_rx',fallback=5000)
+    TLEFILE = configur.get('satellite','tle_file')
+    TLEURL = configur.get('satellite','tle_url')
+    DOPPLER_THRES_FM = configur.get('satellite', 'doppler_threshold_fm',fallback=200)
+    DOPPLER_THRES_LINEAR = configur.get('satellite', 'doppler_threshold_linear',fallback=20)
+    PREDICTIVE_DOPPLER = configur.getboolean('satellite', 'predictive_doppler', fallback=True)
+    SQFILE = configur.get('satellite','sqffile')
+    RADIO = configur.get('icom','radio')
+    CVIADDR = configur.get('icom','cviaddress')
+    RIG_SERIAL_PORT = configur.get('icom', 'serialport')
+    RIG_TYPE = configur.get('icom', 'rig_type')
+    LAST_TLE_UPDATE = configur.get('misc', 'last_tle_update')
+    LAST_DOPPLER_UPDATE = configur.get('misc', 'last_doppler_update', fallback='Never')
+    TLE_UPDATE_INTERVAL = configur.get('misc', 'tle_update_interval')
+    AUTO_TLE_STARTUP = configur.getboolean('misc', 'auto_tle_startup', fallback=False)
+    TLE_UPDATE_STARTUP = configur.getboolean('misc', 'tle_update_startup', fallback=False)
+    AUTO_TLE_INTERVAL_ENABLED = configur.getboolean('misc', 'auto_tle_interval_enabled', fallback=False)
+    AUTO_TLE_INTERVAL_HOURS = configur.getint('misc', 'auto_tle_interval_hours', fallback=24)
+    STYLESHEET = configur.get('misc', 'stylesheet',fallback="dark_lightgreen.xml")
+    UI_SCALLING = configur.get('misc','ui_scale', fallback=1.0)
+
+    # Rotator config
+    ROTATOR_ENABLED = configur.getboolean('rotator', 'enabled', fallback=False)
+    ROTATOR_SERIAL_PORT = configur.get('rotator', 'serial_port', fallback='COM4')
+    ROTATOR_BAUDRATE = configur.getint('rotator', 'baudrate', fallback=4800)
+    ROTATOR_AZ_PARK = configur.getint('rotator', 'az_park', fallback=0)
+    ROTATOR_EL_PARK = configur.getint('rotator', 'el_park', fallback=0)
+    ROTATOR_AZ_MIN = configur.getint('rotator', 'az_min', fallback=0)
+    ROTATOR_AZ_MAX = configur.getint('rotator', 'az_max', fallback=450)
+    ROTATOR_EL_MIN = configur.getint('rotator', 'el_min', fallback=0)
+    ROTATOR_EL_MAX = configur.getint('rotator', 'el_max', fallback=180)
+    ROTATOR_MIN_ELEVATION = configur.getint('rotator', 'min_elevation', fallback=5)
+
+    # Cloudlog config
+    CLOUDLOG_API_KEY = configur.get('Cloudlog', 'api_key', fallback=None)
+    CLOUDLOG_URL = configur.get('Cloudlog', 'url', fallback=None)
+    CLOUDLOG_ENABLED = configur.getboolean('Cloudlog', 'enabled', fallback=False)
+
+    # Passrecoder config
+    if configur.has_section('passrecording') and configur.getboolean('passrecording', 'enabled'):
+        PASS_RECORDER_ENABLED = True
     else:
-        # Only show ERROR and CRITICAL in console
-        console_handler.setLevel(logging.ERROR)
-    console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
-    handlers.append(console_handler)
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=log_level,
-        handlers=handlers,
-        force=True  # Force reconfiguration if already configured
-    )
-    
-    return log_file, log_level
-
-# Set up logging
-log_file_path, log_level = setup_logging()
-
-# Log startup message
-logging.info("=" * 50)
-logging.info("QTrigdoppler starting up")
-logging.info(f"Logging configured - Level: {logging.getLevelName(log_level)}, File: {log_file_path}")
-logging.info("=" * 50)
-
-### Read config and import additional libraries if needed
-# parsing config file
-try:
-    with open('config.ini') as f:
-        f.close()
-        configur = ConfigParser()
-        configur.read('config.ini')
-except IOError:
-    logging.critical("Failed to find configuration file!")
-    sys.exit()
-
-# Set environment variables
-LATITUDE = configur.get('qth','latitude', fallback=0.0)
-LONGITUDE = configur.get('qth','longitude', fallback=0.0)
-ALTITUDE = configur.getfloat('qth','altitude', fallback=0.0)
-STEP_RX = configur.getint('qth','step_rx', fallback=1)
-MAX_OFFSET_RX = configur.getint('qth','max_offset_rx',fallback=5000)
-TLEFILE = configur.get('satellite','tle_file')
-TLEURL = configur.get('satellite','tle_url')
-DOPPLER_THRES_FM = configur.get('satellite', 'doppler_threshold_fm',fallback=200)
-DOPPLER_THRES_LINEAR = configur.get('satellite', 'doppler_threshold_linear',fallback=20)
-PREDICTIVE_DOPPLER = configur.getboolean('satellite', 'predictive_doppler', fallback=True)
-SQFILE = configur.get('satellite','sqffile')
-RADIO = configur.get('icom','radio')
-CVIADDR = configur.get('icom','cviaddress')
-RIG_SERIAL_PORT = configur.get('icom', 'serialport')
-RIG_TYPE = configur.get('icom', 'rig_type')
-LAST_TLE_UPDATE = configur.get('misc', 'last_tle_update')
-LAST_DOPPLER_UPDATE = configur.get('misc', 'last_doppler_update', fallback='Never')
-TLE_UPDATE_INTERVAL = configur.get('misc', 'tle_update_interval')
-AUTO_TLE_STARTUP = configur.getboolean('misc', 'auto_tle_startup', fallback=False)
-TLE_UPDATE_STARTUP = configur.getboolean('misc', 'tle_update_startup', fallback=False)
-AUTO_TLE_INTERVAL_ENABLED = configur.getboolean('misc', 'auto_tle_interval_enabled', fallback=False)
-AUTO_TLE_INTERVAL_HOURS = configur.getint('misc', 'auto_tle_interval_hours', fallback=24)
-STYLESHEET = configur.get('misc', 'stylesheet',fallback="dark_lightgreen.xml")
-UI_SCALLING = configur.get('misc','ui_scale', fallback=1.0)
-
-# Rotator config
-ROTATOR_ENABLED = configur.getboolean('rotator', 'enabled', fallback=False)
-ROTATOR_SERIAL_PORT = configur.get('rotator', 'serial_port', fallback='COM4')
-ROTATOR_BAUDRATE = configur.getint('rotator', 'baudrate', fallback=4800)
-ROTATOR_AZ_PARK = configur.getint('rotator', 'az_park', fallback=0)
-ROTATOR_EL_PARK = configur.getint('rotator', 'el_park', fallback=0)
-ROTATOR_AZ_MIN = configur.getint('rotator', 'az_min', fallback=0)
-ROTATOR_AZ_MAX = configur.getint('rotator', 'az_max', fallback=450)
-ROTATOR_EL_MIN = configur.getint('rotator', 'el_min', fallback=0)
-ROTATOR_EL_MAX = configur.getint('rotator', 'el_max', fallback=180)
-ROTATOR_MIN_ELEVATION = configur.getint('rotator', 'min_elevation', fallback=5)
-
-# Cloudlog config
-CLOUDLOG_API_KEY = configur.get('Cloudlog', 'api_key', fallback=None)
-CLOUDLOG_URL = configur.get('Cloudlog', 'url', fallback=None)
-CLOUDLOG_ENABLED = configur.getboolean('Cloudlog', 'enabled', fallback=False)
-
-# Passrecoder config
-if configur.has_section('passrecording') and configur.getboolean('passrecording', 'enabled'):
-    PASS_RECORDER_ENABLED = True
-else:
-    PASS_RECORDER_ENABLED = False
-
-# Webapi config
-if configur.has_section('web_api') and configur.getboolean('web_api', 'enabled'):
-    WEBAPI_ENABLED = True
-else:
-    WEBAPI_ENABLED = False
-if configur.has_section('web_api') and configur.getboolean('web_api', 'debug'):
-    WEBAPI_DEBUG_ENABLED = True
-else:
-    WEBAPI_DEBUG_ENABLED = False
-WEBAPI_PORT = configur.getint('web_api', 'port', fallback=5000)
+        PASS_RECORDER_ENABLED = False
+
+    # Webapi config
+    if configur.has_section('web_api') and configur.getboolean('web_api', 'enabled'):
+        WEBAPI_ENABLED = True
+    else:
+        WEBAPI_ENABLED = False
+    if configur.has_section('web_api') and configur.getboolean('web_api', 'debug'):
+        WEBAPI_DEBUG_ENABLED = True
+    else:
+        WEBAPI_DEBUG_ENABLED = False
+    WEBAPI_PORT = configur.getint('web_api', 'port', fallback=5000)
     
-if configur.get('icom', 'fullmode') == "True":
-    OPMODE = True
-elif configur.get('icom', 'fullmode') == "False":
-    OPMODE = False
-
-# Import the remote client if section exists
-REMOTE_ENABLED = False
-if configur.has_section('remote_server') and configur.getboolean('remote_server', 'enable'):
-    from lib import remote_client
-    REMOTE_ENABLED = True
-
-if WEBAPI_ENABLED or REMOTE_ENABLED:
-    from lib import web_api  # Import the web API module
-    # web_api_proxy import moved to after QApplication creation
-
-### Global constants
-subtone_list = ["None", "67 Hz", "71.9 Hz", "74.4 Hz", "141.3 Hz"]
-
-useroffsets = []
-for (each_key, each_val) in configur.items('offset_profiles'):
-    # Format SATNAME,TRANSPONDER,RXoffset,TXoffset
-    parts = each_val.split(',')
-    useroffsets += [parts]
-    #i+=1
-
-# radio frequencies
-f_cal = 0
-i_cal = 0
-doppler_thres = 0
-FM_update_time = 0.3
-
-myloc = ephem.Observer()
-myloc.lon = LONGITUDE
-myloc.lat = LATITUDE
-myloc.elevation = ALTITUDE
-
-TRACKING_ACTIVE = True # tracking on/off
-FREQUENCY_UPDATES_PAUSED = False # pause frequency updates while keeping rotator tracking
-INTERACTIVE = False # read user vfo/dial input - disable for inband packet
-RX_TPX_ONLY = False
-RIG_CONNECTED = False
-DOPPLER_UPDATE_LOCK = False
-
-if configur['icom']['radio'] == '9700':
-    icomTrx = icom.icom(RIG_SERIAL_PORT, '19200', 96, '9700')
-elif configur['icom']['radio'] == '910':
-    icomTrx = icom.icom(RIG_SERIAL_PORT, '19200', 96, '910')
-RIG_CONNECTED = icomTrx.is_connected()    
-
-class Satellite:
-    name = ""
-    noradid = 0
-    amsatname= ""
-    downmode = ""
-    upmode = ""
-    mode = ""
-    F = 0
-    F_init = 0
-    F_cal = 0
-    I = 0
-    I_init = 0
-    I_cal = 0
-    new_cal = 0
-    down_doppler = 0
-    down_doppler_old = 0
-    down_doppler_rate = 0
-    up_doppler = 0
-    up_doppler_old = 0
-    up_doppler_rate = 0
-    tledata = ""
-    tle_age = "-1"
-    rig_satmode = 0
-    F_RIG = 0.0
-    I_RIG = 0.0
+    if configur.get('icom', 'fullmode') == "True":
+        OPMODE = True
+    elif configur.get('icom', 'fullmode') == "False":
+        OPMODE = False
+
+    # Import the remote client if section exists
+    REMOTE_ENABLED = False
+    if configur.has_section('remote_server') and configur.getboolean('remote_server', 'enable'):
+        from lib import remote_client
+        REMOTE_ENABLED = True
+
+    if WEBAPI_ENABLED:
+        from lib import web_api  # Import the web API module
+    profiler.mark("web API, remote client")
+
+    # Satellite tracking, rig, rotator, pass recorder and Cloudlog, shared with the web API and remote client
+    engine = TrackingEngine(configur)
+    profiler.mark("tracking engine")
     
 class MainWindow(QMainWindow):
     def __init__(self, *args, **kwargs):
@@ -308,12 +185,17 @@ class MainWindow(QMainWindow):
         global OPMODE
 
         self.counter = 0
-        self.my_satellite = Satellite()
+        # Same object the engine tracks, the GUI only reads it
+        self.my_satellite = engine.satellite
+        # Engine changes from any thread (GUI, web API, remote client) reach the widgets on the UI thread
+        self.engine_events = EngineEventBridge()
+        self.engine_events.changed.connect(self.on_engine_event)
+        engine.add_listener(self.engine_events.changed.emit)
         
         
         if WEBAPI_ENABLED:
-            # Register this window with the web API
-            web_api.register_window(self)
+            # Register the tracking engine with the web API
+            web_api.register_engine(engine)
         
             # Start web API server in a separate thread if enabled
             self.web_api_thread = threading.Thread(target=web_api.run_socketio, daemon=True)
@@ -336,7 +218,8 @@ class MainWindow(QMainWindow):
         # Remote client registration (if enabled)
         if REMOTE_ENABLED:
             try:
-                remote_client.register_window(self)
+                remote_client.register_engine(engine)
+                logging.info(f"Remote client registered with server: {configur.get('remote_server', 'url', fallback='http://localhost:5001')}")
             except Exception as e:
                 logging.error(f"Error registering with remote client: {e}")
                 
@@ -359,52 +242,11 @@ class MainWindow(QMainWindow):
                 logging.warning(f"Failed to adjust web_api_thread priority: {e}")
             
             logging.info(f"Web API server started on port {configur.get('web_api', 'port', fallback='5000')}")
-        
-            # Set up the web API proxy for thread-safe GUI/timer operations
-            self.web_api_proxy = web_api_proxy.WebApiGuiProxy()
-            self.web_api_proxy.select_satellite.connect(self.slot_select_satellite)
-            self.web_api_proxy.select_transponder.connect(self.slot_select_transponder)
-            self.web_api_proxy.set_subtone.connect(self.slot_set_subtone)
-            self.web_api_proxy.set_rx_offset.connect(self.slot_set_rx_offset)
-            self.web_api_proxy.start_tracking.connect(self.init_worker)
-            self.web_api_proxy.stop_tracking.connect(self.the_stop_button_was_clicked)
-        
-        # If remote server is enabled, register with remote client
-        if REMOTE_ENABLED:
-            # Make sure we have a web API proxy for signals even if local web API is disabled
-            if not WEBAPI_ENABLED:
-                self.web_api_proxy = web_api_proxy.WebApiGuiProxy()
-                self.web_api_proxy.select_satellite.connect(self.slot_select_satellite)
-                self.web_api_proxy.select_transponder.connect(self.slot_select_transponder)
-                self.web_api_proxy.set_subtone.connect(self.slot_set_subtone)
-                self.web_api_proxy.set_rx_offset.connect(self.slot_set_rx_offset)
-                self.web_api_proxy.start_tracking.connect(self.init_worker)
-                self.web_api_proxy.stop_tracking.connect(self.the_stop_button_was_clicked)
-            
-            # Register with remote client
-            remote_client.register_window(self)
-            logging.info(f"Remote client registered with server: {configur.get('remote_server', 'url', fallback='http://localhost:5001')}")
             
         # Rotator integration
         self.ROTATOR_ENABLED = ROTATOR_ENABLED
-        self.rotator = None
-        self.rotator_thread = None
-        self.rotator_error = None
-        if ROTATOR_ENABLED:
-            try:
-                self.rotator = rotator.YaesuRotator(
-                    ROTATOR_SERIAL_PORT,
-                    baudrate=ROTATOR_BAUDRATE,
-                    az_min=ROTATOR_AZ_MIN,
-                    az_max=ROTATOR_AZ_MAX,
-                    el_min=ROTATOR_EL_MIN,
-                    el_max=ROTATOR_EL_MAX
-                )
-            except Exception as e:
-                self.rotator_error = f"Rotator init failed: {e}"
-                logging.error(self.rotator_error)
-                self.rotator = None
-
+        self.rotator = engine.rotator
+        self.rotator_error = engine.rotator_error
 
         
         self.setWindowTitle("QTRigDoppler")
@@ -440,27 +282,7 @@ class MainWindow(QMainWindow):
         self.sat_list_view = self.combo1.view()
         self.sat_list_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)        
         QScroller.grabGesture(self.sat_list_view.viewport(), QScroller.LeftMouseButtonGesture)
-        satlist = []
-        with open(SQFILE, 'r') as h:
-            sqfdata = h.readlines() 
-            for line in sqfdata:
-                # Skip comment lines
-                if line.strip().startswith(';'):
-                    continue
-                    
-                if ',' in line:
-                    newitem = str(line.split(",")[0].strip())
-                    if newitem:
-                        satlist += [newitem]
-        satlist = list(dict.fromkeys(satlist))  # Deduplicate
-
-        def sat_sort_key(name):
-            match = re.match(r"([A-Za-z]+)-(\d+)", name)
-            if match:
-                prefix, num = match.groups()
-                return (prefix, int(num))
-            return (name, 0)
-        satlist.sort(key=sat_sort_key)
+        satlist = engine.satellite_list()
         self.combo1.addItems(['Select one...'])
         self.combo1.addItems(satlist)
         self.combo1.currentTextChanged.connect(self.sat_changed) 
@@ -482,7 +304,7 @@ class MainWindow(QMainWindow):
         self.tonetext.setAlignment(Qt.AlignHCenter | Qt.AlignVCenter)
         combo_layout.addWidget(self.tonetext)
         self.combo3 = QComboBox()
-        self.combo3.addItems(subtone_list)
+        self.combo3.addItems(SUBTONE_LIST)
         self.combo3.currentTextChanged.connect(self.tone_changed) 
         combo_layout.addWidget(self.combo3)
         
@@ -1272,46 +1094,11 @@ class MainWindow(QMainWindow):
         passrec_settings_layout.addWidget(self.passrec_soundcard_label, 1, 0)
         self.passrec_soundcard_dropdown = QComboBox()
         self.passrec_soundcard_dropdown.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
-        devices = sd.query_devices()
-        input_devices = [(i, d) for i, d in enumerate(devices) if d['max_input_channels'] > 0]
-        for idx, dev in input_devices:
-            hostapi = sd.query_hostapis(dev['hostapi'])['name'] if 'hostapi' in dev else ''
-            # Create a more readable label for the device
-            friendly_name = dev['name'].replace("[", "").replace("]", "").strip()
-            if "Default" in friendly_name or "default" in friendly_name:
-                label = f"Default Device"
-            else:
-                label = f"{friendly_name}"
-                
-            # Store the technical details as tooltip
-            tech_details = f"{dev['name']} [{hostapi}] (index {idx})"
-            self.passrec_soundcard_dropdown.addItem(label, idx)
-            # Also store the device name and full details for persistence
-            self.passrec_soundcard_dropdown.setItemData(self.passrec_soundcard_dropdown.count()-1, dev['name'], Qt.UserRole + 1)
-            self.passrec_soundcard_dropdown.setItemData(self.passrec_soundcard_dropdown.count()-1, tech_details, Qt.ToolTipRole)
-        # Set current
-        current_card = configur.get('passrecording', 'soundcard', fallback='default dev')
-        if current_card == 'default dev':
-            self.passrec_soundcard_dropdown.setCurrentIndex(0)
-        else:
-            try:
-                # Try to find the device by name instead of index
-                found = False
-                for i in range(self.passrec_soundcard_dropdown.count()):
-                    if self.passrec_soundcard_dropdown.itemData(i, Qt.UserRole + 1) == current_card:
-                        self.passrec_soundcard_dropdown.setCurrentIndex(i)
-                        found = True
-                        break
-                # If name not found, try using it as an index (for backwards compatibility)
-                if not found:
-                    try:
-                        index = int(current_card)
-                        if 0 <= index < self.passrec_soundcard_dropdown.count():
-                            self.passrec_soundcard_dropdown.setCurrentIndex(index)
-                    except:
-                        self.passrec_soundcard_dropdown.setCurrentIndex(0)
-            except:
-                self.passrec_soundcard_dropdown.setCurrentIndex(0)
+        # Probing the sound cards loads sounddevice, skip it until pass recording is used
+        self.passrec_soundcards_loaded = False
+        if PASS_RECORDER_ENABLED:
+            self.populate_soundcard_dropdown()
+        self.passrec_enable_checkbox.toggled.connect(lambda checked: self.populate_soundcard_dropdown())
         passrec_settings_layout.addWidget(self.passrec_soundcard_dropdown, 1, 1)
         
         # Add an audio level meter
@@ -1356,6 +1143,10 @@ class MainWindow(QMainWindow):
         self.passrec_bitdepth_spin.setRange(8, 32)
         self.passrec_bitdepth_spin.setValue(configur.getint('passrecording', 'bit_depth', fallback=16))
         passrec_settings_layout.addWidget(self.passrec_bitdepth_spin, 6, 1)
+        # Recording catalog browser
+        self.passrec_catalog_button = QPushButton("Browse Recordings")
+        passrec_settings_layout.addWidget(self.passrec_catalog_button, 10, 0, 1, 2)
+        self.passrec_catalog_button.clicked.connect(self.show_recording_catalog)
         self.passrec_settings_box.setLayout(passrec_settings_layout)
         adv_settings_value_layout.addWidget(self.passrec_settings_box, 0,3)
         # --- End Pass Recording Settings UI ---
@@ -1368,6 +1159,7 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(self.tab_overview,"Overview")
         self.tab_widget.addTab(self.tab_settings,"Settings")
         self.tab_widget.addTab(self.tab_adv_settings,"Feature Settings")
+        self.tab_widget.currentChanged.connect(self.settings_tab_shown)
         self.tab_overview.setLayout(overview_pagelayout)
         self.tab_settings.setLayout(settings_layout)
         self.tab_adv_settings.setLayout(adv_settings_layout)
@@ -1377,20 +1169,17 @@ class MainWindow(QMainWindow):
             self.combo1, QScroller.LeftMouseButtonGesture
         )
 
-        self.threadpool = QThreadPool()
         self.timer = QTimer()
         self.timer.setInterval(200)
         self.timer.timeout.connect(self.recurring_timer)
+        self.timer.start()
 
         self.utc_clock_timer = QTimer()
         self.utc_clock_timer.setInterval(500)
         self.utc_clock_timer.timeout.connect(self.recurring_utc_clock_timer)
         self.utc_clock_timer.start()
             
-        
-        self._last_cloudlog_F = None
-        self._last_cloudlog_I = None
-        self.pass_recorder = PassRecorder(configur)
+        engine.start()
         self.gps_enable_checkbox.toggled.connect(self.toggle_gps_qth)
         self.gps_reader = None
         self.gps_last_port = None
@@ -1486,12 +1275,12 @@ class MainWindow(QMainWindow):
             num_offsets = num_offsets+1
             # Iterate through each entry if sat/tpx combo is already in list otherwise adds it. 
             parts = each_val.split(",")
-            if len(parts) >= 3 and parts[0].strip() == self.my_satellite.name and parts[1].strip() == self.my_transponder_name:
+            if len(parts) >= 3 and parts[0].strip() == self.my_satellite.name and parts[1].strip() == engine.transponder_name:
                 offset_stored = True
                 if int(parts[2].strip()) != int(self.rxoffsetbox.value()):
-                    configur['offset_profiles'][each_key] = self.my_satellite.name + "," + self.my_transponder_name + ","+str(self.rxoffsetbox.value()) + ",0"
+                    configur['offset_profiles'][each_key] = self.my_satellite.name + "," + engine.transponder_name + ","+str(self.rxoffsetbox.value()) + ",0"
         if offset_stored == False and int(self.rxoffsetbox.value()) != 0:
-            configur['offset_profiles']["satoffset"+str(num_offsets+1)] = self.my_satellite.name + "," + self.my_transponder_name + ","+str(self.rxoffsetbox.value()) + ",0"
+            configur['offset_profiles']["satoffset"+str(num_offsets+1)] = self.my_satellite.name + "," + engine.transponder_name + ","+str(self.rxoffsetbox.value()) + ",0"
             offset_stored = True
         
         # Save TLE update settings
@@ -1530,26 +1319,27 @@ class MainWindow(QMainWindow):
 
         # Pass Recording settings
         configur['passrecording']['enabled'] = str(self.passrec_enable_checkbox.isChecked())
-        # Store the device name instead of the index
-        selected_idx = self.passrec_soundcard_dropdown.currentIndex()
-        if selected_idx >= 0:
-            # First try to get the full device name (most reliable)
-            device_name = self.passrec_soundcard_dropdown.itemData(selected_idx, Qt.UserRole + 1)
-            if device_name:
-                configur['passrecording']['soundcard'] = device_name
-                logging.info(f"Saved audio device by name: {device_name}")
-            else:
-                # Fallback to index if name isn't available (should not happen)
-                device_idx = self.passrec_soundcard_dropdown.itemData(selected_idx)
-                if device_idx is not None:
-                    configur['passrecording']['soundcard'] = str(device_idx)
-                    logging.info(f"Saved audio device by index: {device_idx}")
+        # Store the device name instead of the index, keep the stored one if the list was never loaded
+        if self.passrec_soundcards_loaded:
+            selected_idx = self.passrec_soundcard_dropdown.currentIndex()
+            if selected_idx >= 0:
+                # First try to get the full device name (most reliable)
+                device_name = self.passrec_soundcard_dropdown.itemData(selected_idx, Qt.UserRole + 1)
+                if device_name:
+                    configur['passrecording']['soundcard'] = device_name
+                    logging.info(f"Saved audio device by name: {device_name}")
                 else:
-                    configur['passrecording']['soundcard'] = 'default'
-                    logging.info("Saved default audio device")
-        else:
-            configur['passrecording']['soundcard'] = 'default'
-            logging.info("Saved default audio device")
+                    # Fallback to index if name isn't available (should not happen)
+                    device_idx = self.passrec_soundcard_dropdown.itemData(selected_idx)
+                    if device_idx is not None:
+                        configur['passrecording']['soundcard'] = str(device_idx)
+                        logging.info(f"Saved audio device by index: {device_idx}")
+                    else:
+                        configur['passrecording']['soundcard'] = 'default'
+                        logging.info("Saved default audio device")
+            else:
+                configur['passrecording']['soundcard'] = 'default'
+                logging.info("Saved default audio device")
         configur['passrecording']['save_dir'] = self.passrec_savedir_edit.text()
         configur['passrecording']['min_elevation'] = str(self.passrec_minelev_spin.value())
         configur['passrecording']['sample_rate'] = str(self.passrec_samplerate_spin.value())
@@ -1566,7 +1356,8 @@ class MainWindow(QMainWindow):
 
         with open('config.ini', 'w') as configfile:
             configur.write(configfile)
-        self.pass_recorder.update_config(configur)
+        # Also hands the new settings to the pass recorder and rig supervisor
+        engine.load_settings(configur)
 
 
     def change_theme(self, theme_name):
@@ -1595,28 +1386,69 @@ class MainWindow(QMainWindow):
             """)
         
     def rxoffset_value_changed(self, i):
-            global f_cal
-            self.my_satellite.new_cal = 1
-            self.my_satellite.F_cal = f_cal = i
-            
-            # Notify web clients of RX offset change
-            if WEBAPI_ENABLED:
-                try:
-                    web_api.safe_emit('status', {'rx_offset': i})
-                except Exception as e:
-                    logging.error(f"Error broadcasting RX offset change to web clients: {e}")
+            # The engine wakes the doppler worker and notifies the web clients
+            engine.set_rx_offset(i)
     
     def rxoffset_button_pushed(self, i):
             new_value = self.rxoffsetbox.value() + int(i)
             self.rxoffsetbox.setValue(new_value)
-            
-            # Notify web clients of RX offset change (note: setValue will trigger the valueChanged signal, 
-            # but we'll add this for clarity and as a backup)
-            if WEBAPI_ENABLED:
-                try:
-                    web_api.safe_emit('status', {'rx_offset': new_value})
-                except Exception as e:
-                    logging.error(f"Error broadcasting RX offset button change to web clients: {e}")
+    def populate_soundcard_dropdown(self):
+        """Fill the pass recording soundcard dropdown, only once"""
+        if self.passrec_soundcards_loaded:
+            return
+        self.passrec_soundcards_loaded = True
+        try:
+            # Probed once and shared with the pass recorder
+            devices = engine.audio_devices.list()
+        except Exception as e:
+            logging.error(f"Could not list audio devices: {e}")
+            return
+        for dev in devices:
+            idx = dev.index
+            # Create a more readable label for the device
+            friendly_name = dev.name.replace("[", "").replace("]", "").strip()
+            if "Default" in friendly_name or "default" in friendly_name:
+                label = f"Default Device"
+            else:
+                label = f"{friendly_name}"
+                
+            # Store the technical details as tooltip
+            rates = ', '.join(str(r) for r in dev.sample_rates) or 'unknown'
+            tech_details = f"{dev.name} [{dev.hostapi}] (index {idx}), sample rates: {rates}"
+            if not dev.working:
+                tech_details += ", not available"
+            self.passrec_soundcard_dropdown.addItem(label, idx)
+            # Also store the device name and full details for persistence
+            self.passrec_soundcard_dropdown.setItemData(self.passrec_soundcard_dropdown.count()-1, dev.name, Qt.UserRole + 1)
+            self.passrec_soundcard_dropdown.setItemData(self.passrec_soundcard_dropdown.count()-1, tech_details, Qt.ToolTipRole)
+        # Set current
+        current_card = configur.get('passrecording', 'soundcard', fallback='default dev')
+        if current_card == 'default dev':
+            self.passrec_soundcard_dropdown.setCurrentIndex(0)
+        else:
+            try:
+                # Try to find the device by name instead of index
+                found = False
+                for i in range(self.passrec_soundcard_dropdown.count()):
+                    if self.passrec_soundcard_dropdown.itemData(i, Qt.UserRole + 1) == current_card:
+                        self.passrec_soundcard_dropdown.setCurrentIndex(i)
+                        found = True
+                        break
+                # If name not found, try using it as an index (for backwards compatibility)
+                if not found:
+                    try:
+                        index = int(current_card)
+                        if 0 <= index < self.passrec_soundcard_dropdown.count():
+                            self.passrec_soundcard_dropdown.setCurrentIndex(index)
+                    except:
+                        self.passrec_soundcard_dropdown.setCurrentIndex(0)
+            except:
+                self.passrec_soundcard_dropdown.setCurrentIndex(0)
+
+    def settings_tab_shown(self, index):
+        if self.tab_widget.widget(index) is self.tab_adv_settings:
+            self.populate_soundcard_dropdown()
+
     def update_tle_file(self):
         try:
             self.the_stop_button_was_clicked()
@@ -1625,6 +1457,8 @@ class MainWindow(QMainWindow):
         try:
             
             global LAST_TLE_UPDATE
+            import requests
+            import certifi
             response = requests.get(TLEURL, verify=certifi.where())
             with open(TLEFILE, 'wb') as f:
                 f.write(response.content)
@@ -1715,6 +1549,8 @@ class MainWindow(QMainWindow):
             QApplication.processEvents()  # Update the UI
             
             # Download the new file
+            import requests
+            import certifi
             response = requests.get(doppler_url, verify=certifi.where())
             new_content = response.text
             
@@ -1877,6 +1713,8 @@ class MainWindow(QMainWindow):
         # if we're currently tracking (startup updates shouldn't interrupt)
         try:
             global LAST_TLE_UPDATE
+            import requests
+            import certifi
             response = requests.get(TLEURL, verify=certifi.where())
             with open(TLEFILE, 'wb') as f:
                 f.write(response.content)
@@ -1922,8 +1760,6 @@ class MainWindow(QMainWindow):
 
             
     def sat_changed(self, satname):
-        self.my_satellite.name = satname
-        
         try:
             text_to_remove = 'Select one...'
             index = self.combo1.findText(text_to_remove)
@@ -1932,34 +1768,8 @@ class MainWindow(QMainWindow):
         except:
             pass
 
-        try:
-            with open(SQFILE, 'r') as h:
-                sqfdata = h.readlines()
-                tpxlist=[]
-                # Block signals temporarily while we clear the combo box
-                self.combo2.blockSignals(True)
-                self.combo2.clear()
-                self.combo2.blockSignals(False)
-                
-                for line in sqfdata:
-                    if line.startswith(satname):
-                        tpxlist += [str(line.split(",")[8].strip())]
-                        
-                tpxlist=list(dict.fromkeys(tpxlist))
-                
-                # Add items one by one to ensure signals are properly emitted
-                for tpx in tpxlist:
-                    self.combo2.addItem(tpx)
-                    
-        except Exception as e:
-            logging.error(f"Error reading SQFFile: {e}")
-            
-        # Notify web clients of the satellite change
-        if WEBAPI_ENABLED:
-            try:
-                web_api.broadcast_satellite_change(satname)
-            except Exception as e:
-                logging.error(f"Error broadcasting satellite change to web clients: {e}")
+        # The engine selects the first transponder, on_engine_event() fills the transponder list
+        engine.select_satellite(satname)
     
     def refresh_satellite_dropdown(self):
         """Refresh the satellite dropdown with current data from SQF file"""
@@ -1975,36 +1785,7 @@ class MainWindow(QMainWindow):
             self.combo1.clear()
             
             # Reload satellite list from SQF file
-            import re
-            satlist = []
-            with open(SQFILE, 'r') as h:
-                sqfdata = h.readlines() 
-                for line in sqfdata:
-                    # Skip comment lines
-                    if line.strip().startswith(';'):
-                        continue
-                        
-                    if ',' in line:
-                        newitem = str(line.split(",")[0].strip())
-                        if newitem:
-                            satlist.append(newitem)
-            
-            # Remove duplicates while preserving order
-            unique_satlist = []
-            for sat in satlist:
-                if sat not in unique_satlist:
-                    unique_satlist.append(sat)
-            
-            # Sort satellite list using the same logic as initial load
-            def sat_sort_key(name):
-                # Extract prefix and number for sorting (e.g., "AO-73" -> ("AO", 73))
-                match = re.match(r'([A-Za-z\-]+)(\d+)', name)
-                if match:
-                    prefix, num = match.groups()
-                    return (prefix, int(num))
-                return (name, 0)
-            
-            unique_satlist.sort(key=sat_sort_key)
+            unique_satlist = engine.reload_satellite_list()
             
             # Add items back
             self.combo1.addItem('Select one...')
@@ -2033,919 +1814,156 @@ class MainWindow(QMainWindow):
             self.combo1.blockSignals(False)
                 
     def tpx_changed(self, tpxname):
-        global f_cal
-        global i_cal
-        global MAX_OFFSET_RX
-        global RX_TPX_ONLY
-        
         logging.debug(f"tpx_changed called with transponder: {tpxname}")
-        self.my_transponder_name = tpxname
-        
-        try:
-            with open(SQFILE, 'r') as h:
-                sqfdata = h.readlines()
-                found_match = False
-                for lineb in sqfdata:
-                    if lineb.startswith(";") == 0:
-                        if lineb.split(",")[8].strip() == tpxname and lineb.split(",")[0].strip() == self.my_satellite.name:
-                            found_match = True
-                            logging.debug(f"Found matching transponder in SQFILE: {tpxname} for satellite {self.my_satellite.name}")
-                            self.my_satellite.F = self.my_satellite.F_init = float(lineb.split(",")[1].strip())*1000
-                            self.rxfreq.setText(str('{:,}'.format(self.my_satellite.F))+ " Hz")
-                            self.my_satellite.F_RIG = self.my_satellite.F + f_cal
-                            self.my_satellite.I = self.my_satellite.I_init = float(lineb.split(",")[2].strip())*1000
-                            self.txfreq.setText(str('{:,}'.format(self.my_satellite.I)) + " Hz")
-                            self.my_satellite.I_RIG = self.my_satellite.I + i_cal
-                            self.my_satellite.downmode =  lineb.split(",")[3].strip()
-                            self.my_satellite.upmode =  lineb.split(",")[4].strip()
-                            self.my_satellite.mode =  lineb.split(",")[5].strip()
-                            #  check if frequencies are in the same band: e.g. U/U, V/V vs V/U, U/V
-                            if abs(self.my_satellite.F - self.my_satellite.I) > 10000000:
-                                self.my_satellite.rig_satmode = 1
-                            else:
-                                self.my_satellite.rig_satmode = 0
-                            if self.my_satellite.F == 0:
-                                self.Startbutton.setEnabled(False)
-                                self.Stopbutton.setEnabled(False)
-                                self.syncbutton.setEnabled(False)
-                                self.offsetstorebutton.setEnabled(False)
-                            else:
-                                self.Startbutton.setEnabled(True)
-                                self.syncbutton.setEnabled(True)
-                                self.offsetstorebutton.setEnabled(True)
-                                
-                            if  self.my_satellite.F > 0 and self.my_satellite.I == 0:
-                                RX_TPX_ONLY = True
-                                self.my_satellite.rig_satmode = 0
-                            else:
-                                RX_TPX_ONLY = False
-                            break
-                
-                if not found_match:
-                    logging.info(f"Warning: No matching entry found for transponder: {tpxname} and satellite: {self.my_satellite.name}")
-        except IOError as e:
-            logging.error(f"IO Error when processing transponder change: {e}")
-
-        logging.debug(f"Setting RX offset to 0")
-        self.rxoffsetbox.setValue(0)
-        for tpx in useroffsets:
-            if tpx[0] == self.my_satellite.name and tpx[1] == tpxname:
-                usrrxoffset=int(tpx[2])
-                logging.debug(f"Found user offset for this satellite+transponder: {usrrxoffset}")
-                if usrrxoffset < MAX_OFFSET_RX and usrrxoffset > -MAX_OFFSET_RX:
-                    logging.debug(f"Setting RX offset to: {usrrxoffset}")
-                    self.rxoffsetbox.setMaximum(MAX_OFFSET_RX)
-                    self.rxoffsetbox.setMinimum(-MAX_OFFSET_RX)
-                    self.rxoffsetbox.setValue(usrrxoffset)
-                    self.my_satellite.new_cal = 1
-                    self.my_satellite.F_cal = f_cal = usrrxoffset
-                else:
-                    logging.debug(f"User offset {usrrxoffset} outside allowed range [-{MAX_OFFSET_RX}, {MAX_OFFSET_RX}]")
-                    self.rxoffsetbox.setValue(0)
-                
-                
-        self.my_satellite.tledata = ""
-        
-        # Safely stop the timer from any thread
-        try:
-            QMetaObject.invokeMethod(self.timer, "stop", Qt.QueuedConnection)
-            logging.debug("Timer stopped safely")
-        except Exception as e:
-            logging.error(f"Error stopping timer: {e}")
-            # Fallback: try direct stop if invokeMethod failed
-            try:
-                if QThread.currentThread() == self.thread():
-                    self.timer.stop()
-                    logging.debug("Timer stopped directly")
-                else:
-                    logging.error("Cannot stop timer - not in main thread")
-            except Exception as e2:
-                logging.error(f"Error in fallback timer stop: {e2}")
-                
-        try:
-            with open(TLEFILE, 'r') as f:
-                data = f.readlines()  
-                tle_found = False
-                for index, line in enumerate(data):
-                    if str(self.my_satellite.name) in line:
-                        logging.debug(f"Found TLE data for satellite: {self.my_satellite.name}")
-                        self.my_satellite.tledata = ephem.readtle(data[index], data[index+1], data[index+2])
-                        tle_found = True
-                        break
-                        
-                if not tle_found:
-                    logging.warning(f"Warning: No TLE data found for satellite: {self.my_satellite.name}")
-        except IOError as e:
-            logging.error(f"IO Error when reading TLE file: {e}")
-        
+        engine.select_transponder(tpxname)
+            
+    def tone_changed(self, tone_name):
+        engine.set_subtone(tone_name)
+
+    def select_combo_item(self, combo, text):
+        """Show an item without triggering the combo box handler"""
+        index = combo.findText(text)
+        if index != -1 and index != combo.currentIndex():
+            combo.blockSignals(True)
+            combo.setCurrentIndex(index)
+            combo.blockSignals(False)
+
+    @Slot(str, object)
+    def on_engine_event(self, event, value):
+        """Apply a tracking engine change to the widgets, see lib/tracking_engine.py for the events"""
+        if event == 'satellite':
+            self.select_combo_item(self.combo1, value)
+            self.combo2.blockSignals(True)
+            self.combo2.clear()
+            self.combo2.addItems(engine.transponders)
+            self.combo2.blockSignals(False)
+        elif event == 'transponder':
+            self.select_combo_item(self.combo2, value)
+            self.show_transponder()
+        elif event == 'subtone':
+            self.select_combo_item(self.combo3, value)
+        elif event == 'rx_offset':
+            self.rxoffsetbox.blockSignals(True)
+            self.rxoffsetbox.setValue(value)
+            self.rxoffsetbox.blockSignals(False)
+        elif event == 'tracking':
+            self.show_tracking_state(value)
+        elif event == 'frequency_pause':
+            if hasattr(self, 'toggle_freq_button'):
+                self.toggle_freq_button.setText("Resume Frequency Updates" if value else "Pause Frequency Updates")
+        elif event == 'catalog_scan':
+            if getattr(self, 'catalog_rescan_finished', None):
+                self.catalog_rescan_finished(value)
+
+    def show_transponder(self):
+        self.rxfreq.setText(str('{:,}'.format(self.my_satellite.F))+ " Hz")
+        self.txfreq.setText(str('{:,}'.format(self.my_satellite.I)) + " Hz")
+        can_track = engine.can_track()
+        self.Startbutton.setEnabled(can_track and not engine.tracking_session.active)
+        self.syncbutton.setEnabled(can_track)
+        self.offsetstorebutton.setEnabled(can_track)
         if self.my_satellite.tledata == "":
-            logging.info("TLE data is empty, disabling tracking buttons")
-            self.Startbutton.setEnabled(False)
-            self.syncbutton.setEnabled(False)
-            self.offsetstorebutton.setEnabled(False)
             self.log_tle_state_val.setText("n/a")
-            return
         else:
-            day_of_year = datetime.now().timetuple().tm_yday
-            tleage = int(data[index+1][20:23])
-            self.my_satellite.tle_age = day_of_year - tleage
             self.log_tle_state_val.setText("{0} day(s)".format(self.my_satellite.tle_age))
 
-        # Send to Cloudlog in background after updating satellite/transponder info
-        if not CLOUDLOG_ENABLED:
-            logging.debug("Cloudlog: Disabled in config.ini")
-        elif not CLOUDLOG_API_KEY or not CLOUDLOG_URL:
-            logging.warning("Cloudlog API key or URL not set in config.ini")
-        else:
-            worker = CloudlogWorker(
-                sat=self.my_satellite,
-                tx_freq=self.my_satellite.I,
-                rx_freq=self.my_satellite.F,
-                tx_mode=self.my_satellite.upmode,
-                rx_mode=self.my_satellite.downmode,
-                sat_name=self.my_satellite.name,
-                log_url=CLOUDLOG_URL,
-                log_api_key=CLOUDLOG_API_KEY
-            )
-            QThreadPool.globalInstance().start(worker)
-            self._last_cloudlog_F = self.my_satellite.F
-            self._last_cloudlog_I = self.my_satellite.I
-            
-        # Safely start the timer from any thread    
-        try:
-            QMetaObject.invokeMethod(self.timer, "start", Qt.QueuedConnection)
-            logging.debug("Timer started safely")
-        except Exception as e:
-            logging.error(f"Error starting timer: {e}")
-            # Fallback: try direct start if invokeMethod failed
-            try:
-                if QThread.currentThread() == self.thread():
-                    self.timer.start()
-                    logging.debug("Timer started directly")
-                else:
-                    logging.error("Cannot start timer - not in main thread")
-            except Exception as e2:
-                logging.error(f"Error in fallback timer start: {e2}")
-        
-        # Notify web clients of the transponder change
-        if WEBAPI_ENABLED:
-            try:
-                web_api.broadcast_transponder_change(tpxname)
-            except Exception as e:
-                logging.error(f"Error broadcasting transponder change to web clients: {e}")
-            
-    def tone_changed(self, tone_name):
-        DOPPLER_UPDATE_LOCK = True
-        if self.my_satellite.rig_satmode == 1:
-            icomTrx.setVFO("Sub")
-        else:
-            icomTrx.setVFO("VFOB")
-            
-        if RIG_TYPE == "US":
-            if tone_name == "67 Hz":
-                icomTrx.setToneSQLHz(str(670))
-                icomTrx.setToneSquelchOn(1)
-            elif tone_name == "71.9 Hz":
-                icomTrx.setToneSQLHz(str(719))
-                icomTrx.setToneSquelchOn(1)
-            elif tone_name == "74.4 Hz":
-                icomTrx.setToneSQLHz(str(744))
-                icomTrx.setToneSquelchOn(1)
-            elif tone_name == "141.3 Hz":
-                icomTrx.setToneSQLHz(str(1413))
-                icomTrx.setToneSquelchOn(1)
-            elif tone_name == "None":
-                icomTrx.setToneSquelchOn(0)
-        elif RIG_TYPE == "EU":
-            if tone_name == "67 Hz":
-                icomTrx.setToneHz(str(670))
-                icomTrx.setToneOn(1)
-            elif tone_name == "71.9 Hz":
-                icomTrx.setToneHz(str(719))
-                icomTrx.setToneOn(1)
-            elif tone_name == "74.4 Hz":
-                icomTrx.setToneHz(str(744))
-                icomTrx.setToneOn(1)
-            elif tone_name == "141.3 Hz":
-                icomTrx.setToneHz(str(1413))
-                icomTrx.setToneOn(1)
-            elif tone_name == "None":
-                icomTrx.setToneOn(0)
-        DOPPLER_UPDATE_LOCK = False
-        # Notify web clients of the subtone change
-        if WEBAPI_ENABLED:
-            try:
-                web_api.broadcast_subtone_change(tone_name)
-            except Exception as e:
-                logging.error(f"Error broadcasting subtone change to web clients: {e}")
+    def show_tracking_state(self, active):
+        self.Stopbutton.setEnabled(active)
+        self.Startbutton.setEnabled(not active and engine.can_track())
+        self.combo1.setEnabled(not active)
+        self.combo2.setEnabled(not active)
+        if active:
+            self.syncbutton.setEnabled(True)
+            self.offsetstorebutton.setEnabled(True)
+        # Frequency control button is only usable while tracking (if rotator enabled)
+        if ROTATOR_ENABLED and hasattr(self, 'toggle_freq_button'):
+            self.toggle_freq_button.setEnabled(active)
+            self.toggle_freq_button.setText("Pause Frequency Updates")
 
     def the_exit_button_was_clicked(self):
-        self.the_stop_button_was_clicked()
-        icomTrx.close()
+        engine.shutdown()
         sys.exit()
     
     def the_stop_button_was_clicked(self):
-        global TRACKING_ACTIVE
-        global INTERACTIVE
-        global FREQUENCY_UPDATES_PAUSED
-        TRACKING_ACTIVE = False
-        INTERACTIVE = False
-        FREQUENCY_UPDATES_PAUSED = False  # Reset frequency pause state when stopping tracking
-        self.threadpool.clear()
-        self.Stopbutton.setEnabled(False)
-        self.Startbutton.setEnabled(True)
-        self.combo1.setEnabled(True)
-        self.combo2.setEnabled(True)
-        
-        # Disable frequency control button when tracking stops
-        if ROTATOR_ENABLED and hasattr(self, 'toggle_freq_button'):
-            self.toggle_freq_button.setEnabled(False)
-            self.toggle_freq_button.setText("Pause Frequency Updates")
-            
-        # Set pass recorder to inactive tracking state
-        self.pass_recorder.set_tracking_active(False)
-        # Stop rotator thread and park
-        if ROTATOR_ENABLED:
-            self.stop_rotator_thread()
-            self.park_rotators()
-        # Notify web clients of tracking state change
-        if WEBAPI_ENABLED:
-            try:
-                web_api.broadcast_tracking_state(False)
-            except Exception as e:
-                logging.error(f"Error broadcasting tracking stop to web clients: {e}")
+        # Buttons are updated through on_engine_event()
+        engine.stop_tracking()
 
     def the_sync_button_was_clicked(self):
-        self.my_satellite.F = self.my_satellite.F_init
-        self.my_satellite.I = self.my_satellite.I_init
+        engine.sync_to_memory()
     
     def init_worker(self):
-        global TRACKING_ACTIVE
-        self.syncbutton.setEnabled(True)
-        self.offsetstorebutton.setEnabled(True)
-        self.Stopbutton.setEnabled(True)
-        if TRACKING_ACTIVE == False:
-            TRACKING_ACTIVE = True
-        self.Startbutton.setEnabled(False)
-        self.combo1.setEnabled(False)
-        self.combo2.setEnabled(False)
-        
-        # Enable frequency control button when tracking starts (if rotator enabled)
-        if ROTATOR_ENABLED and hasattr(self, 'toggle_freq_button'):
-            self.toggle_freq_button.setEnabled(True)
-            self.toggle_freq_button.setText("Pause Frequency Updates")
-        self.doppler_worker = Worker(self.calc_doppler)
-        
-        # Set high priority for doppler calculations
-        # This ensures doppler calculations run at higher priority than WebSocket communications
-        # For PySide6, we need to use the integer priority value directly
-        self.threadpool.start(self.doppler_worker, QThread.HighestPriority.value)
-        
-        # Set pass recorder to active tracking state
-        self.pass_recorder.set_tracking_active(True)
-        # Start rotator thread
-        if ROTATOR_ENABLED:
-            self.start_rotator_thread()
-        # Notify web clients of tracking state change
-        if WEBAPI_ENABLED:
-            try:
-                web_api.broadcast_tracking_state(True)
-            except Exception as e:
-                logging.error(f"Error broadcasting tracking start to web clients: {e}")
-
-    def calc_doppler(self, progress_callback):
-        global CVIADDR
-        global TRACKING_ACTIVE
-        global FREQUENCY_UPDATES_PAUSED
-        global INTERACTIVE
-        global myloc
-        global f_cal
-        global i_cal
-        global doppler_thres
-        
-        try:
-                #################################
-                #       INIT RADIOS
-                #################################
-
-                if RADIO == "910" and self.my_satellite.rig_satmode == 0 and RX_TPX_ONLY == False:
-                    icomTrx.setSatelliteMode(0)
-                    icomTrx.setSplitOn(1)
-                elif RADIO == "910" and self.my_satellite.rig_satmode == 0 and RX_TPX_ONLY == True:
-                    icomTrx.setSatelliteMode(0)
-                    icomTrx.setSplitOn(0)
-                elif RADIO == "910" and self.my_satellite.rig_satmode == 1:
-                    icomTrx.setSatelliteMode(1)
-                    icomTrx.setSplitOn(0)
-                elif ( RADIO == "705" or "818" ) and OPMODE == False and self.my_satellite.rig_satmode == 0: #not implemented yet
-                    logging.error("*** Not implemented yet mate***")
-                    sys.exit()
-
-                #################################
-                #       SETUP DOWNLINK & UPLINK
-                #################################
-
-                if RADIO == "910":
-                    # Testing current satmode config for V/U or U/V and swapping if needed
-                    icomTrx.setVFO("Main")
-                    freq_str = icomTrx.getFrequency()
-                    try:
-                        # Handle case where getFrequency returns hex error codes like 'FD'
-                        if freq_str and freq_str.isdigit():
-                            curr_band = int(freq_str)
-                        else:
-                            logging.warning(f"ICOM getFrequency returned non-numeric value: {freq_str}, skipping band check")
-                            curr_band = 0  # Default value, will not trigger exchange
-                    except (ValueError, TypeError) as e:
-                        logging.warning(f"Error parsing ICOM frequency '{freq_str}': {e}, skipping band check")
-                        curr_band = 0  # Default value, will not trigger exchange
-                    
-                    if curr_band > 400000000 and self.my_satellite.F_RIG < 400000000:
-                        icomTrx.setExchange()
-                    elif curr_band < 200000000 and self.my_satellite.F_RIG > 200000000:
-                        icomTrx.setExchange()
-                            
-                    doppler_thres, INTERACTIVE = icomTrx.setup_vfos(self.my_satellite.rig_satmode,self.my_satellite.downmode, self.my_satellite.upmode, DOPPLER_THRES_FM, DOPPLER_THRES_LINEAR)
-                    
-                elif RADIO != "910":
-                    logging.error("*** Not implemented yet mate***")
-                    sys.exit()
-
-                icomTrx.setVFO("Main") 
-
-                date_val = strftime('%Y/%m/%d %H:%M:%S', gmtime())
-                myloc.date = ephem.Date(date_val)
-
-                self.my_satellite.F_RIG = rx_dopplercalc(self.my_satellite.tledata, self.my_satellite.F, myloc)
-                self.my_satellite.I_RIG = tx_dopplercalc(self.my_satellite.tledata, self.my_satellite.I, myloc)
-                self.rxdoppler_val.setText(str('{:,}'.format(float(rx_doppler_val_calc(self.my_satellite.tledata,self.my_satellite.F, myloc)))))
-                self.txdoppler_val.setText(str('{:,}'.format(float(tx_doppler_val_calc(self.my_satellite.tledata,self.my_satellite.I, myloc)))))
-                user_Freq = 0;
-                user_Freq_history = [0, 0, 0, 0]
-                vfo_not_moving = 0
-                vfo_not_moving_old = 0
-                ptt_state = 0
-                ptt_state_old = 0
-                
-                if self.my_satellite.rig_satmode == 1:
-                    icomTrx.setVFO("Main")
-                    if RIG_TYPE == "US":
-                        icomTrx.setToneSquelchOn(0)
-                    elif RIG_TYPE == "EU":
-                        icomTrx.setToneOn(0)
-                    icomTrx.setFrequency(str(int(self.my_satellite.F_RIG)))
-                    icomTrx.setVFO("SUB")
-                    icomTrx.setFrequency(str(int(self.my_satellite.I_RIG)))
-                else:
-                    icomTrx.setVFO("VFOA")
-                    if RIG_TYPE == "US":
-                        icomTrx.setToneSquelchOn(0)
-                    elif RIG_TYPE == "EU":
-                        icomTrx.setToneOn(0)
-                    icomTrx.setFrequency(str(int(self.my_satellite.F_RIG)))
-                    if RX_TPX_ONLY == False:
-                        icomTrx.setVFO("VFOB")
-                        icomTrx.setFrequency(str(int(self.my_satellite.I_RIG)))
-                        INTERACTIVE = False #for SSB packet sats
-                        icomTrx.setVFO("VFOA")
-                    else:
-                        icomTrx.setSplitOn(0)
-        
-        
-                # Ensure that initial frequencies are always written 
-                tracking_init = 1
-                last_freq_update = 0  # Track last frequency update time
-                min_freq_update_interval = 0.030  # Minimum 30ms between frequency updates (optimized for high latitude)
-
-                while TRACKING_ACTIVE == True:
-                    a = datetime.now()
-                    #date_val = strftime('%Y/%m/%d %H:%M:%S', gmtime())
-                    date_val = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M:%S.%f')[:-3]
-                    myloc.date = ephem.Date(date_val)
-
-
-                    if INTERACTIVE == True:
-                        
-                        # Set RX VFO as standard
-                        if self.my_satellite.rig_satmode == 1:
-                            icomTrx.setVFO("Main")
-                        else:
-                            icomTrx.setVFO("VFOA")
-                            
-                        # read current RX
-                        try:
-                            user_Freq = int(icomTrx.getFrequency())
-                            updated_rx = 1
-                            user_Freq_history.pop(0)
-                            user_Freq_history.append(user_Freq)
-                        except:
-                            updated_rx = 0
-                            user_Freq = 0
-                        
-                        vfo_not_moving_old = vfo_not_moving
-                        vfo_not_moving = user_Freq_history.count(user_Freq_history[0]) == len(user_Freq_history)
-                        #print("Last n frequencies: " +str(user_Freq_history) +" --> no change: " + str(vfo_not_moving))
-                        # check for valid received freq and if dial is not moving (last two read frequencies are the same)
-                        if user_Freq > 0 and updated_rx == 1 and vfo_not_moving and self.my_satellite.new_cal == 0:
-                            # check if there is an offset from the dial and move up/downlink accordingly
-                            if abs(user_Freq - self.my_satellite.F_RIG) > 1:
-                                if True:
-                                    if user_Freq > self.my_satellite.F_RIG:
-                                        delta_F = user_Freq - self.my_satellite.F_RIG
-                                        if self.my_satellite.mode == "REV":
-                                            self.my_satellite.I -= delta_F
-                                            self.my_satellite.I_RIG -= delta_F
-                                            self.my_satellite.F += delta_F
-                                        else:
-                                            self.my_satellite.I += delta_F
-                                            self.my_satellite.I_RIG += delta_F
-                                            self.my_satellite.F += delta_F
-                                    else:
-                                        delta_F = self.my_satellite.F_RIG - user_Freq
-                                        if self.my_satellite.mode == "REV":
-                                            self.my_satellite.I += delta_F
-                                            self.my_satellite.I_RIG += delta_F
-                                            self.my_satellite.F -= delta_F
-                                        else:
-                                            self.my_satellite.I -= delta_F
-                                            self.my_satellite.I_RIG -= delta_F
-                                            self.my_satellite.F -= delta_F
-                                    self.my_satellite.F_RIG = user_Freq
-                                            
-                        # check if dial isn't moving, might be skipable as later conditional check yields the same         
-                        if updated_rx and vfo_not_moving and vfo_not_moving_old:#old_user_Freq == user_Freq and False:
-                            # Use predictive doppler for linear satellites if enabled, especially around TCA
-                            if self.my_satellite.downmode in ["USB", "LSB", "CW"] and PREDICTIVE_DOPPLER:
-                                # Use the new adaptive prediction algorithm - no need to pass prediction_time
-                                # The function now automatically determines optimal prediction time internally
-                                new_rx_doppler = rx_dopplercalc_predictive(self.my_satellite.tledata, self.my_satellite.F + self.my_satellite.F_cal, myloc)
-                            else:
-                                # Use standard calculation for FM satellites or when predictive doppler is disabled
-                                new_rx_doppler = round(rx_dopplercalc(self.my_satellite.tledata, self.my_satellite.F + self.my_satellite.F_cal, myloc))
-                                
-                            if abs(new_rx_doppler-self.my_satellite.F_RIG) > doppler_thres and DOPPLER_UPDATE_LOCK == False and FREQUENCY_UPDATES_PAUSED == False:
-                                rx_doppler = new_rx_doppler
-                                if self.my_satellite.rig_satmode == 1:
-                                    icomTrx.setVFO("Main")
-                                else:
-                                    icomTrx.setVFO("VFOA")
-                                
-                                icomTrx.setFrequency(str(rx_doppler))
-                                self.my_satellite.F_RIG = rx_doppler
-                        
-                            # Apply predictive correction to TX as well for linear satellites
-                            if self.my_satellite.upmode in ["USB", "LSB", "CW"]:
-                                # Use the new adaptive prediction algorithm - no need to pass prediction_time
-                                # The function now automatically determines optimal prediction time internally
-                                new_tx_doppler = tx_dopplercalc_predictive(self.my_satellite.tledata, self.my_satellite.I, myloc)
-                            else:
-                                # Use standard calculation for FM satellites
-                                new_tx_doppler = round(tx_dopplercalc(self.my_satellite.tledata, self.my_satellite.I, myloc))
-                                
-                            if abs(new_tx_doppler-self.my_satellite.I_RIG) > doppler_thres and DOPPLER_UPDATE_LOCK == False and FREQUENCY_UPDATES_PAUSED == False:
-                                tx_doppler = new_tx_doppler
-                                if self.my_satellite.rig_satmode == 1:
-                                    icomTrx.setVFO("SUB")
-                                else:
-                                    icomTrx.setVFO("VFOB")
-                                    # Don't switch VFO when PTT is pushed, to avoid switching VFO while TX 
-                                    # Only check PTT status for radios that support it (not IC-910)
-                                    if icomTrx.radio_model != '910':
-                                        while icomTrx.isPttOff() == 0:
-                                            time.sleep(0.1)
-                                        
-                                icomTrx.setFrequency(str(tx_doppler))
-                                self.my_satellite.I_RIG = tx_doppler
-                            time.sleep(0.2)
-                    # FM sats, no dial input accepted!
-                    elif self.my_satellite.rig_satmode == 1:
-                        new_rx_doppler = round(rx_dopplercalc(self.my_satellite.tledata,self.my_satellite.F + self.my_satellite.F_cal, myloc))
-                        new_tx_doppler = round(tx_dopplercalc(self.my_satellite.tledata,self.my_satellite.I, myloc))
-                        if (abs(new_rx_doppler-self.my_satellite.F_RIG) > doppler_thres or tracking_init == 1) and DOPPLER_UPDATE_LOCK == False and FREQUENCY_UPDATES_PAUSED == False:
-                                tracking_init = 0
-                                rx_doppler = new_rx_doppler
-                                icomTrx.setVFO("MAIN")
-                                icomTrx.setFrequency(str(rx_doppler))
-                                self.my_satellite.F_RIG = rx_doppler
-                        if (abs(new_tx_doppler-self.my_satellite.I_RIG) > doppler_thres or tracking_init == 1) and DOPPLER_UPDATE_LOCK == False and FREQUENCY_UPDATES_PAUSED == False:
-                                tracking_init = 0
-                                tx_doppler = new_tx_doppler
-                                icomTrx.setVFO("SUB")
-                                icomTrx.setFrequency(str(tx_doppler))
-                                self.my_satellite.I_RIG = tx_doppler
-                                icomTrx.setVFO("MAIN")
-                        if doppler_thres > 0:
-                            time.sleep(FM_update_time) # Slower update rate on FM, max on linear sats
-                            
-                    else:
-                        # Non-interactive mode for linear satellites (SSB packet, etc.)
-                        # Use predictive doppler for better TCA tracking if enabled
-                        if self.my_satellite.downmode in ["USB", "LSB", "CW"] and PREDICTIVE_DOPPLER:
-                            # Use the new adaptive prediction algorithm - automatically determines optimal prediction time
-                            new_rx_doppler = rx_dopplercalc_predictive(self.my_satellite.tledata, self.my_satellite.F + self.my_satellite.F_cal, myloc)
-                            new_tx_doppler = tx_dopplercalc_predictive(self.my_satellite.tledata, self.my_satellite.I, myloc)
-                        else:
-                            # Standard calculation for FM or other modes, or when predictive doppler is disabled
-                            new_rx_doppler = round(rx_dopplercalc(self.my_satellite.tledata,self.my_satellite.F + self.my_satellite.F_cal, myloc))
-                            new_tx_doppler = round(tx_dopplercalc(self.my_satellite.tledata,self.my_satellite.I, myloc))
-                        # PTT checking only supported on radios other than IC-910
-                        if icomTrx.radio_model != '910':
-                            # 0 = PTT is pressed
-                            # 1 = PTT is released
-                            ptt_state_old = ptt_state
-                            ptt_state = icomTrx.isPttOff()
-                            # Check for RX -> TX transition
-                            if  ptt_state_old and ptt_state == 0 and abs(new_tx_doppler-self.my_satellite.I_RIG) > doppler_thres and FREQUENCY_UPDATES_PAUSED == False:
-                                #icomTrx.setVFO("VFOB")
-                                logging.debug("TX inititated")
-                                tx_doppler = new_tx_doppler
-                                self.my_satellite.I_RIG = tx_doppler
-                                icomTrx.setFrequency(str(tx_doppler))
-                            if  ptt_state and abs(new_rx_doppler-self.my_satellite.F_RIG) > doppler_thres and FREQUENCY_UPDATES_PAUSED == False:
-                                rx_doppler = new_rx_doppler
-                                self.my_satellite.F_RIG = rx_doppler
-                                icomTrx.setVFO("VFOA")
-                                icomTrx.setFrequency(str(rx_doppler))
-                        else:
-                            # IC-910: Simple frequency updates without PTT checking
-                            # Skip health checks during rapid updates to avoid interference
-                            
-                            # Use adaptive threshold based on doppler rate - optimized for high latitude (57.63°N)
-                            current_doppler_rate = abs(self.my_satellite.down_doppler_rate) + abs(self.my_satellite.up_doppler_rate)
-                            if current_doppler_rate > 2500:  # Extreme doppler rate - much smaller threshold
-                                adaptive_thres = max(50, doppler_thres // 2)  # Half threshold, minimum 50Hz
-                            elif current_doppler_rate > 1500:  # Very high doppler rate - smaller threshold
-                                adaptive_thres = max(75, doppler_thres * 2 // 3)  # 2/3 threshold, minimum 75Hz
-                            elif current_doppler_rate > 800:  # High doppler rate
-                                adaptive_thres = max(100, doppler_thres * 3 // 4)  # 3/4 threshold, minimum 100Hz
-                            else:
-                                adaptive_thres = doppler_thres  # Normal threshold
-                            
-                            # Check minimum time between frequency updates to avoid overwhelming radio
-                            current_time = time.time()
-                            time_since_last_update = current_time - last_freq_update
-                            
-                            if time_since_last_update >= min_freq_update_interval:
-                                if abs(new_rx_doppler-self.my_satellite.F_RIG) > adaptive_thres and FREQUENCY_UPDATES_PAUSED == False:
-                                    rx_doppler = new_rx_doppler
-                                    self.my_satellite.F_RIG = rx_doppler
-                                    icomTrx.setVFO("VFOA")
-                                    icomTrx.setFrequency(str(rx_doppler))
-                                    last_freq_update = current_time
-                                        
-                                if abs(new_tx_doppler-self.my_satellite.I_RIG) > adaptive_thres and FREQUENCY_UPDATES_PAUSED == False:
-                                    tx_doppler = new_tx_doppler
-                                    self.my_satellite.I_RIG = tx_doppler
-                                    icomTrx.setVFO("VFOB")
-                                    icomTrx.setFrequency(str(tx_doppler))
-                                    # Small delay after TX frequency update to let radio process
-                                    time.sleep(0.01)
-                                    last_freq_update = current_time
-                        # Adaptive sleep based on doppler rate - optimized for high latitude (57.63°N)
-                        doppler_rate = abs(self.my_satellite.down_doppler_rate) + abs(self.my_satellite.up_doppler_rate)
-                        if doppler_rate > 3000:  # Extreme doppler rate (very high latitude near TCA)
-                            time.sleep(0.010)  # 10ms - maximum safe speed for radio
-                        elif doppler_rate > 2000:  # Very high doppler rate (high latitude near TCA)
-                            time.sleep(0.012)  # 12ms - very fast but safe
-                        elif doppler_rate > 1000:  # High doppler rate (approaching TCA)
-                            time.sleep(0.015)  # 15ms for rapid changes
-                        elif doppler_rate > 500:  # Medium-high doppler rate
-                            time.sleep(0.020)  # 20ms for moderate-rapid changes
-                        elif doppler_rate > 100:  # Medium doppler rate
-                            time.sleep(0.025)  # 25ms for moderate changes
-                        else:
-                            time.sleep(0.030)  # 30ms for slow changes
-                        
-                    self.my_satellite.new_cal = 0
-                    time.sleep(0.01)
-                    #b = datetime.now()
-                    #c = b - a
-                    #print("Ups:" +str(1000000/c.microseconds))  
-                    
+        # The engine runs the doppler worker in its own thread
+        engine.start_tracking()
 
-        except Exception as e:
-            global RIG_CONNECTED
-            RIG_CONNECTED = False
-            logging.critical(f"ICOM rig communication error: {e}")
-            logging.warning("Rig connection lost, attempting to reconnect...")
-            
-            # Try to reconnect
-            reconnected = self.attempt_icom_reconnection()
-            if not reconnected:
-                logging.warning("Reconnection failed, continuing in offline mode")
-            
-            # Wait a moment for reconnection to stabilize
-            time.sleep(1.0)
-            
-            # Check if tracking should continue and restart the worker
-            if TRACKING_ACTIVE and hasattr(self, 'my_satellite') and self.my_satellite:
-                logging.info("Resuming doppler tracking after reconnection...")
-                # Restart the doppler worker to continue tracking
-                self.restart_doppler_tracking()
-            else:
-                logging.warning("Tracking not active or no satellite selected, stopping doppler calculations")
-                return
-    
     def recurring_utc_clock_timer(self):
-        date_val = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M:%S.%f')[:-3]
-        myloc.date = ephem.Date(date_val)
         self.log_time_val.setText(datetime.now(timezone.utc).strftime('%H:%M:%S')+"z")
         if self.my_satellite.tledata != "":
-            self.log_sat_event_val.setText(str(sat_next_event_calc(self.my_satellite.tledata, myloc)))
-        if icomTrx.is_connected():
+            self.log_sat_event_val.setText(engine.next_event)
+        # Reconnection is left to the rig supervisor thread, the GUI only shows the state
+        if engine.rig_connected():
             self.log_rig_state_val.setText("✔")
             self.log_rig_state_val.setStyleSheet('color: green')
-            # Reset reconnection counter when connected
-            self._reconnect_counter = 0
         else:
             self.log_rig_state_val.setText("✘")
             self.log_rig_state_val.setStyleSheet('color: red')
             
-            # Attempt reconnection every 30 seconds (timer runs every ~2 seconds)
-            if not hasattr(self, '_reconnect_counter'):
-                self._reconnect_counter = 0
-            self._reconnect_counter += 1
-            
-            if self._reconnect_counter >= 15:  # 15 * 2 seconds = 30 seconds
-                self._reconnect_counter = 0
-                logging.info("Attempting periodic ICOM reconnection...")
-                self.attempt_icom_reconnection()
-            
     
     def recurring_timer(self):
+        # The engine's orbit thread computes doppler and position, this only shows its latest snapshot
+        telemetry = engine.telemetry
+        if not telemetry.satellite:
+            return
         try:
-            date_val = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M:%S.%f')[:-3]
-            myloc.date = ephem.Date(date_val)
-            
-            # ★ SINGLE ORBITAL COMPUTATION ★ - replaces 7-10 individual compute calls
-            self.my_satellite.tledata.compute(myloc)
-            
-            # Doppler calculations using direct property access (no additional compute calls)
-            self.my_satellite.down_doppler_old = self.my_satellite.down_doppler
-            # Match original rx_doppler_val_calc format: format(..., '.2f') then convert to float
-            rx_doppler_raw = -self.my_satellite.tledata.range_velocity * self.my_satellite.F / C
-            self.my_satellite.down_doppler = float(format(rx_doppler_raw, '.2f'))
-            self.my_satellite.down_doppler_rate = ((self.my_satellite.down_doppler - self.my_satellite.down_doppler_old)/2)/0.2
-            # Use higher rate limit for linear satellites (USB, LSB, CW) as they have legitimate high doppler rates at TCA
-            max_doppler_rate = 2000.0 if self.my_satellite.downmode in ["USB", "LSB", "CW"] else 500.0
-            if abs(self.my_satellite.down_doppler_rate) > max_doppler_rate:
-                # Cap the rate instead of stopping updates completely
-                self.my_satellite.down_doppler_rate = max_doppler_rate if self.my_satellite.down_doppler_rate > 0 else -max_doppler_rate
-                logging.debug(f"Capped RX doppler rate to {self.my_satellite.down_doppler_rate} Hz/s")
-                
-            self.my_satellite.up_doppler_old = self.my_satellite.up_doppler
-            # Match original tx_doppler_val_calc format: format(..., '.2f') then convert to float
-            tx_doppler_raw = self.my_satellite.tledata.range_velocity * self.my_satellite.I / C
-            self.my_satellite.up_doppler = float(format(tx_doppler_raw, '.2f'))
-            self.my_satellite.up_doppler_rate = ((self.my_satellite.up_doppler - self.my_satellite.up_doppler_old)/2)/0.2
-            # Use higher rate limit for linear satellites (USB, LSB, CW) as they have legitimate high doppler rates at TCA
-            max_uplink_rate = 2000.0 if self.my_satellite.upmode in ["USB", "LSB", "CW"] else 500.0
-            if abs(self.my_satellite.up_doppler_rate) > max_uplink_rate:
-                # Cap the rate instead of stopping updates completely
-                self.my_satellite.up_doppler_rate = max_uplink_rate if self.my_satellite.up_doppler_rate > 0 else -max_uplink_rate
-                logging.debug(f"Capped TX doppler rate to {self.my_satellite.up_doppler_rate} Hz/s")
-                
-            self.rxdoppler_val.setText(str('{:,}'.format(self.my_satellite.down_doppler)) + " Hz")
-            self.txdoppler_val.setText(str('{:,}'.format(self.my_satellite.up_doppler)) + " Hz")
-            self.rxdopplerrate_val.setText(str(format(self.my_satellite.down_doppler_rate, '.2f')) + " Hz/s")
-            self.txdopplerrate_val.setText(str(format(self.my_satellite.up_doppler_rate, '.2f')) + " Hz/s")
-            self.rxfreq.setText(str('{:,}'.format(self.my_satellite.F_RIG))+ " Hz")
-            self.rxfreq_onsat.setText(str('{:,}'.format(self.my_satellite.F))+ " Hz")
-            self.txfreq.setText(str('{:,}'.format(self.my_satellite.I_RIG))+ " Hz")
-            self.txfreq_onsat.setText(str('{:,}'.format(self.my_satellite.I))+ " Hz")
-            
-            # All satellite position data using single computation (no additional compute calls)
-            elevation = format(self.my_satellite.tledata.alt / math.pi * 180.0, '.2f')
-            azimuth = format(self.my_satellite.tledata.az / math.pi * 180.0, '.2f')
-            height = format(float(self.my_satellite.tledata.elevation) / 1000.0, '.2f')
-            eclipse = "☾" if self.my_satellite.tledata.eclipsed else "☀︎"
-            
-            self.log_sat_status_ele_val.setText(str(elevation) + " °")
-            self.log_sat_status_azi_val.setText(str(azimuth) + " °")
-            self.log_sat_status_height_val.setText(str(height) + " km")
-            self.log_sat_status_illumintated_val.setText(eclipse)
-
-            # Cloudlog: only log if F or I changed and satellite is above horizon
-            try:
-                # Use already calculated elevation (no additional compute call)
-                elevation_float = float(elevation)
-                
-                # Update pass recorder with current elevation - no need to log every update
-                if self.my_satellite.name:
-                    self.on_satellite_update(elevation_float, self.my_satellite.name)
-                
-                # Handle Cloudlog updates
-                F_now = self.my_satellite.F
-                I_now = self.my_satellite.I
-                if elevation_float > 0.0 and (F_now != self._last_cloudlog_F or I_now != self._last_cloudlog_I):
-                    if not CLOUDLOG_ENABLED:
-                        logging.debug("Cloudlog: Disabled in config.ini")
-                    elif not CLOUDLOG_API_KEY or not CLOUDLOG_URL:
-                        logging.warning("Cloudlog API key or URL not set in config.ini")
-                    else:
-                        worker = CloudlogWorker(
-                            sat=self.my_satellite,
-                            tx_freq=self.my_satellite.I,
-                            rx_freq=self.my_satellite.F,
-                            tx_mode=self.my_satellite.upmode,
-                            rx_mode=self.my_satellite.downmode,
-                            sat_name=self.my_satellite.name,
-                            log_url=CLOUDLOG_URL,
-                            log_api_key=CLOUDLOG_API_KEY
-                        )
-                        QThreadPool.globalInstance().start(worker)
-                        self._last_cloudlog_F = self.my_satellite.F
-                        self._last_cloudlog_I = self.my_satellite.I
-            except Exception as e:
-                logging.error(f"Error getting satellite elevation: {e}")
-                elevation_float = -1
+            self.rxdoppler_val.setText(str('{:,}'.format(telemetry.down_doppler)) + " Hz")
+            self.txdoppler_val.setText(str('{:,}'.format(telemetry.up_doppler)) + " Hz")
+            self.rxdopplerrate_val.setText(str(format(telemetry.down_doppler_rate, '.2f')) + " Hz/s")
+            self.txdopplerrate_val.setText(str(format(telemetry.up_doppler_rate, '.2f')) + " Hz/s")
+            self.rxfreq.setText(str('{:,}'.format(telemetry.rig_downlink_freq))+ " Hz")
+            self.rxfreq_onsat.setText(str('{:,}'.format(telemetry.downlink_freq))+ " Hz")
+            self.txfreq.setText(str('{:,}'.format(telemetry.rig_uplink_freq))+ " Hz")
+            self.txfreq_onsat.setText(str('{:,}'.format(telemetry.uplink_freq))+ " Hz")
+            
+            self.log_sat_status_ele_val.setText(format(telemetry.sat_elevation, '.2f') + " °")
+            self.log_sat_status_azi_val.setText(format(telemetry.sat_azimuth, '.2f') + " °")
+            self.log_sat_status_height_val.setText(format(telemetry.sat_height, '.2f') + " km")
+            self.log_sat_status_illumintated_val.setText("☾" if telemetry.sat_eclipsed else "☀︎")
+            
+            self.update_passrecorder_status()
         except:
             logging.warning("Error in label timer")
             traceback.print_exc()
 
-    @Slot(str)
-    def slot_select_satellite(self, sat_name):
-        # Set the combo box and call sat_changed in the main thread
-        for i in range(self.combo1.count()):
-            if self.combo1.itemText(i) == sat_name:
-                self.combo1.setCurrentIndex(i)
-                break
-        self.sat_changed(sat_name)
-
-    @Slot(str)
-    def slot_select_transponder(self, tpx_name):
-        for i in range(self.combo2.count()):
-            if self.combo2.itemText(i) == tpx_name:
-                self.combo2.setCurrentIndex(i)
-                break
-        self.tpx_changed(tpx_name)
-
-    @Slot(str)
-    def slot_set_subtone(self, tone):
-        for i in range(self.combo3.count()):
-            if self.combo3.itemText(i) == tone:
-                self.combo3.setCurrentIndex(i)
-                break
-        self.tone_changed(tone)
-
-    @Slot(int)
-    def slot_set_rx_offset(self, offset):
-        min_val = self.rxoffsetbox.minimum()
-        max_val = self.rxoffsetbox.maximum()
-        if min_val <= offset <= max_val:
-            self.rxoffsetbox.setValue(offset)
-
-    # The slots for start_tracking and stop_tracking are already connected to init_worker and the_stop_button_was_clicked
-
-    # Remove all QMetaObject.invokeMethod and run_on_ui_thread logic for GUI/timer operations in this file.
-    # Only start/stop timers in the main thread via these slots.
-
-    def get_current_az_el(self):
-        # Returns (az, el) as floats for the current satellite
-        try:
-            # Single computation for both azimuth and elevation
-            self.my_satellite.tledata.compute(myloc)
-            az = float(self.my_satellite.tledata.az / math.pi * 180.0)
-            el = float(self.my_satellite.tledata.alt / math.pi * 180.0)
-            return az, el
-        except Exception as e:
-            logging.error(f"Error getting current az/el: {e}")
-            return ROTATOR_AZ_PARK, ROTATOR_EL_PARK
-    def best_rotator_azimuth(self, current_az, target_az, az_max):
-        """
-        Returns the best azimuth to command the rotator to, considering overlap.
-        """
-        current_az = current_az % az_max
-        target_az = target_az % az_max
-        direct_diff = abs(target_az - current_az)
-        overlap_target = target_az
-        if az_max > 360:
-            # Try using overlap (e.g., 370 instead of 10)
-            if target_az < 90 and current_az > 270:
-                overlap_target = target_az + 360
-            elif target_az > 270 and current_az < 90:
-                overlap_target = target_az - 360
-        overlap_diff = abs(overlap_target - current_az)
-        if overlap_diff < direct_diff:
-            return overlap_target
-        else:
-            return target_az
-
-    def rotator_set_position(self, az, el):
-        # Defensive: ensure az, el are always float to avoid TypeError
-        az = float(az)
-        el = float(el)
-        if self.rotator:
-            # Get current rotator azimuth for shortest-path logic
-            current_az, _ = self.rotator.get_position()
-            if current_az is not None:
-                az_to_send = self.best_rotator_azimuth(current_az, az, ROTATOR_AZ_MAX)
-            else:
-                az_to_send = az
-            self.rotator.set_position(az_to_send, el)
-            self.update_rotator_position()
-
-    def rotator_park(self, az_park, el_park):
-        # Defensive: ensure arguments are always float to avoid TypeError in rotator.set_position
-        az_park = float(az_park)
-        el_park = float(el_park)
-        if self.rotator:
-            self.rotator.park(az_park, el_park)
-            self.update_rotator_position()
-
-    def rotator_stop(self):
-        if self.rotator:
-            self.rotator.stop()
-            self.update_rotator_position()
-
     def park_rotators(self):
-        self.rotator_park(ROTATOR_AZ_PARK, ROTATOR_EL_PARK)
-
-    def pause_frequency_updates(self):
-        """Pause frequency updates while keeping rotator tracking active"""
-        global FREQUENCY_UPDATES_PAUSED
-        FREQUENCY_UPDATES_PAUSED = True
-        logging.info("Frequency updates paused - rotator tracking continues")
-        # Update button state
-        if hasattr(self, 'toggle_freq_button'):
-            self.toggle_freq_button.setText("Resume Frequency Updates")
-        # Notify web clients
-        if WEBAPI_ENABLED:
-            try:
-                web_api.broadcast_frequency_pause_state(True)
-            except Exception as e:
-                logging.error(f"Error broadcasting frequency pause state to web clients: {e}")
-
-    def resume_frequency_updates(self):
-        """Resume frequency updates"""
-        global FREQUENCY_UPDATES_PAUSED
-        FREQUENCY_UPDATES_PAUSED = False
-        logging.info("Frequency updates resumed")
-        # Update button state
-        if hasattr(self, 'toggle_freq_button'):
-            self.toggle_freq_button.setText("Pause Frequency Updates")
-        # Notify web clients
-        if WEBAPI_ENABLED:
-            try:
-                web_api.broadcast_frequency_pause_state(False)
-            except Exception as e:
-                logging.error(f"Error broadcasting frequency pause state to web clients: {e}")
+        engine.park_rotators()
+        self.update_rotator_position()
+
+    def stop_rotators(self):
+        engine.stop_rotators()
+        self.update_rotator_position()
 
     def toggle_frequency_updates(self):
         """Toggle frequency updates pause/resume"""
-        global FREQUENCY_UPDATES_PAUSED
-        if FREQUENCY_UPDATES_PAUSED:
-            self.resume_frequency_updates()
-        else:
-            self.pause_frequency_updates()
+        engine.toggle_frequency_updates()
 
-    def stop_rotators(self):
-        self.rotator_stop()
-        logging.info("Rotator stopped.")
-
-    def start_rotator_thread(self):
-        if ROTATOR_ENABLED and self.rotator and not self.rotator_thread:
-            self.rotator_thread = rotator.RotatorThread(
-                self.rotator,
-                self.get_current_az_el,
-                ROTATOR_MIN_ELEVATION,
-                ROTATOR_AZ_PARK,
-                ROTATOR_EL_PARK
-            )
-            self.rotator_thread.daemon = True
-            self.rotator_thread.start()
-            logging.debug("Rotator thread started.")
-            self.update_rotator_position()
-    def stop_rotator_thread(self):
-        if self.rotator_thread:
-            self.rotator_thread.stop()
-            self.rotator_thread.join(timeout=2)
-            self.rotator_thread = None
-            logging.debug("Rotator thread stopped.")
     def closeEvent(self, event):
         # Log shutdown
         logging.info("=" * 50)
         logging.info("QTrigdoppler shutting down")
         logging.info("=" * 50)
+        shutdown_started = time.monotonic()
         
-        # Ensure rotator is stopped and parked on exit
         if ROTATOR_ENABLED:
-            self.stop_rotator_thread()
-            self.park_rotators()
-            if self.rotator:
-                self.rotator.close()
             self.stop_rotator_position_worker()
+        
+        # Stops tracking, parks and closes the rotator and releases the rig
+        engine.shutdown()
             
         # Stop audio monitoring if active
         if hasattr(self, 'audio_monitor_active') and self.audio_monitor_active:
-            if hasattr(self, 'audio_monitor_stream') and self.audio_monitor_stream:
-                try:
-                    self.audio_monitor_stream.stop()
-                    self.audio_monitor_stream.close()
-                    self.audio_monitor_stream = None
-                    self.audio_monitor_active = False
-                except Exception as e:
-                    logging.error(f"Error stopping audio monitor on exit: {e}")
+            try:
+                self.stop_audio_monitoring()
+            except Exception as e:
+                logging.error(f"Error stopping audio monitor on exit: {e}")
             
         # Stop all timers to prevent accessibility events during shutdown
         try:
@@ -2966,23 +1984,12 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logging.error(f"Error stopping UTC clock timer: {e}")
         
-        # Wait for any running workers to complete and clear threadpool
-        try:
-            # Give workers more time to shut down properly
-            QThread.msleep(200)
-            self.threadpool.clear()
-            # Additional time for final cleanup
-            QThread.msleep(100)
-            logging.debug("Threadpool cleared")
-        except Exception as e:
-            logging.error(f"Error clearing threadpool: {e}")
-            
         # Stop web API background threads if enabled
         if WEBAPI_ENABLED:
             try:
                 import lib.web_api as web_api
-                web_api.stop_status_broadcast_thread()
-                logging.debug("Web API broadcast thread stopped")
+                web_api.stop_telemetry_thread()
+                logging.debug("Web API telemetry thread stopped")
             except Exception as e:
                 logging.error(f"Error stopping web API thread: {e}")
         
@@ -2994,6 +2001,11 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 logging.error(f"Error disconnecting remote client: {e}")
         
+        shutdown_time = time.monotonic() - shutdown_started
+        if shutdown_time > SHUTDOWN_TIME_TARGET:
+            logging.warning(f"Shutdown took {shutdown_time * 1000:.0f} ms (target {SHUTDOWN_TIME_TARGET * 1000:.0f} ms)")
+        else:
+            logging.info(f"Shutdown took {shutdown_time * 1000:.0f} ms")
         event.accept()
 
     def update_rotator_position(self):
@@ -3026,27 +2038,11 @@ class MainWindow(QMainWindow):
         # Defensive: safely stop worker and avoid double-deletion
         if hasattr(self, 'rotator_position_worker') and self.rotator_position_worker:
             try:
-                # Set up a finished signal handler to know when worker is done
-                worker_finished = False
-                def on_worker_finished():
-                    nonlocal worker_finished
-                    worker_finished = True
-                    
-                # Connect to finished signal if possible
-                try:
-                    self.rotator_position_worker.signals.finished.connect(on_worker_finished)
-                except:
-                    pass  # Signal connection failed, continue anyway
-                
-                # Tell worker to stop
+                # Tell worker to stop, this interrupts its poll wait right away
                 self.rotator_position_worker.stop()
                 
                 # Wait for worker to finish, with timeout
-                wait_count = 0
-                max_wait = 20  # 200ms maximum wait (20 * 10ms)
-                while not worker_finished and wait_count < max_wait:
-                    QThread.msleep(10)
-                    wait_count += 1
+                worker_finished = self.rotator_position_worker.finished_event.wait(0.2)
                     
                 if not worker_finished:
                     logging.debug("RotatorPositionWorker did not finish within timeout")
@@ -3058,104 +2054,145 @@ class MainWindow(QMainWindow):
             finally:
                 self.rotator_position_worker = None
             
+    def show_recording_catalog(self):
+        """Browse the recording catalog, every filter is a database query (lib/recording_catalog.py)"""
+        catalog = engine.recording_catalog
+        if catalog is None:
+            QMessageBox.information(self, "Recordings", "No recording catalog: enable pass recording or check the save directory.")
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Recordings")
+        dialog.resize(900, 500)
+        layout = QVBoxLayout()
+        
+        filter_layout = QHBoxLayout()
+        satellite_combo = QComboBox()
+        satellite_combo.addItem("All satellites", None)
+        for name, count, _ in catalog.satellites():
+            satellite_combo.addItem(f"{name} ({count})", name)
+        days_spin = QSpinBox()
+        days_spin.setRange(0, 3650)
+        days_spin.setSpecialValueText("All dates")
+        days_spin.setPrefix("Last ")
+        days_spin.setSuffix(" days")
+        elevation_spin = QDoubleSpinBox()
+        elevation_spin.setRange(0, 90)
+        elevation_spin.setSpecialValueText("Any elevation")
+        elevation_spin.setPrefix("Max el ≥ ")
+        elevation_spin.setSuffix(" °")
+        snr_spin = QDoubleSpinBox()
+        snr_spin.setRange(0, 60)
+        snr_spin.setSpecialValueText("Any SNR")
+        snr_spin.setPrefix("SNR ≥ ")
+        snr_spin.setSuffix(" dB")
+        rescan_button = QPushButton("Rescan Folder")
+        for widget in (satellite_combo, days_spin, elevation_spin, snr_spin, rescan_button):
+            filter_layout.addWidget(widget)
+        layout.addLayout(filter_layout)
+        
+        headers = ["Start (UTC)", "Satellite", "Transponder", "Duration", "Max El", "SNR", "Format", "File"]
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(table)
+        status_label = QLabel()
+        layout.addWidget(status_label)
+        
+        def refresh():
+            filters = {
+                'satellite': satellite_combo.currentData(),
+                'since': time.time() - days_spin.value() * 86400 if days_spin.value() else None,
+                'min_elevation': elevation_spin.value() or None,
+                'min_snr': snr_spin.value() or None,
+            }
+            rows = engine.search_recordings(limit=500, **filters)
+            table.setRowCount(len(rows))
+            for i, row in enumerate(rows):
+                start = datetime.fromtimestamp(row['start_time'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S') if row['start_time'] else ""
+                values = [start, row['satellite'] or "", row['transponder'] or "",
+                          f"{row['duration'] / 60:.1f} min" if row['duration'] is not None else "",
+                          f"{row['max_elevation']:.0f} °" if row['max_elevation'] is not None else "",
+                          f"{row['snr_median']:.1f} dB" if row['snr_median'] is not None else "",
+                          row['format'] or "", row['filename']]
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    item.setData(Qt.UserRole, row['path'])
+                    table.setItem(i, column, item)
+            table.resizeColumnsToContents()
+            status_label.setText(f"{len(rows)} of {catalog.count(**filters)} recordings, double-click to open")
+        
+        def rescan():
+            # In the background, reading the headers of a large folder would freeze the window
+            rescan_button.setEnabled(False)
+            status_label.setText(status_label.text() + " | rescanning...")
+            engine.rescan_recordings()
+        
+        def rescan_finished(stats):
+            rescan_button.setEnabled(True)
+            refresh()
+            if stats:
+                status_label.setText(status_label.text() + f" | rescan: {stats['added']} added, {stats['removed']} removed")
+        
+        satellite_combo.currentIndexChanged.connect(refresh)
+        days_spin.valueChanged.connect(refresh)
+        elevation_spin.valueChanged.connect(refresh)
+        snr_spin.valueChanged.connect(refresh)
+        rescan_button.clicked.connect(rescan)
+        table.cellDoubleClicked.connect(lambda row, column: QDesktopServices.openUrl(
+            QUrl.fromLocalFile(table.item(row, column).data(Qt.UserRole))))
+        refresh()
+        dialog.setLayout(layout)
+        # Called by on_engine_event once the background rescan is done
+        self.catalog_rescan_finished = rescan_finished
+        try:
+            dialog.exec_()
+        finally:
+            self.catalog_rescan_finished = None
+
     def toggle_audio_monitoring(self):
         """Start or stop audio level monitoring"""
         if hasattr(self, 'audio_monitor_active') and self.audio_monitor_active:
             # Stop monitoring
-            self.audio_monitor_active = False
-            self.passrec_monitor_button.setText("Start Monitoring")
-            if hasattr(self, 'audio_monitor_stream') and self.audio_monitor_stream:
-                self.audio_monitor_stream.stop()
-                self.audio_monitor_stream.close()
-                self.audio_monitor_stream = None
+            self.stop_audio_monitoring()
         else:
             # Start monitoring
+            from lib.audio_capture import Subscriber, LevelProcessor
+            from lib.audio_dsp import DEFAULT_BLOCKSIZE
             self.audio_monitor_active = True
             self.passrec_monitor_button.setText("Stop Monitoring")
             
-            # Get the selected device using the same logic as recording
-            device = None
+            # Same device lookup as recording, in the registry probed at startup
             selected_idx = self.passrec_soundcard_dropdown.currentIndex()
+            device_name = None
             if selected_idx >= 0:
                 device_name = self.passrec_soundcard_dropdown.itemData(selected_idx, Qt.UserRole + 1)
-                
-                # Try to find device by name first (more reliable)
-                if device_name:
-                    devices = sd.query_devices()
-                    for i, dev in enumerate(devices):
-                        if dev['name'] == device_name and dev['max_input_channels'] > 0:
-                            device = i
-                            logging.info(f"Found monitoring device by name: {device_name} (index {i})")
-                            break
-                    
-                    # If not found by exact name, try partial match
-                    if device is None:
-                        for i, dev in enumerate(devices):
-                            if device_name in dev['name'] and dev['max_input_channels'] > 0:
-                                device = i
-                                logging.info(f"Found similar monitoring device: {dev['name']} (index {i})")
-                                break
-                
-                # If not found by name, use the index
-                if device is None:
-                    device_idx = self.passrec_soundcard_dropdown.itemData(selected_idx)
-                    if device_idx is not None:
-                        try:
-                            device = int(device_idx)
-                            logging.info(f"Using monitoring device by index: {device}")
-                        except (ValueError, TypeError):
-                            logging.warning(f"Could not use device index: {device_idx}")
-            
-            if device is None:
-                logging.info("Using default audio input device for monitoring")
-                try:
-                    device = sd.default.device[0]  # Default input device
-                except Exception as e:
-                    logging.error(f"Error getting default device: {e}")
-            
-            # Create callback for audio processing with debug logging
-            def audio_callback(indata, frames, time, status):
-                # Only log errors other than overflow 
-                if status and status.input_overflow:
-                    # Skip logging for input overflow as it's too verbose
-                    pass
-                elif status:
-                    logging.warning(f"Audio monitoring status: {status}")
-                
-                try:
-                    # Calculate RMS amplitude (volume level)
-                    level = np.linalg.norm(indata)
-                    
-                    # Log levels occasionally to help debug (reduced frequency)
-                    if frames % 1000 == 0 and logging.getLogger().isEnabledFor(logging.DEBUG):
-                        logging.debug(f"Monitor audio level: {level:.4f}")
-                    
-                    # Scale to percentage (0-100)
-                    # Apply a logarithmic scaling to make low levels more visible
-                    if level > 0:
-                        log_level = 20 * np.log10(level) + 90  # Convert to dB scale (normalized)
-                        percentage = min(100, max(0, int(log_level)))
-                    else:
-                        percentage = 0
-                    
-                    # Update UI in thread-safe way
-                    QMetaObject.invokeMethod(self.passrec_level_meter, "setValue", 
-                                            Qt.QueuedConnection, Q_ARG(int, percentage))
-                except Exception as e:
-                    # Catch any errors to prevent audio stream from crashing
-                    logging.error(f"Error in audio monitoring callback: {e}")
-            
-            # Start the audio stream
+            monitor_device = engine.audio_devices.resolve(device_name or 'default')
+            # The recording format, so the recorder can share the stream; the card's default rate if it lacks that one
+            samplerate = configur.getint('passrecording', 'sample_rate', fallback=44100)
+            if monitor_device is not None and monitor_device.sample_rates and not monitor_device.supports(samplerate):
+                samplerate = monitor_device.default_samplerate or monitor_device.sample_rates[-1]
+            
+            # One level per block in the subscriber's own ring, read by a GUI timer, so nothing is
+            # posted to the GUI from the audio thread. The meter follows whatever format the
+            # recorder captures in when it already uses the device.
+            self.audio_monitor_subscriber = Subscriber("level meter", 64, 1, processor=LevelProcessor(), strict=False)
+            self.audio_monitor_last_percentage = -1
+            
+            # Subscribe to the device's capture engine, it opens the stream unless the recorder already did
             try:
-                logging.info(f"Starting audio level monitoring with device: {device}")
-                self.audio_monitor_stream = sd.InputStream(
-                    device=device,
-                    channels=1,
-                    callback=audio_callback,
-                    blocksize=8192,  # Increased from 1024 to 8192 for better stability
-                    samplerate=44100
+                logging.info(f"Starting audio level monitoring with device: {monitor_device}")
+                if monitor_device is None:
+                    raise RuntimeError("no working audio input device")
+                self.audio_monitor_engine = engine.get_audio_capture().subscribe(
+                    monitor_device.index, monitor_device.name, self.audio_monitor_subscriber, samplerate,
+                    configur.getint('passrecording', 'channels', fallback=1),
+                    configur.getint('passrecording', 'blocksize', fallback=DEFAULT_BLOCKSIZE)
                 )
-                self.audio_monitor_stream.start()
+                self.audio_monitor_timer = QTimer()
+                self.audio_monitor_timer.timeout.connect(self.update_audio_level)
+                self.audio_monitor_timer.start(100)
                 
                 # Update UI to confirm monitoring is active
                 self.passrec_level_meter.setStyleSheet("""
@@ -3171,9 +2208,42 @@ class MainWindow(QMainWindow):
                 """)
             except Exception as e:
                 logging.error(f"Error starting audio monitoring: {e}")
+                self.audio_monitor_engine = None
                 self.audio_monitor_active = False
                 self.passrec_monitor_button.setText("Start Monitoring")
 
+    def update_audio_level(self):
+        """Level meter timer: the loudest block since the last update"""
+        from lib.audio_dsp import level_percentage
+        ring = self.audio_monitor_subscriber.ring
+        level = None
+        for block in ring.peek():
+            level = max(level or 0.0, float(block.max()))
+            ring.consume(len(block))
+        if level is None:
+            return
+        
+        # Log levels occasionally to help debug
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Monitor audio level: {level:.4f}")
+        
+        # Scale to percentage (0-100), logarithmic to make low levels more visible, only set when the meter would change
+        percentage = level_percentage(level)
+        if percentage != self.audio_monitor_last_percentage:
+            self.audio_monitor_last_percentage = percentage
+            self.passrec_level_meter.setValue(percentage)
+
+    def stop_audio_monitoring(self):
+        self.audio_monitor_active = False
+        self.passrec_monitor_button.setText("Start Monitoring")
+        if getattr(self, 'audio_monitor_timer', None):
+            self.audio_monitor_timer.stop()
+            self.audio_monitor_timer = None
+        if getattr(self, 'audio_monitor_engine', None):
+            # Closes the stream unless the pass recorder still uses it
+            engine.audio_capture.unsubscribe(self.audio_monitor_engine, self.audio_monitor_subscriber)
+            self.audio_monitor_engine = None
+
     @Slot(object, object)
     def handle_rotator_position_update(self, az, el):
         if az is not None and el is not None:
@@ -3185,32 +2255,12 @@ class MainWindow(QMainWindow):
 
     def update_passrecorder_status(self):
         if PASS_RECORDER_ENABLED:
-            if self.pass_recorder.is_recording():
+            if engine.pass_recorder is not None and engine.pass_recorder.is_recording():
                 self.recording_status_label.setText("✔")
                 self.recording_status_label.setStyleSheet("QLabel{font-size: 12pt; font-weight: bold; color: green}")
             else:
                 self.recording_status_label.setText("✘")
                 self.recording_status_label.setStyleSheet("QLabel{font-size: 12pt; font-weight: bold; color: red}")
-    def on_satellite_update(self, elevation, satname):
-        try:
-            # Ensure elevation is a float
-            elev_float = float(elevation)
-            
-            # Call the pass recorder without logging every elevation update
-            self.pass_recorder.update_elevation(elev_float, satname)
-            self.update_passrecorder_status()
-        except (ValueError, TypeError) as e:
-            logging.error(f"Error converting elevation '{elevation}' to float: {e}")
-            # Try to get a valid elevation directly from satellite calculations
-            try:
-                # Get current elevation directly
-                current_elevation = float(sat_ele_calc(self.my_satellite.tledata, myloc))
-                logging.info(f"Using fallback elevation={current_elevation}")
-                self.pass_recorder.update_elevation(current_elevation, satname)
-                self.update_passrecorder_status()
-            except Exception as e2:
-                logging.error(f"Fallback elevation calculation also failed: {e2}")
-
     def toggle_gps_qth(self, enabled):
         if enabled:
             self.gps_status_label.setText("GPS Status: Starting...")
@@ -3234,6 +2284,7 @@ class MainWindow(QMainWindow):
         if self.gps_reader:
             self.stop_gps_reader()
         try:
+            from lib.gps_reader import GPSReader
             self.gps_reader = GPSReader(port)
             self.gps_reader.position_update.connect(self.on_gps_position_update)
             self.gps_reader.status_update.connect(self.handle_gps_status_update)
@@ -3278,61 +2329,9 @@ class MainWindow(QMainWindow):
         self.gps_status_label.setText("GPS Status: Fix received")
         self.gps_lock_button.setEnabled(True)
 
-    def attempt_icom_reconnection(self):
-        """Attempt to reconnect to the ICOM rig after communication failure"""
-        global icomTrx, RIG_CONNECTED
-        
-        try:
-            logging.info("Attempting to reconnect to ICOM rig...")
-            
-            # Close existing connection if any
-            if hasattr(icomTrx, 'close'):
-                try:
-                    icomTrx.close()
-                except Exception as e:
-                    logging.debug(f"Error closing ICOM connection during cleanup: {e}")
-                    pass  # Ignore errors during cleanup
-            
-            # Create new connection
-            if configur['icom']['radio'] == '9700':
-                icomTrx = icom.icom(RIG_SERIAL_PORT, '19200', 96, '9700')
-            elif configur['icom']['radio'] == '910':
-                icomTrx = icom.icom(RIG_SERIAL_PORT, '19200', 96, '910')
-            
-            # Update connection status
-            RIG_CONNECTED = icomTrx.is_connected()
-            
-            if RIG_CONNECTED:
-                logging.info("Successfully reconnected to ICOM rig")
-                return True
-            else:
-                logging.warning("Failed to reconnect to ICOM rig")
-                return False
-                
-        except Exception as e:
-            logging.error(f"Error during ICOM reconnection attempt: {e}")
-            RIG_CONNECTED = False
-            return False
-
-    def restart_doppler_tracking(self):
-        """Restart doppler tracking worker after communication failure"""
-        try:
-            if TRACKING_ACTIVE and hasattr(self, 'my_satellite') and self.my_satellite:
-                logging.info("Restarting doppler tracking worker...")
-                self.doppler_worker = Worker(self.calc_doppler)
-                self.threadpool.start(self.doppler_worker, QThread.HighestPriority.value)
-                logging.info("Doppler tracking worker restarted successfully")
-                return True
-            else:
-                logging.warning("Cannot restart tracking - not active or no satellite selected")
-                return False
-        except Exception as e:
-            logging.error(f"Failed to restart doppler tracking worker: {e}")
-            return False
-
     def keyPressEvent(self, event):
         """Handle keyboard shortcuts for improved accessibility and efficiency"""
-        global TRACKING_ACTIVE
+        tracking_active = engine.tracking_session.active
         
         key = event.key()
         modifiers = event.modifiers()
@@ -3346,11 +2345,11 @@ class MainWindow(QMainWindow):
             
             # T - Start Tracking
             elif key == Qt.Key_T:
-                if TRACKING_ACTIVE:
+                if tracking_active:
                     logging.warning("Keyboard shortcut: T - Cannot start tracking, already in progress")
                 elif not self.my_satellite.name:
                     logging.warning("Keyboard shortcut: T - Cannot start tracking, no satellite selected")
-                elif not hasattr(self, 'my_transponder_name') or not self.my_transponder_name:
+                elif not engine.transponder_name:
                     logging.warning("Keyboard shortcut: T - Cannot start tracking, no transponder selected")
                 elif not self.my_satellite.tledata:
                     logging.warning("Keyboard shortcut: T - Cannot start tracking, no TLE data available")
@@ -3361,7 +2360,7 @@ class MainWindow(QMainWindow):
             
             # S or Esc - Stop Tracking
             elif key == Qt.Key_S or key == Qt.Key_Escape:
-                if not TRACKING_ACTIVE:
+                if not tracking_active:
                     logging.warning("Keyboard shortcut: S/Esc - Cannot stop tracking, not currently tracking")
                 else:
                     action = "S" if key == Qt.Key_S else "Esc"
@@ -3371,12 +2370,12 @@ class MainWindow(QMainWindow):
             
             # Space - Toggle Tracking
             elif key == Qt.Key_Space:
-                if TRACKING_ACTIVE:
+                if tracking_active:
                     logging.info("Keyboard shortcut: Space - Stopping tracking (toggle)")
                     self.the_stop_button_was_clicked()
                 elif not self.my_satellite.name:
                     logging.warning("Keyboard shortcut: Space - Cannot start tracking, no satellite selected")
-                elif not hasattr(self, 'my_transponder_name') or not self.my_transponder_name:
+                elif not engine.transponder_name:
                     logging.warning("Keyboard shortcut: Space - Cannot start tracking, no transponder selected")
                 elif not self.my_satellite.tledata:
                     logging.warning("Keyboard shortcut: Space - Cannot start tracking, no TLE data available")
@@ -3393,7 +2392,7 @@ class MainWindow(QMainWindow):
             
             # M - Memory to VFO (Sync frequencies)
             elif key == Qt.Key_M:
-                if TRACKING_ACTIVE:
+                if tracking_active:
                     logging.warning("Keyboard shortcut: M - Cannot sync frequencies while tracking")
                 elif not self.my_satellite.name:
                     logging.warning("Keyboard shortcut: M - Cannot sync frequencies, no satellite selected")
@@ -3421,10 +2420,10 @@ class MainWindow(QMainWindow):
             elif key == Qt.Key_F:
                 if not ROTATOR_ENABLED:
                     logging.warning("Keyboard shortcut: F - Rotator not enabled, frequency pause requires rotator")
-                elif not TRACKING_ACTIVE:
+                elif not tracking_active:
                     logging.warning("Keyboard shortcut: F - Not tracking, cannot pause frequency updates")
                 else:
-                    if FREQUENCY_UPDATES_PAUSED:
+                    if engine.tracking_session.paused:
                         logging.info("Keyboard shortcut: F - Resuming frequency updates")
                     else:
                         logging.info("Keyboard shortcut: F - Pausing frequency updates")
@@ -3481,6 +2480,9 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logging.error(f"Error refreshing status displays: {e}")
 
+class EngineEventBridge(QObject):
+    changed = Signal(str, object)  # event, value
+
 class WorkerSignals(QObject):
     finished = Signal()
     error = Signal(tuple)
@@ -3488,38 +2490,6 @@ class WorkerSignals(QObject):
     progress = Signal(int)
     position = Signal(object, object)  # az, el
 
-class Worker(QRunnable):
-
-    def __init__(self, fn, *args, **kwargs):
-        super(Worker, self).__init__()
-
-        # Store constructor arguments (re-used for processing)
-        self.fn = fn
-        self.args = args
-        self.kwargs = kwargs
-        self.signals = WorkerSignals()
-
-        # Add the callback to our kwargs
-        self.kwargs['progress_callback'] = self.signals.progress
-
-    @Slot()
-    def run(self):
-        '''
-        Initialise the runner function with passed args, kwargs.
-        '''
-
-        # Retrieve args/kwargs here; and fire processing using them
-        try:
-            result = self.fn(*self.args, **self.kwargs)
-        except:
-            traceback.print_exc()
-            exctype, value = sys.exc_info()[:2]
-            self.signals.error.emit((exctype, value, traceback.format_exc()))
-        else:
-            self.signals.result.emit(result)  # Return the result of the processing
-        finally:
-            self.signals.finished.emit()  # Done
-
 class RotatorPositionWorker(QRunnable):
     def __init__(self, rotator, poll_interval=2.0):
         super().__init__()
@@ -3527,9 +2497,12 @@ class RotatorPositionWorker(QRunnable):
         self.poll_interval = poll_interval
         self.signals = WorkerSignals()
         self._running = True
+        self._stop_event = threading.Event()
+        self.finished_event = threading.Event()
 
     def stop(self):
         self._running = False
+        self._stop_event.set()
 
     @Slot()
     def run(self):
@@ -3551,16 +2524,10 @@ class RotatorPositionWorker(QRunnable):
                             self._running = False
                             break
                 
-                # Use smaller sleep intervals for more responsive shutdown
-                # Break the sleep into smaller chunks to check _running more frequently
-                sleep_count = 0
-                sleep_chunk = 0.1  # 100ms chunks
-                max_chunks = int(self.poll_interval / sleep_chunk)
-                
-                while sleep_count < max_chunks and self._running:
-                    time.sleep(sleep_chunk)
-                    sleep_count += 1
+                # Wait for the next poll, stop() wakes us up immediately
+                self._stop_event.wait(self.poll_interval)
         finally:
+            self.finished_event.set()
             # Emit finished signal when worker is truly done
             if hasattr(self, 'signals') and self.signals is not None:
                 try:
@@ -3591,42 +2558,45 @@ class AudioLevelMeter(QProgressBar):
         """)
 
 ## Starts here:
-if RADIO != "9700" and RADIO != "705" and RADIO != "818" and RADIO != "910":
-    logging.critical("***  Icom radio not supported: {badmodel}".format(badmodel=RADIO))
-    sys.exit()
+if __name__ == '__main__':
+    if RADIO != "9700" and RADIO != "705" and RADIO != "818" and RADIO != "910":
+        logging.critical("***  Icom radio not supported: {badmodel}".format(badmodel=RADIO))
+        sys.exit()
 
-# Disable Qt accessibility warnings that are just normal system events
-import os
-os.environ["QT_LOGGING_RULES"] = "qt.accessibility.atspi.warning=false"
-os.environ["QT_SCALE_FACTOR"] = str(UI_SCALLING)
-
-app = QApplication(sys.argv)
-
-# Now safe to import Qt-based classes after QApplication exists
-from lib.gps_reader import GPSReader
-from lib.logbook_connector import *
-
-# Import web_api_proxy if needed
-if WEBAPI_ENABLED or REMOTE_ENABLED:
-    from lib import web_api_proxy
-
-window = MainWindow()
-window.show()
-
-# This part aligns the window to its optimal size
-window.adjustSize()
-def widen_a_bit():
-    pad = window.fontMetrics().horizontalAdvance("M") * 20  # Magic padding number
-    window.resize(window.sizeHint().width() + pad,
-                  window.sizeHint().height())
-QTimer.singleShot(0, widen_a_bit)  # run after the event loop lays out widgets
-
-# Proper application shutdown handling
-try:
-    exit_code = app.exec()
-finally:
-    # Ensure all events are processed before shutdown
-    app.processEvents()
-    logging.debug("Application shutdown complete")
-    sys.exit(exit_code if 'exit_code' in locals() else 0)
+    # Disable Qt accessibility warnings that are just normal system events
+    import os
+    os.environ["QT_LOGGING_RULES"] = "qt.accessibility.atspi.warning=false"
+    os.environ["QT_SCALE_FACTOR"] = str(UI_SCALLING)
+
+    app = QApplication(sys.argv)
+    profiler.mark("QApplication")
+
+    window = MainWindow()
+    profiler.mark("main window")
+    window.show()
+
+    # This part aligns the window to its optimal size
+    window.adjustSize()
+    def widen_a_bit():
+        pad = window.fontMetrics().horizontalAdvance("M") * 20  # Magic padding number
+        window.resize(window.sizeHint().width() + pad,
+                      window.sizeHint().height())
+    QTimer.singleShot(0, widen_a_bit)  # run after the event loop lays out widgets
+
+    if profiler.enabled:
+        # Report once the first event loop pass has shown the window, then exit
+        def finish_startup_profile():
+            profiler.mark("window shown")
+            profiler.report()
+            window.close()
+        QTimer.singleShot(0, finish_startup_profile)
+
+    # Proper application shutdown handling
+    try:
+        exit_code = app.exec()
+    finally:
+        # Ensure all events are processed before shutdown
+        app.processEvents()
+        logging.debug("Application shutdown complete")
+        sys.exit(exit_code if 'exit_code' in locals() else 0)
 
@@ -0,0 +1,114 @@
+"""
+Audio callback execution time benchmark.
+
+Runs the pass recorder's per-block work outside PortAudio, once the way the
+callback used to do it (norm, gain, clip, scale, astype, copy, lock and list
+append) and once through lib.audio_dsp and lib.audio_ring as the recorder
+does now, for a range of block sizes. For each it prints the median, p99 and
+maximum time per block, the worst case as a share of the block period (the
+callback's deadline) and the peak memory a block allocates.
+
+A block size is safe when the p99 stays well below the deadline on the
+target machine, e.g. a Raspberry Pi. Run from the repository root:
+
+    python benchmarks/audio_callback_benchmark.py
+    python benchmarks/audio_callback_benchmark.py --channels 2 --bit-depth 24 --blocksizes 512 1024 2048
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.audio_dsp import BlockProcessor, block_level
+from lib.audio_ring import AudioRing
+
+SAMPLE_FORMATS = {16: (np.int16, 32767), 24: (np.int32, 8388607), 32: (np.int32, 2147483647)}
+
+
+def legacy_callback(dtype, scale_factor):
+    buffer = []
+    lock = threading.Lock()
+
+    def callback(indata):
+        level = np.linalg.norm(indata)
+        amplified_data = indata * 2.0
+        amplified_data = np.clip(amplified_data, -1.0, 1.0)
+        with np.errstate(invalid='ignore'):  # 32 bit full scale rounds past int32 in float32
+            audio_data = (amplified_data * scale_factor).astype(dtype)
+        with lock:
+            buffer.append(audio_data.copy())
+        return level
+    return callback, buffer.clear
+
+
+def streaming_callback(blocksize, channels, dtype, scale_factor, sample_rate):
+    processor = BlockProcessor(blocksize, channels, scale_factor)
+    ring = AudioRing(10 * sample_rate, channels, dtype)
+
+    def callback(indata):
+        ring.write(processor.process(indata))
+
+    def drain():
+        # Stands in for the writer thread, outside the timed section
+        ring.consume(ring.available())
+    return callback, drain
+
+
+def measure(callback, drain, blocks):
+    times = []
+    for block in blocks:
+        started = time.perf_counter()
+        callback(block)
+        times.append(time.perf_counter() - started)
+        drain()
+    # Peak allocation while processing a block, measured separately so tracing does not slow the timed runs
+    tracemalloc.start()
+    for block in blocks[:20]:
+        callback(block)
+        drain()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio callback execution time benchmark")
+    parser.add_argument('--blocksizes', type=int, nargs='+', default=[256, 512, 1024, 2048, 4096, 8192])
+    parser.add_argument('--sample-rate', type=int, default=48000)
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--bit-depth', type=int, choices=sorted(SAMPLE_FORMATS), default=16)
+    parser.add_argument('--blocks', type=int, default=2000, help="blocks per measurement")
+    args = parser.parse_args()
+
+    dtype, scale_factor = SAMPLE_FORMATS[args.bit_depth]
+    rng = np.random.default_rng(1)
+    print(f"{args.sample_rate} Hz, {args.channels} channel(s), {args.bit_depth} bit, {args.blocks} blocks each\n")
+    print(f"  {'blocksize':>9} {'path':<10} {'median':>10} {'p99':>10} {'max':>10} {'max/period':>11} {'alloc peak':>12}")
+    for blocksize in args.blocksizes:
+        period = blocksize / args.sample_rate
+        pool = [(rng.standard_normal((blocksize, args.channels)) * 0.2).astype(np.float32) for _ in range(16)]
+        blocks = [pool[i % len(pool)] for i in range(args.blocks)]
+        block_level(blocks[0])  # warm up
+        paths = (
+            ('legacy', legacy_callback(dtype, scale_factor)),
+            ('streaming', streaming_callback(blocksize, args.channels, dtype, scale_factor, args.sample_rate)),
+        )
+        for name, (callback, drain) in paths:
+            times, peak = measure(callback, drain, blocks)
+            times.sort()
+            p99 = times[int(0.99 * (len(times) - 1))]
+            print(f"  {blocksize:>9} {name:<10} {statistics.median(times) * 1e6:7.1f} us {p99 * 1e6:7.1f} us "
+                  f"{times[-1] * 1e6:7.1f} us {100 * times[-1] / period:9.2f} % {peak / 1024:9.1f} KiB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
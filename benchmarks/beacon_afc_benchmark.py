@@ -0,0 +1,120 @@
+"""
+Beacon-lock AFC benchmark.
+
+Closes the loop of lib.beacon_afc around a simulated receiver: a beacon
+whose audio frequency is beacon_hz plus a TLE error (300 Hz by default)
+plus a slow drift, minus the correction the loop has applied, which reaches
+the audio only after the rig delay. Audio arrives in sound card blocks and
+the loop runs at its configured rate, as BeaconAFC does.
+
+Prints the time per tick (median, p99, max) with the share of the tick
+period it uses, and how the loop behaved: time to lock, time until the
+beacon stays within 10 Hz, the remaining error and lock losses during a
+fade. Run from the repository root:
+
+    python benchmarks/beacon_afc_benchmark.py
+    python benchmarks/beacon_afc_benchmark.py --error 800 --search 1000 --snr -20 --rate 20 --fft-size 8192
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.beacon_afc import AFCLoop, PeakTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--blocksize', type=int, default=2048)
+    parser.add_argument('--rate', type=float, default=10.0, help="loop updates per second")
+    parser.add_argument('--fft-size', type=int, default=4096)
+    parser.add_argument('--integration', type=float, default=0.5)
+    parser.add_argument('--gain', type=float, default=0.1)
+    parser.add_argument('--max-rate', type=float, default=50.0, help="Hz/s")
+    parser.add_argument('--beacon', type=float, default=1000.0, help="expected audio frequency (Hz)")
+    parser.add_argument('--search', type=float, default=500.0, help="search range around it (+/- Hz)")
+    parser.add_argument('--error', type=float, default=300.0, help="initial TLE error (Hz)")
+    parser.add_argument('--drift', type=float, default=2.0, help="drift of the error (Hz/s)")
+    parser.add_argument('--snr', type=float, default=10.0, help="beacon to noise power over the whole audio band (dB)")
+    parser.add_argument('--rig-delay', type=float, default=0.3, help="seconds until a correction is heard")
+    parser.add_argument('--seconds', type=float, default=60.0)
+    args = parser.parse_args()
+
+    rate = args.sample_rate
+    tracker = PeakTracker(rate, args.fft_size, args.integration, args.beacon, args.search)
+    loop = AFCLoop(args.rate, args.gain, args.max_rate)
+    rng = np.random.default_rng(1)
+    noise = 0.3 / np.sqrt(2) * 10 ** (-args.snr / 20)  # standard deviation next to a 0.3 sine
+    tick_period = 1.0 / args.rate
+    applied = []  # (time the rig has it, correction)
+    correction_heard = 0.0
+    phase = 0.0
+    now = 0.0
+    next_tick = tick_period
+    times, errors = [], []
+    locked_at = settled_at = None
+    unlocks = 0
+    fade = (0.6 * args.seconds, 0.6 * args.seconds + 5.0)  # beacon gone for 5 s
+    while now < args.seconds:
+        # One block from the simulated receiver
+        t = now + np.arange(args.blocksize) / rate
+        while applied and applied[0][0] <= now:
+            correction_heard = applied.pop(0)[1]
+        frequency = args.beacon + args.error + args.drift * now - correction_heard
+        amplitude = 0.0 if fade[0] <= now < fade[1] else 0.3
+        phases = phase + 2 * np.pi * frequency * np.arange(1, args.blocksize + 1) / rate
+        phase = float(phases[-1]) % (2 * np.pi)
+        block = (amplitude * np.sin(phases) + noise * rng.standard_normal(len(t))).astype(np.float32)
+        tracker.push(block)
+        now += args.blocksize / rate
+        if now < next_tick:
+            continue
+        next_tick += tick_period
+        was_locked = loop.locked
+        started = time.perf_counter()
+        measurement = tracker.measure()
+        if measurement is None:
+            continue  # less than one FFT length of audio yet
+        correction = loop.update(measurement[0] - args.beacon, measurement[1])
+        times.append(time.perf_counter() - started)
+        applied.append((now + args.rig_delay, round(correction)))
+        if loop.locked and locked_at is None:
+            locked_at = now
+        if was_locked and not loop.locked:
+            unlocks += 1
+        error = args.error + args.drift * now - correction_heard
+        if fade[0] - 1 > now > (locked_at or now + 1):
+            errors.append(error)
+            if abs(error) > 10:
+                settled_at = None
+            elif settled_at is None:
+                settled_at = now
+
+    times.sort()
+    p99 = times[int(0.99 * (len(times) - 1))]
+    print(f"{rate} Hz, blocksize {args.blocksize}, FFT {args.fft_size}, {tracker.frames / rate:.2f} s integration, "
+          f"{args.rate:.0f} updates/s, rig delay {args.rig_delay} s\n")
+    print(f"  tick time     median {statistics.median(times) * 1e3:.2f} ms, p99 {p99 * 1e3:.2f} ms, "
+          f"max {times[-1] * 1e3:.2f} ms = {100 * times[-1] / tick_period:.1f} % of the {tick_period * 1e3:.0f} ms period")
+    print(f"  CPU           {100 * statistics.mean(times) / tick_period:.2f} % of one core")
+    print(f"  locked after  {locked_at:.1f} s" if locked_at is not None else "  never locked")
+    if settled_at is not None:
+        tail = np.array(errors[len(errors) // 2:])
+        print(f"  within 10 Hz  after {settled_at:.1f} s, then {np.sqrt(np.mean(tail ** 2)):.1f} Hz rms "
+              f"(error {args.error:.0f} Hz, drifting {args.drift} Hz/s)")
+    else:
+        print("  did not settle within 10 Hz")
+    print(f"  lock losses   {unlocks} (beacon faded for {fade[1] - fade[0]:.0f} s at {fade[0]:.0f} s), "
+          f"final correction {loop.correction:+.0f} Hz, {'locked' if loop.locked else 'unlocked'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
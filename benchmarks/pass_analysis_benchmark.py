@@ -0,0 +1,162 @@
+"""
+Post-pass analysis benchmark.
+
+Writes a synthetic pass recording (15 minutes by default): a beacon tone
+whose residual Doppler drifts in an S curve, fading in and out of white
+noise. It is then analysed by lib.pass_analysis four ways and the wall and
+CPU time, real time factor and peak memory are printed:
+
+    in process   analyze_recording() called directly, no cache
+    cached       the same again, answered from the cache next to the file
+    thread       in a thread of this process while a 10 ms ticker runs
+    pool         through PassAnalyzer's process pool while the ticker runs
+
+For the last two the ticker's worst lateness shows what the analysis costs
+the GUI and tracking threads sharing the interpreter. Run from the
+repository root:
+
+    python benchmarks/pass_analysis_benchmark.py
+    python benchmarks/pass_analysis_benchmark.py --minutes 5 --sample-rate 48000 --bit-depth 24
+    python benchmarks/pass_analysis_benchmark.py --file recordings/ISS_20250101_120000.wav
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from configparser import ConfigParser
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.pass_analysis import PassAnalyzer, analyze_recording, analysis_paths
+from lib.recording_writer import wav_header
+
+BEACON_HZ = 1200.0
+
+
+def write_pass(path, minutes, sample_rate, bit_depth):
+    """Beacon with an S shaped +-150 Hz residual and a fade in the middle of the pass, in 10 s chunks"""
+    sampwidth = bit_depth // 8
+    frames = int(minutes * 60 * sample_rate)
+    rng = np.random.default_rng(1)
+    phase = 0.0
+    with open(path, 'wb') as f:
+        f.write(wav_header(frames * sampwidth, sample_rate, 1, sampwidth))
+        for start in range(0, frames, 10 * sample_rate):
+            t = (np.arange(start, min(frames, start + 10 * sample_rate)) / sample_rate) / (minutes * 60)
+            frequency = BEACON_HZ - 150 * np.tanh(6 * (t - 0.5))
+            amplitude = 0.05 + 0.2 * np.sin(np.pi * t) ** 2
+            phases = phase + 2 * np.pi * np.cumsum(frequency) / sample_rate
+            phase = float(phases[-1])
+            samples = amplitude * np.sin(phases) + 0.05 * rng.standard_normal(len(t))
+            samples = np.clip(samples, -1.0, 1.0) * (2 ** (bit_depth - 1) - 1)
+            if sampwidth == 3:
+                f.write(samples.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes())
+            else:
+                f.write(samples.astype('<i2' if sampwidth == 2 else '<i4').tobytes())
+
+
+def remove_cache(path):
+    for cached in analysis_paths(path).values():
+        if os.path.exists(cached):
+            os.remove(cached)
+
+
+def ticker(stop, lateness):
+    """10 ms periodic loop standing in for the tracking and GUI timers"""
+    deadline = time.perf_counter()
+    while not stop.is_set():
+        deadline += 0.01
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+        lateness.append(time.perf_counter() - deadline)
+
+
+def with_ticker(run):
+    stop, lateness = threading.Event(), []
+    tick = threading.Thread(target=ticker, args=(stop, lateness), daemon=True)
+    tick.start()
+    started = time.perf_counter()
+    summary = run()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    tick.join()
+    lateness.sort()
+    return summary, elapsed, lateness[int(0.99 * (len(lateness) - 1))], lateness[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file', help="analyse this recording instead of a synthetic one")
+    parser.add_argument('--minutes', type=float, default=15.0)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--bit-depth', type=int, choices=(16, 24, 32), default=16)
+    parser.add_argument('--fft-size', type=int, default=2048)
+    args = parser.parse_args()
+
+    workdir = None
+    path = args.file
+    if path is None:
+        workdir = tempfile.TemporaryDirectory(prefix='pass_analysis_')
+        path = os.path.join(workdir.name, 'SYNTHETIC_pass.wav')
+        started = time.perf_counter()
+        write_pass(path, args.minutes, args.sample_rate, args.bit_depth)
+        print(f"Wrote {os.path.getsize(path) / 1e6:.0f} MB synthetic pass in {time.perf_counter() - started:.1f} s")
+    params = {'fft_size': args.fft_size, 'beacon_hz': 0.0 if args.file else BEACON_HZ}
+
+    try:
+        remove_cache(path)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started, cpu_started = time.perf_counter(), time.process_time()
+        summary = analyze_recording(path, params)
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        duration = summary['duration']
+        print(f"{os.path.basename(path)}: {duration:.0f} s of audio, SNR median {summary['snr_median_db']} dB, "
+              f"beacon {summary['beacon_hz']} Hz in {summary['beacon_seconds']} s, "
+              f"residual {summary['residual_rms_hz']} Hz rms")
+        print(f"  outputs: {', '.join(summary['files'])}\n")
+        print(f"  {'run':<11} {'wall':>8} {'cpu':>8} {'realtime':>9} {'ticker p99':>11} {'ticker max':>11}")
+        print(f"  {'in process':<11} {elapsed:6.2f} s {cpu:6.2f} s {duration / elapsed:7.0f}x "
+              f"{'':>11} {'':>11}   peak RSS +{(rss - rss_before) / 1024:.0f} MiB")
+
+        started = time.perf_counter()
+        cached = analyze_recording(path, params)
+        print(f"  {'cached':<11} {(time.perf_counter() - started) * 1000:6.1f} ms {'':>8} {'':>9}"
+              f"{'':>12} {'':>11}   cached={cached['cached']}")
+
+        def in_thread():
+            result = {}
+            worker = threading.Thread(target=lambda: result.update(analyze_recording(path, params, use_cache=False)))
+            worker.start()
+            worker.join()
+            return result
+        _, elapsed, p99, worst = with_ticker(in_thread)
+        print(f"  {'thread':<11} {elapsed:6.2f} s {'':>8} {duration / elapsed:7.0f}x "
+              f"{p99 * 1000:8.2f} ms {worst * 1000:8.2f} ms")
+
+        config = ConfigParser()
+        config['passrecording'] = {'analysis': 'True', 'analysis_fft_size': str(args.fft_size),
+                                   'analysis_beacon_hz': str(params['beacon_hz'])}
+        analyzer = PassAnalyzer(config)
+        try:
+            # Start the worker first, the table shows steady state
+            analyzer.submit(path).result()
+            remove_cache(path)
+            summary, elapsed, p99, worst = with_ticker(lambda: analyzer.submit(path).result())
+            print(f"  {'pool':<11} {elapsed:6.2f} s {summary['cpu_time']:6.2f} s {duration / elapsed:7.0f}x "
+                  f"{p99 * 1000:8.2f} ms {worst * 1000:8.2f} ms   (cpu in the worker)")
+        finally:
+            analyzer.shutdown()
+    finally:
+        if workdir is not None:
+            workdir.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Rotator command latency against a local rotctld stand-in.
+
+Starts a small TCP server that answers like Hamlib's rotctld (P, p, S, q) and
+moves a simulated rotator at fixed slew rates, optionally with an added
+network delay per reply. Then it runs the same command/poll cycle as RotatorIO
+two ways:
+
+    pipelined   RotctldRotator: P is written without waiting for its RPRT,
+                the reply is collected together with the next p answer
+    lockstep    P, wait for RPRT, then p, wait for the position (how a simple
+                client would talk to rotctld)
+
+and prints p50/p99 of the time set_position() blocks the caller and of the
+whole command + position cycle. Run from the repository root:
+
+    python benchmarks/rotctld_benchmark.py --cycles 500 --delay-ms 5
+
+Pass --host/--port to measure a real rotctld instead of the stand-in.
+"""
+
+import argparse
+import os
+import socket
+import socketserver
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.rotator import RotctldRotator
+
+
+class StandInRotator:
+    def __init__(self, az_rate=6.0, el_rate=2.7):
+        self.az_rate = az_rate
+        self.el_rate = el_rate
+        self.az = self.el = 0.0
+        self.target = (0.0, 0.0)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _advance(self):
+        now = time.monotonic()
+        dt, self.updated = now - self.updated, now
+        self.az += max(-self.az_rate * dt, min(self.az_rate * dt, self.target[0] - self.az))
+        self.el += max(-self.el_rate * dt, min(self.el_rate * dt, self.target[1] - self.el))
+
+    def command(self, line):
+        with self.lock:
+            self._advance()
+            parts = line.split()
+            if not parts:
+                return None
+            if parts[0] == 'P' and len(parts) == 3:
+                self.target = (float(parts[1]), float(parts[2]))
+                return "RPRT 0\n"
+            if parts[0] == 'p':
+                return f"{self.az:.6f}\n{self.el:.6f}\n"
+            if parts[0] == 'S':
+                self.target = (self.az, self.el)
+                return "RPRT 0\n"
+            return "RPRT -1\n"
+
+
+def make_handler(rotator, delay):
+    class Handler(socketserver.StreamRequestHandler):
+        def setup(self):
+            super().setup()
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode().strip()
+                if line == 'q':
+                    break
+                reply = rotator.command(line)
+                if reply:
+                    if delay:
+                        time.sleep(delay)
+                    self.wfile.write(reply.encode())
+                    self.wfile.flush()
+    return Handler
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(round(0.99 * (len(samples) - 1))))]
+    return statistics.median(samples) * 1000, p99 * 1000
+
+
+def run_pipelined(host, port, cycles):
+    rotator = RotctldRotator(host, port)
+    command_times, cycle_times = [], []
+    for i in range(cycles):
+        started = time.perf_counter()
+        rotator.set_position(i % 360, 10 + i % 60)
+        command_times.append(time.perf_counter() - started)
+        rotator.get_position()
+        cycle_times.append(time.perf_counter() - started)
+    rotator.close()
+    return command_times, cycle_times
+
+
+def run_lockstep(host, port, cycles):
+    sock = socket.create_connection((host, port), timeout=2)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    reader = sock.makefile('rb')
+    command_times, cycle_times = [], []
+    for i in range(cycles):
+        started = time.perf_counter()
+        sock.sendall(f"P {i % 360:.1f} {10 + i % 60:.1f}\n".encode())
+        reader.readline()
+        command_times.append(time.perf_counter() - started)
+        sock.sendall(b"p\n")
+        reader.readline()
+        reader.readline()
+        cycle_times.append(time.perf_counter() - started)
+    sock.sendall(b"q\n")
+    sock.close()
+    return command_times, cycle_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rotctld command latency benchmark")
+    parser.add_argument('--cycles', type=int, default=500)
+    parser.add_argument('--delay-ms', type=float, default=0.0, help="stand-in reply delay, simulates the network round trip")
+    parser.add_argument('--host', help="benchmark a running rotctld instead of the stand-in")
+    parser.add_argument('--port', type=int, default=4533)
+    parser.add_argument('--target-ms', type=float, default=50.0, help="p99 command latency goal")
+    args = parser.parse_args()
+
+    server = None
+    host, port = args.host, args.port
+    if host is None:
+        server = StandInServer(('127.0.0.1', 0), make_handler(StandInRotator(), args.delay_ms / 1000.0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        print(f"rotctld stand-in on {host}:{port}, reply delay {args.delay_ms:.1f} ms")
+
+    results = {}
+    for name, run in (('lockstep', run_lockstep), ('pipelined', run_pipelined)):
+        results[name] = run(host, port, args.cycles)
+
+    print(f"\n{args.cycles} command + position cycles:")
+    print(f"  {'':<12} {'command p50':>12} {'command p99':>12} {'cycle p50':>12} {'cycle p99':>12}")
+    for name, (command_times, cycle_times) in results.items():
+        c50, c99 = percentiles(command_times)
+        y50, y99 = percentiles(cycle_times)
+        print(f"  {name:<12} {c50:9.2f} ms {c99:9.2f} ms {y50:9.2f} ms {y99:9.2f} ms")
+
+    if server:
+        server.shutdown()
+    _, p99 = percentiles(results['pipelined'][0])
+    if p99 > args.target_ms:
+        print(f"\nPipelined command p99 {p99:.1f} ms is above the {args.target_ms:.0f} ms goal")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Startup time regression benchmark.
+
+Starts QTrigdoppler with --profile-startup a number of times, collects the
+phase table it prints and reports the median per phase. A baseline saved with
+--save-baseline on a known good version is compared against later runs; the
+script exits with 1 when the median total is slower than the baseline by more
+than the tolerance.
+
+Run from the repository root (config.ini is read from the working directory):
+
+    python benchmarks/startup_benchmark.py --headless --runs 5
+    python benchmarks/startup_benchmark.py --save-baseline benchmarks/startup_baseline.json
+    python benchmarks/startup_benchmark.py --baseline benchmarks/startup_baseline.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+PHASE_LINE = re.compile(r"^  (.+?)\s+([\d.]+) ms")
+
+
+def run_once(args):
+    command = [sys.executable, 'QTrigdoppler.py', '--profile-startup']
+    if args.headless:
+        command.append('--headless')
+    started = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout)
+    wall = time.perf_counter() - started
+    phases = {}
+    for line in result.stdout.splitlines():
+        match = PHASE_LINE.match(line)
+        if match:
+            phases[match.group(1).strip()] = float(match.group(2))
+    if 'total' not in phases:
+        raise RuntimeError(f"No startup profile in output (exit code {result.returncode}):\n{result.stdout}\n{result.stderr}")
+    # Interpreter start and shutdown are not part of the profile, the wall time includes them
+    phases['process wall time'] = wall * 1000
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QTrigdoppler startup time benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--headless', action='store_true', help="profile the headless daemon instead of the GUI")
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--baseline', help="JSON baseline to compare against")
+    parser.add_argument('--save-baseline', help="write the medians of this run as baseline")
+    parser.add_argument('--tolerance', type=float, default=15.0, help="allowed slowdown of the total in percent")
+    args = parser.parse_args()
+
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    runs = []
+    for i in range(args.runs):
+        runs.append(run_once(args))
+        print(f"run {i + 1}/{args.runs}: {runs[-1]['total']:.1f} ms")
+
+    # The first run also pays for cold disk caches, the median hides it
+    names = list(runs[-1].keys())
+    medians = {name: statistics.median(run.get(name, 0.0) for run in runs) for name in names}
+    print(f"\nMedian of {args.runs} runs ({'headless' if args.headless else 'GUI'}):")
+    for name in names:
+        print(f"  {name:<36} {medians[name]:9.1f} ms")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'headless': args.headless, 'runs': args.runs, 'median_ms': medians}, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['median_ms']
+        limit = baseline['total'] * (1 + args.tolerance / 100.0)
+        change = 100.0 * (medians['total'] - baseline['total']) / baseline['total']
+        print(f"\nTotal {medians['total']:.1f} ms vs baseline {baseline['total']:.1f} ms ({change:+.1f} %)")
+        if medians['total'] > limit:
+            print(f"REGRESSION: startup is more than {args.tolerance:.0f} % slower than the baseline")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Web API telemetry: bandwidth and freshness per client.
+
+Replays a synthetic pass (10 minutes by default) as the engine publishes
+it, one TelemetrySnapshot per orbit tick, and feeds it to the ways a web
+client can get the state:
+
+    broadcast    full status plus satellite list every 15 s while tracking
+                 (the former status_broadcast_worker)
+    poll 5 s     get_status every 5 s (what web_api_client.html did)
+    poll N Hz    get_status at the stream rate, the same freshness by polling
+    stream       TelemetryStream deltas at --rate with heartbeats
+
+For each it prints the bytes per second one client receives and sends
+(Socket.IO framing included) and how old the azimuth, elevation and Doppler
+the client shows are, mean and max. Also the server CPU per stream frame.
+Run from the repository root:
+
+    python benchmarks/telemetry_stream_benchmark.py
+    python benchmarks/telemetry_stream_benchmark.py --rate 10 --minutes 15
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.telemetry import TelemetrySnapshot, TelemetryStream
+
+ORBIT_TICK = 0.2  # seconds, ORBIT_TICK_INTERVAL of the engine
+HEARTBEAT = 5.0
+
+
+def satellite_names():
+    """Names from the bundled doppler.sqf, the satellite list the broadcast carried"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doppler.sqf')
+    names = set()
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.strip() and not line.startswith(';'):
+                names.add(line.split(',')[0].strip())
+    return sorted(names)
+
+
+def pass_snapshots(minutes):
+    """(time, snapshot) per orbit tick of an overhead pass with a rotator in 1 degree steps"""
+    duration = minutes * 60
+    base = TelemetrySnapshot(
+        tracking=True, frequency_paused=False, satellite='ISS', transponder='Cross band repeater',
+        subtone='67 Hz', rx_offset=0, afc_offset=0, afc_locked=None,
+        downlink_mode='FM', uplink_mode='FM', tle_age='1.2', sat_eclipsed=False,
+        next_event='LOS 2025/01/12 14:45:30', rotator_enabled=True)
+    snapshots = []
+    for tick in range(int(duration / ORBIT_TICK)):
+        t = tick * ORBIT_TICK
+        x = (t - duration / 2) / 90
+        down_doppler = int(-10000 * math.tanh(x))
+        up_doppler = int(-3400 * math.tanh(x))
+        azimuth = (200 + 160 * (t / duration)) % 360
+        elevation = 80 * math.sin(math.pi * t / duration)
+        down_rate = round(-10000 / 90 / math.cosh(x) ** 2, 1)
+        snapshots.append((t, base.replace(
+            timestamp=1736692530.0 + t,
+            downlink_freq=437800000 + down_doppler, uplink_freq=145990000 + up_doppler,
+            rig_downlink_freq=437800000 + down_doppler, rig_uplink_freq=145990000 + up_doppler,
+            down_doppler=down_doppler, up_doppler=up_doppler,
+            down_doppler_rate=down_rate, up_doppler_rate=round(down_rate * 0.34, 1),
+            sat_azimuth=azimuth, sat_elevation=elevation, sat_height=420.0 + 3 * math.sin(t / 300),
+            rotator_azimuth=float(round(azimuth)), rotator_elevation=float(round(elevation)))))
+    return snapshots
+
+
+def frame_size(event, data):
+    """Bytes of a Socket.IO event message: 42["event",data]"""
+    return len(json.dumps([event, data], separators=(',', ':')).encode()) + 2
+
+
+def replay(snapshots, interval, send):
+    """Call send(snapshot) every interval seconds, return (down bytes, up bytes, ages of what the client shows)"""
+    down = up = 0
+    shown = None  # timestamp of the snapshot the client shows
+    next_send = 0.0
+    ages = []
+    for t, snapshot in snapshots:
+        if t >= next_send - 1e-9:
+            next_send += interval
+            sent = send(snapshot)
+            if sent is not None:
+                down += sent[0]
+                up += sent[1]
+                if sent[2]:
+                    shown = snapshot.timestamp
+        if shown is not None:
+            # Sampled once per tick, a tick later the engine has the next value
+            ages.append(snapshot.timestamp + ORBIT_TICK - shown)
+    return down, up, ages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=5.0, help="stream and fast poll rate (Hz)")
+    args = parser.parse_args()
+
+    snapshots = pass_snapshots(args.minutes)
+    duration = len(snapshots) * ORBIT_TICK
+    satellite_list = {'satellites': satellite_names(), 'current': 'ISS'}
+    poll_request = len('42["get_status"]')
+
+    def broadcast(snapshot):
+        return frame_size('status', snapshot.to_status()) + frame_size('satellite_list', satellite_list), 0, True
+
+    def poll(snapshot):
+        return frame_size('status', snapshot.to_status()), poll_request, True
+
+    stream = TelemetryStream()
+    state = {'last_sent': -HEARTBEAT, 'cpu': [], 'frames': 0}
+
+    def delta(snapshot):
+        started = time.perf_counter()
+        frame = stream.update(snapshot)
+        now = snapshot.timestamp
+        if frame is None:
+            if now - state['last_sent'] < HEARTBEAT:
+                state['cpu'].append(time.perf_counter() - started)
+                return None
+            frame = stream.heartbeat()
+        size = frame_size('telemetry', frame)
+        state['cpu'].append(time.perf_counter() - started)
+        state['last_sent'] = now
+        state['frames'] += 1
+        return size, 0, bool(frame['changes'])
+
+    runs = [
+        ('broadcast', 15.0, broadcast),
+        ('poll 5 s', 5.0, poll),
+        (f'poll {args.rate:g} Hz', 1.0 / args.rate, poll),
+        (f'stream {args.rate:g} Hz', 1.0 / args.rate, delta),
+    ]
+    print(f"{duration / 60:.0f} minute pass, {len(snapshots)} snapshots, satellite list of "
+          f"{len(satellite_list['satellites'])} names\n")
+    print(f"  {'client':<14} {'down B/s':>9} {'up B/s':>7} {'age mean':>9} {'age max':>8}")
+    for name, interval, send in runs:
+        down, up, ages = replay(snapshots, interval, send)
+        print(f"  {name:<14} {down / duration:9.0f} {up / duration:7.1f} {sum(ages) / len(ages):7.2f} s "
+              f"{max(ages):6.2f} s")
+    cpu = sorted(state['cpu'])
+    print(f"\n  stream: {state['frames']} frames, keyframe {frame_size('telemetry', stream.keyframe())} bytes, "
+          f"update {1e6 * sum(cpu) / len(cpu):.0f} us mean, "
+          f"{1e6 * cpu[int(0.99 * (len(cpu) - 1))]:.0f} us p99 per tick")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Web API under load: event latency and tracker tick jitter with many clients.
+
+Starts the web API in a child process with a stand-in engine whose tracker
+thread ticks like the orbit loop (wait 200 ms, one ephem computation,
+publish a TelemetrySnapshot of a synthetic pass), then connects N local
+Socket.IO clients that behave like the bundled page: status, satellite
+list and telemetry keyframe on connect, the telemetry stream, get_status
+every --poll seconds, and every tenth client also searching the recording
+catalog (one query at a time, each taking --query-ms) as often.
+
+For each server mode ([web_api] async_mode) and client count it prints
+
+    status      get_status round trip, p50/p99
+    catalog     get_recordings round trip, p50/p99
+    telemetry   age of the streamed values on arrival (arrival time minus
+                snapshot time, includes up to one stream period), p50/p99
+    tick late   how much later than 200 ms each tracker tick finished,
+                measured in the server process, p50/p99/max
+    threads     threads in the server process
+    cpu         server CPU time per second
+
+Clients and server share the machine, on few cores the clients' own work
+shows up in the latencies. Run from the repository root (needs Flask-SocketIO,
+python-socketio[client] and aiohttp):
+
+    python benchmarks/web_load_benchmark.py
+    python benchmarks/web_load_benchmark.py --modes asyncio --clients 0 100 400 --seconds 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telemetry_stream_benchmark import ORBIT_TICK, pass_snapshots, satellite_names
+
+ISS_TLE = ("ISS (ZARYA)",
+           "1 25544U 98067A   25012.50000000  .00016717  00000-0  30000-3 0  9993",
+           "2 25544  51.6400 200.0000 0003000 100.0000 260.0000 15.50000000400007")
+
+
+class LoadEngine:
+    """What the web API reads from the tracking engine, with a tracker thread ticking like _orbit_loop"""
+
+    class Catalog:
+        def count(self, **filters):
+            return 250
+
+        def satellites(self):
+            return [['ISS', 250, 1736692530.0]]
+
+    def __init__(self, query_ms):
+        import ephem
+        self._ephem = ephem
+        self._tle = ephem.readtle(*ISS_TLE)
+        self._observer = ephem.Observer()
+        self._observer.lat, self._observer.lon = '48.1', '11.6'
+        self._snapshots = [snapshot for _, snapshot in pass_snapshots(10)]
+        self._satellites = satellite_names()
+        self._query = query_ms / 1000
+        self._catalog_lock = threading.Lock()
+        self._shutdown = threading.Event()
+        self.telemetry = self._snapshots[0]
+        self.transponder_name = 'Cross band repeater'
+        self.recording_catalog = self.Catalog()
+        self.ticks = []  # (time, lateness, threads, process time)
+
+    def start(self):
+        threading.Thread(target=self._orbit_loop, name="Tracker", daemon=True).start()
+
+    def _orbit_loop(self):
+        n = 0
+        started = time.perf_counter()
+        epoch = self._ephem.Date('2025/01/12 12:00:00')  # the TLE's epoch, ephem refuses dates far from it
+        while not self._shutdown.wait(ORBIT_TICK):
+            self._observer.date = epoch + n * ORBIT_TICK * self._ephem.second
+            self._tle.compute(self._observer)
+            n += 1
+            self.telemetry = self._snapshots[n % len(self._snapshots)].replace(timestamp=time.time())
+            now = time.perf_counter()
+            self.ticks.append((time.time(), now - started - ORBIT_TICK, threading.active_count(), time.process_time()))
+            started = now
+
+    def report(self, start, stop):
+        ticks = [t for t in self.ticks if start <= t[0] <= stop]
+        cpu = (ticks[-1][3] - ticks[0][3]) / (ticks[-1][0] - ticks[0][0]) if len(ticks) > 1 else 0.0
+        return {'late': [t[1] for t in ticks], 'threads': max(t[2] for t in ticks), 'cpu': cpu}
+
+    def add_listener(self, callback):
+        pass
+
+    def status(self):
+        return self.telemetry.to_status()
+
+    def satellite_list(self):
+        return list(self._satellites)
+
+    def transponder_list(self, satname):
+        return ['Cross band repeater', 'Packet']
+
+    def station_stats(self):
+        return []
+
+    def recorder_status(self):
+        return {'enabled': False, 'armed': False, 'recording': False, 'file': None, 'satellite': None,
+                'start_time': None, 'max_elevation': None, 'last_recording': None}
+
+    def search_recordings(self, **filters):
+        with self._catalog_lock:  # One connection behind a lock like RecordingCatalog
+            time.sleep(self._query)  # SQLite releases the GIL while it searches
+        return [{'path': f'recordings/ISS-{n}.flac', 'satellite': 'ISS'} for n in range(filters.get('limit', 20))]
+
+
+def serve(mode, port, query_ms):
+    """Child process: web API on port, reports tick statistics for the windows asked for on stdin"""
+    workdir = tempfile.mkdtemp()
+    with open(os.path.join(workdir, 'config.ini'), 'w') as f:
+        f.write(f"[web_api]\nport = {port}\nasync_mode = {mode}\ntelemetry_rate = 5\n")
+    os.chdir(workdir)  # web_api reads config.ini from the working directory
+    # Reports go to the parent on stdout, banners and logging of the server to stderr
+    reports = os.fdopen(os.dup(1), 'w')
+    os.dup2(2, 1)
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    from lib import web_api
+    engine = LoadEngine(query_ms)
+    web_api.register_engine(engine)
+    threading.Thread(target=web_api.run_socketio, name="WebSocketThread", daemon=True).start()
+    engine.start()
+    for line in sys.stdin:
+        start, stop = map(float, line.split())
+        print(json.dumps(engine.report(start, stop)), file=reports, flush=True)
+    return 0
+
+
+async def client(url, stats, stop, poll, catalog):
+    import socketio
+    sio = socketio.AsyncClient(reconnection=False)
+    sent = {}
+
+    @sio.on('status')
+    def on_status(data):
+        if 'satellite_info' in data and 'status' in sent:
+            stats['status'].append(time.perf_counter() - sent.pop('status'))
+
+    @sio.on('telemetry')
+    def on_telemetry(frame):
+        if (frame.get('changes') or frame.get('full')) and frame.get('time'):
+            stats['telemetry'].append(time.time() - frame['time'])
+
+    @sio.on('recordings')
+    def on_recordings(data):
+        if 'recordings' in sent:
+            stats['recordings'].append(time.perf_counter() - sent.pop('recordings'))
+
+    await sio.connect(url, transports=['websocket'])
+    stats['connected'] += 1
+    await asyncio.sleep(random.uniform(0, poll))
+    while not stop.is_set():
+        sent['status'] = time.perf_counter()
+        await sio.emit('get_status')
+        if catalog:
+            sent['recordings'] = time.perf_counter()
+            await sio.emit('get_recordings', {'limit': 20})
+        try:
+            await asyncio.wait_for(stop.wait(), poll)
+        except asyncio.TimeoutError:
+            pass
+    await sio.disconnect()
+
+
+async def load(url, clients, seconds, poll):
+    """Connect clients, measure for seconds, returns (stats, measured window)"""
+    stats = {'status': [], 'telemetry': [], 'recordings': [], 'connected': 0}
+    stop = asyncio.Event()
+    tasks = []
+    for n in range(clients):
+        tasks.append(asyncio.create_task(client(url, stats, stop, poll, n % 10 == 9)))
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(2.0)  # settle
+    for values in (stats['status'], stats['telemetry'], stats['recordings']):
+        values.clear()
+    start = time.time()
+    await asyncio.sleep(seconds)
+    window = (start, time.time())
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats, window
+
+
+def percentiles(values, *points):
+    values = sorted(values)
+    if not values:
+        return ['-'] * len(points)
+    return [f"{values[min(len(values) - 1, int(p * len(values)))] * 1e3:.1f}" for p in points]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['threading', 'asyncio'])
+    parser.add_argument('--clients', nargs='+', type=int, default=[0, 100, 400])
+    parser.add_argument('--seconds', type=float, default=20.0, help="measured per client count")
+    parser.add_argument('--poll', type=float, default=2.0, help="seconds between get_status of a client")
+    parser.add_argument('--query-ms', type=float, default=10.0, help="duration of a catalog search")
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args.serve, args.port, args.query_ms)
+
+    print(f"get_status every {args.poll:g} s per client, {args.seconds:g} s measured, {os.cpu_count()} CPUs\n")
+    print(f"  {'mode':<10} {'clients':>7}   {'status p50/p99':>15}   {'catalog p50/p99':>15}   {'telemetry p50/p99':>17}   "
+          f"{'tick late p50/p99/max':>21}   {'threads':>7} {'cpu':>6}   (ms)")
+    for mode in args.modes:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+                                   '--query-ms', str(args.query_ms)],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            url = f"http://127.0.0.1:{port}"
+            for _ in range(100):
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            for clients in args.clients:
+                stats, window = asyncio.run(load(url, clients, args.seconds, args.poll))
+                server.stdin.write(f"{window[0]} {window[1]}\n")
+                server.stdin.flush()
+                report = json.loads(server.stdout.readline())
+                status = '/'.join(percentiles(stats['status'], 0.5, 0.99))
+                catalog = '/'.join(percentiles(stats['recordings'], 0.5, 0.99))
+                telemetry = '/'.join(percentiles(stats['telemetry'], 0.5, 0.99))
+                late = '/'.join(percentiles(report['late'], 0.5, 0.99, 1.0))
+                connected = '' if stats['connected'] == clients else f"  only {stats['connected']} connected"
+                print(f"  {mode:<10} {clients:7d}   {status:>15}   {catalog:>15}   {telemetry:>17}   {late:>21}   "
+                      f"{report['threads']:7d} {report['cpu'] * 100:5.0f}%{connected}")
+        finally:
+            server.stdin.close()
+            server.wait(timeout=10)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
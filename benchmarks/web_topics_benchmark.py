@@ -0,0 +1,159 @@
+"""
+Web API fan-out: broadcast to every client against topic rooms.
+
+Replays a synthetic pass (10 minutes by default, from the telemetry
+benchmark) at the engine's orbit tick with a mix of clients:
+
+    dashboards   status and telemetry at the full rate (the bundled page)
+    phones       rotator stream only, at most once a second
+    operators    status, logs, recorder and catalog, at most once a second
+
+and the events of a busy pass: a burst of status changes every minute, the
+satellite list every two minutes, three log lines a second, the recorder
+state every second and a finished recording at the end. It is delivered
+two ways:
+
+    broadcast    every event and the full telemetry stream to every client,
+                 as safe_emit did
+    rooms        lib.web_topics.SubscriptionHub: each client only gets its
+                 topics, at its rate, with events coalesced in between
+
+and prints the messages and bytes per second leaving the server, the
+server CPU spent on encoding and the hub per second of pass, and what the
+dashboards, phones and operators each receive. Run from the repository root:
+
+    python benchmarks/web_topics_benchmark.py
+    python benchmarks/web_topics_benchmark.py --dashboards 2 --phones 100 --operators 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lib.telemetry import TelemetryStream
+from lib.web_topics import DEFAULT_TOPICS, SubscriptionHub
+from telemetry_stream_benchmark import ORBIT_TICK, pass_snapshots, satellite_names
+
+RATE = 1 / ORBIT_TICK
+
+
+def encode(event, data):
+    """Socket.IO event message as it goes on the wire, encoded once per emit"""
+    return ('42' + json.dumps([event, data], separators=(',', ':'))).encode()
+
+
+def pass_events(t, duration, satellites):
+    """Events published at time t of the pass"""
+    events = []
+    tick = round(t / ORBIT_TICK)
+    if tick % round(60 * RATE) == 0:
+        events += [('status', {'satellite': 'ISS'}), ('status', {'transponder': 'Cross band repeater'}),
+                   ('status', {'subtone': '67 Hz'}), ('status', {'rx_offset': 0})]
+    if tick % round(120 * RATE) == 0:
+        events.append(('satellite_list', {'satellites': satellites, 'current': 'ISS'}))
+    if tick % round(RATE) == 0:
+        events.append(('recorder', {'enabled': True, 'armed': True, 'recording': True,
+                                    'file': 'ISS-20250112-143530.flac', 'satellite': 'ISS',
+                                    'start_time': 1736692530.0, 'max_elevation': round(min(t, duration - t) / 7.5, 1),
+                                    'last_recording': None}))
+    if tick == round(duration * RATE) - 1:
+        events.append(('recording', {'path': 'recordings/ISS-20250112-143530.flac', 'duration': duration}))
+    return events
+
+
+def log_lines(t):
+    tick = round(t / ORBIT_TICK)
+    if tick % round(RATE / 3) == 0:
+        return [f"14:35:{int(t) % 60:02d} INFO Doppler update {tick}: RX 437.79{tick % 1000:03d} MHz"]
+    return []
+
+
+def broadcast(snapshots, duration, satellites, clients):
+    """Every event and the telemetry stream to every client: (messages, bytes, cpu, per client bytes)"""
+    stream = TelemetryStream()
+    messages = sent = 0
+    per_client = dict.fromkeys(clients, 0)
+    started = time.process_time()
+    for t, snapshot in snapshots:
+        out = [(event, data) for event, data in pass_events(t, duration, satellites)]
+        out += [('log', {'lines': [line], 'dropped': 0}) for line in log_lines(t)]
+        frame = stream.update(snapshot)
+        if frame is not None:
+            out.append(('telemetry', frame))
+        for event, data in out:
+            size = len(encode(event, data))
+            messages += len(clients)
+            sent += size * len(clients)
+            for sid in clients:
+                per_client[sid] += size
+    return messages, sent, time.process_time() - started, per_client
+
+
+def rooms(snapshots, duration, satellites, clients):
+    """Through the hub: (messages, bytes, cpu, per client bytes)"""
+    hub = SubscriptionHub(RATE)
+    for sid, (topics, max_rate) in clients.items():
+        hub.subscribe(sid, topics, max_rate)
+    messages = sent = 0
+    per_client = dict.fromkeys(clients, 0)
+    started = time.process_time()
+
+    def emit(out):
+        nonlocal messages, sent
+        for room, event, data in out:
+            size = len(encode(event, data))
+            members = hub.rooms[room].members
+            messages += len(members)
+            sent += size * len(members)
+            for sid in members:
+                per_client[sid] += size
+    for t, snapshot in snapshots:
+        for event, data in pass_events(t, duration, satellites):
+            emit(hub.publish(event, data))
+        for line in log_lines(t):
+            hub.add_log(line)
+        emit(hub.tick(snapshot))
+    return messages, sent, time.process_time() - started, per_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=10.0)
+    parser.add_argument('--dashboards', type=int, default=3)
+    parser.add_argument('--phones', type=int, default=20)
+    parser.add_argument('--operators', type=int, default=2)
+    args = parser.parse_args()
+
+    snapshots = pass_snapshots(args.minutes)
+    duration = len(snapshots) * ORBIT_TICK
+    satellites = satellite_names()
+    clients = {}
+    for n in range(args.dashboards):
+        clients[f'dashboard{n}'] = (DEFAULT_TOPICS, None)
+    for n in range(args.phones):
+        clients[f'phone{n}'] = (('rotator',), 1.0)
+    for n in range(args.operators):
+        clients[f'operator{n}'] = (('status', 'logs', 'recorder', 'catalog'), 1.0)
+
+    print(f"{duration / 60:.0f} minute pass, {args.dashboards} dashboards, {args.phones} phones, "
+          f"{args.operators} operators\n")
+    print(f"  {'':<10} {'msgs/s':>8} {'kB/s':>8} {'cpu':>8}   {'B/s per dashboard':>18} {'phone':>7} {'operator':>9}")
+    for name, run in (('broadcast', broadcast), ('rooms', rooms)):
+        messages, sent, cpu, per_client = run(snapshots, duration, satellites, clients)
+
+        def per(kind):
+            values = [v for sid, v in per_client.items() if sid.startswith(kind)]
+            return f"{sum(values) / len(values) / duration:.0f}" if values else "-"
+        print(f"  {name:<10} {messages / duration:8.0f} {sent / duration / 1000:8.1f} "
+              f"{1000 * cpu / duration:5.2f} ms   {per('dashboard'):>18} {per('phone'):>7} {per('operator'):>9}")
+    print("\n  cpu: server time per second of pass for the hub and JSON encoding, not counting the sockets")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
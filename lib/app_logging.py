@@ -0,0 +1,242 @@
+"""
+Logging setup shared by the GUI and the headless daemon, configured from the
+[logging] section of config.ini.
+
+With async_logging enabled (the default) logging calls only put the record on
+a bounded queue; a writer thread owns the file and console handlers, so the
+Doppler loop, the orbit thread and the audio callback never wait for the SD
+card. When the queue is full records are dropped and counted instead of
+blocking. Repeated messages from the same call site are rate limited.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import atexit
+
+# Writer thread and queue handler of the running pipeline, see stop_logging()
+_listener = None
+_queue_handler = None
+_rate_limiter = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `burst` records per logger and call site through every `interval` seconds"""
+
+    def __init__(self, burst=5, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.suppressed_total = 0
+        self._lock = threading.Lock()
+        self._windows = {}  # (logger, file, line) -> [window start, count, suppressed]
+
+    def filter(self, record):
+        if self.burst <= 0 or record.levelno >= logging.CRITICAL:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    # Tell the reader what was left out, on the first record of the next window
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed in the last {self.interval:g} s)"
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed_total += 1
+            return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops and counts records instead of blocking on a full queue"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported_drops = 0
+
+    def enqueue(self, record):
+        try:
+            if self._unreported_drops:
+                drops = self._unreported_drops
+                notice = logging.LogRecord('qtrigdoppler.logging', logging.WARNING, __file__, 0,
+                                           f"Logging queue was full, {drops} messages dropped", None, None)
+                self.queue.put_nowait(notice)
+                self._unreported_drops -= drops
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported_drops += 1
+
+
+class DispatchingHandler(logging.Handler):
+    """Passes each record on to the handlers at or below its level, filters on it see every record once"""
+
+    def __init__(self, handlers):
+        super().__init__()
+        self.handlers = list(handlers)
+
+    def emit(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self):
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+
+def logging_stats():
+    """Counters of the logging pipeline, for status displays"""
+    return {
+        'queued': _queue_handler.queue.qsize() if _queue_handler else 0,
+        'dropped': _queue_handler.dropped if _queue_handler else 0,
+        'suppressed': _rate_limiter.suppressed_total if _rate_limiter else 0
+    }
+
+
+def stop_logging():
+    """Flush the queue and stop the writer thread, called on shutdown"""
+    global _listener
+    if _listener:
+        listener, _listener = _listener, None
+        listener.stop()
+
+
+def setup_logging():
+    """Set up logging configuration from config file"""
+    # Default logging settings (used if config file is not available)
+    default_level = logging.INFO
+    default_log_to_file = True
+    default_log_file = 'logs/qtrigdoppler.log'
+    default_max_size_mb = 10
+    default_backup_count = 5
+    default_console_output = False
+    default_async_logging = True
+    default_queue_size = 10000
+    default_rate_limit_burst = 5
+    default_rate_limit_interval = 10.0
+    
+    try:
+        # Try to read logging config from config.ini
+        from configparser import ConfigParser
+        config = ConfigParser()
+        config.read('config.ini')
+        
+        if config.has_section('logging'):
+            log_level_str = config.get('logging', 'level', fallback='INFO')
+            log_to_file = config.getboolean('logging', 'log_to_file', fallback=True)
+            log_file = config.get('logging', 'log_file', fallback='logs/qtrigdoppler.log')
+            max_size_mb = config.getint('logging', 'max_file_size_mb', fallback=10)
+            backup_count = config.getint('logging', 'backup_count', fallback=5)
+            console_output = config.getboolean('logging', 'console_output', fallback=False)
+            async_logging = config.getboolean('logging', 'async_logging', fallback=default_async_logging)
+            queue_size = config.getint('logging', 'queue_size', fallback=default_queue_size)
+            rate_limit_burst = config.getint('logging', 'rate_limit_burst', fallback=default_rate_limit_burst)
+            rate_limit_interval = config.getfloat('logging', 'rate_limit_interval', fallback=default_rate_limit_interval)
+        else:
+            # Use defaults if no logging section
+            log_level_str = 'INFO'
+            log_to_file = default_log_to_file
+            log_file = default_log_file
+            max_size_mb = default_max_size_mb
+            backup_count = default_backup_count
+            console_output = default_console_output
+            async_logging = default_async_logging
+            queue_size = default_queue_size
+            rate_limit_burst = default_rate_limit_burst
+            rate_limit_interval = default_rate_limit_interval
+            
+        # Convert log level string to logging constant
+        log_level = getattr(logging, log_level_str.upper(), logging.INFO)
+        
+    except Exception:
+        # If config reading fails, use defaults
+        log_level = default_level
+        log_to_file = default_log_to_file
+        log_file = default_log_file
+        max_size_mb = default_max_size_mb
+        backup_count = default_backup_count
+        console_output = default_console_output
+        async_logging = default_async_logging
+        queue_size = default_queue_size
+        rate_limit_burst = default_rate_limit_burst
+        rate_limit_interval = default_rate_limit_interval
+    
+    # Stop a previous pipeline and clear any existing handlers
+    stop_logging()
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    
+    handlers = []
+    
+    # Set up file logging if enabled
+    if log_to_file:
+        # Create logs directory if it doesn't exist
+        log_dir = os.path.dirname(log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        
+        # Create rotating file handler
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_size_mb*1024*1024, backupCount=backup_count
+        )
+        file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s')
+        file_handler.setFormatter(file_formatter)
+        handlers.append(file_handler)
+    
+    # Set up console logging
+    console_handler = logging.StreamHandler()
+    if console_output:
+        # Show all logs in console if enabled
+        console_handler.setLevel(log_level)
+    else:
+        # Only show ERROR and CRITICAL in console
+        console_handler.setLevel(logging.ERROR)
+    console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+    handlers.append(console_handler)
+
+    global _listener, _queue_handler, _rate_limiter
+    _rate_limiter = RateLimitFilter(rate_limit_burst, rate_limit_interval)
+    if async_logging:
+        # The writer thread owns the real handlers, loggers only see the queue
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(queue_size, 1)))
+        _queue_handler.addFilter(_rate_limiter)
+        # prepare() merges args into the message, the real formatters run in the writer thread
+        _queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        root_handlers = [_queue_handler]
+    else:
+        _queue_handler = None
+        # One handler in front of the file and console handlers, so the limiter counts each record once
+        dispatcher = DispatchingHandler(handlers)
+        dispatcher.addFilter(_rate_limiter)
+        root_handlers = [dispatcher]
+    
+    # Configure root logger
+    logging.basicConfig(
+        level=log_level,
+        handlers=root_handlers,
+        force=True  # Force reconfiguration if already configured
+    )
+    
+    return log_file, log_level
+
+
+# Records still in the queue are written out when the interpreter exits
+atexit.register(stop_logging)
@@ -0,0 +1,208 @@
+"""
+Shared audio capture: one input stream per sound card, any number of consumers.
+
+The pass recorder, the GUI level meter and any later DSP consumer subscribe
+to the CaptureEngine of their device instead of opening their own stream,
+so another consumer never means another hardware stream (some ALSA devices
+cannot be opened twice at all). The stream is opened with the first
+subscriber and closed after the last one leaves.
+
+The audio callback hands the block PortAudio delivered, as is, to every
+subscriber in turn. A subscriber may reduce it first with a processor
+(BlockProcessor for the recorder, LevelProcessor for the meter) working in
+its own preallocated buffer, then copies the result into its own AudioRing,
+read by exactly one consumer thread. A slow consumer therefore only
+overruns its own ring; the dropped frames are counted per subscriber and
+nobody else is held up.
+"""
+
+import math
+import threading
+import time
+import logging
+
+import numpy as np
+
+from lib.audio_ring import AudioRing
+
+
+class LevelProcessor:
+    """Reduces a block to its level, one (1, 1) float32 frame per block"""
+
+    def __init__(self):
+        self.scratch = np.zeros((1, 1), dtype=np.float32)
+
+    def process(self, indata):
+        flat = indata.reshape(-1)
+        self.scratch[0, 0] = math.sqrt(float(np.dot(flat, flat)))
+        return self.scratch
+
+
+class Subscriber:
+    def __init__(self, name, frames, channels, dtype=np.float32, processor=None, tap=None, strict=True):
+        self.name = name
+        self.ring = AudioRing(max(1, frames), channels, dtype)
+        self.processor = processor
+        self.tap = tap  # called with every raw block in the audio callback, must be cheap
+        self.strict = strict  # needs the stream at the sample rate and channels it asked for
+        self.blocks = 0
+        self.first_block_time = None
+        self.last_block_time = None
+        self.last_block_frames = 0
+
+    @property
+    def overruns(self):
+        return self.ring.overruns
+
+    def feed(self, indata):
+        """Audio callback: process the block and copy it into this subscriber's ring"""
+        now = time.perf_counter()
+        if self.first_block_time is None:
+            self.first_block_time = now
+        self.blocks += 1
+        if self.tap is not None:
+            self.tap(indata)
+        self.ring.write(self.processor.process(indata) if self.processor is not None else indata)
+        self.last_block_time = now
+        self.last_block_frames = len(indata)
+
+    def position(self, sample_rate):
+        """Frames written into the ring up to now, extrapolated within the current block period"""
+        written, block_time = self.ring.written, self.last_block_time
+        if block_time is None:
+            return written
+        return written + min(self.last_block_frames, int((time.perf_counter() - block_time) * sample_rate))
+
+
+class CaptureEngine:
+    """The input stream of one device, fanning every block out to the subscribers"""
+
+    def __init__(self, registry, device, device_name, sample_rate, channels, blocksize):
+        self.registry = registry
+        self.device = device
+        self.device_name = device_name
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.subscribers = ()  # replaced as a whole, the callback iterates it without a lock
+        self.stream = None
+        self.frames = 0
+        self.input_overflows = 0
+        self.callback_errors = 0
+
+    def _callback(self, indata, frames, time_info, status):
+        self.frames += frames
+        if status:
+            if status.input_overflow:
+                # Counted instead of logged, it would be too verbose
+                self.input_overflows += 1
+            else:
+                logging.warning(f"Audio status in callback: {status}")
+        for subscriber in self.subscribers:
+            try:
+                subscriber.feed(indata)
+            except Exception as e:
+                # Keeps the stream and the other subscribers running
+                self.callback_errors += 1
+                logging.error(f"Error in audio subscriber {subscriber.name}: {e}")
+
+    def _create_stream(self, device):
+        import sounddevice as sd
+        return sd.InputStream(
+            device=device,
+            channels=self.channels,
+            samplerate=self.sample_rate,
+            dtype='float32',
+            callback=self._callback,
+            blocksize=self.blocksize
+        )
+
+    def open(self):
+        logging.info(f"Starting audio stream from device {self.device} ({self.device_name}), "
+                     f"{self.sample_rate} Hz, {self.channels} channel(s), blocksize {self.blocksize}")
+        stream = self._create_stream(self.device)
+        stream.start()
+        self.stream = stream
+        self.registry.stream_opened(self.device)
+
+    def close(self):
+        if self.stream is None:
+            return
+        try:
+            self.stream.stop()
+            self.stream.close()
+        except Exception as e:
+            logging.debug(f"Error closing audio stream: {e}")
+        self.stream = None
+        self.registry.stream_closed(self.device)
+        if self.input_overflows:
+            logging.info(f"Audio device {self.device_name}: {self.input_overflows} input overflows")
+
+    def stats(self):
+        return {'device': self.device_name, 'sample_rate': self.sample_rate, 'channels': self.channels,
+                'frames': self.frames, 'input_overflows': self.input_overflows, 'errors': self.callback_errors,
+                'subscribers': {s.name: {'blocks': s.blocks, 'overruns': s.overruns} for s in self.subscribers}}
+
+
+class AudioCapture:
+    """Capture engines by device, shared by the pass recorder, the level meter and later consumers"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.engines = {}
+        self._lock = threading.RLock()  # subscribe() retries a fallback device from within
+
+    def subscribe(self, device, device_name, subscriber, sample_rate, channels, blocksize, fallback=True):
+        """Add a subscriber to the device's engine, opening its stream if needed; returns the engine"""
+        with self._lock:
+            engine = self.engines.get(device)
+            if engine is not None and (engine.sample_rate, engine.channels) != (sample_rate, channels):
+                if subscriber.strict and any(s.strict for s in engine.subscribers):
+                    raise RuntimeError(f"{device_name} is already capturing at {engine.sample_rate} Hz, "
+                                       f"{engine.channels} channel(s)")
+                if subscriber.strict:
+                    # Only flexible subscribers so far (the level meter), they follow the new format
+                    logging.info(f"Reopening {device_name} at {sample_rate} Hz, {channels} channel(s) for {subscriber.name}")
+                    engine.close()
+                    engine.sample_rate, engine.channels, engine.blocksize = sample_rate, channels, blocksize
+            if engine is None:
+                engine = CaptureEngine(self.registry, device, device_name, sample_rate, channels, blocksize)
+                self.engines[device] = engine
+            engine.subscribers = engine.subscribers + (subscriber,)
+            if engine.stream is None:
+                try:
+                    engine.open()
+                except Exception as e:
+                    engine.subscribers = tuple(s for s in engine.subscribers if s is not subscriber)
+                    if not engine.subscribers:
+                        del self.engines[device]
+                    if not fallback:
+                        raise
+                    logging.error(f"Error creating audio stream: {e}", exc_info=True)
+                    # The cached device may have been unplugged, probe again and retry, then the 'default' specifier.
+                    # Under the device it resolves to now, so a card that is already capturing is shared, not opened twice
+                    self.registry.refresh(reinitialize=True)
+                    retry = self.registry.resolve(device_name)
+                    logging.info(f"Trying with {retry.name if retry is not None else 'the default device specifier'} as fallback")
+                    try:
+                        return self.subscribe(retry.index if retry is not None else 'default', device_name, subscriber,
+                                              sample_rate, channels, blocksize, fallback=False)
+                    except Exception as e2:
+                        logging.error(f"Fallback also failed: {e2}")
+                        raise  # Re-raise to be caught by the subscriber
+            return engine
+
+    def unsubscribe(self, engine, subscriber):
+        """Remove a subscriber, the stream is closed once nobody is left"""
+        with self._lock:
+            engine.subscribers = tuple(s for s in engine.subscribers if s is not subscriber)
+            if subscriber.overruns:
+                logging.warning(f"Audio subscriber {subscriber.name} dropped {subscriber.overruns} frames, "
+                                f"it could not keep up")
+            if not engine.subscribers:
+                engine.close()
+                self.engines = {k: e for k, e in self.engines.items() if e is not engine}
+
+    def stats(self):
+        with self._lock:
+            return [engine.stats() for engine in self.engines.values()]
@@ -0,0 +1,200 @@
+"""
+Audio input device registry shared by the pass recorder and the level monitor.
+
+Probing sound cards is slow: every candidate is opened with a test stream
+and some drivers take a long time for that. The registry probes all input
+devices once, on a background thread at startup, and caches for each of them
+whether it opens and which sample rates it supports. Finding the device for
+a recording is then a dictionary lookup on the configured name. The cache is
+rebuilt on request, and by the recorder when the cached device no longer
+opens (a sound card was unplugged or plugged in). Cards we are capturing
+from keep their result, they are not opened a second time for the test.
+"""
+
+import threading
+import time
+import logging
+
+PROBE_SAMPLE_RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000, 88200, 96000, 192000)
+PROBE_BLOCKSIZE = 8192
+
+
+class AudioDevice:
+    """Probe result of one input device"""
+
+    def __init__(self, index, info, hostapi, sample_rates, working):
+        self.index = index
+        self.name = info['name']
+        self.info = info
+        self.hostapi = hostapi
+        self.max_input_channels = info.get('max_input_channels', 0)
+        self.default_samplerate = int(info.get('default_samplerate', 0) or 0)
+        self.sample_rates = sample_rates
+        self.working = working
+
+    def supports(self, sample_rate):
+        return sample_rate in self.sample_rates
+
+    def __repr__(self):
+        return f"AudioDevice({self.index}, {self.name!r}, working={self.working})"
+
+
+class AudioDeviceRegistry:
+    def __init__(self):
+        self.devices = []
+        self.probe_time = 0.0  # seconds the last probe took
+        self._resolved = {}  # configured soundcard -> AudioDevice, filled on first use
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._probe_thread = None
+        self.streams_open = 0  # streams of our own, PortAudio is only reinitialised without any
+        self.open_devices = {}  # device index -> streams of our own on it, not probed again while open
+
+    ### Probing
+
+    def start_probe(self):
+        """Probe in the background, resolve() and list() wait for it"""
+        if self._probe_thread is None and not self._ready.is_set():
+            self._probe_thread = threading.Thread(target=self.refresh, name="AudioProbe", daemon=True)
+            self._probe_thread.start()
+
+    def refresh(self, reinitialize=False):
+        """Probe every input device again; reinitialize also picks up cards plugged in since startup"""
+        import sounddevice as sd
+        with self._lock:
+            started = time.perf_counter()
+            if reinitialize and self.streams_open == 0:
+                # PortAudio only sees new devices after a restart, which would also end open streams
+                try:
+                    sd._terminate()
+                    sd._initialize()
+                except Exception as e:
+                    logging.warning(f"Could not reinitialise PortAudio: {e}")
+            devices = []
+            previous = {device.index: device for device in self.devices}
+            try:
+                for index, info in enumerate(sd.query_devices()):
+                    if info.get('max_input_channels', 0) > 0:
+                        known = previous.get(index)
+                        if index in self.open_devices and known is not None and known.name == info['name']:
+                            # We capture from it, a test stream could fail on a driver that opens a card only once
+                            devices.append(AudioDevice(index, info, known.hostapi, known.sample_rates, known.working))
+                        else:
+                            devices.append(self._probe(sd, index, info))
+            except Exception as e:
+                logging.error(f"Error probing audio devices: {e}")
+            self.devices = devices
+            self._resolved = {}
+            self.probe_time = time.perf_counter() - started
+            self._ready.set()
+        working = [d for d in devices if d.working]
+        logging.info(f"Audio devices probed in {self.probe_time:.2f} s: {len(devices)} inputs, {len(working)} available")
+        if not devices:
+            logging.warning("No audio input devices detected. Recording will not work.")
+        for device in devices:
+            logging.info(f"Audio input device {device.index}: {device.name} | API: {device.hostapi} | "
+                         f"Inputs: {device.max_input_channels} | "
+                         f"Rates: {', '.join(str(r) for r in device.sample_rates) or '-'}"
+                         f"{'' if device.working else ' | not available'}")
+        return devices
+
+    @staticmethod
+    def _probe(sd, index, info):
+        hostapi = "unknown"
+        try:
+            hostapi = sd.query_hostapis(info.get('hostapi', 0)).get('name', 'unknown')
+        except Exception:
+            pass
+        sample_rates = []
+        for sample_rate in PROBE_SAMPLE_RATES:
+            try:
+                sd.check_input_settings(device=index, channels=1, samplerate=sample_rate)
+                sample_rates.append(sample_rate)
+            except Exception:
+                pass
+        working = False
+        try:
+            # Quick test that the device opens, another program may hold it
+            rate = int(info.get('default_samplerate') or 0) or (sample_rates[-1] if sample_rates else 44100)
+            with sd.InputStream(device=index, channels=1, samplerate=rate, blocksize=PROBE_BLOCKSIZE,
+                                callback=lambda *args: None):
+                pass
+            working = True
+        except Exception as e:
+            logging.debug(f"Device {index} ({info['name']}) not available: {e}")
+        return AudioDevice(index, info, hostapi, tuple(sample_rates), working)
+
+    def list(self, timeout=10.0):
+        """All input devices, probing first if that has not happened yet"""
+        self._wait(timeout)
+        return list(self.devices)
+
+    def _wait(self, timeout):
+        if not self._ready.is_set():
+            if self._probe_thread is None:
+                self.refresh()
+            else:
+                self._ready.wait(timeout)
+
+    ### Lookup
+
+    def resolve(self, soundcard='default', timeout=10.0):
+        """Device to use for the configured soundcard (name, part of a name, index or 'default'), None if none works"""
+        self._wait(timeout)
+        device = self._resolved.get(soundcard)
+        if device is None:
+            device = self._lookup(soundcard)
+            if device is not None:
+                self._resolved[soundcard] = device
+        return device
+
+    def _lookup(self, soundcard):
+        working = [d for d in self.devices if d.working]
+        if soundcard and soundcard != 'default':
+            # Exact name first, then a partial match, then as an index
+            for device in working:
+                if device.name == soundcard:
+                    logging.info(f"Selected working device '{device.name}' (index {device.index})")
+                    return device
+            for device in working:
+                if soundcard in device.name or device.name in soundcard:
+                    logging.info(f"Selected similar working device '{device.name}' (index {device.index})")
+                    return device
+            try:
+                index = int(soundcard)
+                for device in working:
+                    if device.index == index:
+                        logging.info(f"Selected working device by index {index} ({device.name})")
+                        return device
+            except ValueError:
+                pass
+            logging.warning(f"Audio device '{soundcard}' not available, using the default device")
+        try:
+            import sounddevice as sd
+            default_index = sd.default.device[0]
+        except Exception:
+            default_index = None
+        for device in working:
+            if device.index == default_index:
+                logging.info(f"Selected default working device {device.name} (index {device.index})")
+                return device
+        if working:
+            logging.info(f"Found working device: {working[0].name} (index {working[0].index})")
+            return working[0]
+        return None
+
+    ### Open streams, for refresh()
+
+    def stream_opened(self, device=None):
+        with self._lock:
+            self.streams_open += 1
+            if device is not None:
+                self.open_devices[device] = self.open_devices.get(device, 0) + 1
+
+    def stream_closed(self, device=None):
+        with self._lock:
+            self.streams_open = max(0, self.streams_open - 1)
+            if device in self.open_devices:
+                self.open_devices[device] -= 1
+                if not self.open_devices[device]:
+                    del self.open_devices[device]
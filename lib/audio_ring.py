@@ -0,0 +1,65 @@
+"""
+Preallocated single-producer/single-consumer ring buffer for audio frames.
+
+The PortAudio callback is the only writer and one thread (the recording
+writer) the only reader. Each side only advances its own counter, and the
+writer publishes a block by advancing `written` after the samples are in
+place, so neither side takes a lock and the callback never waits for disk
+I/O. When the reader falls behind by more than the capacity, whole blocks
+are dropped and counted in `overruns` instead of growing the buffer.
+"""
+
+import numpy as np
+
+
+class AudioRing:
+    def __init__(self, frames, channels, dtype):
+        self.buffer = np.zeros((frames, channels), dtype=dtype)
+        self.capacity = frames
+        self.channels = channels
+        self.written = 0    # frames written in total, only the producer changes it
+        self.read = 0       # frames consumed in total, only the consumer changes it
+        self.overruns = 0   # frames dropped because the ring was full
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def available(self):
+        """Frames ready for the consumer"""
+        return self.written - self.read
+
+    def space(self):
+        """Frames the producer can write without dropping"""
+        return self.capacity - (self.written - self.read)
+
+    def write(self, block):
+        """Copy a (frames, channels) block in, converting to the ring's dtype; False if it was dropped"""
+        frames = len(block)
+        if frames > self.space():
+            self.overruns += frames
+            return False
+        start = self.written % self.capacity
+        first = min(frames, self.capacity - start)
+        np.copyto(self.buffer[start:start + first], block[:first], casting='unsafe')
+        if first < frames:
+            np.copyto(self.buffer[:frames - first], block[first:], casting='unsafe')
+        self.written += frames
+        return True
+
+    def peek(self, max_frames=None):
+        """Up to two views of the readable frames, oldest first; call consume() once they are used"""
+        frames = self.available()
+        if max_frames is not None:
+            frames = min(frames, max_frames)
+        if frames <= 0:
+            return []
+        start = self.read % self.capacity
+        first = min(frames, self.capacity - start)
+        views = [self.buffer[start:start + first]]
+        if first < frames:
+            views.append(self.buffer[:frames - first])
+        return views
+
+    def consume(self, frames):
+        self.read += frames
@@ -0,0 +1,314 @@
+"""
+Beacon-lock AFC: closes the loop on the TLE Doppler correction from the audio.
+
+TLE errors, above all on newly launched satellites, can leave the predicted
+downlink hundreds of Hz off. With [afc] enabled, BeaconAFC subscribes to
+the shared capture engine of the pass recording sound card (lib/audio_capture.py),
+looks for a beacon or carrier near its expected audio frequency and moves
+F_cal, the RX correction the Doppler worker adds to the downlink, until the
+beacon sits where it should.
+
+    PeakTracker   Welch averaged FFT of the latest audio, strongest bin
+                  within +/- search_hz of beacon_hz, refined by a parabola
+    AFCLoop       lock/unlock hysteresis on the SNR, then a smoothed and
+                  rate limited correction; unlocked it holds the last one
+    BeaconAFC     the loop thread, `rate` times per second (10 by default)
+
+Each tick costs a handful of FFTs of fft_size samples, see
+benchmarks/beacon_afc_benchmark.py for the time per tick and how fast the
+loop pulls in a beacon.
+"""
+
+import math
+import threading
+import time
+import logging
+
+import numpy as np
+
+from lib.audio_capture import Subscriber
+
+
+class MonoProcessor:
+    """Downmixes a block to one float32 channel in a preallocated buffer"""
+
+    def __init__(self, frames=8192):
+        self.scratch = np.zeros((frames, 1), dtype=np.float32)
+
+    def process(self, indata):
+        if indata.shape[1] == 1:
+            return indata
+        if len(indata) > len(self.scratch):
+            self.scratch = np.zeros((len(indata), 1), dtype=np.float32)
+        out = self.scratch[:len(indata)]
+        np.mean(indata, axis=1, keepdims=True, out=out)
+        return out
+
+
+class PeakTracker:
+    """Frequency and SNR of the strongest signal near the beacon in the latest integration seconds"""
+
+    def __init__(self, sample_rate, fft_size=4096, integration=0.5, beacon_hz=1000.0, search_hz=500.0):
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.hop = fft_size // 2
+        # Whole hops only, so every frame of the history is used
+        self.frames = fft_size + max(0, int(integration * sample_rate) - fft_size) // self.hop * self.hop
+        self.history = np.zeros(self.frames, dtype=np.float32)
+        self.filled = 0
+        self.window = np.hanning(fft_size).astype(np.float32)
+        self.bin_hz = sample_rate / fft_size
+        self.set_beacon(beacon_hz, search_hz)
+
+    def set_beacon(self, beacon_hz, search_hz):
+        self.beacon_hz = beacon_hz
+        bins = self.fft_size // 2 + 1
+        self.low = max(1, int((beacon_hz - search_hz) / self.bin_hz))
+        self.high = min(bins - 1, int(math.ceil((beacon_hz + search_hz) / self.bin_hz)) + 1)
+
+    def push(self, samples):
+        """Append new mono samples, only the latest `frames` are kept"""
+        n = len(samples)
+        if n >= self.frames:
+            self.history[:] = samples[-self.frames:]
+        elif n:
+            self.history[:-n] = self.history[n:]
+            self.history[-n:] = samples
+        self.filled = min(self.frames, self.filled + n)
+
+    def measure(self):
+        """(peak frequency in Hz, SNR in dB) over the history, None until one FFT length is there"""
+        if self.filled < self.fft_size:
+            return None
+        history = self.history[self.frames - self.filled:]
+        frames = np.lib.stride_tricks.sliding_window_view(history, self.fft_size)[::self.hop]
+        power = np.abs(np.fft.rfft(frames * self.window, axis=1)[:, self.low - 1:self.high + 1]) ** 2
+        band = power.mean(axis=0)
+        search = band[1:-1]
+        i = int(np.argmax(search))
+        snr = 10 * math.log10((search[i] + 1e-20) / (float(np.median(search)) + 1e-20))
+        # Parabola through the log power of the peak and its neighbours
+        a, b, c = np.log10(band[i:i + 3] + 1e-20)
+        denominator = a - 2 * b + c
+        fraction = 0.5 * (a - c) / denominator if denominator != 0 else 0.0
+        return float((self.low + i + fraction) * self.bin_hz), snr
+
+
+class AFCLoop:
+    """Turns residual measurements into a correction, with lock hysteresis and rate limits"""
+
+    def __init__(self, rate=10.0, gain=0.1, max_rate=50.0, max_offset=2000.0, deadband=5.0,
+                 lock_snr=10.0, unlock_snr=6.0, lock_time=0.5, unlock_time=2.0, lock_tolerance=30.0):
+        self.gain = gain
+        self.max_step = max_rate / rate  # Hz per update
+        self.max_offset = max_offset
+        self.deadband = deadband
+        self.lock_snr = lock_snr
+        self.unlock_snr = unlock_snr
+        self.lock_updates = max(1, int(round(lock_time * rate)))
+        self.unlock_updates = max(1, int(round(unlock_time * rate)))
+        self.lock_tolerance = lock_tolerance  # Hz the peak may move between two updates while locking
+        self.reset()
+
+    def reset(self, correction=0.0):
+        self.correction = correction
+        self.locked = False
+        self.good = 0
+        self.bad = 0
+        self.last_residual = None
+
+    def update(self, residual, snr):
+        """Feed one measurement (audio peak minus beacon_hz, SNR); returns the correction in Hz"""
+        if not self.locked:
+            steady = self.last_residual is not None and abs(residual - self.last_residual) <= self.lock_tolerance
+            self.good = self.good + 1 if snr >= self.lock_snr and (steady or self.good == 0) else 0
+            self.last_residual = residual
+            if self.good >= self.lock_updates:
+                self.locked = True
+                self.bad = 0
+                logging.info(f"AFC locked: beacon {residual:+.0f} Hz off, SNR {snr:.1f} dB")
+            else:
+                return self.correction
+        if snr < self.unlock_snr or abs(residual - self.last_residual) > self.lock_tolerance:
+            # Between the two thresholds the lock holds, below it the measurement is not used;
+            # nor is a jump, a noise peak elsewhere in the search range while the beacon fades
+            self.bad += 1
+            if self.bad >= self.unlock_updates:
+                self.locked = False
+                self.good = 0
+                self.last_residual = None
+                logging.info(f"AFC unlocked: SNR {snr:.1f} dB, holding {self.correction:+.0f} Hz")
+            return self.correction
+        self.bad = 0
+        self.last_residual = residual
+        if abs(residual) > self.deadband:
+            step = max(-self.max_step, min(self.max_step, self.gain * residual))
+            self.correction = max(-self.max_offset, min(self.max_offset, self.correction + step))
+        return self.correction
+
+
+class BeaconAFC:
+    """Runs the AFC loop on the pass recording sound card while tracking"""
+
+    def __init__(self, config, devices, capture, apply, sideband=lambda: 'USB', on_lock=None):
+        self.devices = devices
+        self.capture = capture
+        self.apply = apply  # called with the new correction (Hz, int) when it changes
+        self.sideband = sideband  # downlink mode, LSB turns the correction around
+        self.on_lock = on_lock  # called with True/False when the lock changes
+        self.thread = None
+        self.tracker = None
+        self.snr = None
+        self.residual = None
+        self.ticks = 0
+        self.updates = 0
+        self.cpu_time = 0.0
+        self.running_time = 0.0
+        self._stop_event = threading.Event()
+        self.load_config(config)
+        self.loop = self._make_loop()
+
+    def load_config(self, config):
+        self.enabled = config.getboolean('afc', 'enabled', fallback=False)
+        self.beacon_hz = config.getfloat('afc', 'beacon_hz', fallback=1000.0)
+        self.search_hz = config.getfloat('afc', 'search_hz', fallback=500.0)
+        self.fft_size = config.getint('afc', 'fft_size', fallback=4096)
+        self.integration = config.getfloat('afc', 'integration', fallback=0.5)
+        self.rate = max(1.0, config.getfloat('afc', 'rate', fallback=10.0))
+        self.gain = config.getfloat('afc', 'gain', fallback=0.1)
+        self.max_rate = config.getfloat('afc', 'max_rate', fallback=50.0)
+        self.max_offset = config.getfloat('afc', 'max_offset', fallback=2000.0)
+        self.deadband = config.getfloat('afc', 'deadband', fallback=5.0)
+        self.lock_snr = config.getfloat('afc', 'lock_snr', fallback=10.0)
+        self.unlock_snr = config.getfloat('afc', 'unlock_snr', fallback=6.0)
+        self.lock_time = config.getfloat('afc', 'lock_time', fallback=0.5)
+        self.unlock_time = config.getfloat('afc', 'unlock_time', fallback=2.0)
+        # The sound card and stream format are shared with pass recording
+        self.soundcard = config.get('passrecording', 'soundcard', fallback='default')
+        self.sample_rate = config.getint('passrecording', 'sample_rate', fallback=44100)
+        self.channels = config.getint('passrecording', 'channels', fallback=1)
+        self.blocksize = config.getint('passrecording', 'blocksize', fallback=8192)
+
+    def update_config(self, config):
+        self.load_config(config)
+        correction = self.loop.correction
+        self.loop = self._make_loop()
+        self.loop.correction = correction
+        if self.tracker is not None:
+            self.tracker.set_beacon(self.beacon_hz, self.search_hz)
+
+    def _make_loop(self):
+        return AFCLoop(self.rate, self.gain, self.max_rate, self.max_offset, self.deadband,
+                       self.lock_snr, self.unlock_snr, self.lock_time, self.unlock_time)
+
+    @property
+    def locked(self):
+        return self.loop.locked
+
+    @property
+    def correction(self):
+        return self.loop.correction
+
+    def start(self):
+        if not self.enabled or (self.thread is not None and self.thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="BeaconAFC", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+
+    def reset(self):
+        """Forget the correction, e.g. for another transponder"""
+        was_locked = self.loop.locked
+        self.loop.reset()
+        if was_locked and self.on_lock is not None:
+            self.on_lock(False)
+
+    def status(self):
+        return {'enabled': self.enabled, 'running': self.thread is not None and self.thread.is_alive(),
+                'locked': self.loop.locked, 'correction': round(self.loop.correction),
+                'residual': None if self.residual is None else round(self.residual, 1),
+                'snr': None if self.snr is None else round(self.snr, 1), 'updates': self.updates,
+                'cpu_percent': round(100 * self.cpu_time / self.running_time, 2) if self.running_time else 0.0}
+
+    def _blocksize(self, sample_rate):
+        # At least two blocks per tick, otherwise the loop would wait for audio
+        blocksize = 256
+        while blocksize * 2 <= sample_rate / (2 * self.rate):
+            blocksize *= 2
+        return min(self.blocksize, blocksize)
+
+    def _run(self):
+        try:
+            device = self.devices.resolve(self.soundcard)
+        except Exception as e:
+            logging.error(f"AFC: could not look up the audio device: {e}")
+            return
+        if device is None:
+            logging.warning("AFC: no audio input device available")
+            return
+        subscriber = Subscriber("afc", 2 * self.sample_rate, 1, processor=MonoProcessor(), strict=False)
+        try:
+            engine = self.capture.subscribe(device.index, device.name, subscriber, self.sample_rate,
+                                            self.channels, self._blocksize(self.sample_rate))
+        except Exception as e:
+            logging.error(f"AFC: could not open {device.name}: {e}")
+            return
+        # A stream opened before, e.g. by the level meter, may run at another rate
+        sample_rate = engine.sample_rate
+        if engine.blocksize > sample_rate / self.rate:
+            logging.warning(f"AFC: the sound card delivers audio every {1000 * engine.blocksize / sample_rate:.0f} ms, "
+                            f"fewer than {self.rate:.0f} updates per second; lower blocksize in [passrecording]")
+        self.tracker = PeakTracker(sample_rate, self.fft_size, self.integration, self.beacon_hz, self.search_hz)
+        logging.info(f"AFC running on {device.name}: beacon {self.beacon_hz:.0f} Hz +/- {self.search_hz:.0f} Hz, "
+                     f"{self.rate:.0f} updates/s, {self.tracker.frames / sample_rate:.2f} s integration")
+        ring = subscriber.ring
+        started, cpu_started = time.monotonic(), time.thread_time()
+        next_tick = started
+        try:
+            while not self._stop_event.is_set():
+                next_tick += 1.0 / self.rate
+                delay = next_tick - time.monotonic()
+                if delay < 0:
+                    next_tick = time.monotonic()  # overloaded: skip ticks instead of bunching them up
+                elif self._stop_event.wait(delay):
+                    break
+                self.ticks += 1
+                views = ring.peek()
+                if not views:
+                    continue  # no new audio since the last update, measuring again would count it twice
+                for view in views:
+                    self.tracker.push(view[:, 0])
+                ring.consume(sum(len(view) for view in views))
+                self._update()
+                self.cpu_time = time.thread_time() - cpu_started
+                self.running_time = time.monotonic() - started
+        except Exception as e:
+            logging.error(f"AFC loop error: {e}", exc_info=True)
+        finally:
+            self.capture.unsubscribe(engine, subscriber)
+            self.tracker = None
+            logging.info(f"AFC stopped: correction {self.loop.correction:+.0f} Hz, {self.updates} updates, "
+                         f"CPU {self.status()['cpu_percent']}%")
+
+    def _update(self):
+        measurement = self.tracker.measure()
+        if measurement is None:
+            return
+        peak_hz, self.snr = measurement
+        self.residual = peak_hz - self.beacon_hz
+        # Upper sideband: the beacon is heard too high when the rig is tuned too low, so F_cal goes up.
+        # Lower sideband hears the spectrum the other way round.
+        sign = -1 if self.sideband() == 'LSB' else 1
+        was_locked, before = self.loop.locked, round(self.loop.correction)
+        after = round(self.loop.update(sign * self.residual, self.snr))
+        self.updates += 1
+        if after != before:
+            self.apply(after)
+        if self.loop.locked != was_locked and self.on_lock is not None:
+            self.on_lock(self.loop.locked)
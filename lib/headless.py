@@ -0,0 +1,114 @@
+"""
+Headless daemon mode for QTrigdoppler (python QTrigdoppler.py --headless).
+
+Runs the tracking engine - Doppler correction, rotator, pass recorder and
+Cloudlog - together with the web API and the remote client, without loading
+PySide6, qt-material or matplotlib. Control happens through the web API or
+the remote server; the optional [headless] section selects a satellite and
+starts tracking unattended.
+"""
+
+import sys
+import signal
+import logging
+import threading
+from configparser import ConfigParser
+from lib.app_logging import setup_logging
+from lib.startup_profile import StartupProfiler
+from lib.tracking_engine import TrackingEngine
+
+
+def start_from_config(engine, config):
+    """Apply the [headless] satellite/transponder/subtone selection and optionally start tracking"""
+    satname = config.get('headless', 'satellite', fallback='')
+    if not satname:
+        return
+    if satname not in engine.satellite_list():
+        logging.error(f"Headless: satellite '{satname}' not found in {engine.sqf_file}")
+        return
+    transponders = engine.select_satellite(satname)
+    tpxname = config.get('headless', 'transponder', fallback='')
+    if tpxname:
+        if tpxname in transponders:
+            engine.select_transponder(tpxname)
+        else:
+            logging.error(f"Headless: transponder '{tpxname}' not found for {satname}, using '{engine.transponder_name}'")
+    subtone = config.get('headless', 'subtone', fallback='')
+    if subtone:
+        engine.set_subtone(subtone)
+    if config.getboolean('headless', 'autostart', fallback=False):
+        if engine.start_tracking():
+            logging.info(f"Headless: tracking {satname} / {engine.transponder_name}")
+
+
+def main(profiler=None):
+    """Run until SIGINT/SIGTERM, with --profile-startup only until the engine is up"""
+    profiler = profiler or StartupProfiler()
+    profiler.mark("imports")
+    log_file_path, log_level = setup_logging()
+    logging.info("=" * 50)
+    logging.info("QTrigdoppler starting up (headless)")
+    logging.info(f"Logging configured - Level: {logging.getLevelName(log_level)}, File: {log_file_path}")
+    logging.info("=" * 50)
+
+    config = ConfigParser()
+    if not config.read('config.ini'):
+        logging.critical("Failed to find configuration file!")
+        return 1
+
+    radio = config.get('icom', 'radio')
+    if radio != "9700" and radio != "705" and radio != "818" and radio != "910":
+        logging.critical("***  Icom radio not supported: {badmodel}".format(badmodel=radio))
+        return 1
+    profiler.mark("logging, config.ini")
+
+    engine = TrackingEngine(config)
+    profiler.mark("tracking engine")
+
+    webapi_enabled = config.has_section('web_api') and config.getboolean('web_api', 'enabled')
+    remote_enabled = config.has_section('remote_server') and config.getboolean('remote_server', 'enable')
+    if webapi_enabled:
+        from lib import web_api
+        web_api.register_engine(engine)
+        web_api_thread = threading.Thread(target=web_api.run_socketio, name="WebSocketThread", daemon=True)
+        web_api_thread.start()
+        logging.info(f"Web API server started on port {config.get('web_api', 'port', fallback='5000')}")
+    if remote_enabled:
+        from lib import remote_client
+        remote_client.register_engine(engine)
+    if not webapi_enabled and not remote_enabled:
+        logging.warning("Headless mode without web API or remote server, only [headless] autostart can control tracking")
+    profiler.mark("web API, remote client")
+
+    engine.start()
+    start_from_config(engine, config)
+    profiler.mark("engine threads, [headless] selection")
+
+    # SIGINT/SIGTERM only set the event, the shutdown itself runs on the main thread
+    shutdown_requested = threading.Event()
+    def request_shutdown(signum, frame):
+        shutdown_requested.set()
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+
+    if profiler.enabled:
+        profiler.report()
+        shutdown_requested.set()
+
+    # A timed wait keeps the main thread responsive to signals on Windows
+    while not shutdown_requested.wait(1.0):
+        pass
+
+    logging.info("=" * 50)
+    logging.info("QTrigdoppler shutting down")
+    logging.info("=" * 50)
+    if webapi_enabled:
+        web_api.stop_telemetry_thread()
+    if remote_enabled:
+        remote_client.disconnect()
+    engine.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
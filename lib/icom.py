@@ -26,6 +26,9 @@ import logging
 
 
 class icom:
+    # Frequency writes and the time they took, for the station throughput statistics
+    frequency_writes = 0
+    frequency_write_time = 0.0
 
     def __init__(self, serialDevice, serialBaud, icomTrxCivAdress, radio_model='9700'):
         self.connected = False
@@ -328,7 +331,10 @@ class icom:
             freq = freq[-10:]
             b = bytes([5, int(freq[8:10], 16), int(freq[6:8], 16), int(freq[4:6], 16),
                        int(freq[2:4], 16), int(freq[0:2], 16)])
+            started = time.perf_counter()
             returnMsg = self.__writeToIcom(b)  # Single attempt only
+            self.frequency_writes += 1
+            self.frequency_write_time += time.perf_counter() - started
             back = False
             if len(returnMsg) > 0:
                 if returnMsg.count(b'\xfb') > 0:
@@ -1,6 +1,5 @@
-import requests
 import logging
-from PySide6.QtCore import *
+import threading
 
 def send_to_cloudlog(sat, tx_freq, rx_freq, tx_mode, rx_mode, sat_name,CLOUDLOG_URL,CLOUDLOG_API_KEY):
     # Convert FMN to FM for Cloudlog
@@ -18,6 +17,7 @@ def send_to_cloudlog(sat, tx_freq, rx_freq, tx_mode, rx_mode, sat_name,CLOUDLOG_
         "sat_name": sat_name,
     }
     try:
+        import requests
         response = requests.post(url, json=payload, timeout=5)
         if response.status_code == 200:
             logging.info("Cloudlog API: Success")
@@ -27,9 +27,9 @@ def send_to_cloudlog(sat, tx_freq, rx_freq, tx_mode, rx_mode, sat_name,CLOUDLOG_
         logging.error(f"Cloudlog API: Exception occurred: {e}")
 
 # CloudlogWorker for background posting
-class CloudlogWorker(QRunnable):
+class CloudlogWorker(threading.Thread):
     def __init__(self, sat, tx_freq, rx_freq, tx_mode, rx_mode, sat_name, log_url, log_api_key):
-        super().__init__()
+        super().__init__(name="CloudlogWorker", daemon=True)
         self.sat = sat
         self.tx_freq = tx_freq
         self.rx_freq = rx_freq
@@ -0,0 +1,120 @@
+"""
+Shared orbital state for the station's device trackers.
+
+One OrbitalStateService thread computes every satellite a device follows,
+each with its own ephem body and observer, and publishes an immutable
+OrbitalState per satellite. Tracker threads only read these states: adding a
+device adds no ephem computation and no lock held while a rig or rotator is
+being written. Between two ticks a tracker extrapolates the range velocity
+linearly, so a 0.2 s tick still gives doppler updates at any tracker rate.
+"""
+
+import math
+import time
+import threading
+import logging
+import ephem
+from lib import rotator_planner
+
+ORBIT_STATE_INTERVAL = 0.2  # seconds between computations, same rate as the engine's orbit tick
+MAIN = 'main'               # key of the satellite selected in the GUI/web API
+
+
+class OrbitalState:
+    """Position and range velocity of one satellite at one point in time"""
+
+    __slots__ = ('satellite', 'timestamp', 'azimuth', 'elevation', 'range_velocity', 'range_acceleration')
+
+    def __init__(self, satellite, timestamp, azimuth, elevation, range_velocity, range_acceleration=0.0):
+        object.__setattr__(self, 'satellite', satellite)
+        object.__setattr__(self, 'timestamp', timestamp)
+        object.__setattr__(self, 'azimuth', azimuth)
+        object.__setattr__(self, 'elevation', elevation)
+        object.__setattr__(self, 'range_velocity', range_velocity)  # m/s, positive when receding
+        object.__setattr__(self, 'range_acceleration', range_acceleration)  # m/s^2
+
+    def __setattr__(self, name, value):
+        raise AttributeError("OrbitalState is immutable")
+
+    def range_velocity_at(self, t):
+        """Range velocity extrapolated to time t (time.time())"""
+        return self.range_velocity + self.range_acceleration * (t - self.timestamp)
+
+    def age(self):
+        return time.time() - self.timestamp
+
+
+class OrbitalStateService(threading.Thread):
+    """Computes the followed satellites and publishes their OrbitalState"""
+
+    def __init__(self, make_observer, interval=ORBIT_STATE_INTERVAL, on_tick=None):
+        super().__init__(name="OrbitalState", daemon=True)
+        self.make_observer = make_observer
+        self.interval = interval
+        self.on_tick = on_tick  # called from this thread after every tick
+        self._satellites = {}  # key -> (name, tle lines), replaced as a whole
+        self._states = {}      # key -> OrbitalState, replaced as a whole
+        self._bodies = {}      # key -> (tle lines, ephem body, observer), only used by this thread
+        self._tick = threading.Condition()
+        self._shutdown = threading.Event()
+
+    def follow(self, key, name, tle_lines):
+        """Compute satellite name under key from now on, empty tle_lines stops it"""
+        satellites = dict(self._satellites)
+        if tle_lines:
+            satellites[key] = (name, tuple(tle_lines))
+        else:
+            satellites.pop(key, None)
+        self._satellites = satellites
+
+    def state(self, key):
+        """Latest OrbitalState for key, None before the first computation"""
+        return self._states.get(key)
+
+    def wait_for_tick(self, timeout):
+        """Block until the next computation or the timeout"""
+        with self._tick:
+            self._tick.wait(timeout)
+
+    def stop(self):
+        self._shutdown.set()
+        with self._tick:
+            self._tick.notify_all()
+
+    def _compute(self, key, name, tle_lines, now):
+        entry = self._bodies.get(key)
+        if entry is None or entry[0] != tle_lines:
+            # ephem bodies are not thread safe, this thread keeps its own
+            entry = (tle_lines, ephem.readtle(*tle_lines), self.make_observer())
+            self._bodies[key] = entry
+        _, body, observer = entry
+        observer.date = rotator_planner.unix_to_ephem(now)
+        body.compute(observer)
+        previous = self._states.get(key)
+        acceleration = 0.0
+        if previous is not None and previous.satellite == name and now > previous.timestamp:
+            acceleration = (body.range_velocity - previous.range_velocity) / (now - previous.timestamp)
+        return OrbitalState(name, now, math.degrees(body.az), math.degrees(body.alt), body.range_velocity, acceleration)
+
+    def run(self):
+        while not self._shutdown.is_set():
+            now = time.time()
+            satellites = self._satellites
+            states = {}
+            for key, (name, tle_lines) in satellites.items():
+                try:
+                    states[key] = self._compute(key, name, tle_lines, now)
+                except Exception as e:
+                    logging.warning(f"Error computing orbital state of {name}: {e}")
+            for key in list(self._bodies):
+                if key not in satellites:
+                    del self._bodies[key]
+            self._states = states
+            with self._tick:
+                self._tick.notify_all()
+            if self.on_tick:
+                try:
+                    self.on_tick()
+                except Exception as e:
+                    logging.error(f"Error in orbital state tick callback: {e}")
+            self._shutdown.wait(max(0.0, self.interval - (time.time() - now)))
@@ -0,0 +1,386 @@
+"""
+Post-pass analysis of pass recordings on a process pool.
+
+When a recording is finished the pass recorder hands it to PassAnalyzer,
+which runs analyze_recording() in a worker process, away from the GUI,
+tracking and audio threads (and the GIL). The recording is streamed in
+chunks, through np.memmap for WAV files and soundfile for FLAC/Opus, so a
+long pass never has to fit in memory. For each recording it computes:
+
+    - an STFT waterfall (power spectrum rows at rows_per_second),
+    - the SNR of every second: strongest bin over the median of the band,
+    - a beacon track: the peak frequency every second near the beacon and
+      its residual, how far it is from where the beacon should be; with a
+      doppler sidecar next to the recording the Doppler applied at that
+      second is stored alongside.
+
+Results are cached next to the recording:
+
+    <recording>.analysis.json   summary, source size/mtime and parameters
+    <recording>.analysis.npz    waterfall, per second SNR and beacon track
+    <recording>.waterfall.png   waterfall image (needs matplotlib)
+
+and are not computed again while the recording and the parameters are
+unchanged. benchmarks/pass_analysis_benchmark.py times a 15 minute pass.
+"""
+
+import os
+import json
+import struct
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+ANALYSIS_VERSION = 1
+CHUNK_SECONDS = 10
+DEFAULT_PARAMS = {
+    'fft_size': 2048,
+    'rows_per_second': 2,
+    'band_low': 200.0,          # Hz, audio passband used for SNR and the beacon search
+    'band_high': 3000.0,
+    'beacon_hz': 0.0,           # audio frequency the beacon should sit at, 0 = median of its track
+    'beacon_search_hz': 300.0,  # +/- around beacon_hz
+    'snr_threshold': 6.0,       # dB, seconds below it get no beacon peak
+}
+
+
+def analysis_paths(recording):
+    base = os.path.splitext(recording)[0]
+    return {'summary': base + '.analysis.json', 'data': base + '.analysis.npz', 'image': base + '.waterfall.png'}
+
+
+### Audio sources, mono float32 in chunks
+
+class WavSource:
+    """PCM WAV through np.memmap, only the chunk being analysed is read"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+            if riff != b'RIFF' or wave_id != b'WAVE':
+                raise ValueError(f"{path} is not a WAV file")
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path} has no data chunk")
+                chunk_id, size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = struct.unpack('<HHIIHH', f.read(16))
+                    f.seek(size - 16 + (size & 1), 1)
+                elif chunk_id == b'data':
+                    data_offset = f.tell()
+                    break
+                else:
+                    f.seek(size + (size & 1), 1)
+        if fmt is None or fmt[0] != 1:
+            raise ValueError(f"{path} is not PCM")
+        _, self.channels, self.sample_rate, _, _, bits = fmt
+        self.sampwidth = bits // 8
+        # The header of a recording cut short may claim less than is there, or nothing at all
+        available = os.path.getsize(path) - data_offset
+        if size == 0 or size > available:
+            size = available
+        self.frames = size // (self.channels * self.sampwidth)
+        if self.sampwidth == 3:
+            self.data = np.memmap(path, dtype=np.uint8, mode='r', offset=data_offset,
+                                  shape=(self.frames, self.channels, 3))
+            self.scale = 1.0 / 2 ** 31
+        else:
+            dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[self.sampwidth]
+            self.data = np.memmap(path, dtype=dtype, mode='r', offset=data_offset, shape=(self.frames, self.channels))
+            self.scale = 1.0 / 2 ** (8 * self.sampwidth - 1)
+        self.position = 0
+
+    def read(self, frames):
+        block = self.data[self.position:self.position + frames]
+        self.position += len(block)
+        if self.sampwidth == 3:
+            # Three little endian bytes into the top of an int32, which also sign-extends them
+            samples = (block[..., 0].astype(np.int32) << 8) | (block[..., 1].astype(np.int32) << 16) \
+                | (block[..., 2].astype(np.int32) << 24)
+        elif self.sampwidth == 1:
+            samples = block.astype(np.int16) - 128
+            return (samples.mean(axis=1) / 128.0).astype(np.float32)
+        else:
+            samples = block
+        return (samples.mean(axis=1, dtype=np.float64) * self.scale).astype(np.float32)
+
+    def close(self):
+        self.data = None
+
+
+class SoundFileSource:
+    """FLAC and Opus recordings through soundfile"""
+
+    def __init__(self, path):
+        import soundfile as sf
+        self.file = sf.SoundFile(path)
+        self.sample_rate = self.file.samplerate
+        self.channels = self.file.channels
+        self.frames = self.file.frames
+
+    def read(self, frames):
+        return self.file.read(frames, dtype='float32', always_2d=True).mean(axis=1).astype(np.float32)
+
+    def close(self):
+        self.file.close()
+
+
+def open_audio(path):
+    if path.lower().endswith('.wav'):
+        return WavSource(path)
+    return SoundFileSource(path)
+
+
+### Analysis, runs in the worker processes
+
+def _cache_key(path, params):
+    stat = os.stat(path)
+    return {'version': ANALYSIS_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'params': params}
+
+
+def load_cached(path, params=None):
+    """Summary of an earlier analysis if it is still valid for this recording and these parameters"""
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    paths = analysis_paths(path)
+    try:
+        with open(paths['summary'], 'r') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if summary.get('cache') != _cache_key(path, params) or not os.path.exists(paths['data']):
+        return None
+    return summary
+
+
+def _peak(spectrum, low, high, bin_hz):
+    """Frequency of the strongest bin between low and high, refined by a parabola through its neighbours"""
+    i = low + int(np.argmax(spectrum[low:high]))
+    if low < i < high - 1:
+        a, b, c = np.log10(spectrum[i - 1:i + 2] + 1e-30)
+        denominator = a - 2 * b + c
+        if denominator != 0:
+            return (i + 0.5 * (a - c) / denominator) * bin_hz
+    return i * bin_hz
+
+
+def analyze_recording(path, params=None, use_cache=True):
+    """Waterfall, per second SNR and beacon track of a recording, cached next to it; returns the summary"""
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    if use_cache:
+        cached = load_cached(path, params)
+        if cached is not None:
+            cached['cached'] = True
+            return cached
+    started, cpu_started = time.perf_counter(), time.process_time()
+
+    source = open_audio(path)
+    try:
+        sample_rate = source.sample_rate
+        nfft = int(params['fft_size'])
+        rows_per_second = max(1, int(params['rows_per_second']))
+        hop = nfft // 2
+        bins = nfft // 2 + 1
+        bin_hz = sample_rate / nfft
+        seconds = max(1, -(-source.frames // sample_rate))
+        window = np.hanning(nfft).astype(np.float32)
+        # Power sums per waterfall row, averaged once everything is read
+        row_power = np.zeros((seconds * rows_per_second, bins), dtype=np.float64)
+        row_count = np.zeros(seconds * rows_per_second, dtype=np.int64)
+
+        carry = np.zeros(0, dtype=np.float32)
+        carry_start = 0  # sample index of carry[0]
+        chunk_frames = CHUNK_SECONDS * sample_rate
+        while True:
+            block = source.read(chunk_frames)
+            if not len(block) and len(carry) < nfft:
+                break
+            samples = np.concatenate((carry, block)) if len(carry) else block
+            count = (len(samples) - nfft) // hop + 1 if len(samples) >= nfft else 0
+            if count > 0:
+                # All frames of the chunk in one go: strided view, window, real FFT
+                frames = np.lib.stride_tricks.sliding_window_view(samples, nfft)[::hop][:count]
+                power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+                centers = carry_start + np.arange(count) * hop + nfft // 2
+                rows = np.minimum(centers * rows_per_second // sample_rate, len(row_count) - 1)
+                # Frames are in time order, so each row is one contiguous run
+                starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+                np.add.at(row_power, rows[starts], np.add.reduceat(power, starts, axis=0))
+                np.add.at(row_count, rows[starts], np.diff(np.r_[starts, count]))
+                consumed = count * hop
+            else:
+                consumed = 0
+            carry = samples[consumed:].copy()
+            carry_start += consumed
+            if not len(block):
+                break
+    finally:
+        source.close()
+
+    filled = row_count > 0
+    row_power[filled] /= row_count[filled, None]
+    waterfall = (10 * np.log10(row_power + 1e-20)).astype(np.float32)
+
+    # Per second: the rows of that second averaged
+    second_power = row_power[:seconds * rows_per_second].reshape(seconds, rows_per_second, bins).mean(axis=1)
+    low = max(1, int(params['band_low'] / bin_hz))
+    high = min(bins, int(params['band_high'] / bin_hz) + 1)
+    band = second_power[:, low:high]
+    snr_db = (10 * np.log10((band.max(axis=1) + 1e-20) / (np.median(band, axis=1) + 1e-20))).astype(np.float32)
+
+    # Beacon: the peak near beacon_hz (or anywhere in the band while there is no reference yet)
+    beacon_hz = float(params['beacon_hz'])
+    search_low, search_high = low, high
+    if beacon_hz > 0:
+        search_low = max(low, int((beacon_hz - params['beacon_search_hz']) / bin_hz))
+        search_high = min(high, int((beacon_hz + params['beacon_search_hz']) / bin_hz) + 1)
+    peak_hz = np.full(seconds, np.nan, dtype=np.float32)
+    for second in np.flatnonzero(snr_db >= params['snr_threshold']):
+        peak_hz[second] = _peak(second_power[second], search_low, search_high, bin_hz)
+    reference = beacon_hz if beacon_hz > 0 else (float(np.nanmedian(peak_hz)) if np.any(~np.isnan(peak_hz)) else np.nan)
+    residual_hz = (peak_hz - reference).astype(np.float32)
+
+    # Doppler applied by the tracking at each second, from the sidecar
+    doppler_hz = np.full(seconds, np.nan, dtype=np.float32)
+    try:
+        from lib.recording_sidecar import SidecarReader, sidecar_path
+        if os.path.exists(sidecar_path(path)):
+            track = SidecarReader(path)
+            if len(track):
+                positions = (np.arange(seconds) + 0.5) * sample_rate
+                doppler_hz[:] = np.interp(positions, track.offsets.astype(np.float64),
+                                          track.column('down_doppler').astype(np.float64))
+    except Exception as e:
+        logging.warning(f"Could not read the doppler sidecar of {path}: {e}")
+
+    paths = analysis_paths(path)
+    np.savez_compressed(paths['data'], waterfall=waterfall.astype(np.float16),
+                        frequencies=(np.arange(bins) * bin_hz).astype(np.float32),
+                        row_times=((np.arange(len(waterfall)) + 0.5) / rows_per_second).astype(np.float32),
+                        snr_db=snr_db, peak_hz=peak_hz, residual_hz=residual_hz, doppler_hz=doppler_hz)
+    image = _waterfall_image(paths['image'], waterfall, bin_hz, rows_per_second, params, os.path.basename(path))
+
+    locked = ~np.isnan(residual_hz)
+    summary = {
+        'recording': os.path.basename(path),
+        'duration': round(source.frames / sample_rate, 1),
+        'sample_rate': sample_rate,
+        'snr_median_db': round(float(np.median(snr_db)), 1),
+        'snr_max_db': round(float(np.max(snr_db)), 1),
+        'beacon_hz': None if np.isnan(reference) else round(reference, 1),
+        'beacon_seconds': int(locked.sum()),
+        'residual_rms_hz': round(float(np.sqrt(np.mean(residual_hz[locked] ** 2))), 1) if locked.any() else None,
+        'files': [os.path.basename(paths['data'])] + ([os.path.basename(paths['image'])] if image else []),
+        'compute_time': round(time.perf_counter() - started, 2),
+        'cpu_time': round(time.process_time() - cpu_started, 2),
+        'cache': _cache_key(path, params),
+    }
+    with open(paths['summary'], 'w') as f:
+        json.dump(summary, f, indent=1)
+    summary['cached'] = False
+    return summary
+
+
+def _waterfall_image(path, waterfall, bin_hz, rows_per_second, params, title):
+    """Waterfall PNG with matplotlib's Agg canvas (no GUI), skipped if matplotlib is missing"""
+    try:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+    except ImportError:
+        return False
+    high = min(waterfall.shape[1], int(params['band_high'] / bin_hz) + 1)
+    shown = waterfall[:, :high]
+    figure = Figure(figsize=(8, 10), dpi=100)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1)
+    floor = float(np.percentile(shown, 5))
+    axes.imshow(shown, aspect='auto', origin='lower', cmap='viridis', vmin=floor, vmax=floor + 50,
+                extent=(0, high * bin_hz, 0, len(shown) / rows_per_second))
+    axes.set_xlabel("Audio frequency (Hz)")
+    axes.set_ylabel("Time (s)")
+    axes.set_title(title)
+    figure.savefig(path)
+    return True
+
+
+### Main process side
+
+class PassAnalyzer:
+    """Runs analyze_recording() for finished recordings on a process pool"""
+
+    def __init__(self, config, on_result=None):
+        self.on_result = on_result  # called with the summary of every finished analysis
+        self.executor = None
+        self.pending = {}
+        self.last_summary = None
+        self._lock = threading.Lock()
+        self.load_config(config)
+
+    def load_config(self, config):
+        self.enabled = config.getboolean('passrecording', 'analysis', fallback=False)
+        workers = max(1, config.getint('passrecording', 'analysis_workers', fallback=1))
+        with self._lock:
+            if self.executor is not None and workers != self.workers:
+                # A pool keeps its size: this one finishes what is queued, the next submit starts one with the new size
+                self.executor.shutdown(wait=False)
+                self.executor = None
+            self.workers = workers
+        self.params = {
+            'fft_size': config.getint('passrecording', 'analysis_fft_size', fallback=DEFAULT_PARAMS['fft_size']),
+            'beacon_hz': config.getfloat('passrecording', 'analysis_beacon_hz', fallback=DEFAULT_PARAMS['beacon_hz']),
+        }
+
+    def _executor(self):
+        if self.executor is None:
+            # spawn everywhere: forking a process with audio, serial and Qt threads is not safe
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.executor
+
+    def submit(self, recording, stats=None):
+        """Queue a finished recording, returns its Future (None when analysis is off)"""
+        if not self.enabled or not recording or not os.path.exists(recording):
+            return None
+        with self._lock:
+            try:
+                future = self._executor().submit(analyze_recording, recording, self.params)
+            except BrokenProcessPool:
+                # A worker died (out of memory?), start a new pool
+                self.executor = None
+                future = self._executor().submit(analyze_recording, recording, self.params)
+            self.pending[future] = recording
+        logging.info(f"Post-pass analysis queued: {os.path.basename(recording)}")
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            recording = self.pending.pop(future, None)
+        if future.cancelled():
+            return
+        try:
+            summary = future.result()
+        except Exception as e:
+            logging.error(f"Post-pass analysis of {recording} failed: {e}")
+            return
+        summary['path'] = recording
+        self.last_summary = summary
+        if self.on_result is not None:
+            self.on_result(summary)
+        if summary.get('cached'):
+            logging.info(f"Post-pass analysis of {summary['recording']}: up to date")
+            return
+        logging.info(f"Post-pass analysis of {summary['recording']}: SNR median {summary['snr_median_db']} dB, "
+                     f"max {summary['snr_max_db']} dB, beacon {summary['beacon_hz']} Hz "
+                     f"({summary['beacon_seconds']} s, residual {summary['residual_rms_hz']} Hz rms), "
+                     f"{summary['compute_time']} s for {summary['duration']} s of audio")
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
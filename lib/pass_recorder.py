@@ -1,42 +1,45 @@
 import threading
-import sounddevice as sd
-import numpy as np
 import os
 import configparser
 from datetime import datetime
 import wave
 import logging  # Add import for logging
 import time
+from lib.recording_writer import RecordingWriter, create_encoder, RECORDING_FORMATS
+from lib.audio_dsp import BlockProcessor, block_level, DEFAULT_BLOCKSIZE
+from lib.audio_devices import AudioDeviceRegistry
+from lib.audio_capture import AudioCapture, Subscriber
 
 class PassRecorder:
-    def __init__(self, config):
+    def __init__(self, config, devices=None, capture=None, telemetry=None):
         self.load_config(config)
+        self.telemetry = telemetry  # returns the engine's latest TelemetrySnapshot, for the doppler sidecar
+        self.sidecar = None
+        self.devices = devices if devices is not None else AudioDeviceRegistry()
+        self.capture = capture if capture is not None else AudioCapture(self.devices)
         self.recording = False
-        self.thread = None
+        self.capture_thread = None  # subscribed to the audio stream, while armed for as long as tracking is active
+        self._capture_armed_mode = False
         self._stop_event = threading.Event()
+        self._record_request = threading.Event()
+        self._recording_finished = threading.Event()
+        self._wakeup = threading.Event()
+        self._trigger_time = 0.0
+        self.armed = False  # pre-roll capture running
+        self.trigger_latency_ms = None  # trigger to first sample of the last recording
+        self.recording_start_time = None  # unix time of the first sample of the current recording
         self.current_satname = None
+        self.max_elevation = None  # highest elevation seen during the current recording
         self.tracking_active = False  # Track if satellite tracking is active
         self.current_filepath = None  # Track the current recording file path
-        self.audio_buffer = None  # Buffer to hold audio data
-        self.buffer_lock = threading.Lock()
+        self.ring = None  # AudioRing between the audio callback and the writer thread
         self.device_info = None  # Store info about the selected device
+        self.last_recording = None  # stats() of the last finished recording
+        self.on_recording_finished = None  # called with (filepath, stats) once a recording is closed
         
-        # Check at startup if any audio devices are available
-        try:
-            devices = sd.query_devices()
-            input_devices = [dev for dev in devices if dev.get('max_input_channels', 0) > 0]
-            logging.info(f"Pass recorder initialized: Found {len(input_devices)} audio input devices")
-            if len(input_devices) == 0:
-                logging.warning("No audio input devices detected. Recording will not work.")
-                
-            # Print available devices for troubleshooting
-            for i, dev in enumerate(devices):
-                input_channels = dev.get('max_input_channels', 0)
-                if input_channels > 0:
-                    logging.info(f"Audio input device {i}: {dev['name']} | {input_channels} channels")
-                    
-        except Exception as e:
-            logging.error(f"Error checking audio devices at startup: {e}")
+        # Probe the audio devices once in the background, sounddevice is only loaded when recording is enabled
+        if self.enabled:
+            self.devices.start_probe()
 
     def load_config(self, config):
         self.enabled = config.getboolean('passrecording', 'enabled', fallback=False)
@@ -47,9 +50,22 @@ class PassRecorder:
         self.channels = config.getint('passrecording', 'channels', fallback=1)
         self.bit_depth = config.getint('passrecording', 'bit_depth', fallback=16)
         self.log_audio_levels = config.getboolean('passrecording', 'log_audio_levels', fallback=True)
+        self.buffer_seconds = config.getfloat('passrecording', 'buffer_seconds', fallback=10.0)
+        self.header_interval = config.getfloat('passrecording', 'header_interval', fallback=5.0)
+        self.blocksize = config.getint('passrecording', 'blocksize', fallback=DEFAULT_BLOCKSIZE)
+        self.format = config.get('passrecording', 'format', fallback='wav').strip().lower()
+        if self.format not in RECORDING_FORMATS:
+            logging.warning(f"Unknown recording format '{self.format}', using wav")
+            self.format = 'wav'
+        self.preroll_seconds = config.getfloat('passrecording', 'preroll_seconds', fallback=0.0)
+        self.preroll_max_mb = config.getfloat('passrecording', 'preroll_max_mb', fallback=32.0)
+        self.sidecar_enabled = config.getboolean('passrecording', 'sidecar', fallback=True)
+        self.sidecar_rate = config.getfloat('passrecording', 'sidecar_rate', fallback=10.0)
 
     def update_config(self, config):
         self.load_config(config)
+        if self.enabled:
+            self.devices.start_probe()
         
     def set_tracking_active(self, active):
         """Set whether satellite tracking is active"""
@@ -57,6 +73,11 @@ class PassRecorder:
         # If tracking is stopped, stop recording
         if not active and self.recording:
             self.stop_recording()
+        # With a pre-roll the stream is kept open while tracking, so a recording starts with the seconds before the trigger
+        if active:
+            self._arm()
+        else:
+            self._disarm()
 
     def update_elevation(self, elevation, satname):
         # Remove excessive logging, only log when recording state changes
@@ -66,6 +87,8 @@ class PassRecorder:
                 self.stop_recording()
             return
             
+        if self.recording:
+            self.max_elevation = elevation if self.max_elevation is None else max(self.max_elevation, elevation)
         if elevation >= self.min_elevation:
             if not self.recording:
                 logging.info(f"Starting recording for {satname} at elevation {elevation}")
@@ -76,160 +99,47 @@ class PassRecorder:
                 self.stop_recording()
 
     def find_audio_device(self):
-        """Find the appropriate audio input device"""
-        try:
-            device = None
-            device_name = None
-            device_info = None
-            
-            # Get all available devices
-            devices = sd.query_devices()
-            logging.info(f"Available audio devices: {len(devices)}")
-            
-            # List all devices with detailed information to help troubleshoot
-            for i, dev in enumerate(devices):
-                input_channels = dev.get('max_input_channels', 0)
-                hostapi_name = "unknown"
-                try:
-                    hostapi_name = sd.query_hostapis(dev.get('hostapi', 0)).get('name', 'unknown')
-                except:
-                    pass
-                
-                logging.info(f"Device {i}: {dev['name']} | API: {hostapi_name} | Inputs: {input_channels}")
-            
-            # Try to use the configured device
-            if self.soundcard != 'default':
-                # First try to find by exact name
-                for i, dev in enumerate(devices):
-                    if dev['name'] == self.soundcard and dev.get('max_input_channels', 0) > 0:
-                        # Before selecting, test if device is available
-                        try:
-                            # Quick test with a small stream
-                            with sd.InputStream(device=i, channels=1, samplerate=44100, blocksize=8192, callback=lambda *args: None):
-                                pass  # Just test if it works
-                            device = i
-                            device_name = dev['name']
-                            device_info = dev
-                            logging.info(f"Selected working device '{dev['name']}' (index {i})")
-                            break
-                        except Exception as e:
-                            logging.warning(f"Device {i} ({dev['name']}) not available: {e}")
-                
-                # If not found or not working, try partial name matches
-                if device is None:
-                    for i, dev in enumerate(devices):
-                        if (self.soundcard in dev['name'] or dev['name'] in self.soundcard) and dev.get('max_input_channels', 0) > 0:
-                            try:
-                                # Quick test
-                                with sd.InputStream(device=i, channels=1, samplerate=44100, blocksize=8192, callback=lambda *args: None):
-                                    pass
-                                device = i
-                                device_name = dev['name']
-                                device_info = dev
-                                logging.info(f"Selected similar working device '{dev['name']}' (index {i})")
-                                break
-                            except Exception as e:
-                                logging.warning(f"Similar device {i} ({dev['name']}) not available: {e}")
-                
-                # If still not found, try as an index
-                if device is None:
-                    try:
-                        index = int(self.soundcard)
-                        if 0 <= index < len(devices) and devices[index].get('max_input_channels', 0) > 0:
-                            try:
-                                # Quick test
-                                with sd.InputStream(device=index, channels=1, samplerate=44100, blocksize=8192, callback=lambda *args: None):
-                                    pass
-                                device = index
-                                device_name = devices[index]['name']
-                                device_info = devices[index]
-                                logging.info(f"Selected working device by index {index} ({device_name})")
-                            except Exception as e:
-                                logging.warning(f"Indexed device {index} not available: {e}")
-                    except ValueError:
-                        pass
-            
-            # If no device found yet, try the default device
-            if device is None:
-                try:
-                    default_device = sd.default.device[0]
-                    if default_device is not None and 0 <= default_device < len(devices):
-                        try:
-                            # Quick test
-                            with sd.InputStream(device=default_device, channels=1, samplerate=44100, blocksize=8192, callback=lambda *args: None):
-                                pass
-                            device = default_device
-                            device_name = devices[default_device]['name']
-                            device_info = devices[default_device]
-                            logging.info(f"Selected default working device {device_name} (index {device})")
-                        except Exception as e:
-                            logging.warning(f"Default device not available: {e}")
-                except Exception as e:
-                    logging.warning(f"Error getting default device: {e}")
-            
-            # Last resort: try every device until one works
-            if device is None:
-                logging.info("Trying all devices sequentially to find a working one")
-                for i, dev in enumerate(devices):
-                    if dev.get('max_input_channels', 0) > 0:
-                        try:
-                            # Quick test
-                            with sd.InputStream(device=i, channels=1, samplerate=44100, blocksize=8192, callback=lambda *args: None):
-                                pass
-                            device = i
-                            device_name = dev['name']
-                            device_info = dev
-                            logging.info(f"Found working device: {device_name} (index {i})")
-                            break
-                        except Exception as e:
-                            logging.debug(f"Device {i} ({dev['name']}) not available: {e}")
-            
-            # If STILL no device, try with 'default' keyword explicitly (works on some systems)
-            if device is None:
-                try:
-                    with sd.InputStream(device='default', channels=1, samplerate=44100, blocksize=8192, callback=lambda *args: None):
-                        pass
-                    device = 'default'
-                    device_name = 'system default'
-                    logging.info("Using explicit 'default' device specifier")
-                except Exception as e:
-                    logging.warning(f"'default' device specifier not working: {e}")
-            
-            # Give up if no device works
-            if device is None:
-                logging.error("No working audio input device found on this system")
-                return None, None
-                
-            self.device_info = device_info
-            return device, device_name
-            
-        except Exception as e:
-            logging.error(f"Error finding audio device: {e}", exc_info=True)
+        """Find the appropriate audio input device, a lookup in the probed device registry"""
+        device = self.devices.resolve(self.soundcard)
+        if device is None:
+            logging.error("No working audio input device found on this system")
             return None, None
+        if device.sample_rates and not device.supports(self.sample_rate):
+            logging.warning(f"Device {device.name} does not report {self.sample_rate} Hz "
+                            f"(supported: {', '.join(str(r) for r in device.sample_rates)})")
+        self.device_info = device.info
+        return device.index, device.name
 
     def start_recording(self, satname):
         if self.recording or not self.tracking_active:
             return
-        
-        # Initialize the buffer
-        with self.buffer_lock:
-            self.audio_buffer = []
             
         self.recording = True
         self.current_satname = satname
-        self._stop_event.clear()
-        self.thread = threading.Thread(target=self._record_worker, args=(satname,))
-        self.thread.start()
+        self.max_elevation = None
+        self._trigger_time = time.perf_counter()
+        self._recording_finished.clear()
+        self._record_request.set()
+        self._wakeup.set()
+        # Armed, the capture thread picks the request up within a few milliseconds; otherwise open the device now
+        self._start_capture()
 
     def stop_recording(self):
         if not self.recording:
             return
             
         filepath = self.current_filepath  # Save the filepath before it gets reset
-        self._stop_event.set()
+        self._record_request.clear()
+        self._wakeup.set()
         
-        if self.thread:
-            self.thread.join()
+        # Wait until the writer has finished the file, the stream stays open while armed
+        if self.capture_thread and self.capture_thread.is_alive():
+            while not self._recording_finished.wait(0.2):
+                if not self.capture_thread.is_alive():
+                    break
+            if not self._capture_armed_mode:
+                # Without pre-roll the stream is closed after each recording
+                self.capture_thread.join()
             
         self.recording = False
         self.current_satname = None
@@ -242,21 +152,163 @@ class PassRecorder:
     def is_recording(self):
         return self.recording
 
-    def _record_worker(self, satname):
+    def is_armed(self):
+        """True while the pre-roll capture is running"""
+        return self.armed
+
+    def status(self):
+        """Recorder state for the web API"""
+        recording = self.recording
+        return {
+            'enabled': self.enabled,
+            'armed': self.armed,
+            'recording': recording,
+            'file': os.path.basename(self.current_filepath) if recording and self.current_filepath else None,
+            'satellite': self.current_satname if recording else None,
+            'start_time': self.recording_start_time if recording else None,
+            'max_elevation': None if not recording or self.max_elevation is None else round(self.max_elevation, 1),
+            'last_recording': self.last_recording
+        }
+
+    def _start_capture(self):
+        if self.capture_thread and self.capture_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._capture_armed_mode = self.enabled and self.preroll_seconds > 0 and self.tracking_active
+        self.capture_thread = threading.Thread(target=self._capture_worker, name="AudioCapture", daemon=True)
+        self.capture_thread.start()
+
+    def _arm(self):
+        if self.enabled and self.preroll_seconds > 0:
+            self._start_capture()
+
+    def _disarm(self):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self.capture_thread:
+            self.capture_thread.join()
+            self.capture_thread = None
+
+    def _preroll_frames(self, bytes_per_frame):
+        """Pre-roll length in frames, limited to the memory budget"""
+        frames = int(self.preroll_seconds * self.sample_rate)
+        budget = int(self.preroll_max_mb * 1024 * 1024 / bytes_per_frame)
+        if frames > budget:
+            logging.warning(f"Pre-roll of {self.preroll_seconds:.0f} s needs more than preroll_max_mb = {self.preroll_max_mb} MB, "
+                            f"limited to {budget / self.sample_rate:.1f} s")
+            frames = budget
+        return max(0, frames)
+
+    def _write_placeholder(self):
+        """Short silent WAV marking a recording that could not be made"""
+        import numpy as np
+        os.makedirs(self.save_dir, exist_ok=True)
+        safe_satname = ''.join(c for c in (self.current_satname or 'unknown') if c.isalnum() or c in ('-_')).rstrip()
+        filepath = os.path.join(self.save_dir, f"{safe_satname}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.wav")
+        try:
+            with wave.open(filepath, 'wb') as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(44100)
+                # Write a brief note (silence)
+                wf.writeframes(np.zeros(4410, dtype=np.int16).tobytes())
+            logging.warning(f"Created empty WAV file as no input device was available: {filepath}")
+        except Exception as e:
+            logging.error(f"Error creating placeholder file: {e}")
+
+    def _start_writer(self, subscriber, sampwidth, preroll_frames):
+        """Open the file and hand the ring, pre-roll included, to a writer thread"""
+        ring = subscriber.ring
         # Ensure save directory exists
         os.makedirs(self.save_dir, exist_ok=True)
         
-        # File name: satname-YYYYMMDD-HHMMSS.wav (using UTC time for amateur radio standard)
-        start_time = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
-        safe_satname = ''.join(c for c in satname if c.isalnum() or c in ('-_')).rstrip()
-        filename = f"{safe_satname}-{start_time}.wav"
-        filepath = os.path.join(self.save_dir, filename)
-        self.current_filepath = filepath
+        # The recording starts with the pre-roll, the file is named after its first sample
+        preroll_available = ring.available()
+        # On the same sample clock as the sidecar offsets, the current block counted up to now
+        self.recording_start_time = time.time() - (subscriber.position(self.sample_rate) - ring.read) / self.sample_rate
+        
+        # File name: satname-YYYYMMDD-HHMMSS.wav/.flac/.opus (using UTC time for amateur radio standard)
+        start_time = datetime.utcfromtimestamp(self.recording_start_time).strftime('%Y%m%d-%H%M%S')
+        safe_satname = ''.join(c for c in self.current_satname if c.isalnum() or c in ('-_')).rstrip()
+        basepath = os.path.join(self.save_dir, f"{safe_satname}-{start_time}")
+        
+        # The encoder decides the extension, it falls back to WAV if the format cannot be written
+        encoder = create_encoder(self.format, basepath, self.sample_rate, self.channels, sampwidth)
+        self.current_filepath = encoder.filepath
+        
+        # Tracking state along the recording, indexed by sample offset
+        if self.sidecar_enabled and self.telemetry is not None and self.sidecar_rate > 0:
+            from lib.recording_sidecar import SidecarWriter, sidecar_path
+            self.sidecar = SidecarWriter(sidecar_path(encoder.filepath), lambda: subscriber.position(self.sample_rate),
+                                         ring.read, self.sample_rate,
+                                         self.recording_start_time, self.telemetry, self.current_satname,
+                                         rate=self.sidecar_rate)
+            self.sidecar.start()
         
         # Log recording start
-        logging.info(f"Recording started: {filename}")
+        if preroll_frames:
+            logging.info(f"Recording started: {os.path.basename(encoder.filepath)} "
+                         f"with {preroll_available / self.sample_rate:.1f} s pre-roll")
+        else:
+            logging.info(f"Recording started: {os.path.basename(encoder.filepath)}")
+        
+        # Encodes on its own thread, the callback only fills the ring
+        writer = RecordingWriter(encoder, ring, self.sample_rate, self.channels, sampwidth,
+                                 header_interval=self.header_interval)
+        writer.preroll = preroll_available / self.sample_rate
+        writer.satellite = self.current_satname
+        telemetry = self.telemetry() if self.telemetry is not None else None
+        writer.transponder = telemetry.transponder if telemetry is not None else None
+        writer.start_time = self.recording_start_time
+        writer.start()
+        return writer
+
+    def _finish_writer(self, writer, ring):
+        """Encode the rest of the ring, close the file and report it"""
+        self._stop_sidecar()
+        writer.stop()
+        stats = writer.stats()
+        stats['preroll'] = round(writer.preroll, 1)
+        stats['trigger_latency_ms'] = self.trigger_latency_ms
+        # What the recording catalog stores about the pass
+        stats['satellite'] = writer.satellite
+        stats['transponder'] = writer.transponder
+        stats['start_time'] = writer.start_time
+        stats['stop_time'] = writer.start_time + stats['duration']
+        stats['max_elevation'] = None if self.max_elevation is None else round(self.max_elevation, 1)
+        stats['sample_rate'] = self.sample_rate
+        stats['channels'] = self.channels
+        stats['dropped_frames'] = ring.overruns
+        self.last_recording = stats
+        if writer.frames_written == 0:
+            logging.warning("No audio data captured during recording")
+        if ring.overruns:
+            logging.warning(f"Recording dropped {ring.overruns} frames ({ring.overruns / self.sample_rate:.1f} s), the disk could not keep up")
+            ring.overruns = 0
         
-        # Choose WAV file parameters based on bit depth
+        # File size verification
+        filepath = writer.encoder.filepath
+        try:
+            file_size = os.path.getsize(filepath)
+        except OSError:
+            file_size = 0
+        logging.info(f"Saved {writer.encoder.name.upper()} file: {filepath} (size: {file_size} bytes, "
+                     f"compression {stats['compression_ratio']:.2f}:1, encoder CPU {stats['cpu_time']:.2f} s "
+                     f"= {stats['cpu_percent']:.1f}% of {stats['duration']:.0f} s)")
+        
+        if file_size < 1000:
+            logging.warning("Warning: Recorded file is very small, may not contain usable audio")
+        elif self.on_recording_finished is not None:
+            try:
+                self.on_recording_finished(filepath, stats)
+            except Exception as e:
+                logging.error(f"Error handing over finished recording: {e}")
+
+    def _capture_worker(self):
+        """Subscribes to the device's capture engine: while armed it keeps the pre-roll, while recording a writer drains the ring"""
+        import numpy as np
+        
+        # Choose sample format based on bit depth
         if self.bit_depth == 16:
             sampwidth = 2
             dtype = np.int16
@@ -274,133 +326,103 @@ class PassRecorder:
             dtype = np.int16
             scale_factor = 32767
         
-        # Find the appropriate audio device
+        # Look up the audio device in the probed registry
         device, device_name = self.find_audio_device()
         if device is None:
             logging.error("Failed to find a suitable audio device for recording")
+            if self._record_request.is_set():
+                # Create a short empty file to indicate the attempt
+                self._write_placeholder()
             self.recording = False
-            # Create a short empty file to indicate the attempt
-            try:
-                with wave.open(filepath, 'wb') as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2)
-                    wf.setframerate(44100)
-                    # Write a brief note (silence)
-                    wf.writeframes(np.zeros(4410, dtype=np.int16).tobytes())
-                logging.warning(f"Created empty WAV file as no input device was available: {filepath}")
-            except Exception as e:
-                logging.error(f"Error creating placeholder file: {e}")
+            self._recording_finished.set()
             return
         
-        # Try a direct recording approach
+        armed = self._capture_armed_mode
+        preroll_frames = self._preroll_frames(self.channels * np.dtype(dtype).itemsize) if armed else 0
         total_frames = 0
         
+        def log_level(indata):
+            nonlocal total_frames
+            total_frames += len(indata)
+            # Log audio level every 10 seconds to verify we're getting input, only then it is computed
+            if total_frames % 100000 < len(indata):  # Changed from 10000 to 100000 (10 seconds at 48kHz)
+                logging.info(f"Recording audio level: {block_level(indata):.4f}, total frames: {total_frames}")
+        
+        # Fixed size whatever the pass length: the pre-roll plus what the writer may fall behind.
+        # Gain, clip and scale happen in the subscriber's scratch buffer, the conversion to the
+        # sample type while it is copied into the ring; no lock and no disk I/O in the audio callback.
+        subscriber = Subscriber("recorder", preroll_frames + int(self.buffer_seconds * self.sample_rate), self.channels, dtype,
+                                processor=BlockProcessor(self.blocksize, self.channels, scale_factor),
+                                tap=log_level if self.log_audio_levels else None)
+        ring = subscriber.ring
+        self.ring = ring
+        writer = None
+        engine = None
+        
         try:
-            # Define callback that stores data in our buffer
-            def audio_callback(indata, frames, time, status):
-                nonlocal total_frames
+            # Shares the stream when the level meter already captures from this device
+            engine = self.capture.subscribe(device, device_name, subscriber, self.sample_rate, self.channels, self.blocksize)
+            if armed:
+                self.armed = True
+                logging.info(f"Pass recorder armed: {preroll_frames / self.sample_rate:.1f} s pre-roll, "
+                             f"{ring.nbytes / (1024 * 1024):.1f} MB buffer")
+            
+            # This thread is the ring's only reader until a writer takes over, and again once it is done
+            while True:
+                if self._record_request.is_set() and writer is None:
+                    # Exactly preroll_seconds, the ring was last trimmed up to one check interval ago
+                    excess = ring.available() - preroll_frames
+                    if armed and excess > 0:
+                        ring.consume(excess)
+                    self.trigger_latency_ms = None
+                    writer_started = time.perf_counter()
+                    writer = self._start_writer(subscriber, sampwidth, preroll_frames)
+                elif not self._record_request.is_set() and writer is not None:
+                    self._finish_writer(writer, ring)
+                    writer = None
+                    self._recording_finished.set()
                 
-                # Only log errors other than overflow
-                if status and status.input_overflow:
-                    # Skip logging for input overflow as it's too verbose
-                    pass
-                elif status:
-                    logging.warning(f"Audio status in callback: {status}")
+                first_block_time = subscriber.first_block_time
+                if writer is not None and self.trigger_latency_ms is None and first_block_time is not None:
+                    # Trigger to the first sample in the file: the pre-roll is there at once, a cold stream
+                    # has to open and deliver its first block
+                    self.trigger_latency_ms = round(1000 * (max(first_block_time, writer_started) - self._trigger_time), 1)
+                    logging.info(f"Recording trigger to first sample: {self.trigger_latency_ms} ms")
                 
-                try:
-                    # Get the RMS level to check if we're recording anything
-                    level = np.linalg.norm(indata)
-                    total_frames += frames
-                    
-                    # Log audio level every 10 seconds to verify we're getting input (reduced from every second)
-                    if self.log_audio_levels and total_frames % 100000 < frames:  # Changed from 10000 to 100000 (10 seconds at 48kHz)
-                        logging.info(f"Recording audio level: {level:.4f}, total frames: {total_frames}")
-                    
-                    # Apply gain to make sure the audio is audible
-                    gain = 2.0  # Reduced from 5.0 to 2.0 to prevent over-amplification
-                    amplified_data = indata * gain
-                    
-                    # Clip to valid range for float (-1.0 to 1.0)
-                    amplified_data = np.clip(amplified_data, -1.0, 1.0)
-                    
-                    # Convert to integer format
-                    audio_data = (amplified_data * scale_factor).astype(dtype)
-                    
-                    # Store in buffer
-                    with self.buffer_lock:
-                        self.audio_buffer.append(audio_data.copy())
-                        
-                except Exception as e:
-                    # Catch any errors in the callback to prevent audio stream from crashing
-                    logging.error(f"Error in audio processing callback: {e}")
-                    # Still increment frames to avoid hitting the logging condition too often
-                    total_frames += frames
-            
-            # Create audio stream with careful error handling
-            try:
-                logging.info(f"Starting audio stream from device {device} ({device_name})")
-                stream = sd.InputStream(
-                    device=device,
-                    channels=self.channels,
-                    samplerate=self.sample_rate,
-                    dtype='float32',
-                    callback=audio_callback,
-                    blocksize=8192  # Increased block size from 4096 to 8192 for better stability
-                )
-            except Exception as e:
-                logging.error(f"Error creating audio stream: {e}", exc_info=True)
-                # Try one more time with default device
-                logging.info("Trying with 'default' device specifier as fallback")
-                try:
-                    stream = sd.InputStream(
-                        device='default',
-                        channels=self.channels,
-                        samplerate=self.sample_rate,
-                        dtype='float32',
-                        callback=audio_callback,
-                        blocksize=8192  # Increased block size for better stability
-                    )
-                except Exception as e2:
-                    logging.error(f"Fallback also failed: {e2}")
-                    raise  # Re-raise to be caught by outer exception handler
-            
-            # Start the stream
-            stream.start()
-            
-            # Wait for stop event
-            while not self._stop_event.is_set():
-                time.sleep(0.2)
-            
-            # Stop the stream
-            stream.stop()
-            stream.close()
-            
-            # Write the recorded data to the WAV file
-            with wave.open(filepath, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(sampwidth)
-                wf.setframerate(self.sample_rate)
+                if writer is None:
+                    if not armed or self._stop_event.is_set():
+                        break
+                    # Keep only the last preroll_seconds
+                    excess = ring.available() - preroll_frames
+                    if excess > 0:
+                        ring.consume(excess)
                 
-                # Write buffer to file
-                with self.buffer_lock:
-                    if self.audio_buffer:
-                        logging.info(f"Writing {len(self.audio_buffer)} audio chunks to file")
-                        for chunk in self.audio_buffer:
-                            wf.writeframes(chunk.tobytes())
-                    else:
-                        logging.warning("No audio data captured during recording")
-            
-            # File size verification
-            file_size = os.path.getsize(filepath)
-            logging.info(f"Saved WAV file: {filepath} (size: {file_size} bytes)")
-            
-            if file_size < 1000:
-                logging.warning("Warning: Recorded file is very small, may not contain usable audio")
+                self._record_request_wait(0.05 if writer is None else 0.2)
                 
         except Exception as e:
             logging.error(f"Error in audio recording: {e}", exc_info=True)
         finally:
-            # Clean up
+            # Clean up, whatever reached the file so far stays playable
+            self._stop_sidecar()
+            if writer is not None:
+                if writer.is_alive():
+                    writer.stop()
+                self.last_recording = writer.stats()
+            if engine is not None:
+                # Closes the stream unless the level meter still uses it
+                self.capture.unsubscribe(engine, subscriber)
+            self.armed = False
             self.recording = False
-            with self.buffer_lock:
-                self.audio_buffer = None 
\ No newline at end of file
+            self.ring = None
+            self._recording_finished.set()
+
+    def _stop_sidecar(self):
+        if self.sidecar is not None:
+            self.sidecar.stop()
+            logging.info(f"Doppler sidecar: {os.path.basename(self.sidecar.filepath)}, {self.sidecar.records} records")
+            self.sidecar = None
+
+    def _record_request_wait(self, timeout):
+        """Sleep until the next check, woken early by a trigger or a stop"""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
@@ -0,0 +1,323 @@
+"""
+Recording catalog: an SQLite index of the pass recordings in save_dir.
+
+The pass recorder adds a row for every finished pass (satellite,
+transponder, start and stop time, maximum elevation, duration, size,
+format); the post-pass analysis fills in the quality columns (SNR, beacon
+residual) when it is done. Searches by satellite, date, elevation or
+quality are then an indexed query instead of a walk over thousands of
+files, for the GUI's recording browser and the web API alike.
+
+Files copied into save_dir by hand, or recorded before the catalog
+existed, are picked up by rescan(). It remembers the modification time of
+every directory and only lists the directories that changed since the last
+scan: adding or deleting a file changes its directory's mtime, so an
+unchanged tree costs one stat() per directory. For new files the satellite
+and start time come from the file name, the elevation from the doppler
+sidecar and the quality from a cached analysis, when those exist.
+
+The database lives in save_dir as catalog.db and can be deleted at any
+time, the next rescan rebuilds it.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+
+CATALOG_FILENAME = 'catalog.db'
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.opus')
+# satname-YYYYMMDD-HHMMSS.ext as written by the pass recorder, the name may contain dashes itself
+FILENAME_PATTERN = re.compile(r'^(?P<satellite>.+)-(?P<date>\d{8})-(?P<time>\d{6})$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    satellite TEXT,
+    transponder TEXT,
+    start_time REAL,
+    stop_time REAL,
+    duration REAL,
+    max_elevation REAL,
+    file_size INTEGER,
+    mtime REAL,
+    format TEXT,
+    sample_rate INTEGER,
+    channels INTEGER,
+    preroll REAL,
+    dropped_frames INTEGER,
+    snr_median REAL,
+    snr_max REAL,
+    beacon_residual_rms REAL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS recordings_satellite ON recordings (satellite, start_time);
+CREATE INDEX IF NOT EXISTS recordings_start ON recordings (start_time);
+CREATE INDEX IF NOT EXISTS recordings_elevation ON recordings (max_elevation);
+CREATE INDEX IF NOT EXISTS recordings_snr ON recordings (snr_median);
+CREATE INDEX IF NOT EXISTS recordings_directory ON recordings (directory);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+"""
+
+COLUMNS = ('path', 'directory', 'filename', 'satellite', 'transponder', 'start_time', 'stop_time', 'duration',
+           'max_elevation', 'file_size', 'mtime', 'format', 'sample_rate', 'channels', 'preroll', 'dropped_frames',
+           'snr_median', 'snr_max', 'beacon_residual_rms', 'source')
+ORDER_BY = {'start_time': ('start_time',), 'max_elevation': ('max_elevation',), 'snr': ('snr_median',),
+            'duration': ('duration',), 'satellite': ('satellite', 'start_time')}
+
+
+def _probe_recording(path):
+    """Satellite, start time, duration etc. of a file found by rescan(), from what is next to it"""
+    base, extension = os.path.splitext(path)
+    row = {'format': extension[1:].lower(), 'source': 'scan'}
+    match = FILENAME_PATTERN.match(os.path.basename(base))
+    if match:
+        row['satellite'] = match['satellite']
+        try:
+            started = datetime.strptime(match['date'] + match['time'], '%Y%m%d%H%M%S')
+            row['start_time'] = started.replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+    try:
+        from lib.pass_analysis import open_audio
+        source = open_audio(path)
+        try:
+            row['sample_rate'] = source.sample_rate
+            row['channels'] = source.channels
+            row['duration'] = round(source.frames / source.sample_rate, 1)
+        finally:
+            source.close()
+    except Exception as e:
+        logging.debug(f"Catalog: cannot read {path}: {e}")
+    try:
+        from lib.recording_sidecar import SidecarReader, sidecar_path
+        if os.path.exists(sidecar_path(path)):
+            track = SidecarReader(path)
+            if len(track):
+                import numpy as np
+                elevation = track.column('sat_elevation')
+                if not np.all(np.isnan(elevation)):
+                    row['max_elevation'] = round(float(np.nanmax(elevation)), 1)
+                row['start_time'] = track.start_time
+                row['satellite'] = track.satellite or row.get('satellite')
+    except Exception as e:
+        logging.debug(f"Catalog: cannot read the sidecar of {path}: {e}")
+    row.update(_quality(base + '.analysis.json'))
+    if row.get('start_time') is not None and row.get('duration') is not None:
+        row['stop_time'] = row['start_time'] + row['duration']
+    return row
+
+
+def _quality(summary_path):
+    """Quality columns from a post-pass analysis summary, see lib/pass_analysis.py"""
+    try:
+        with open(summary_path, 'r') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {'snr_median': summary.get('snr_median_db'), 'snr_max': summary.get('snr_max_db'),
+            'beacon_residual_rms': summary.get('residual_rms_hz')}
+
+
+class RecordingCatalog:
+    def __init__(self, save_dir, filename=CATALOG_FILENAME):
+        self.save_dir = os.path.abspath(save_dir)
+        os.makedirs(self.save_dir, exist_ok=True)
+        self.path = os.path.join(self.save_dir, filename)
+        self.last_rescan = None  # stats of the last rescan()
+        # One connection for all threads, every use holds the lock
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self._lock, self.db:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    ### Updates
+
+    def add(self, filepath, **values):
+        """Insert or update the row of a recording, values are column names"""
+        filepath = os.path.abspath(filepath)
+        row = {name: values[name] for name in COLUMNS if name in values}
+        row['path'] = filepath
+        row['directory'] = os.path.dirname(filepath)
+        row['filename'] = os.path.basename(filepath)
+        try:
+            stat = os.stat(filepath)
+            row.setdefault('file_size', stat.st_size)
+            row.setdefault('mtime', stat.st_mtime)
+        except OSError:
+            pass
+        names = list(row)
+        # Unknown values (None) keep what the row already has
+        updates = ', '.join(f"{name} = COALESCE(excluded.{name}, {name})" for name in names if name != 'path')
+        with self._lock, self.db:
+            self.db.execute(f"INSERT INTO recordings ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+                            f"ON CONFLICT(path) DO UPDATE SET {updates}", [row[name] for name in names])
+
+    def add_recording(self, filepath, stats):
+        """Row of a recording the pass recorder just finished, stats as in PassRecorder.last_recording"""
+        self.add(filepath, satellite=stats.get('satellite'), transponder=stats.get('transponder'),
+                 start_time=stats.get('start_time'), stop_time=stats.get('stop_time'),
+                 duration=stats.get('duration'), max_elevation=stats.get('max_elevation'),
+                 format=stats.get('format'), sample_rate=stats.get('sample_rate'), channels=stats.get('channels'),
+                 preroll=stats.get('preroll'), dropped_frames=stats.get('dropped_frames'), source='recorder')
+
+    def update_quality(self, filepath, summary):
+        """Quality columns from a post-pass analysis summary"""
+        with self._lock, self.db:
+            self.db.execute("UPDATE recordings SET snr_median = ?, snr_max = ?, beacon_residual_rms = ? WHERE path = ?",
+                            (summary.get('snr_median_db'), summary.get('snr_max_db'),
+                             summary.get('residual_rms_hz'), os.path.abspath(filepath)))
+
+    def rescan(self, skip=()):
+        """Pick up files added or removed outside the recorder; only changed directories are listed"""
+        with self._scan_lock:
+            started = time.perf_counter()
+            skip = {os.path.abspath(path) for path in skip if path}
+            with self._lock:
+                known_dirs = {row['path']: (row['parent'], row['mtime_ns'])
+                              for row in self.db.execute("SELECT path, parent, mtime_ns FROM directories")}
+            stats = {'directories': 0, 'listed': 0, 'added': 0, 'updated': 0, 'removed': 0}
+            seen_dirs = set()
+            pending = [self.save_dir]
+            while pending:
+                directory = pending.pop()
+                seen_dirs.add(directory)
+                stats['directories'] += 1
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                known = known_dirs.get(directory)
+                if known is not None and known[1] == mtime_ns:
+                    # Unchanged, its files are as catalogued; subdirectories are checked on their own
+                    pending.extend(path for path, (parent, _) in known_dirs.items() if parent == directory)
+                    continue
+                stats['listed'] += 1
+                pending.extend(self._scan_directory(directory, mtime_ns, skip, stats))
+            # Directories that are gone, with their recordings
+            gone = [path for path in known_dirs if path not in seen_dirs]
+            if gone:
+                with self._lock, self.db:
+                    for path in gone:
+                        stats['removed'] += self.db.execute("DELETE FROM recordings WHERE directory = ?", (path,)).rowcount
+                        self.db.execute("DELETE FROM directories WHERE path = ?", (path,))
+            stats['seconds'] = round(time.perf_counter() - started, 3)
+            self.last_rescan = stats
+            if stats['added'] or stats['removed'] or stats['updated']:
+                logging.info(f"Recording catalog: {stats['added']} added, {stats['updated']} updated, "
+                             f"{stats['removed']} removed ({stats['listed']} of {stats['directories']} "
+                             f"directories listed, {stats['seconds']} s)")
+            return stats
+
+    def _scan_directory(self, directory, mtime_ns, skip, stats):
+        files, subdirs = {}, []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(AUDIO_EXTENSIONS) and entry.path not in skip:
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_size, stat.st_mtime)
+        except OSError as e:
+            logging.warning(f"Recording catalog: cannot list {directory}: {e}")
+            return []
+        with self._lock:
+            catalogued = {row['path']: (row['file_size'], row['mtime']) for row in
+                          self.db.execute("SELECT path, file_size, mtime FROM recordings WHERE directory = ?", (directory,))}
+        # Reading headers and sidecars happens without the lock
+        new_rows = {path: _probe_recording(path) for path, state in files.items() if catalogued.get(path) != state}
+        with self._lock, self.db:
+            for path, row in new_rows.items():
+                size, mtime = files[path]
+                if path in catalogued:
+                    # Changed in place, e.g. converted; what the recorder wrote stays unless the scan knows better
+                    self.db.execute("UPDATE recordings SET file_size = ?, mtime = ?, duration = COALESCE(?, duration) "
+                                    "WHERE path = ?", (size, mtime, row.get('duration'), path))
+                    stats['updated'] += 1
+                    continue
+                row.update(path=path, directory=directory, filename=os.path.basename(path), file_size=size, mtime=mtime)
+                names = [name for name in COLUMNS if name in row]
+                self.db.execute(f"INSERT OR IGNORE INTO recordings ({', '.join(names)}) "
+                                f"VALUES ({', '.join('?' * len(names))})", [row[name] for name in names])
+                stats['added'] += 1
+            for path in catalogued.keys() - files.keys():
+                if path not in skip:
+                    self.db.execute("DELETE FROM recordings WHERE path = ?", (path,))
+                    stats['removed'] += 1
+            self.db.execute("INSERT INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?) "
+                            "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, parent = excluded.parent",
+                            (directory, os.path.dirname(directory) if directory != self.save_dir else None, mtime_ns))
+        return subdirs
+
+    ### Queries
+
+    @staticmethod
+    def _where(satellite=None, since=None, until=None, min_elevation=None, min_snr=None, format=None):
+        where, args = [], []
+        if satellite:
+            where.append("satellite = ?")
+            args.append(satellite)
+        if since is not None:
+            where.append("start_time >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("start_time < ?")
+            args.append(until)
+        if min_elevation is not None:
+            where.append("max_elevation >= ?")
+            args.append(min_elevation)
+        if min_snr is not None:
+            where.append("snr_median >= ?")
+            args.append(min_snr)
+        if format:
+            where.append("format = ?")
+            args.append(format)
+        return (f" WHERE {' AND '.join(where)}" if where else ""), args
+
+    def search(self, satellite=None, since=None, until=None, min_elevation=None, min_snr=None, format=None,
+               order='start_time', descending=True, limit=100, offset=0):
+        """Recordings matching all given filters as dicts, since/until are unix times; limit -1 for all"""
+        clause, args = self._where(satellite, since, until, min_elevation, min_snr, format)
+        direction = 'DESC' if descending else 'ASC'
+        order_by = ', '.join(f"{column} {direction}" for column in ORDER_BY.get(order, ORDER_BY['start_time']))
+        with self._lock:
+            rows = self.db.execute(f"SELECT * FROM recordings{clause} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                                   args + [int(limit), int(offset)]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, satellite=None, since=None, until=None, min_elevation=None, min_snr=None, format=None):
+        """Number of recordings search() finds without a limit"""
+        clause, args = self._where(satellite, since, until, min_elevation, min_snr, format)
+        with self._lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM recordings{clause}", args).fetchone()[0]
+
+    def satellites(self):
+        """(satellite, number of recordings, last start time), most recorded first"""
+        with self._lock:
+            rows = self.db.execute("SELECT satellite, COUNT(*) AS count, MAX(start_time) AS last FROM recordings "
+                                   "WHERE satellite IS NOT NULL GROUP BY satellite ORDER BY count DESC").fetchall()
+        return [tuple(row) for row in rows]
+
+    def summary(self):
+        with self._lock:
+            row = self.db.execute("SELECT COUNT(*), SUM(file_size), SUM(duration) FROM recordings").fetchone()
+        return {'recordings': row[0], 'bytes': row[1] or 0, 'seconds': round(row[2] or 0.0, 1),
+                'last_rescan': self.last_rescan}
@@ -0,0 +1,205 @@
+"""
+Doppler sidecar: the tracking state along a pass recording.
+
+Next to every recording the pass recorder writes <recording>.doppler, a
+small binary file with the frequencies, Doppler shift, satellite and rotator
+position and RX offset at a fixed rate (10 Hz by default). Each record holds
+the sample offset in the recording it belongs to, taken from the capture
+ring's frame counter, so it follows the sound card clock rather than the
+system clock. SidecarReader maps any sample position or time back to the
+tracking state with a binary search over the records.
+
+File layout, little endian:
+
+    header   64 bytes  magic b'QTDS', version, record size, sample rate,
+                       unix time of sample 0, record interval, satellite name
+    records  RECORD_DTYPE.itemsize bytes each, sample_offset ascending
+
+The Doppler values of a record are extrapolated from the latest telemetry
+snapshot with its Doppler rate, so records between two snapshots still
+follow the curve. Unknown values (no rotator) are NaN.
+"""
+
+import math
+import os
+import struct
+import threading
+import time
+import logging
+
+import numpy as np
+
+SIDECAR_EXTENSION = '.doppler'
+SIDECAR_MAGIC = b'QTDS'
+SIDECAR_VERSION = 1
+HEADER_FORMAT = '<4sHHIdf40s'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+RECORD_DTYPE = np.dtype([
+    ('sample_offset', '<u8'),       # frames from the start of the recording
+    ('time', '<f8'),                # unix time
+    ('downlink_freq', '<f8'),       # nominal downlink frequency (Hz)
+    ('rig_downlink_freq', '<f8'),   # frequency the rig was set to (Hz)
+    ('down_doppler', '<f4'),        # Hz
+    ('down_doppler_rate', '<f4'),   # Hz/s
+    ('uplink_freq', '<f8'),
+    ('rig_uplink_freq', '<f8'),
+    ('up_doppler', '<f4'),
+    ('up_doppler_rate', '<f4'),
+    ('sat_azimuth', '<f4'),         # degrees
+    ('sat_elevation', '<f4'),
+    ('rotator_azimuth', '<f4'),
+    ('rotator_elevation', '<f4'),
+    ('rx_offset', '<i4'),           # Hz
+    ('tracking', 'u1'),
+    ('frequency_paused', 'u1'),
+    ('reserved', 'u1', (2,)),
+])
+
+
+def sidecar_path(recording_path):
+    """Sidecar file of a recording: the recording path with .doppler instead of its extension"""
+    return os.path.splitext(recording_path)[0] + SIDECAR_EXTENSION
+
+
+def _value(value):
+    return math.nan if value is None else value
+
+
+class SidecarWriter(threading.Thread):
+    """Appends a record every interval while the recording runs"""
+
+    def __init__(self, filepath, position_func, start_frame, sample_rate, start_time, telemetry_func, satellite='', rate=10.0):
+        super().__init__(name="SidecarWriter", daemon=True)
+        self.filepath = filepath
+        self.position_func = position_func  # frames captured so far, on the capture ring's counter
+        self.start_frame = start_frame  # that counter at the first sample of the recording
+        self.sample_rate = sample_rate
+        self.start_time = start_time
+        self.telemetry_func = telemetry_func
+        self.satellite = satellite or ''
+        self.interval = 1.0 / rate
+        self.records = 0
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def header(self):
+        return struct.pack(HEADER_FORMAT, SIDECAR_MAGIC, SIDECAR_VERSION, RECORD_DTYPE.itemsize, self.sample_rate,
+                           self.start_time, self.interval, self.satellite.encode('utf-8')[:40])
+
+    def _fill(self, sample_offset, now):
+        telemetry = self.telemetry_func()
+        record = self._record[0]
+        record['sample_offset'] = sample_offset
+        record['time'] = now
+        if telemetry is None:
+            return record
+        dt = now - telemetry.timestamp
+        record['downlink_freq'] = _value(telemetry.downlink_freq)
+        record['rig_downlink_freq'] = _value(telemetry.rig_downlink_freq)
+        record['down_doppler'] = _value(telemetry.down_doppler) + (telemetry.down_doppler_rate or 0.0) * dt
+        record['down_doppler_rate'] = _value(telemetry.down_doppler_rate)
+        record['uplink_freq'] = _value(telemetry.uplink_freq)
+        record['rig_uplink_freq'] = _value(telemetry.rig_uplink_freq)
+        record['up_doppler'] = _value(telemetry.up_doppler) + (telemetry.up_doppler_rate or 0.0) * dt
+        record['up_doppler_rate'] = _value(telemetry.up_doppler_rate)
+        record['sat_azimuth'] = _value(telemetry.sat_azimuth)
+        record['sat_elevation'] = _value(telemetry.sat_elevation)
+        record['rotator_azimuth'] = _value(telemetry.rotator_azimuth)
+        record['rotator_elevation'] = _value(telemetry.rotator_elevation)
+        record['rx_offset'] = telemetry.rx_offset or 0
+        record['tracking'] = bool(telemetry.tracking)
+        record['frequency_paused'] = bool(telemetry.frequency_paused)
+        return record
+
+    def run(self):
+        try:
+            with open(self.filepath, 'wb') as f:
+                f.write(self.header())
+                # Sample 0, a pre-roll starts before the trigger
+                f.write(self._fill(0, self.start_time).tobytes())
+                self.records = 1
+                next_record = time.monotonic()
+                last_flush = next_record
+                sample_offset = 0
+                while not self._stop_event.is_set():
+                    next_record += self.interval
+                    self._stop_event.wait(max(0.0, next_record - time.monotonic()))
+                    # Never backwards, the reader's binary search needs ascending offsets
+                    sample_offset = max(sample_offset, self.position_func() - self.start_frame)
+                    f.write(self._fill(sample_offset, time.time()).tobytes())
+                    self.records += 1
+                    if next_record - last_flush >= 1.0:
+                        f.flush()
+                        last_flush = next_record
+        except Exception as e:
+            logging.error(f"Error writing doppler sidecar {self.filepath}: {e}", exc_info=True)
+
+
+class SidecarReader:
+    """Tracking state at any point of a recording, from its sidecar"""
+
+    def __init__(self, path):
+        if not path.endswith(SIDECAR_EXTENSION):
+            path = sidecar_path(path)
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"{path}: not a doppler sidecar")
+        magic, version, record_size, self.sample_rate, self.start_time, self.interval, satellite = \
+            struct.unpack(HEADER_FORMAT, header)
+        if magic != SIDECAR_MAGIC or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path}: not a doppler sidecar of version {SIDECAR_VERSION}")
+        self.version = version
+        self.satellite = satellite.rstrip(b'\0').decode('utf-8', 'replace')
+        # A file cut short by a crash ends in a partial record, it is left out
+        count = (os.path.getsize(path) - HEADER_SIZE) // record_size
+        self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,)) \
+            if count else np.zeros(0, dtype=RECORD_DTYPE)
+        self.offsets = np.asarray(self.records['sample_offset'])
+
+    def __len__(self):
+        return len(self.records)
+
+    def index(self, sample_offset):
+        """Index of the last record at or before sample_offset (the first one for earlier offsets)"""
+        if not len(self.records):
+            raise IndexError(f"{self.path} has no records")
+        return max(0, int(np.searchsorted(self.offsets, sample_offset, side='right')) - 1)
+
+    def at_sample(self, sample_offset, interpolate=True):
+        """Tracking state at a sample position as a dict, linearly interpolated between records"""
+        i = self.index(sample_offset)
+        record = self.records[i]
+        values = {name: record[name].item() for name in RECORD_DTYPE.names if name != 'reserved'}
+        if not interpolate or i + 1 >= len(self.records):
+            return values
+        following = self.records[i + 1]
+        span = int(following['sample_offset']) - int(record['sample_offset'])
+        if span <= 0:
+            return values
+        fraction = min(1.0, max(0.0, (sample_offset - int(record['sample_offset'])) / span))
+        for name in ('time', 'down_doppler', 'up_doppler', 'sat_azimuth', 'sat_elevation',
+                     'rotator_azimuth', 'rotator_elevation'):
+            a, b = float(record[name]), float(following[name])
+            if name.endswith('azimuth') and abs(b - a) > 180:
+                # Across north, interpolate the short way round
+                b += 360 if b < a else -360
+                values[name] = (a + (b - a) * fraction) % 360
+            else:
+                values[name] = a + (b - a) * fraction
+        values['sample_offset'] = sample_offset
+        return values
+
+    def at_time(self, unix_time, interpolate=True):
+        """Tracking state at a unix time, through the sample position of that time"""
+        return self.at_sample(max(0, round((unix_time - self.start_time) * self.sample_rate)), interpolate)
+
+    def column(self, name):
+        """One field of all records, e.g. column('down_doppler') against column('sample_offset')"""
+        return np.asarray(self.records[name])
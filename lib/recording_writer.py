@@ -0,0 +1,213 @@
+"""
+Streaming writer and encoders for the pass recorder.
+
+A writer thread drains the recorder's AudioRing in chunks of about one
+second and hands them to an encoder, so memory use does not depend on the
+pass length and the audio callback never waits for the encoder or the disk.
+
+Encoders ([passrecording] format):
+    wav   uncompressed, no encoder CPU. The RIFF and data sizes in the header
+          are rewritten every header_interval seconds, so a recording cut
+          short by a crash or power loss is still a valid WAV file up to its
+          last header update.
+    flac  lossless, roughly half the size of WAV for receiver audio.
+    opus  lossy, a small fraction of the size; 8/12/16/24/48 kHz only.
+
+FLAC and Opus are written through the optional soundfile package
+(libsndfile). When it is missing or cannot write the format the recording
+falls back to FLAC (Opus at an unsupported sample rate) or WAV, with a
+warning in the log. The writer measures its own CPU time, stats() reports it
+together with the compression ratio against plain PCM.
+"""
+
+import os
+import struct
+import threading
+import time
+import logging
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+WAVE_FORMAT_PCM = 1
+RECORDING_FORMATS = ('wav', 'flac', 'opus')
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def wav_header(data_bytes, sample_rate, channels, sampwidth):
+    """44 byte PCM WAV header for data_bytes of sample data"""
+    block_align = channels * sampwidth
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_bytes, b'WAVE',
+        b'fmt ', 16, WAVE_FORMAT_PCM, channels, sample_rate, sample_rate * block_align, block_align, sampwidth * 8,
+        b'data', data_bytes
+    )
+
+
+class WavEncoder:
+    name = 'wav'
+    extension = 'wav'
+
+    def __init__(self, filepath, sample_rate, channels, sampwidth):
+        self.filepath = filepath
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sampwidth = sampwidth
+        self.data_bytes = 0
+        self.file = open(filepath, 'wb')
+        self.file.write(wav_header(0, sample_rate, channels, sampwidth))
+
+    def _sample_bytes(self, block):
+        if self.sampwidth == 3:
+            # 24 bit samples are kept as int32, the file gets their low three bytes (little endian)
+            return block.view('u1').reshape(-1, 4)[:, :3].tobytes()
+        return memoryview(block).cast('B')
+
+    def write(self, block):
+        self.file.write(self._sample_bytes(block))
+        self.data_bytes += len(block) * self.channels * self.sampwidth
+
+    def checkpoint(self):
+        """Bring the header up to date, so the file is playable up to here"""
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(wav_header(self.data_bytes, self.sample_rate, self.channels, self.sampwidth))
+        self.file.seek(position)
+        self.file.flush()
+
+    def close(self):
+        self.checkpoint()
+        self.file.close()
+
+
+class SoundFileEncoder:
+    """FLAC or Ogg Opus through soundfile, which takes the ring's integer samples directly"""
+
+    extensions = {'flac': 'flac', 'opus': 'opus'}
+
+    def __init__(self, filepath, sample_rate, channels, sampwidth, name):
+        import soundfile as sf
+        self.name = name
+        self.extension = self.extensions[name]
+        self.filepath = filepath
+        if name == 'flac':
+            # libsndfile writes FLAC with at most 24 bits, 32 bit recordings lose their lowest 8
+            file_format, subtype = 'FLAC', 'PCM_16' if sampwidth == 2 else 'PCM_24'
+        else:
+            if sample_rate not in OPUS_SAMPLE_RATES:
+                raise ValueError(f"Opus needs a sample rate of {', '.join(str(r) for r in OPUS_SAMPLE_RATES)} Hz")
+            file_format, subtype = 'OGG', 'OPUS'
+        if subtype not in sf.available_subtypes(file_format):
+            raise ValueError(f"this libsndfile cannot write {file_format}/{subtype}")
+        # soundfile reads int32 as full scale 2**31, 24 bit samples sit in the low bits and are shifted up
+        self.shift = 8 if sampwidth == 3 else 0
+        self.scratch = None
+        self.file = sf.SoundFile(filepath, mode='w', samplerate=sample_rate, channels=channels,
+                                 format=file_format, subtype=subtype)
+
+    def write(self, block):
+        if self.shift:
+            if self.scratch is None or len(self.scratch) < len(block):
+                self.scratch = np.empty_like(block)
+            shifted = self.scratch[:len(block)]
+            np.left_shift(block, self.shift, out=shifted)
+            block = shifted
+        self.file.write(block)
+
+    def checkpoint(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def create_encoder(name, basepath, sample_rate, channels, sampwidth):
+    """Encoder writing basepath.<extension>, falling back towards WAV when the format is not available"""
+    name = name if name in RECORDING_FORMATS else 'wav'
+    while name != 'wav':
+        filepath = f"{basepath}.{SoundFileEncoder.extensions[name]}"
+        try:
+            return SoundFileEncoder(filepath, sample_rate, channels, sampwidth, name)
+        except ImportError:
+            logging.warning(f"Recording format {name} needs the soundfile package, recording WAV instead")
+            name = 'wav'
+        except Exception as e:
+            fallback = 'flac' if name == 'opus' else 'wav'
+            logging.warning(f"Recording format {name} not available ({e}), recording {fallback.upper()} instead")
+            name = fallback
+        if os.path.exists(filepath) and os.path.getsize(filepath) == 0:
+            os.remove(filepath)
+    return WavEncoder(f"{basepath}.wav", sample_rate, channels, sampwidth)
+
+
+class RecordingWriter(threading.Thread):
+    def __init__(self, encoder, ring, sample_rate, channels, sampwidth, chunk_frames=None, header_interval=5.0):
+        super().__init__(name="RecordingWriter", daemon=True)
+        self.encoder = encoder
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sampwidth = sampwidth
+        self.chunk_frames = chunk_frames or sample_rate  # about one second per write
+        self.header_interval = header_interval
+        self.frames_written = 0
+        self.cpu_time = 0.0  # thread CPU seconds spent encoding and writing
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Write what is left in the ring, finish and close the file"""
+        self._stop_event.set()
+        self.join()
+
+    def _drain(self, max_frames=None):
+        for block in self.ring.peek(max_frames):
+            self.encoder.write(block)
+            self.ring.consume(len(block))
+            self.frames_written += len(block)
+
+    def _timed(self, func, *args):
+        started = time.thread_time()
+        try:
+            func(*args)
+        finally:
+            self.cpu_time += time.thread_time() - started
+
+    def run(self):
+        try:
+            last_header = time.monotonic()
+            while not self._stop_event.wait(0.25):
+                while self.ring.available() >= self.chunk_frames:
+                    self._timed(self._drain, self.chunk_frames)
+                if time.monotonic() - last_header >= self.header_interval:
+                    self._timed(self.encoder.checkpoint)
+                    last_header = time.monotonic()
+            self._timed(self._drain)
+        except Exception as e:
+            self.error = e
+            logging.error(f"Error writing recording {self.encoder.filepath}: {e}", exc_info=True)
+        finally:
+            try:
+                self._timed(self.encoder.close)
+            except Exception as e:
+                logging.error(f"Error closing recording {self.encoder.filepath}: {e}")
+
+    def stats(self):
+        """Size, compression ratio against plain PCM and encoder CPU time of the finished recording"""
+        duration = self.frames_written / self.sample_rate
+        pcm_bytes = self.frames_written * self.channels * self.sampwidth
+        try:
+            file_bytes = os.path.getsize(self.encoder.filepath)
+        except OSError:
+            file_bytes = 0
+        return {
+            'file': os.path.basename(self.encoder.filepath),
+            'format': self.encoder.name,
+            'duration': round(duration, 1),
+            'pcm_bytes': pcm_bytes,
+            'file_bytes': file_bytes,
+            'compression_ratio': round(pcm_bytes / file_bytes, 2) if file_bytes else 0.0,
+            'cpu_time': round(self.cpu_time, 3),
+            'cpu_percent': round(100 * self.cpu_time / duration, 2) if duration else 0.0,
+        }
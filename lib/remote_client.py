@@ -20,7 +20,7 @@ class RemoteClient:
         self.sio = socketio.Client(reconnection=True, reconnection_attempts=0,
                                   reconnection_delay=1, reconnection_delay_max=5)
         self.connected = False
-        self.main_window = None
+        self.engine = None
         self.heartbeat_thread = None
         self.should_run_heartbeat = False
         self.reconnecting = False
@@ -41,14 +41,24 @@ class RemoteClient:
         self.sio.on('cmd_stop_rotator', self.on_cmd_stop_rotator)
         self.sio.on('cmd_get_transponder_list', self.on_cmd_get_transponder_list)
     
-    def register_window(self, window):
-        """Register the main application window"""
-        self.main_window = window
+    def register_engine(self, engine):
+        """Register the tracking engine"""
+        self.engine = engine
+        # Push every change made through the GUI, web API or this client
+        engine.add_listener(self.on_engine_event)
         # Send initial data if already connected
         if self.connected:
             self.send_satellite_list()
             self.send_full_status()
     
+    def on_engine_event(self, event, value):
+        """Tracking engine listener"""
+        if not self.connected:
+            return
+        if event == 'satellite' and value:
+            self.send_transponder_list(value)
+        self.send_full_status()
+    
     def connect(self):
         """Connect to the remote server"""
         if not self.connected and not self.reconnecting:
@@ -66,8 +76,9 @@ class RemoteClient:
     def disconnect(self):
         """Disconnect from the remote server"""
         self.stop_heartbeat()
-        # Clear main window reference to prevent Qt object access after shutdown
-        self.main_window = None
+        if self.engine:
+            self.engine.remove_listener(self.on_engine_event)
+            self.engine = None
         if self.connected:
             try:
                 self.sio.disconnect()
@@ -97,7 +108,7 @@ class RemoteClient:
         """Handler for successful registration as QTrigdoppler client"""
         logging.info("Registered as QTrigdoppler client")
         # Send initial data
-        if self.main_window:
+        if self.engine:
             self.send_satellite_list()
             self.send_full_status()
     
@@ -118,7 +129,7 @@ class RemoteClient:
         """Worker thread for sending heartbeats"""
         while self.should_run_heartbeat and self.connected:
             try:                # Send heartbeat with current status
-                if self.main_window:
+                if self.engine:
                     self.sio.emit('heartbeat', {'state': self.get_current_state()})
                 else:
                     self.sio.emit('heartbeat', {})
@@ -130,131 +141,17 @@ class RemoteClient:
     
     def get_current_state(self):
         """Get the current state of the application"""
-        if not self.main_window:
+        if not self.engine:
             return {}
-        
         try:
-            # Check if Stopbutton exists and is valid to determine tracking state
-            tracking_active = False
-            if hasattr(self.main_window, 'Stopbutton'):
-                try:
-                    tracking_active = self.main_window.Stopbutton.isEnabled()
-                except RuntimeError:
-                    # Qt object has been deleted, stop heartbeat to prevent further errors
-                    logging.debug("Qt objects deleted, stopping heartbeat")
-                    self.should_run_heartbeat = False
-                    return {}
-            
-            state = {
-                'tracking': tracking_active,
-                'satellite': None,
-                'transponder': None,
-                'rx_offset': 0
-            }
-            
-            # Safely get satellite name
-            try:
-                if hasattr(self.main_window, 'my_satellite') and hasattr(self.main_window.my_satellite, 'name'):
-                    state['satellite'] = self.main_window.my_satellite.name
-            except (RuntimeError, AttributeError):
-                pass
-            
-            # Safely get transponder name
-            try:
-                if hasattr(self.main_window, 'my_transponder_name'):
-                    state['transponder'] = getattr(self.main_window, 'my_transponder_name', None)
-            except (RuntimeError, AttributeError):
-                pass
-            
-            # Safely get rx offset
-            try:
-                if hasattr(self.main_window, 'rxoffsetbox'):
-                    state['rx_offset'] = self.main_window.rxoffsetbox.value()
-            except (RuntimeError, AttributeError):
-                pass
-            
-            # Safely add subtone if available
-            try:
-                if hasattr(self.main_window, 'combo3'):
-                    state['subtone'] = self.main_window.combo3.currentText()
-            except (RuntimeError, AttributeError):
-                pass
-            
-            # Safely add satellite info if available
-            try:
-                if hasattr(self.main_window, 'my_satellite') and hasattr(self.main_window.my_satellite, 'name') and self.main_window.my_satellite.name:
-                    sat = self.main_window.my_satellite
-                    state['satellite_info'] = {
-                        'name': sat.name,
-                        'downlink_freq': sat.F if hasattr(sat, 'F') else None,
-                        'uplink_freq': sat.I if hasattr(sat, 'I') else None,
-                        'downlink_mode': sat.downmode if hasattr(sat, 'downmode') else None,
-                        'uplink_mode': sat.upmode if hasattr(sat, 'upmode') else None,
-                        'tle_age': sat.tle_age if hasattr(sat, 'tle_age') else None
-                    }
-            except (RuntimeError, AttributeError):
-                pass
-            
-            # Safely add satellite position if available
-            try:
-                if hasattr(self.main_window, 'log_sat_status_ele_val') and hasattr(self.main_window, 'log_sat_status_azi_val'):
-                    state['satellite_position'] = {
-                        'elevation': self.main_window.log_sat_status_ele_val.text() if hasattr(self.main_window.log_sat_status_ele_val, 'text') else str(self.main_window.log_sat_status_ele_val),
-                        'azimuth': self.main_window.log_sat_status_azi_val.text() if hasattr(self.main_window.log_sat_status_azi_val, 'text') else str(self.main_window.log_sat_status_azi_val)
-                    }
-            except (RuntimeError, AttributeError):
-                pass
-            
-            # Safely add doppler if available
-            try:
-                if hasattr(self.main_window, 'rxdoppler_val') and hasattr(self.main_window, 'txdoppler_val'):
-                    state['doppler'] = {
-                        'downlink': self.main_window.rxdoppler_val.text() if hasattr(self.main_window.rxdoppler_val, 'text') else str(self.main_window.rxdoppler_val),
-                        'uplink': self.main_window.txdoppler_val.text() if hasattr(self.main_window.txdoppler_val, 'text') else str(self.main_window.txdoppler_val)
-                    }
-            except (RuntimeError, AttributeError):
-                pass
-                
-            # Safely add rotator enabled flag
-            try:
-                state['rotator_enabled'] = getattr(self.main_window, 'ROTATOR_ENABLED', False)
-            except (RuntimeError, AttributeError):
-                state['rotator_enabled'] = False
-            
-            # Safely add rotator info
-            try:
-                if state['rotator_enabled'] and hasattr(self.main_window, 'rotator'):
-                    # Get actual rotator position from the rotator device
-                    if self.main_window.rotator:
-                        az, el = self.main_window.rotator.get_position()
-                        if az is not None and el is not None:
-                            az = f"{float(az):.1f}"
-                            el = f"{float(el):.1f}"
-                        else:
-                            az = "error"
-                            el = "error"
-                    else:
-                        az = "error"
-                        el = "error"
-                    
-                    state['rotator'] = {
-                        'azimuth': az,
-                        'elevation': el
-                    }
-            except (RuntimeError, AttributeError):
-                pass
-                
+            return self.engine.status()
         except Exception as e:
-            # Catch any other unexpected errors and stop heartbeat
             logging.error(f"Error in get_current_state: {e}")
-            self.should_run_heartbeat = False
             return {}
-        
-        return state
     
     def send_full_status(self):
         """Send full status update to the server"""
-        if self.connected and self.main_window:
+        if self.connected and self.engine:
             try:
                 self.sio.emit('heartbeat', {'state': self.get_current_state()})
             except Exception as e:
@@ -262,95 +159,23 @@ class RemoteClient:
     
     def send_satellite_list(self):
         """Send satellite list to the server"""
-        if not self.connected or not self.main_window:
+        if not self.connected or not self.engine:
             return
         
         try:
-            # Try to load satellite list from main window
-            satellite_list = []
-            
-            # Try to get SQF file path
-            sqffile = None
-            if hasattr(self.main_window, 'SQFILE'):
-                sqffile = self.main_window.SQFILE
-            elif hasattr(self.main_window, 'configur') and hasattr(self.main_window.configur, 'get'):
-                sqffile = self.main_window.configur.get('satellite', 'sqffile', fallback=None)
-            
-            if not sqffile:
-                import sys
-                import os
-                # Try finding it in the module                
-                if hasattr(self.main_window, '__module__') and self.main_window.__module__ in sys.modules:
-                    module = sys.modules[self.main_window.__module__]
-                    if hasattr(module, 'SQFILE'):
-                        sqffile = module.SQFILE
-                  # Default fallback
-                if not sqffile:
-                    sqffile = 'doppler.sqf'
-                # Read the file
-            try:
-                with open(sqffile, 'r') as f:
-                    sqfdata = f.readlines()
-                    for line in sqfdata:
-                        # Skip comment lines
-                        if line.strip().startswith(';'):
-                            continue
-                            
-                        parts = line.strip().split(',')
-                        if len(parts) > 0:
-                            sat_name = parts[0].strip()
-                            if sat_name and sat_name not in satellite_list:
-                                satellite_list.append(sat_name)
-                
-                # Send the list to the server
-                self.sio.emit('update_satellite_list', {'satellites': satellite_list})
-                logging.info(f"Sent satellite list: {len(satellite_list)} satellites")
-                
-            except Exception as e:
-                logging.error(f"Error reading satellite list: {e}")
-        
+            satellite_list = self.engine.satellite_list()
+            self.sio.emit('update_satellite_list', {'satellites': satellite_list})
+            logging.info(f"Sent satellite list: {len(satellite_list)} satellites")
         except Exception as e:
             logging.error(f"Error sending satellite list: {e}")
     
     def send_transponder_list(self, satellite_name):
         """Send transponder list for a specific satellite to the server"""
-        if not self.connected or not self.main_window:
+        if not self.connected or not self.engine:
             return
         
         try:
-            # Try to get SQF file path
-            sqffile = None
-            if hasattr(self.main_window, 'SQFILE'):
-                sqffile = self.main_window.SQFILE
-            elif hasattr(self.main_window, 'configur') and hasattr(self.main_window.configur, 'get'):
-                sqffile = self.main_window.configur.get('satellite', 'sqffile', fallback=None)
-            
-            if not sqffile:
-                import sys
-                import os
-                # Try finding it in the module
-                if hasattr(self.main_window, '__module__') and self.main_window.__module__ in sys.modules:
-                    module = sys.modules[self.main_window.__module__]
-                    if hasattr(module, 'SQFILE'):
-                        sqffile = module.SQFILE
-                  # Default fallback
-                if not sqffile:
-                    sqffile = 'doppler.sqf'
-            
-            # Read the file and extract transponders for the requested satellite
-            tpxlist = []
-            with open(sqffile, 'r') as f:
-                sqfdata = f.readlines()
-                for line in sqfdata:
-                    # Skip comment lines
-                    if line.strip().startswith(';'):
-                        continue
-                        
-                    parts = line.strip().split(',')
-                    if len(parts) > 8 and parts[0].strip() == satellite_name:  # Ensure we have enough parts including the mode name
-                        mode_name = parts[8].strip()  # Last field is the mode name
-                        if mode_name and mode_name not in tpxlist:
-                            tpxlist.append(mode_name)
+            tpxlist = self.engine.transponder_list(satellite_name)
             
             # Send the list to the server
             self.sio.emit('update_transponder_list', {
@@ -364,68 +189,59 @@ class RemoteClient:
       # Command handlers
     def on_cmd_start_tracking(self, data=None):
         """Handle start tracking command from server"""
-        if self.main_window and hasattr(self.main_window, 'web_api_proxy'):
-            self.main_window.web_api_proxy.start_tracking.emit()
+        if self.engine:
+            self.engine.start_tracking()
             # Send updated status back
             self.send_full_status()
     
     def on_cmd_stop_tracking(self, data=None):
         """Handle stop tracking command from server"""
-        if self.main_window and hasattr(self.main_window, 'web_api_proxy'):
-            self.main_window.web_api_proxy.stop_tracking.emit()
+        if self.engine:
+            self.engine.stop_tracking()
             # Send updated status back
             self.send_full_status()
     
     def on_cmd_select_satellite(self, data):
         """Handle select satellite command from server"""
-        if self.main_window and hasattr(self.main_window, 'web_api_proxy'):
+        if self.engine:
             sat_name = data.get('satellite')
             if sat_name:
-                self.main_window.web_api_proxy.select_satellite.emit(sat_name)
-                # After selection, send the transponder list for this satellite
-                self.send_transponder_list(sat_name)
-                # Send updated status back
-                self.send_full_status()
+                # The engine listener sends the transponder list and status
+                self.engine.select_satellite(sat_name)
     
     def on_cmd_select_transponder(self, data):
         """Handle select transponder command from server"""
-        if self.main_window and hasattr(self.main_window, 'web_api_proxy'):
+        if self.engine:
             tpx_name = data.get('transponder')
             if tpx_name:
-                self.main_window.web_api_proxy.select_transponder.emit(tpx_name)
-                # Send updated status back
-                self.send_full_status()
+                self.engine.select_transponder(tpx_name)
     
     def on_cmd_set_subtone(self, data):
         """Handle set subtone command from server"""
-        if self.main_window and hasattr(self.main_window, 'web_api_proxy'):
+        if self.engine:
             tone = data.get('subtone')
             if tone is not None:
-                self.main_window.web_api_proxy.set_subtone.emit(tone)
-                # Send updated status back
-                self.send_full_status()
+                self.engine.set_subtone(tone)
     
     def on_cmd_set_rx_offset(self, data):
         """Handle set RX offset command from server"""
-        if self.main_window and hasattr(self.main_window, 'web_api_proxy'):
+        if self.engine:
             try:
                 offset = int(data.get('offset', 0))
-                self.main_window.web_api_proxy.set_rx_offset.emit(offset)
-                # Send updated status back
-                self.send_full_status()
+                self.engine.set_rx_offset(offset)
             except (ValueError, TypeError):
                 logging.warning(f"Invalid RX offset value: {data.get('offset')}")
     def on_cmd_park_rotator(self, data=None):
         """Handle park rotator command from server"""
-        if self.main_window and hasattr(self.main_window, 'park_rotators'):
-            self.main_window.park_rotators()
+        if self.engine:
+            self.engine.park_rotators()
             # Send updated status back
             self.send_full_status()
     
     def on_cmd_stop_rotator(self, data=None):
         """Handle stop rotator command from server"""
-        if self.main_window and hasattr(self.main_window, 'stop_rotators'):
-            self.main_window.stop_rotators()
+        if self.engine:
+            self.engine.stop_rotators()
             # Send updated status back
             self.send_full_status()
     
@@ -439,8 +255,8 @@ class RemoteClient:
 remote_client = RemoteClient()
 
 # Functions to be called from the main application
-def register_window(window):
-    """Register the main application window with the remote client"""
+def register_engine(engine):
+    """Register the tracking engine with the remote client"""
     # Read config to get the remote server URL
     config = configparser.ConfigParser()
     try:
@@ -451,8 +267,8 @@ def register_window(window):
         if enable_remote:
             # Update the remote client URL
             remote_client.server_url = remote_url
-            # Register the window
-            remote_client.register_window(window)
+            # Register the engine
+            remote_client.register_engine(engine)
             # Connect to the remote server
             remote_client.connect()
             logging.info(f"Remote client enabled, connecting to {remote_url}")
@@ -0,0 +1,159 @@
+"""
+Connection supervisor for the Icom rig.
+
+Reconnection used to run inline: in the failing doppler worker (which then
+started a second worker) and on the GUI thread every ~30 s. The supervisor
+is a single background thread that notices a lost rig, reopens it with
+exponential backoff, looks for the adapter under a new port name if it was
+re-enumerated, and hands the fresh icom instance to its owner through a
+callback. Nobody else opens or closes the serial port.
+"""
+
+import threading
+import time
+import logging
+from serial.tools import list_ports
+
+# A connection that survives this long resets the backoff delay
+STABLE_CONNECTION_TIME = 30.0
+
+
+class RigSupervisor(threading.Thread):
+    """Background thread that keeps the rig connection alive"""
+
+    def __init__(self, rig_factory, port, on_rig_changed=None, initial_delay=1.0, max_delay=30.0, check_interval=1.0):
+        super().__init__(name="RigSupervisor", daemon=True)
+        self.rig_factory = rig_factory        # function(port) returning a new icom instance
+        self.port = port
+        self.on_rig_changed = on_rig_changed  # called with the new rig after a successful reconnect
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.check_interval = check_interval
+        self._cond = threading.Condition()
+        self._rig = None
+        self._failed = False
+        self._stopped = False
+        self._delay = initial_delay
+        self._connected_since = None
+        self._port_fingerprint = None
+        self.reconnect_count = 0
+
+    @property
+    def rig(self):
+        return self._rig
+
+    def attach(self, rig):
+        """Take over supervision of an already created rig instance"""
+        with self._cond:
+            self._rig = rig
+            self._failed = not rig.is_connected()
+            if rig.is_connected():
+                self._connected_since = time.monotonic()
+                self._port_fingerprint = self._fingerprint(self.port)
+            self._cond.notify_all()
+
+    def set_port(self, port):
+        """Use a different serial port from the next reconnect on"""
+        with self._cond:
+            self.port = port
+            self._port_fingerprint = None
+
+    def report_failure(self, rig, reason=None):
+        """Called by the rig user when a command failed, never blocks"""
+        with self._cond:
+            if rig is not self._rig:
+                return  # already replaced
+            if reason:
+                logging.warning(f"Rig failure reported: {reason}")
+            self._failed = True
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._failed, self.check_interval)
+                if self._stopped:
+                    return
+                # The icom class drops its connected flag on serial errors without raising
+                if self._rig is not None and not self._rig.is_connected():
+                    self._failed = True
+                if not self._failed:
+                    continue
+                delay = self._delay
+            if self._reconnect():
+                continue
+            # Interruptible backoff wait before the next attempt
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped, delay)
+                self._delay = min(self._delay * 2, self.max_delay)
+
+    def _reconnect(self):
+        old_rig = self._rig
+        if old_rig is not None:
+            try:
+                old_rig.close()
+            except Exception as e:
+                logging.debug(f"Error closing rig connection during reconnect: {e}")
+        port = self._find_port()
+        logging.info(f"Attempting to reconnect to ICOM rig on {port}...")
+        try:
+            new_rig = self.rig_factory(port)
+        except Exception as e:
+            logging.warning(f"Rig reconnect on {port} failed: {e}")
+            return False
+        if not new_rig.is_connected():
+            logging.warning(f"Rig reconnect on {port} failed, next attempt in {self._delay:.1f} s")
+            return False
+
+        with self._cond:
+            now = time.monotonic()
+            # Only a connection that stayed up for a while resets the backoff, a flapping adapter keeps backing off
+            if self._connected_since is None or now - self._connected_since >= STABLE_CONNECTION_TIME:
+                self._delay = self.initial_delay
+            else:
+                self._delay = min(self._delay * 2, self.max_delay)
+            self._connected_since = now
+            self._rig = new_rig
+            self._failed = False
+            if port != self.port:
+                logging.info(f"Rig re-enumerated, using {port} instead of {self.port}")
+                self.port = port
+            self._port_fingerprint = self._fingerprint(port) or self._port_fingerprint
+            self.reconnect_count += 1
+        logging.info("Successfully reconnected to ICOM rig")
+
+        if self.on_rig_changed:
+            try:
+                self.on_rig_changed(new_rig)
+            except Exception as e:
+                logging.error(f"Error handing over reconnected rig: {e}")
+        return True
+
+    def _find_port(self):
+        """Configured port if present, otherwise the port now carrying the same USB adapter"""
+        try:
+            ports = list_ports.comports()
+        except Exception as e:
+            logging.debug(f"Could not enumerate serial ports: {e}")
+            return self.port
+        if any(p.device == self.port for p in ports) or not self._port_fingerprint:
+            return self.port
+        for p in ports:
+            if (p.vid, p.pid, p.serial_number) == self._port_fingerprint:
+                return p.device
+        return self.port
+
+    @staticmethod
+    def _fingerprint(port):
+        try:
+            for p in list_ports.comports():
+                if p.device == port and p.vid is not None:
+                    return (p.vid, p.pid, p.serial_number)
+        except Exception:
+            pass
+        return None
@@ -1,48 +1,94 @@
 import serial
+import socket
 import threading
 import time
+from lib import rotator_planner
 
-class YaesuRotator:
-    def __init__(self, port, baudrate=4800, az_min=0, az_max=450, el_min=0, el_max=180, timeout=1):
-        self.ser = serial.Serial(
-            port,
-            baudrate,
-            timeout=timeout,
-            rtscts=False,   # Hardware flow control OFF
-            xonxoff=False   # Software flow control OFF
-        )
+PLAN_RETRY_INTERVAL = 30.0  # seconds before planning again after a failed plan
+BACKENDS = ('gs232', 'rotctld')
+
+class RotatorBackend:
+    """
+    Interface of a rotator controller.
+
+    set_position(), park() and stop() send a command, get_position() returns
+    (az, el) or (None, None) when the controller gave no valid answer. The
+    backends do no waiting of their own beyond the protocol exchange; RotatorIO
+    is the only caller in normal operation.
+    """
+
+    def __init__(self, az_min=0, az_max=450, el_min=0, el_max=180):
         self.az_min = az_min
         self.az_max = az_max
         self.el_min = el_min
         self.el_max = el_max
         self.lock = threading.Lock()
 
-    def set_position(self, az, el):
+    def _clamp(self, az, el):
         try:
             az = float(az)
             el = float(el)
         except (ValueError, TypeError):
             raise ValueError(f"Invalid az/el values: az={az}, el={el}")
-        az = max(self.az_min, min(self.az_max, int(round(az))))
-        el = max(self.el_min, min(self.el_max, int(round(el))))
-        cmd = f"W{az:03d} {el:03d}\r"
-        with self.lock:
-            self.ser.write(cmd.encode())
-            time.sleep(0.1)
+        return max(self.az_min, min(self.az_max, az)), max(self.el_min, min(self.el_max, el))
+
+    def set_position(self, az, el):
+        raise NotImplementedError
 
     def park(self, az_park, el_park):
         self.set_position(az_park, el_park)
 
+    def stop(self):
+        raise NotImplementedError
+
+    def get_position(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class YaesuRotator(RotatorBackend):
+    """
+    Yaesu GS-232A/B serial protocol.
+
+    Replies are read up to their CR terminator, bounded by the serial timeout,
+    instead of sleeping a fixed time after every command. W and S have no reply;
+    the write is flushed so the next command cannot run into it.
+    """
+
+    TERMINATOR = b'\r'
+
+    def __init__(self, port, baudrate=4800, az_min=0, az_max=450, el_min=0, el_max=180, timeout=1):
+        super().__init__(az_min, az_max, el_min, el_max)
+        self.ser = serial.Serial(
+            port,
+            baudrate,
+            timeout=timeout,
+            rtscts=False,   # Hardware flow control OFF
+            xonxoff=False   # Software flow control OFF
+        )
+
+    def set_position(self, az, el):
+        az, el = self._clamp(az, el)
+        cmd = f"W{int(round(az)):03d} {int(round(el)):03d}\r"
+        with self.lock:
+            self.ser.write(cmd.encode())
+            self.ser.flush()
+
     def stop(self):
         with self.lock:
             self.ser.write(b'S\r')
+            self.ser.flush()
+
+    def _query(self, command):
+        self.ser.write(command)
+        # Controllers end replies with CR or CR LF, a leftover LF is stripped with the whitespace
+        return self.ser.read_until(self.TERMINATOR).decode(errors='ignore').strip()
 
     def get_position(self):
         with self.lock:
             self.ser.reset_input_buffer()
-            self.ser.write(b'C2\r')
-            time.sleep(0.1)
-            response = self.ser.readline().decode(errors='ignore').strip()
+            response = self._query(b'C2\r')
             try:
                 # Expected: 'AZ=aaa EL=eee' or just 'AZ=aaa' or 'EL=eee'
                 az = None
@@ -57,15 +103,11 @@ class YaesuRotator:
                     return az, el
                 # fallback: try single queries if C2 didn't work
                 if az is None:
-                    self.ser.write(b'C\r')
-                    time.sleep(0.1)
-                    az_response = self.ser.readline().decode(errors='ignore').strip()
+                    az_response = self._query(b'C\r')
                     if az_response.startswith('AZ='):
                         az = int(az_response[3:])
                 if el is None:
-                    self.ser.write(b'B\r')
-                    time.sleep(0.1)
-                    el_response = self.ser.readline().decode(errors='ignore').strip()
+                    el_response = self._query(b'B\r')
                     if el_response.startswith('EL='):
                         el = int(el_response[3:])
                 if az is not None and el is not None:
@@ -78,8 +120,265 @@ class YaesuRotator:
         with self.lock:
             self.ser.close()
 
+class RotctldRotator(RotatorBackend):
+    """
+    Hamlib rotctld over TCP, for rotators on a networked controller.
+
+    One connection is kept open and reopened on the next call after an error.
+    Commands are pipelined: set_position() and stop() only write their line,
+    their "RPRT n" replies are collected before the answer of the next p query,
+    so a P costs no round trip of its own.
+    """
+
+    def __init__(self, host='localhost', port=4533, az_min=0, az_max=450, el_min=0, el_max=180, timeout=1):
+        super().__init__(az_min, az_max, el_min, el_max)
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self._reader = None
+        self._unanswered = 0  # replies of pipelined commands not read yet
+        with self.lock:
+            self._connect()
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        # Single short lines, Nagle would hold a P back until the previous reply arrived
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self.sock.makefile('rb')
+        self._unanswered = 0
+
+    def _disconnect(self):
+        for closable in (self._reader, self.sock):
+            try:
+                if closable:
+                    closable.close()
+            except OSError:
+                pass
+        self.sock = None
+        self._reader = None
+        self._unanswered = 0
+
+    def _send(self, line):
+        if self.sock is None:
+            self._connect()
+        try:
+            self.sock.sendall(line.encode())
+        except OSError:
+            self._disconnect()
+            raise
+
+    def _readline(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("rotctld closed the connection")
+        return line.decode(errors='ignore').strip()
+
+    def _collect_replies(self):
+        """Read the RPRT replies of pipelined commands, report failed ones"""
+        while self._unanswered:
+            reply = self._readline()
+            self._unanswered -= 1
+            if reply != 'RPRT 0':
+                print(f"rotctld command failed: {reply}")
+
+    def set_position(self, az, el):
+        az, el = self._clamp(az, el)
+        with self.lock:
+            self._send(f"P {az:.1f} {el:.1f}\n")
+            self._unanswered += 1
+
+    def stop(self):
+        with self.lock:
+            self._send("S\n")
+            self._unanswered += 1
+
+    def get_position(self):
+        with self.lock:
+            try:
+                self._send("p\n")
+                self._collect_replies()
+                first = self._readline()
+                if first.startswith('RPRT'):
+                    print(f"rotctld position query failed: {first}")
+                    return None, None
+                return float(first), float(self._readline())
+            except (OSError, ValueError) as e:
+                # Replies are out of step after an error, start over on a new connection
+                self._disconnect()
+                print(f"Error reading rotctld position: {e}")
+                return None, None
+
+    def close(self):
+        with self.lock:
+            if self.sock is not None:
+                try:
+                    self._collect_replies()
+                except OSError:
+                    pass
+            self._disconnect()
+
+class SingleAxisRotator(RotatorBackend):
+    """
+    Azimuth-only or elevation-only rotator of an az/el pair.
+
+    Commands keep the unused axis at its fixed value and are only passed on
+    when the used axis moved by at least min_step, so the other axis of the
+    pass does not cause needless commands.
+    """
+
+    def __init__(self, backend, axis, fixed_az=0, fixed_el=0, min_step=1.0):
+        super().__init__(backend.az_min, backend.az_max, backend.el_min, backend.el_max)
+        self.backend = backend
+        self.axis = axis
+        self.fixed_az = fixed_az
+        self.fixed_el = fixed_el
+        self.min_step = min_step
+        self._last = None
+
+    def set_position(self, az, el):
+        value = float(az) if self.axis == 'az' else float(el)
+        if self._last is not None and abs(value - self._last) < self.min_step:
+            return
+        self._send(az, el)
+
+    def park(self, az_park, el_park):
+        self._send(az_park, el_park)
+
+    def _send(self, az, el):
+        if self.axis == 'az':
+            self.backend.set_position(az, self.fixed_el)
+            self._last = float(az)
+        else:
+            self.backend.set_position(self.fixed_az, el)
+            self._last = float(el)
+
+    def stop(self):
+        self._last = None
+        self.backend.stop()
+
+    def get_position(self):
+        return self.backend.get_position()
+
+    def close(self):
+        self.backend.close()
+
+def create_backend(backend, serial_port='COM4', baudrate=4800, host='localhost', port=4533,
+                   az_min=0, az_max=450, el_min=0, el_max=180):
+    """Rotator backend for the [rotator] backend setting"""
+    if backend == 'rotctld':
+        return RotctldRotator(host, port, az_min=az_min, az_max=az_max, el_min=el_min, el_max=el_max)
+    if backend == 'gs232':
+        return YaesuRotator(serial_port, baudrate=baudrate, az_min=az_min, az_max=az_max, el_min=el_min, el_max=el_max)
+    raise ValueError(f"Unknown rotator backend '{backend}', use one of {', '.join(BACKENDS)}")
+
+class RotatorIO(threading.Thread):
+    """
+    Single owner of the rotator connection (serial port or rotctld socket).
+
+    Polls the position every poll_interval and keeps the last reading with its
+    timestamp; get_position() answers from that cache, so the GUI, web and
+    remote status never touch the port. set_position(), park() and stop() only
+    leave the command for the I/O thread and return, a newer command replaces
+    one that was not sent yet. Offers the RotatorBackend methods, so it can be
+    used in its place.
+    """
+
+    def __init__(self, rotator, poll_interval=1.0, on_position=None, name="RotatorIO"):
+        super().__init__(name=name, daemon=True)
+        self.rotator = rotator
+        self.poll_interval = poll_interval
+        self.on_position = on_position  # callback(az, el) after every poll
+        self.position = (None, None)
+        self.reading_time = 0.0  # time.time() of the last successful reading
+        self.command_latency = 0.0  # smoothed seconds from set_position() until the command was written
+        self.commands = 0
+        self.polls = 0
+        self.errors = 0
+        self._pending = None
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = True
+        self._next_poll = 0.0
+        # First reading right away, front ends show the position as soon as they start
+        self._poll()
+
+    def get_position(self):
+        return self.position
+
+    def set_position(self, az, el):
+        self._queue(('set', float(az), float(el)))
+
+    def park(self, az_park, el_park):
+        self._queue(('set', float(az_park), float(el_park)))
+
+    def stop(self):
+        self._queue(('stop',))
+
+    def close(self):
+        """Send a pending command, stop the thread and close the port"""
+        self._running = False
+        self._wakeup.set()
+        if self.is_alive():
+            self.join(timeout=2)
+        else:
+            self._send_pending()
+        self.rotator.close()
+
+    def _queue(self, command):
+        with self._pending_lock:
+            self._pending = command + (time.perf_counter(),)
+        self._wakeup.set()
+
+    def _send_pending(self):
+        with self._pending_lock:
+            command, self._pending = self._pending, None
+        if command is None:
+            return
+        try:
+            if command[0] == 'set':
+                self.rotator.set_position(command[1], command[2])
+            else:
+                self.rotator.stop()
+            self.command_latency += 0.3 * ((time.perf_counter() - command[-1]) - self.command_latency)
+            self.commands += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Rotator command {command[0]} failed: {e}")
+
+    def _poll(self):
+        try:
+            az, el = self.rotator.get_position()
+        except Exception as e:
+            print(f"Error reading rotator position: {e}")
+            az, el = None, None
+        self.polls += 1
+        if az is None or el is None:
+            self.errors += 1
+        self.position = (az, el)
+        if az is not None and el is not None:
+            self.reading_time = time.time()
+        self._next_poll = time.monotonic() + self.poll_interval
+        if self.on_position:
+            try:
+                self.on_position(az, el)
+            except Exception as e:
+                print(f"Error in rotator position callback: {e}")
+
+    def run(self):
+        while self._running:
+            # Commands go first, a position poll never delays a pointing command
+            self._wakeup.wait(max(0.0, self._next_poll - time.monotonic()))
+            self._wakeup.clear()
+            self._send_pending()
+            if self._running and time.monotonic() >= self._next_poll:
+                self._poll()
+        self._send_pending()
+
+
 class RotatorThread(threading.Thread):
-    def __init__(self, rotator, get_az_el_func, min_elevation, az_park, el_park, poll_interval=1.0):
+    def __init__(self, rotator, get_az_el_func, min_elevation, az_park, el_park, poll_interval=1.0, plan_pass_func=None,
+                 slew_model=None, deadband=1.0):
         super().__init__()
         self.rotator = rotator
         self.get_az_el = get_az_el_func  # function returning (az, el)
@@ -89,39 +388,118 @@ class RotatorThread(threading.Thread):
         self.poll_interval = poll_interval
         self.running = threading.Event()
         self.running.set()
+        self._stop_event = threading.Event()  # wakes run() out of its poll wait on stop()
         self.parked = False
         self.last_az = None
         self.last_el = None
+        # Optional whole-pass planner, function(current_az, current_el) returning a PassPlan or None
+        self.plan_pass = plan_pass_func
+        self.plan = None
+        self._replan = threading.Event()
+        # Lead pointing along the plan: learned slew rates and the allowed pointing error in degrees
+        self.slew_model = slew_model or rotator_planner.SlewModel(6.0, 2.7)
+        self.deadband = deadband
+        self.last_command = None
+        self.commands_sent = 0
+        self._plan_retry_at = 0.0
+
+    def invalidate_plan(self):
+        """Plan again on the next poll, e.g. after the satellite changed"""
+        self._replan.set()
+
+    def _make_plan(self):
+        try:
+            current_az, current_el = self.rotator.get_position()
+            if current_az is None or current_el is None:
+                current_az, current_el = self.last_az, self.last_el
+            return self.plan_pass(current_az, current_el)
+        except Exception as e:
+            print(f"Rotator pass planning failed: {e}")
+            return None
+
+    def _follow_plan(self, now):
+        """Send a lead command once the last one would leave the deadband before the next poll"""
+        current_az, current_el = self.rotator.get_position()
+        if current_az is not None and current_el is not None:
+            # A RotatorIO answers from its cache, the reading may be older than now
+            reading_time = getattr(self.rotator, 'reading_time', now)
+            self.slew_model.observe_position(reading_time, current_az, current_el, self.last_command)
+        elif self.last_command:
+            current_az, current_el = self.last_command
+        else:
+            current_az, current_el = self.plan.command_at(now) or (self.az_park, self.el_park)
+        if self.last_command:
+            check_time = min(now + self.poll_interval + self.slew_model.latency, self.plan.los)
+            predicted = self.plan.command_at(check_time)
+            if predicted is None:
+                return
+            error = rotator_planner.pointing_error(self.last_command[0], self.last_command[1], predicted[0], predicted[1])
+            if error <= self.deadband:
+                return
+        command = rotator_planner.lead_command(self.plan, now, (current_az, current_el), self.slew_model, self.deadband)
+        if command is None:
+            return
+        az, el, _ = command
+        started = time.perf_counter()
+        self.rotator.set_position(az, el)
+        self.slew_model.observe_latency(getattr(self.rotator, 'command_latency', time.perf_counter() - started))
+        self.last_command = (az, el)
+        self.last_az = round(az)
+        self.last_el = round(el)
+        self.commands_sent += 1
 
     def run(self):
         while self.running.is_set():
             try:
                 az, el = self.get_az_el()
+                if self._replan.is_set():
+                    self._replan.clear()
+                    self.plan = None
+                    self.last_command = None
+                    self._plan_retry_at = 0.0
                 if el >= self.min_elevation:
-                    # Only send if az or el changed by at least 1 degree
-                    send = False
-                    if self.last_az is None or self.last_el is None:
-                        send = True
-                    elif abs(az - self.last_az) >= 1 or abs(el - self.last_el) >= 1:
-                        send = True
-                    if send:
-                        self.rotator.set_position(az, el)
-                        self.last_az = round(az)
-                        self.last_el = round(el)
+                    now = time.time()
+                    # Follow the pass plan made at AOS, plan again once it has run out
+                    if self.plan_pass and (self.plan is None or now > self.plan.los) and now >= self._plan_retry_at:
+                        self.plan = self._make_plan()
+                        self.last_command = None
+                        self.commands_sent = 0
+                        if self.plan is None:
+                            self._plan_retry_at = now + PLAN_RETRY_INTERVAL
+                    if self.plan and now <= self.plan.los:
+                        self._follow_plan(now)
+                    else:
+                        # Only send if az or el changed by at least 1 degree
+                        send = False
+                        if self.last_az is None or self.last_el is None:
+                            send = True
+                        elif abs(az - self.last_az) >= 1 or abs(el - self.last_el) >= 1:
+                            send = True
+                        if send:
+                            self.rotator.set_position(az, el)
+                            self.last_az = round(az)
+                            self.last_el = round(el)
                     self.parked = False
                 else:
                     if not self.parked:
+                        if self.plan:
+                            print(f"Rotator pass finished: {self.commands_sent} commands, "
+                                  f"slew rates {self.slew_model.az_rate:.1f}/{self.slew_model.el_rate:.1f} °/s, "
+                                  f"latency {self.slew_model.latency * 1000:.0f} ms")
                         self.rotator.park(self.az_park, self.el_park)
                         self.parked = True
+                        self.plan = None
+                        self.last_command = None
                         self.last_az = self.az_park
                         self.last_el = self.el_park
             except Exception as e:
                 # Log or handle error as needed
                 print(f"RotatorThread error: {e}")
-            time.sleep(self.poll_interval)
+            self._stop_event.wait(self.poll_interval)
 
     def stop(self):
         self.running.clear()
+        self._stop_event.set()
         try:
             self.rotator.stop()
         except Exception as e:
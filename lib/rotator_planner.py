@@ -0,0 +1,287 @@
+"""
+Whole-pass rotator planning.
+
+Instead of deciding per command which side of the azimuth overlap to use,
+plan_pass() computes the az/el track of the whole pass once, when the
+satellite rises above the rotator's minimum elevation (or when tracking starts
+during a pass). Every way of following that track within the rotator limits is
+simulated with the rotator's slew rates:
+
+    normal   azimuth 0-360 plus the overlap range, elevation 0-90
+    flip     azimuth turned by 180 degrees and elevation 180-el, for rotators
+             with el_max > 90; follows passes over the zenith without a fast
+             azimuth swing
+
+The plan that keeps the antenna on target longest, then with the least total
+slew, wins. Its time-stamped command track is what RotatorThread follows for
+the rest of the pass.
+
+RotatorThread does not command where the satellite is, but where it will be
+when the rotator gets there: lead_command() predicts the arrival time from the
+command latency and a SlewModel that learns the real slew rates from position
+readings, then aims further ahead so one command stays within the deadband
+(a share of the antenna beamwidth) for as long as possible.
+"""
+
+import math
+import time
+import bisect
+import ephem
+
+EPHEM_UNIX_EPOCH = 25567.5      # ephem.Date of 1970-01-01 00:00 UTC
+PLAN_STEP = 1.0                 # seconds between track samples
+MAX_PASS_DURATION = 2 * 3600    # seconds, upper bound for the track computation
+ON_TARGET_TOLERANCE = 5.0       # degrees pointing error still counted as on target
+COMMAND_STEP = 1.0              # degrees change between two scheduled commands
+MODES = ('normal', 'flip')      # in order of preference on equal cost
+MAX_LEAD = 60.0                 # seconds, longest lead of a single command
+DEADBAND_SHARE = 0.5            # share of the half beamwidth used as deadband, the rest covers slewing
+
+
+def unix_to_ephem(t):
+    return ephem.Date(t / 86400.0 + EPHEM_UNIX_EPOCH)
+
+
+def compute_track(body, observer, start, min_elevation, step=PLAN_STEP, max_duration=MAX_PASS_DURATION):
+    """(time, az, el) samples from start until the satellite drops below min_elevation"""
+    track = []
+    t = start
+    while t - start <= max_duration:
+        observer.date = unix_to_ephem(t)
+        body.compute(observer)
+        el = math.degrees(body.alt)
+        if el < min_elevation:
+            break
+        track.append((t, math.degrees(body.az), el))
+        t += step
+    return track
+
+
+def pointing_vector(az, el):
+    """Unit vector for a rotator position, elevations above 90 point over the back"""
+    az = math.radians(az)
+    el = math.radians(el)
+    return (math.cos(el) * math.sin(az), math.cos(el) * math.cos(az), math.sin(el))
+
+
+def pointing_error(az1, el1, az2, el2):
+    """Angle in degrees between two pointing directions"""
+    a = pointing_vector(az1, el1)
+    b = pointing_vector(az2, el2)
+    dot = max(-1.0, min(1.0, a[0] * b[0] + a[1] * b[1] + a[2] * b[2]))
+    return math.degrees(math.acos(dot))
+
+
+def _unwrap(azimuths):
+    """Continuous azimuths without the 360 -> 0 jump"""
+    unwrapped = [azimuths[0]]
+    for az in azimuths[1:]:
+        previous = unwrapped[-1]
+        unwrapped.append(previous + (az - previous + 180.0) % 360.0 - 180.0)
+    return unwrapped
+
+
+def _nearest_equivalent(az, reference, az_min, az_max):
+    """az + n*360 within the limits closest to reference, None if no equivalent fits"""
+    best = None
+    for n in range(-2, 3):
+        candidate = az + 360.0 * n
+        if az_min <= candidate <= az_max:
+            if best is None or abs(candidate - reference) < abs(best - reference):
+                best = candidate
+    return best
+
+
+class PassPlan:
+    """Rotator commands for one pass"""
+
+    def __init__(self, mode, commands, off_target, total_slew):
+        self.mode = mode
+        self.commands = commands  # [(time, az, el)] at PLAN_STEP
+        self.off_target = off_target  # seconds with more than ON_TARGET_TOLERANCE pointing error
+        self.total_slew = total_slew  # degrees of az plus el movement
+        self._times = [c[0] for c in commands]
+        self.aos = self._times[0]
+        self.los = self._times[-1]
+
+    def __repr__(self):
+        return f"PassPlan({self.mode}, {len(self.commands)} s, off target {self.off_target:.0f} s, slew {self.total_slew:.0f}°)"
+
+    def command_at(self, t):
+        """Interpolated (az, el) command for time t, None outside the pass"""
+        if t < self.aos - PLAN_STEP or t > self.los:
+            return None
+        i = bisect.bisect_right(self._times, t)
+        if i <= 0:
+            return self.commands[0][1], self.commands[0][2]
+        if i >= len(self.commands):
+            return self.commands[-1][1], self.commands[-1][2]
+        t0, az0, el0 = self.commands[i - 1]
+        t1, az1, el1 = self.commands[i]
+        f = (t - t0) / (t1 - t0)
+        return az0 + f * (az1 - az0), el0 + f * (el1 - el0)
+
+    def schedule(self, min_step=COMMAND_STEP):
+        """Time-stamped commands, one whenever az or el moved by at least min_step"""
+        schedule = [self.commands[0]]
+        for command in self.commands[1:]:
+            _, last_az, last_el = schedule[-1]
+            if abs(command[1] - last_az) >= min_step or abs(command[2] - last_el) >= min_step:
+                schedule.append(command)
+        if schedule[-1] is not self.commands[-1]:
+            schedule.append(self.commands[-1])
+        return schedule
+
+
+def _candidates(track, mode, current_az, az_min, az_max):
+    """Command tracks for one mode: every overlap offset the whole pass fits in, else one with jumps"""
+    if mode == 'flip':
+        azimuths = [(az + 180.0) % 360.0 for _, az, _ in track]
+        elevations = [180.0 - el for _, _, el in track]
+    else:
+        azimuths = [az for _, az, _ in track]
+        elevations = [el for _, _, el in track]
+    times = [t for t, _, _ in track]
+
+    unwrapped = _unwrap(azimuths)
+    low, high = min(unwrapped), max(unwrapped)
+    candidates = []
+    for n in range(-2, 3):
+        shift = 360.0 * n
+        if low + shift >= az_min and high + shift <= az_max:
+            candidates.append([(t, az + shift, el) for t, az, el in zip(times, unwrapped, elevations)])
+    if candidates:
+        return candidates
+
+    # The pass does not fit in one piece, follow it and swing around where the limits force it
+    commands = []
+    reference = current_az
+    for t, az, el in zip(times, azimuths, elevations):
+        command_az = _nearest_equivalent(az, reference, az_min, az_max)
+        if command_az is None:
+            command_az = max(az_min, min(az_max, az))
+        commands.append((t, command_az, el))
+        reference = command_az
+    return [commands]
+
+
+def _simulate(commands, track, current_az, current_el, az_slew_rate, el_slew_rate, tolerance=ON_TARGET_TOLERANCE):
+    """Follow the commands at the slew rates, returns (seconds off target, degrees slewed)"""
+    position_az, position_el = current_az, current_el
+    off_target = 0.0
+    total_slew = 0.0
+    previous_t = commands[0][0]
+    for (t, command_az, command_el), (_, sat_az, sat_el) in zip(commands, track):
+        dt = t - previous_t
+        previous_t = t
+        move_az = max(-az_slew_rate * dt, min(az_slew_rate * dt, command_az - position_az))
+        move_el = max(-el_slew_rate * dt, min(el_slew_rate * dt, command_el - position_el))
+        position_az += move_az
+        position_el += move_el
+        total_slew += abs(move_az) + abs(move_el)
+        if pointing_error(position_az, position_el, sat_az, sat_el) > tolerance:
+            off_target += dt if dt > 0 else PLAN_STEP
+    return off_target, total_slew
+
+
+def plan_pass(body, observer, current_az, current_el, az_min, az_max, el_max,
+              az_slew_rate, el_slew_rate, min_elevation, start=None, tolerance=ON_TARGET_TOLERANCE):
+    """
+    Best PassPlan from now to LOS, None if the satellite is below min_elevation.
+
+    body and observer are computed with, pass objects no other thread uses
+    (ephem bodies are not thread safe and EarthSatellite.copy() is unreliable).
+    """
+    start = time.time() if start is None else start
+    track = compute_track(body, observer, start, min_elevation)
+    if not track:
+        return None
+    if current_az is None or current_el is None:
+        current_az, current_el = track[0][1], track[0][2]
+
+    best = None
+    best_cost = None
+    for mode_index, mode in enumerate(MODES):
+        if mode == 'flip' and el_max <= 90:
+            continue
+        for commands in _candidates(track, mode, current_az, az_min, az_max):
+            off_target, total_slew = _simulate(commands, track, current_az, current_el, az_slew_rate, el_slew_rate, tolerance)
+            cost = (round(off_target), round(total_slew), mode_index)
+            if best_cost is None or cost < best_cost:
+                best_cost = cost
+                best = PassPlan(mode, commands, off_target, total_slew)
+    return best
+
+
+class SlewModel:
+    """Slew rates and command latency of the rotator, refined from position readings"""
+
+    SMOOTHING = 0.3          # weight of a new measurement
+    MIN_MOVE = 2.0           # degrees between readings for a rate measurement
+    FULL_SPEED_MARGIN = 5.0  # degrees from the target, closer the controller may slow down
+
+    def __init__(self, az_rate, el_rate, latency=0.2):
+        self.configured = (az_rate, el_rate)
+        self.az_rate = az_rate
+        self.el_rate = el_rate
+        self.latency = latency
+        self._last_reading = None
+
+    def slew_time(self, from_az, from_el, to_az, to_el):
+        """Seconds to move between two positions, both axes move at the same time"""
+        return max(abs(to_az - from_az) / self.az_rate, abs(to_el - from_el) / self.el_rate)
+
+    def observe_latency(self, seconds):
+        self.latency += self.SMOOTHING * (seconds - self.latency)
+
+    def observe_position(self, t, az, el, command):
+        """Feed a position reading, command is the (az, el) the rotator is moving to"""
+        last, self._last_reading = self._last_reading, (t, az, el, command)
+        if last is None or command is None or last[3] != command:
+            return
+        dt = t - last[0]
+        if dt <= 0:
+            return
+        # Only readings taken while an axis ran at full speed towards the target say anything about its rate
+        if abs(az - last[1]) >= self.MIN_MOVE and abs(command[0] - az) > self.FULL_SPEED_MARGIN:
+            self.az_rate = self._smoothed(self.az_rate, abs(az - last[1]) / dt, self.configured[0])
+        if abs(el - last[2]) >= self.MIN_MOVE and abs(command[1] - el) > self.FULL_SPEED_MARGIN:
+            self.el_rate = self._smoothed(self.el_rate, abs(el - last[2]) / dt, self.configured[1])
+
+    def _smoothed(self, current, measured, configured):
+        # Readings taken mid-command can be far off, stay within a sane range of the configured rate
+        measured = max(configured / 5.0, min(configured * 5.0, measured))
+        return current + self.SMOOTHING * (measured - current)
+
+
+def deadband_for_beamwidth(beamwidth):
+    """Pointing error in degrees a command may accumulate before the next one is sent"""
+    return max(0.5, beamwidth / 2.0 * DEADBAND_SHARE)
+
+
+def lead_command(plan, now, position, slew_model, deadband):
+    """
+    (az, el, aim time) to command now so the rotator arrives where the satellite will be.
+
+    The arrival time is found by iterating latency + slew time to the predicted
+    position; the command then aims ahead until the satellite would move more
+    than deadband away from the arrival position, so the pointing error stays
+    within +-deadband for the longest time.
+    """
+    arrival = now + slew_model.latency
+    for _ in range(3):
+        target = plan.command_at(min(arrival, plan.los))
+        if target is None:
+            return None
+        arrival = now + slew_model.latency + slew_model.slew_time(position[0], position[1], target[0], target[1])
+    arrival = min(arrival, plan.los)
+    start = plan.command_at(arrival)
+    aim = arrival
+    while aim + PLAN_STEP <= plan.los and aim + PLAN_STEP - arrival <= MAX_LEAD:
+        ahead = plan.command_at(aim + PLAN_STEP)
+        # A planned swing (overlap change) is not something to aim past
+        if abs(ahead[0] - start[0]) > 180 or pointing_error(start[0], start[1], ahead[0], ahead[1]) > deadband:
+            break
+        aim += PLAN_STEP
+    az, el = plan.command_at(aim)
+    return az, el, aim
@@ -2,7 +2,6 @@
 ## Calculates the tx doppler frequency
 import ephem
 import math
-import numpy as np
 from datetime import datetime, timedelta, timezone
 import time
 import logging
@@ -190,7 +189,7 @@ def sat_eclipse_calc(ephemdata, myloc):
         return "☀︎"
 ## Calculates sat footprint diameter
 def footprint_radius_km(alt_km):
-    return 6371 * np.arccos(6371 / (6371 + alt_km))
+    return 6371 * math.acos(6371 / (6371 + alt_km))
     
 ## Calculates next sat pass at observer
 def sat_next_event_calc(ephemdata, myloc):
@@ -0,0 +1,47 @@
+"""
+Startup time breakdown for --profile-startup.
+
+QTrigdoppler.py and the headless daemon call mark() after each import group
+and initialization step. With profiling enabled the collected phases are
+printed as a table once the application is up, which is also what
+benchmarks/startup_benchmark.py parses. Disabled, mark() only records a
+timestamp, so the calls can stay in place.
+"""
+
+import sys
+import time
+import logging
+
+PROFILE_FLAG = '--profile-startup'
+
+
+class StartupProfiler:
+    def __init__(self, enabled=None):
+        self.enabled = PROFILE_FLAG in sys.argv if enabled is None else enabled
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._last_modules = len(sys.modules)
+        self.phases = []  # (name, seconds, modules loaded)
+
+    def mark(self, name):
+        """Close the phase that started at the previous mark"""
+        now = time.perf_counter()
+        modules = len(sys.modules)
+        self.phases.append((name, now - self._last, modules - self._last_modules))
+        self._last = now
+        self._last_modules = modules
+
+    def total(self):
+        return self._last - self.started
+
+    def report(self, stream=None):
+        """Print the phase table, slowest phases are the interesting ones"""
+        stream = stream or sys.stdout
+        total = self.total()
+        print("Startup profile:", file=stream)
+        for name, seconds, modules in self.phases:
+            share = 100.0 * seconds / total if total > 0 else 0.0
+            print(f"  {name:<36} {seconds * 1000:9.1f} ms {share:5.1f} %  +{modules} modules", file=stream)
+        print(f"  {'total':<36} {total * 1000:9.1f} ms", file=stream)
+        stream.flush()
+        logging.info(f"Startup took {total * 1000:.0f} ms")
@@ -0,0 +1,326 @@
+"""
+Station mode: additional rigs and rotators next to the main ones.
+
+The main rig ([icom]) and rotator ([rotator]) are driven by the tracking
+engine as before. [station] lists further devices, each configured in its own
+section and driven by its own tracker thread, for separate RX and TX rigs, a
+second rig on another satellite or an azimuth-only plus elevation-only
+rotator pair:
+
+    [station]
+    rigs = tx
+    rotators = az, el
+
+    [rig:tx]            role = uplink, follows the main satellite
+    [rotator:az]        axes = az
+    [rotator:el]        axes = el
+
+A device without a satellite setting follows the satellite selected in the
+GUI/web API, otherwise it tracks the named satellite from the TLE file. All
+trackers read their satellite from the shared OrbitalStateService, so each
+device updates at its own rate however many there are. Throughput of every
+device, the main ones included, is logged every stats_interval seconds and
+available from TrackingEngine.station_stats().
+"""
+
+import time
+import threading
+import logging
+from lib import icom
+from lib import rotator
+from lib.orbital_state import OrbitalStateService, MAIN
+from lib.sat_utils import C
+
+RIG_ROLES = ('downlink', 'uplink')
+ROTATOR_AXES = ('azel', 'az', 'el')
+
+
+class DeviceStats:
+    """Loop, command and error counters of one device, written by its tracker thread only"""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.loops = 0
+        self.commands = 0
+        self.errors = 0
+        self.latency = 0.0  # smoothed seconds per command
+
+    def loop(self):
+        self.loops += 1
+
+    def command(self, latency):
+        self.commands += 1
+        self.latency += 0.3 * (latency - self.latency)
+
+    def error(self):
+        self.errors += 1
+
+    def totals(self):
+        return {'device': self.name, 'kind': self.kind, 'loops': self.loops, 'commands': self.commands,
+                'errors': self.errors, 'latency_ms': round(self.latency * 1000, 1)}
+
+
+class RigTracker(threading.Thread):
+    """Keeps one VFO of an additional rig on the doppler corrected downlink or uplink frequency"""
+
+    def __init__(self, name, rig, service, key, role, frequency_func, active_func, threshold=50, interval=0.1):
+        super().__init__(name=f"RigTracker-{name}", daemon=True)
+        self.rig = rig
+        self.service = service
+        self.key = key
+        self.role = role
+        self.frequency_func = frequency_func  # nominal frequency in Hz, 0 while there is none
+        self.active_func = active_func
+        self.threshold = threshold
+        self.interval = interval
+        self.stats = DeviceStats(name, 'rig')
+        self.rig_frequency = None
+        self._shutdown = threading.Event()
+
+    def stop(self):
+        self._shutdown.set()
+
+    def _doppler_frequency(self):
+        state = self.service.state(self.key)
+        frequency = self.frequency_func()
+        if state is None or not frequency:
+            return None
+        range_velocity = state.range_velocity_at(time.time())
+        if self.role == 'downlink':
+            return round(frequency * (1.0 - range_velocity / C))
+        return round(frequency * (1.0 + range_velocity / C))
+
+    def run(self):
+        while not self._shutdown.is_set():
+            self.stats.loop()
+            if not self.active_func():
+                # Written again in full once tracking resumes
+                self.rig_frequency = None
+            else:
+                target = self._doppler_frequency()
+                if target is not None and (self.rig_frequency is None or abs(target - self.rig_frequency) > self.threshold):
+                    started = time.perf_counter()
+                    if self.rig.setFrequency(str(target)):
+                        self.stats.command(time.perf_counter() - started)
+                        self.rig_frequency = target
+                    else:
+                        self.stats.error()
+                        self.rig_frequency = None
+                        logging.warning(f"Station rig {self.stats.name}: setting {target} Hz failed")
+                        self._shutdown.wait(1.0)
+            self._shutdown.wait(self.interval)
+        try:
+            self.rig.close()
+        except Exception as e:
+            logging.debug(f"Error closing station rig {self.stats.name}: {e}")
+
+
+class StationRotator:
+    """Additional rotator: its RotatorIO, and a RotatorThread while tracking"""
+
+    def __init__(self, name, io, service, key, min_elevation, az_park, el_park, poll_interval):
+        self.name = name
+        self.io = io
+        self.service = service
+        self.key = key
+        self.min_elevation = min_elevation
+        self.az_park = az_park
+        self.el_park = el_park
+        self.poll_interval = poll_interval
+        self.thread = None
+
+    def get_az_el(self):
+        state = self.service.state(self.key)
+        if state is None:
+            # No satellite yet, below any minimum elevation parks the rotator
+            return self.az_park, -90.0
+        return state.azimuth, state.elevation
+
+    def start(self):
+        if self.thread is None:
+            self.thread = rotator.RotatorThread(self.io, self.get_az_el, self.min_elevation,
+                                                self.az_park, self.el_park, poll_interval=self.poll_interval)
+            self.thread.name = f"RotatorThread-{self.name}"
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.thread.stop()
+            self.thread.join(timeout=2)
+            self.thread = None
+            self.io.park(self.az_park, self.el_park)
+
+    def totals(self):
+        return {'device': self.name, 'kind': 'rotator', 'loops': self.io.polls, 'commands': self.io.commands,
+                'errors': self.io.errors, 'latency_ms': round(self.io.command_latency * 1000, 1)}
+
+
+class Station:
+    """Additional devices from the [station] section and their throughput statistics"""
+
+    def __init__(self, config, engine):
+        self.engine = engine
+        self.stats_interval = config.getfloat('station', 'stats_interval', fallback=60.0)
+        self.service = OrbitalStateService(engine._make_observer, on_tick=self._on_tick)
+        self.rigs = []
+        self.rotators = []
+        self.last_report = []
+        self._last_totals = {}
+        self._last_report_time = time.monotonic()
+        self._tle_file = engine.tle_file
+
+        for name in self._names(config, 'rigs'):
+            try:
+                self.rigs.append(self._create_rig(config, name))
+            except Exception as e:
+                logging.error(f"Station rig {name} not started: {e}")
+        for name in self._names(config, 'rotators'):
+            try:
+                self.rotators.append(self._create_rotator(config, name))
+            except Exception as e:
+                logging.error(f"Station rotator {name} not started: {e}")
+
+    @staticmethod
+    def _names(config, key):
+        return [name.strip() for name in config.get('station', key, fallback='').split(',') if name.strip()]
+
+    def _satellite_key(self, section, name):
+        """Orbital state key for a device: MAIN, or the named satellite (followed from now on)"""
+        satellite = section.get('satellite', '').strip()
+        if not satellite:
+            return MAIN
+        with open(self._tle_file, 'r') as f:
+            data = f.readlines()
+        for index, line in enumerate(data):
+            if line.strip() == satellite and index + 2 < len(data):
+                self.service.follow(satellite, satellite, data[index:index + 3])
+                return satellite
+        raise ValueError(f"no TLE for satellite {satellite} in {self._tle_file}")
+
+    def _create_rig(self, config, name):
+        section = config[f'rig:{name}']
+        role = section.get('role', 'downlink').strip().lower()
+        if role not in RIG_ROLES:
+            raise ValueError(f"role must be one of {', '.join(RIG_ROLES)}")
+        key = self._satellite_key(section, name)
+        if key == MAIN:
+            sat = self.engine.satellite
+            if role == 'downlink':
+                frequency_func = lambda: sat.F + sat.F_cal
+            else:
+                frequency_func = lambda: sat.I
+        else:
+            frequency = section.getfloat('frequency', fallback=0.0)
+            if frequency <= 0:
+                raise ValueError(f"a rig on {key} needs its {role} frequency (Hz)")
+            frequency_func = lambda: frequency
+        radio = section.get('radio', '9700').strip()
+        rig = icom.icom(section.get('serialport'), section.get('baudrate', '19200'),
+                        int(section.get('cviaddress', '60'), 16), radio)
+        session = self.engine.tracking_session
+        return RigTracker(name, rig, self.service, key, role, frequency_func,
+                          lambda: session.active and not session.paused,
+                          threshold=section.getint('threshold', fallback=50),
+                          interval=section.getfloat('interval', fallback=0.1))
+
+    def _create_rotator(self, config, name):
+        section = config[f'rotator:{name}']
+        axes = section.get('axes', 'azel').strip().lower()
+        if axes not in ROTATOR_AXES:
+            raise ValueError(f"axes must be one of {', '.join(ROTATOR_AXES)}")
+        key = self._satellite_key(section, name)
+        az_park = section.getint('az_park', fallback=0)
+        el_park = section.getint('el_park', fallback=0)
+        backend = rotator.create_backend(
+            section.get('backend', 'gs232').strip().lower(),
+            serial_port=section.get('serial_port', fallback='COM4'),
+            baudrate=section.getint('baudrate', fallback=4800),
+            host=section.get('rotctld_host', fallback='localhost'),
+            port=section.getint('rotctld_port', fallback=4533),
+            az_min=section.getint('az_min', fallback=0),
+            az_max=section.getint('az_max', fallback=450),
+            el_min=section.getint('el_min', fallback=0),
+            el_max=section.getint('el_max', fallback=180)
+        )
+        if axes != 'azel':
+            backend = rotator.SingleAxisRotator(backend, axes, fixed_az=az_park, fixed_el=el_park)
+        io = rotator.RotatorIO(backend, poll_interval=section.getfloat('poll_interval', fallback=1.0),
+                               name=f"RotatorIO-{name}")
+        io.start()
+        return StationRotator(name, io, self.service, key, section.getint('min_elevation', fallback=5),
+                              az_park, el_park, poll_interval=1.0)
+
+    def __bool__(self):
+        return bool(self.rigs or self.rotators)
+
+    ### Lifecycle, driven by the engine
+
+    def start(self):
+        self.service.start()
+        for tracker in self.rigs:
+            tracker.start()
+
+    def follow_main_satellite(self, name, tle_lines):
+        # Without station devices nobody reads it, the engine computes the main satellite itself
+        if self:
+            self.service.follow(MAIN, name, tle_lines)
+
+    def start_rotators(self):
+        for station_rotator in self.rotators:
+            station_rotator.start()
+
+    def stop_rotators(self):
+        for station_rotator in self.rotators:
+            station_rotator.stop()
+
+    def shutdown(self):
+        self.stop_rotators()
+        for tracker in self.rigs:
+            tracker.stop()
+        for station_rotator in self.rotators:
+            station_rotator.io.close()
+        self.service.stop()
+
+    ### Throughput statistics
+
+    def totals(self):
+        """Counters of every device since startup, the main rig and rotator first"""
+        rig = self.engine.rig
+        writes = getattr(rig, 'frequency_writes', 0)
+        totals = [{'device': 'main', 'kind': 'rig', 'loops': self.engine.rig_stats.loops, 'commands': writes,
+                   'errors': self.engine.rig_stats.errors,
+                   'latency_ms': round(1000 * getattr(rig, 'frequency_write_time', 0.0) / writes, 1) if writes else 0.0}]
+        main_rotator = self.engine.rotator
+        if main_rotator:
+            totals.append({'device': 'main', 'kind': 'rotator', 'loops': main_rotator.polls,
+                           'commands': main_rotator.commands, 'errors': main_rotator.errors,
+                           'latency_ms': round(main_rotator.command_latency * 1000, 1)})
+        totals.extend(tracker.stats.totals() for tracker in self.rigs)
+        totals.extend(station_rotator.totals() for station_rotator in self.rotators)
+        return totals
+
+    def report(self):
+        """Rates per device since the previous report, logged and kept in last_report"""
+        now = time.monotonic()
+        elapsed = max(1e-6, now - self._last_report_time)
+        self._last_report_time = now
+        report = []
+        for totals in self.totals():
+            ident = (totals['kind'], totals['device'])
+            previous = self._last_totals.get(ident, {})
+            self._last_totals[ident] = totals
+            entry = dict(totals)
+            # Counters start over when a rig is reconnected
+            entry['loops_per_s'] = round(max(0, totals['loops'] - previous.get('loops', 0)) / elapsed, 1)
+            entry['commands_per_s'] = round(max(0, totals['commands'] - previous.get('commands', 0)) / elapsed, 2)
+            report.append(entry)
+        self.last_report = report
+        logging.info("Station throughput: " + ", ".join(
+            f"{e['kind']} {e['device']} {e['loops_per_s']}/s updates {e['commands_per_s']}/s commands "
+            f"{e['latency_ms']} ms {e['errors']} errors" for e in report))
+        return report
+
+    def _on_tick(self):
+        if self.stats_interval > 0 and time.monotonic() - self._last_report_time >= self.stats_interval:
+            self.report()
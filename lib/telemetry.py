@@ -0,0 +1,162 @@
+"""
+Telemetry snapshot published by the tracking engine.
+
+The orbit thread builds a new TelemetrySnapshot after every tick and after
+each state change, then swaps it into TrackingEngine.telemetry with a single
+attribute assignment. Readers on any thread (GUI timer, web API, remote
+client) take the reference once and read plain values from it, without
+locks and without touching the engine's mutable state.
+
+TelemetryStream turns successive snapshots into numbered deltas for the web
+API: each frame holds only the fields that changed, and a client that sees
+a gap in the sequence numbers asks for a keyframe with the whole state.
+Deltas name the fields by their index in the keyframe's field list, during
+a pass most of a frame would otherwise be field names.
+"""
+
+import threading
+import time
+
+# Decimal places of float fields in the telemetry stream. A field is sent
+# again only when it changed at this resolution, finer than the GUI shows it.
+STREAM_DIGITS = {
+    'sat_azimuth': 2, 'sat_elevation': 2, 'sat_height': 0,
+    'down_doppler_rate': 0, 'up_doppler_rate': 0,
+    'rotator_azimuth': 1, 'rotator_elevation': 1,
+}
+
+
+class TelemetrySnapshot:
+    """Immutable view of the tracking state at one point in time"""
+
+    __slots__ = (
+        'timestamp',
+        'tracking', 'frequency_paused',
+        'satellite', 'transponder', 'subtone', 'rx_offset', 'afc_offset', 'afc_locked',
+        'downlink_freq', 'uplink_freq', 'downlink_mode', 'uplink_mode', 'tle_age',
+        'rig_downlink_freq', 'rig_uplink_freq',
+        'down_doppler', 'up_doppler', 'down_doppler_rate', 'up_doppler_rate',
+        'sat_azimuth', 'sat_elevation', 'sat_height', 'sat_eclipsed', 'next_event',
+        'rotator_enabled', 'rotator_azimuth', 'rotator_elevation',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.pop(name, None))
+        if values:
+            raise TypeError(f"Unknown telemetry fields: {', '.join(values)}")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TelemetrySnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("TelemetrySnapshot is immutable")
+
+    def __repr__(self):
+        return f"TelemetrySnapshot(satellite={self.satellite!r}, tracking={self.tracking}, el={self.sat_elevation})"
+
+    def replace(self, **changes):
+        """Copy of this snapshot with some fields changed"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return TelemetrySnapshot(**values)
+
+    def age(self):
+        """Seconds since the snapshot was taken"""
+        return time.time() - self.timestamp
+
+    def to_stream(self):
+        """Flat dict of the fields for the telemetry stream, floats rounded to STREAM_DIGITS"""
+        values = {}
+        for name in self.__slots__[1:]:
+            value = getattr(self, name)
+            if isinstance(value, float):
+                value = round(value, STREAM_DIGITS.get(name, 3))
+            values[name] = value
+        return values
+
+    def to_status(self):
+        """Status dict in the format the web and remote clients expect"""
+        status = {
+            'tracking': self.tracking,
+            'satellite': self.satellite,
+            'transponder': self.transponder,
+            'rx_offset': self.rx_offset,
+            'subtone': self.subtone
+        }
+        if self.afc_locked is not None:
+            status['afc'] = {'locked': self.afc_locked, 'offset': self.afc_offset}
+        if self.satellite:
+            status['satellite_info'] = {
+                'name': self.satellite,
+                'downlink_freq': self.downlink_freq,
+                'uplink_freq': self.uplink_freq,
+                'downlink_mode': self.downlink_mode,
+                'uplink_mode': self.uplink_mode,
+                'tle_age': self.tle_age
+            }
+            # Same formatting as the GUI labels
+            status['satellite_position'] = {
+                'elevation': format(self.sat_elevation, '.2f') + " °",
+                'azimuth': format(self.sat_azimuth, '.2f') + " °"
+            }
+            status['doppler'] = {
+                'downlink': '{:,}'.format(self.down_doppler) + " Hz",
+                'uplink': '{:,}'.format(self.up_doppler) + " Hz"
+            }
+        status['rotator_enabled'] = self.rotator_enabled
+        if self.rotator_enabled:
+            if self.rotator_azimuth is not None and self.rotator_elevation is not None:
+                status['rotator'] = {'azimuth': f"{self.rotator_azimuth:.1f}", 'elevation': f"{self.rotator_elevation:.1f}"}
+            else:
+                status['rotator'] = {'azimuth': 'error', 'elevation': 'error'}
+        else:
+            status['rotator'] = {'azimuth': 'Disabled', 'elevation': 'Disabled'}
+        return status
+
+
+class TelemetryStream:
+    """Numbered deltas between successive snapshots
+
+    update() returns a frame {'seq', 'time', 'changes': [index, value, ...]}
+    with the fields that changed since the previous frame and increments seq,
+    or None when nothing changed. keyframe() returns the whole state as of the
+    last frame under the same seq, {'seq', 'time', 'full': True, 'fields',
+    'values'}, so a client can apply the frames after it. fields limits the
+    stream to some of the snapshot's fields.
+    """
+
+    FIELDS = TelemetrySnapshot.__slots__[1:]
+
+    def __init__(self, fields=None):
+        self._lock = threading.Lock()
+        self.fields = tuple(fields) if fields else self.FIELDS
+        self.seq = 0
+        self.time = None
+        self.state = [None] * len(self.fields)
+
+    def update(self, snapshot, values=None):
+        """values: snapshot.to_stream() when the caller already has it"""
+        values = values or snapshot.to_stream()
+        with self._lock:
+            changes = []
+            for index, name in enumerate(self.fields):
+                value = values[name]
+                if self.state[index] != value or self.seq == 0:
+                    self.state[index] = value
+                    changes += (index, value)
+            if not changes:
+                return None
+            self.seq += 1
+            self.time = round(snapshot.timestamp, 3)
+            return {'seq': self.seq, 'time': self.time, 'changes': changes}
+
+    def keyframe(self):
+        with self._lock:
+            return {'seq': self.seq, 'time': self.time, 'full': True,
+                    'fields': list(self.fields), 'values': list(self.state)}
+
+    def heartbeat(self):
+        """Empty frame under the current seq, tells idle clients the stream is alive and whether they missed one"""
+        with self._lock:
+            return {'seq': self.seq, 'time': round(time.time(), 3), 'changes': []}
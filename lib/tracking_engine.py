@@ -0,0 +1,1406 @@
+"""
+Tracking engine for QTrigdoppler.
+
+Everything that actually tracks a satellite lives here: satellite/transponder
+selection, the rig and its supervisor, the Doppler worker, the orbital
+computation that used to run in the GUI's 200 ms label timer, the rotator,
+the pass recorder, Cloudlog and the additional devices of station mode
+(lib/station.py). Nothing in this module imports Qt, so the same engine runs
+behind the GUI and in the headless daemon (--headless).
+
+Front ends talk to the engine through its public methods, which may be called
+from any thread, and learn about changes through add_listener(). Listeners
+are called with (event, value) from the thread that caused the change:
+
+    'satellite'        satellite name
+    'transponder'      transponder name
+    'subtone'          subtone name
+    'rx_offset'        RX offset in Hz
+    'tracking'         True/False
+    'frequency_pause'  True/False
+    'pass_analysis'    summary dict of a finished post-pass analysis
+    'afc'              True/False when the beacon AFC locks or loses the beacon
+    'recording'        stats dict of a finished pass recording, once it is in the catalog
+    'catalog_scan'     stats dict of a finished background rescan of the recordings, None if it failed
+
+Readers that only need the current values use the TelemetrySnapshot in
+engine.telemetry, which is replaced after every orbit tick and state change.
+"""
+
+import os
+import threading
+import time
+import sys
+import re
+import math
+import logging
+import ephem
+from time import gmtime, strftime
+from datetime import datetime, timezone
+from lib import icom
+from lib import rotator
+from lib import rotator_planner
+from lib.sat_utils import *
+from lib.tracking_session import TrackingSession, SHUTDOWN_TIME_TARGET
+from lib.rig_supervisor import RigSupervisor
+from lib.audio_devices import AudioDeviceRegistry
+from lib.recording_catalog import RecordingCatalog
+from lib.logbook_connector import CloudlogWorker
+from lib.telemetry import TelemetrySnapshot
+from lib.station import Station, DeviceStats
+
+SUBTONE_LIST = ["None", "67 Hz", "71.9 Hz", "74.4 Hz", "141.3 Hz"]
+FM_UPDATE_TIME = 0.3         # seconds between FM doppler updates
+ORBIT_TICK_INTERVAL = 0.2    # seconds between orbital computations (the former GUI label timer)
+NEXT_EVENT_INTERVAL = 1.0    # seconds between AOS/LOS countdown updates
+
+
+class Satellite:
+    name = ""
+    noradid = 0
+    amsatname= ""
+    downmode = ""
+    upmode = ""
+    mode = ""
+    F = 0
+    F_init = 0
+    F_cal = 0
+    I = 0
+    I_init = 0
+    I_cal = 0
+    new_cal = 0
+    down_doppler = 0
+    down_doppler_old = 0
+    down_doppler_rate = 0
+    up_doppler = 0
+    up_doppler_old = 0
+    up_doppler_rate = 0
+    tledata = ""
+    tle_lines = ()
+    tle_age = "-1"
+    rig_satmode = 0
+    F_RIG = 0.0
+    I_RIG = 0.0
+
+
+class TrackingEngine:
+    """Satellite tracking without any user interface"""
+
+    def __init__(self, config):
+        self.config = config
+        # Enabling/disabling the rotator needs a restart, the other rotator settings are reloaded
+        self.rotator_enabled = config.getboolean('rotator', 'enabled', fallback=False)
+        self.load_settings(config)
+
+        # The satellite object is never replaced, front ends may keep a reference to it
+        self.satellite = Satellite()
+        self.transponder_name = None
+        self.transponders = []
+        self.subtone = SUBTONE_LIST[0]
+        self.rx_offset = 0
+        self.afc_offset = 0  # beacon AFC correction, F_cal = rx_offset + afc_offset
+        self.interactive = False  # read user vfo/dial input - disable for inband packet
+        self.rx_tpx_only = False
+        self.doppler_thres = 0
+
+        # Orbital state, updated by the orbit thread every ORBIT_TICK_INTERVAL
+        self.sat_azimuth = 0.0
+        self.sat_elevation = 0.0
+        self.sat_height = 0.0
+        self.sat_eclipsed = False
+        self.next_event = ""
+
+        # Each thread computes with its own observer, ephem observers are not thread safe
+        self.observer = self._make_observer()
+        self._tick_observer = self._make_observer()
+        self._event_observer = self._make_observer()
+
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._shutdown = threading.Event()
+        self._orbit_thread = None
+        self._doppler_thread = None
+        self._satellite_list = None
+        self._transponder_lists = {}  # satellite name -> transponder names from the SQF file
+        self._last_cloudlog_F = None
+        self._last_cloudlog_I = None
+
+        # Tracking on/off, frequency pause and commands for the doppler worker
+        self.tracking_session = TrackingSession()
+
+        # Only the supervisor thread reopens the serial port, with backoff, after a failure
+        self.rig = self._create_rig(self.rig_serial_port)
+        self.rig_supervisor = RigSupervisor(self._create_rig, self.rig_serial_port, on_rig_changed=self._on_rig_reconnected)
+        self.rig_supervisor.attach(self.rig)
+
+        # Rotator integration
+        self.rotator = None
+        self.rotator_thread = None
+        self.rotator_slew_model = None
+        self.rotator_error = None
+        self.rotator_position = (None, None)
+        if self.rotator_enabled:
+            try:
+                backend = rotator.create_backend(
+                    self.rotator_backend,
+                    serial_port=self.rotator_serial_port,
+                    baudrate=self.rotator_baudrate,
+                    host=self.rotator_rotctld_host,
+                    port=self.rotator_rotctld_port,
+                    az_min=self.rotator_az_min,
+                    az_max=self.rotator_az_max,
+                    el_min=self.rotator_el_min,
+                    el_max=self.rotator_el_max
+                )
+                # Only the RotatorIO thread talks to the controller, everyone else reads its position cache
+                self.rotator = rotator.RotatorIO(backend, poll_interval=self.rotator_poll_interval,
+                                                 on_position=self._on_rotator_position)
+                self.rotator_position = self.rotator.get_position()
+                self.rotator.start()
+            except Exception as e:
+                self.rotator_error = f"Rotator init failed: {e}"
+                logging.error(self.rotator_error)
+                self.rotator = None
+
+        # Probed once, shared by the pass recorder and the GUI level monitor
+        self.audio_devices = AudioDeviceRegistry()
+        # One input stream per sound card, the recorder, the AFC and the level monitor subscribe to it
+        self.audio_capture = None
+        self.pass_recorder = None
+        self.pass_analyzer = None
+        self.beacon_afc = None
+        self._load_audio_features(config)
+        # Index of everything in save_dir, see lib/recording_catalog.py
+        self.recording_catalog = self._open_catalog(config)
+        self._catalog_scan_thread = None
+        self._catalog_scan_lock = threading.Lock()
+        self._catalog_rescan_pending = False
+
+        # Additional rigs and rotators from [station], each with its own tracker thread
+        self.rig_stats = DeviceStats('main', 'rig')
+        self.station = Station(config, self)
+
+        # Swapped as a whole, readers never see a half updated snapshot
+        self._telemetry_lock = threading.Lock()
+        self.telemetry = None
+        self.publish_telemetry()
+
+    def load_settings(self, config):
+        """(Re)read the engine settings, called again after the GUI stored new settings"""
+        self.latitude = config.get('qth', 'latitude', fallback=0.0)
+        self.longitude = config.get('qth', 'longitude', fallback=0.0)
+        self.altitude = config.getfloat('qth', 'altitude', fallback=0.0)
+        self.max_offset_rx = config.getint('qth', 'max_offset_rx', fallback=5000)
+        self.tle_file = config.get('satellite', 'tle_file')
+        self.sqf_file = config.get('satellite', 'sqffile')
+        self.doppler_thres_fm = int(config.get('satellite', 'doppler_threshold_fm', fallback=200))
+        self.doppler_thres_linear = int(config.get('satellite', 'doppler_threshold_linear', fallback=20))
+        self.predictive_doppler = config.getboolean('satellite', 'predictive_doppler', fallback=True)
+        self.radio = config.get('icom', 'radio')
+        self.rig_type = config.get('icom', 'rig_type')
+        self.rig_serial_port = config.get('icom', 'serialport')
+        self.opmode = config.get('icom', 'fullmode') == "True"
+
+        self.rotator_backend = config.get('rotator', 'backend', fallback='gs232').strip().lower()
+        self.rotator_serial_port = config.get('rotator', 'serial_port', fallback='COM4')
+        self.rotator_baudrate = config.getint('rotator', 'baudrate', fallback=4800)
+        self.rotator_rotctld_host = config.get('rotator', 'rotctld_host', fallback='localhost')
+        self.rotator_rotctld_port = config.getint('rotator', 'rotctld_port', fallback=4533)
+        self.rotator_az_park = config.getint('rotator', 'az_park', fallback=0)
+        self.rotator_el_park = config.getint('rotator', 'el_park', fallback=0)
+        self.rotator_az_min = config.getint('rotator', 'az_min', fallback=0)
+        self.rotator_az_max = config.getint('rotator', 'az_max', fallback=450)
+        self.rotator_el_min = config.getint('rotator', 'el_min', fallback=0)
+        self.rotator_el_max = config.getint('rotator', 'el_max', fallback=180)
+        self.rotator_min_elevation = config.getint('rotator', 'min_elevation', fallback=5)
+        self.rotator_poll_interval = config.getfloat('rotator', 'poll_interval', fallback=1.0)
+        if getattr(self, 'rotator', None):
+            self.rotator.poll_interval = self.rotator_poll_interval
+        self.rotator_pass_planner = config.getboolean('rotator', 'pass_planner', fallback=True)
+        self.rotator_az_slew_rate = config.getfloat('rotator', 'az_slew_rate', fallback=6.0)
+        self.rotator_el_slew_rate = config.getfloat('rotator', 'el_slew_rate', fallback=2.7)
+        self.rotator_beamwidth = config.getfloat('rotator', 'beamwidth', fallback=20.0)
+
+        self.cloudlog_enabled = config.getboolean('Cloudlog', 'enabled', fallback=False)
+        self.cloudlog_api_key = config.get('Cloudlog', 'api_key', fallback=None)
+        self.cloudlog_url = config.get('Cloudlog', 'url', fallback=None)
+
+        # Settings that take effect without a restart
+        if hasattr(self, 'rig_supervisor'):
+            self.rig_supervisor.set_port(self.rig_serial_port)
+        if hasattr(self, 'pass_recorder'):
+            self._load_audio_features(config)
+            # Another save_dir has its own catalog
+            save_dir = os.path.abspath(config.get('passrecording', 'save_dir', fallback='./recordings'))
+            if self.recording_catalog is None or self.recording_catalog.save_dir != save_dir:
+                if self.recording_catalog is not None:
+                    self.recording_catalog.close()
+                self.recording_catalog = self._open_catalog(config)
+                self.rescan_recordings()
+        self._satellite_list = None
+        self._transponder_lists = {}
+
+    def _load_audio_features(self, config):
+        """Build what config enables of the audio features, they import numpy and stay unloaded while disabled"""
+        if self.pass_recorder is not None:
+            self.pass_recorder.update_config(config)
+        elif config.getboolean('passrecording', 'enabled', fallback=False):
+            from lib.pass_recorder import PassRecorder
+            self.pass_recorder = PassRecorder(config, self.audio_devices, self.get_audio_capture(),
+                                              telemetry=lambda: self.telemetry)
+            self.pass_recorder.on_recording_finished = self._on_recording_finished
+            # Switched on from the settings while tracking
+            if self.tracking_session.active:
+                self.pass_recorder.set_tracking_active(True)
+        if self.pass_analyzer is not None:
+            self.pass_analyzer.load_config(config)
+        elif config.getboolean('passrecording', 'analysis', fallback=False):
+            # Finished recordings are analysed in worker processes, see lib/pass_analysis.py
+            from lib.pass_analysis import PassAnalyzer
+            self.pass_analyzer = PassAnalyzer(config, on_result=self._on_pass_analysis)
+        if self.beacon_afc is not None:
+            self.beacon_afc.update_config(config)
+        elif config.getboolean('afc', 'enabled', fallback=False):
+            # Pulls the downlink onto a known beacon from the same sound card, see lib/beacon_afc.py
+            from lib.beacon_afc import BeaconAFC
+            self.beacon_afc = BeaconAFC(config, self.audio_devices, self.get_audio_capture(), apply=self._apply_afc_offset,
+                                        sideband=lambda: self.satellite.downmode,
+                                        on_lock=lambda locked: self._notify('afc', locked))
+
+    def get_audio_capture(self):
+        """The capture engine shared by the recorder, the AFC and the GUI level monitor, built on first use"""
+        if self.audio_capture is None:
+            from lib.audio_capture import AudioCapture
+            self.audio_capture = AudioCapture(self.audio_devices)
+        return self.audio_capture
+
+    def _make_observer(self):
+        observer = ephem.Observer()
+        observer.lon = self.longitude
+        observer.lat = self.latitude
+        observer.elevation = self.altitude
+        return observer
+
+    ### Lifecycle
+
+    def start(self):
+        """Start the background threads, call once the front end has registered its listeners"""
+        self.rig_supervisor.start()
+        self._orbit_thread = threading.Thread(target=self._orbit_loop, name="OrbitThread", daemon=True)
+        self._orbit_thread.start()
+        self.station.start()
+        # Pick up recordings added while we were not running
+        self.rescan_recordings()
+
+    def shutdown(self):
+        """Stop tracking and release the rig, rotator and audio device"""
+        started = time.monotonic()
+        # Wake the doppler worker first so it winds down while the rest is cleaned up
+        self.tracking_session.stop()
+        self._shutdown.set()
+        if self.pass_recorder is not None:
+            self.pass_recorder.set_tracking_active(False)
+        if self.pass_analyzer is not None:
+            self.pass_analyzer.shutdown()
+        if self.beacon_afc is not None:
+            self.beacon_afc.stop()
+        if self.recording_catalog is not None:
+            self.recording_catalog.close()
+        if self.rotator_enabled:
+            self.stop_rotator_thread()
+            self.park_rotators()
+            if self.rotator:
+                self.rotator.close()
+        self.station.shutdown()
+        # The worker returns as soon as it sees the stopped session, no fixed sleep needed
+        worker = self._doppler_thread
+        if worker and worker.is_alive():
+            worker.join(max(0.0, SHUTDOWN_TIME_TARGET - (time.monotonic() - started)))
+            if worker.is_alive():
+                logging.warning("Doppler worker did not finish before shutdown")
+        self.rig_supervisor.stop()
+        try:
+            self.rig.close()
+        except Exception as e:
+            logging.debug(f"Error closing rig on shutdown: {e}")
+
+    ### Recordings
+
+    def _open_catalog(self, config):
+        if not config.getboolean('passrecording', 'catalog', fallback=True):
+            return None
+        save_dir = config.get('passrecording', 'save_dir', fallback='./recordings')
+        # Without recording there is only something to index if the directory is already there
+        if not ((self.pass_recorder is not None and self.pass_recorder.enabled) or os.path.isdir(save_dir)):
+            return None
+        try:
+            return RecordingCatalog(save_dir)
+        except Exception as e:
+            logging.error(f"Could not open the recording catalog in {save_dir}: {e}")
+            return None
+
+    def _on_recording_finished(self, filepath, stats):
+        """Called from the pass recorder's capture thread once a recording is closed"""
+        if self.recording_catalog is not None:
+            self.recording_catalog.add_recording(filepath, stats)
+        if self.pass_analyzer is not None:
+            self.pass_analyzer.submit(filepath)
+        self._notify('recording', dict(stats, path=filepath))
+
+    def _on_pass_analysis(self, summary):
+        if self.recording_catalog is not None and summary.get('path'):
+            self.recording_catalog.update_quality(summary['path'], summary)
+        self._notify('pass_analysis', summary)
+
+    def rescan_recordings(self, wait=False):
+        """Bring the catalog up to date with save_dir in the background, or wait for it; returns the stats then"""
+        if self.recording_catalog is None:
+            return None
+        if wait:
+            return self.recording_catalog.rescan(skip=[self._current_recording()])
+        with self._catalog_scan_lock:
+            if self._catalog_scan_thread is not None:
+                # The running scan goes once more, for files added since it started
+                self._catalog_rescan_pending = True
+            else:
+                self._catalog_scan_thread = threading.Thread(target=self._catalog_scan, name="CatalogScan", daemon=True)
+                self._catalog_scan_thread.start()
+        return None
+
+    def _catalog_scan(self):
+        while True:
+            stats = None
+            catalog = self.recording_catalog
+            if catalog is not None:
+                try:
+                    stats = catalog.rescan(skip=[self._current_recording()])
+                except Exception as e:
+                    # e.g. the catalog was closed for another save_dir meanwhile, that one is scanned next
+                    logging.warning(f"Recording catalog rescan failed: {e}")
+            with self._catalog_scan_lock:
+                if not self._catalog_rescan_pending:
+                    self._catalog_scan_thread = None
+                    break
+                self._catalog_rescan_pending = False
+        self._notify('catalog_scan', stats)
+
+    def _current_recording(self):
+        """File the recorder is writing, the catalog leaves it out until it is finished"""
+        return self.pass_recorder.current_filepath if self.pass_recorder is not None else None
+
+    def recorder_status(self):
+        """Pass recorder state for the web API"""
+        if self.pass_recorder is None:
+            return {'enabled': False, 'armed': False, 'recording': False, 'file': None, 'satellite': None,
+                    'start_time': None, 'max_elevation': None, 'last_recording': None}
+        return self.pass_recorder.status()
+
+    def search_recordings(self, **filters):
+        """Catalog query, see RecordingCatalog.search() for the filters"""
+        if self.recording_catalog is None:
+            return []
+        return self.recording_catalog.search(**filters)
+
+    ### Listeners
+
+    def add_listener(self, callback):
+        """Register callback(event, value), see the module docstring for the events"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify(self, event, value):
+        # Publish first so listeners reading engine.telemetry see the change
+        self.publish_telemetry()
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event, value)
+            except Exception as e:
+                logging.error(f"Error in tracking engine listener for '{event}': {e}")
+
+    ### Rig
+
+    def _create_rig(self, port):
+        """Open the configured Icom radio on the given serial port"""
+        if self.radio == '9700':
+            return icom.icom(port, '19200', 96, '9700')
+        elif self.radio == '910':
+            return icom.icom(port, '19200', 96, '910')
+
+    def rig_connected(self):
+        return self.rig.is_connected()
+
+    def _on_rig_reconnected(self, rig):
+        """Called from the rig supervisor thread once a new rig connection is up"""
+        self.rig = rig
+        # A running doppler worker adopts the new rig and restores its last frequencies
+        if self.tracking_session.active:
+            self.tracking_session.post('rig')
+
+    ### Satellite database
+
+    def satellite_list(self):
+        """Sorted, de-duplicated satellite names from the SQF file (cached, read without the lock once loaded)"""
+        satlist = self._satellite_list
+        if satlist is None:
+            with self._lock:
+                if self._satellite_list is None:
+                    self._satellite_list = self._read_satellite_list()
+                satlist = self._satellite_list
+        return list(satlist)
+
+    def reload_satellite_list(self):
+        """Drop the caches after the SQF file was updated"""
+        with self._lock:
+            self._satellite_list = None
+            self._transponder_lists = {}
+        return self.satellite_list()
+
+    def _read_satellite_list(self):
+        satlist = []
+        try:
+            with open(self.sqf_file, 'r') as h:
+                for line in h:
+                    # Skip comment lines
+                    if line.strip().startswith(';'):
+                        continue
+                    if ',' in line:
+                        newitem = str(line.split(",")[0].strip())
+                        if newitem:
+                            satlist.append(newitem)
+        except IOError as e:
+            logging.error(f"Error reading SQFFile: {e}")
+        satlist = list(dict.fromkeys(satlist))  # Deduplicate
+
+        def sat_sort_key(name):
+            match = re.match(r"([A-Za-z]+)-(\d+)", name)
+            if match:
+                prefix, num = match.groups()
+                return (prefix, int(num))
+            return (name, 0)
+        satlist.sort(key=sat_sort_key)
+        return satlist
+
+    def transponder_list(self, satname):
+        """Transponder names of a satellite in SQF file order (cached until the SQF file is reloaded)"""
+        tpxlist = self._transponder_lists.get(satname)
+        if tpxlist is None:
+            tpxlist = self._read_transponder_list(satname)
+            if tpxlist:  # Unknown names are not kept, clients can send anything
+                self._transponder_lists[satname] = tpxlist
+        return list(tpxlist)
+
+    def _read_transponder_list(self, satname):
+        tpxlist = []
+        try:
+            with open(self.sqf_file, 'r') as h:
+                for line in h:
+                    if line.strip().startswith(';'):
+                        continue
+                    parts = line.strip().split(',')
+                    if len(parts) > 8 and parts[0].strip() == satname:
+                        tpx = parts[8].strip()
+                        if tpx:
+                            tpxlist.append(tpx)
+        except IOError as e:
+            logging.error(f"Error reading SQFFile: {e}")
+        return list(dict.fromkeys(tpxlist))
+
+    ### Selection
+
+    def select_satellite(self, satname):
+        """Select a satellite and its first transponder, returns the transponder names"""
+        with self._lock:
+            self.satellite.name = satname
+            self.transponders = self.transponder_list(satname)
+            transponders = list(self.transponders)
+        self._notify('satellite', satname)
+        if transponders:
+            self.select_transponder(transponders[0])
+        return transponders
+
+    def select_transponder(self, tpxname):
+        """Load frequencies, modes, the stored RX offset and the TLE for a transponder"""
+        logging.debug(f"select_transponder called with transponder: {tpxname}")
+        sat = self.satellite
+        with self._lock:
+            self.transponder_name = tpxname
+            try:
+                with open(self.sqf_file, 'r') as h:
+                    found_match = False
+                    for lineb in h:
+                        if lineb.startswith(";") == 0:
+                            parts = lineb.split(",")
+                            if len(parts) > 8 and parts[8].strip() == tpxname and parts[0].strip() == sat.name:
+                                found_match = True
+                                logging.debug(f"Found matching transponder in SQFILE: {tpxname} for satellite {sat.name}")
+                                sat.F = sat.F_init = float(parts[1].strip())*1000
+                                sat.F_RIG = sat.F + sat.F_cal
+                                sat.I = sat.I_init = float(parts[2].strip())*1000
+                                sat.I_RIG = sat.I + sat.I_cal
+                                sat.downmode = parts[3].strip()
+                                sat.upmode = parts[4].strip()
+                                sat.mode = parts[5].strip()
+                                #  check if frequencies are in the same band: e.g. U/U, V/V vs V/U, U/V
+                                if abs(sat.F - sat.I) > 10000000:
+                                    sat.rig_satmode = 1
+                                else:
+                                    sat.rig_satmode = 0
+                                if sat.F > 0 and sat.I == 0:
+                                    self.rx_tpx_only = True
+                                    sat.rig_satmode = 0
+                                else:
+                                    self.rx_tpx_only = False
+                                break
+                    if not found_match:
+                        logging.info(f"Warning: No matching entry found for transponder: {tpxname} and satellite: {sat.name}")
+            except IOError as e:
+                logging.error(f"IO Error when processing transponder change: {e}")
+
+            # Stored offset profile for this satellite+transponder, otherwise no offset
+            offset = 0
+            for tpx in self.offset_profiles():
+                if len(tpx) >= 3 and tpx[0] == sat.name and tpx[1] == tpxname:
+                    usrrxoffset = int(tpx[2])
+                    logging.debug(f"Found user offset for this satellite+transponder: {usrrxoffset}")
+                    if -self.max_offset_rx < usrrxoffset < self.max_offset_rx:
+                        offset = usrrxoffset
+                    else:
+                        logging.debug(f"User offset {usrrxoffset} outside allowed range [-{self.max_offset_rx}, {self.max_offset_rx}]")
+            # The AFC correction belonged to the previous transponder
+            if getattr(self, 'beacon_afc', None) is not None:
+                self.beacon_afc.reset()
+            self.afc_offset = 0
+            self._apply_rx_offset(offset)
+
+            sat.tledata = ""
+            sat.tle_lines = ()
+            try:
+                with open(self.tle_file, 'r') as f:
+                    data = f.readlines()
+                for index, line in enumerate(data):
+                    if str(sat.name) in line:
+                        logging.debug(f"Found TLE data for satellite: {sat.name}")
+                        sat.tledata = ephem.readtle(data[index], data[index+1], data[index+2])
+                        sat.tle_lines = (data[index], data[index+1], data[index+2])
+                        day_of_year = datetime.now().timetuple().tm_yday
+                        tleage = int(data[index+1][20:23])
+                        sat.tle_age = day_of_year - tleage
+                        break
+                else:
+                    logging.warning(f"Warning: No TLE data found for satellite: {sat.name}")
+            except IOError as e:
+                logging.error(f"IO Error when reading TLE file: {e}")
+
+        self._notify('rx_offset', offset)
+        self.station.follow_main_satellite(sat.name, sat.tle_lines)
+        # A pass plan made for the previous satellite is useless now
+        if self.rotator_thread:
+            self.rotator_thread.invalidate_plan()
+        if sat.tledata == "":
+            logging.info("TLE data is empty, tracking is not possible")
+            self._notify('transponder', tpxname)
+            return
+
+        # Send to Cloudlog in background after updating satellite/transponder info
+        self.post_to_cloudlog()
+
+        # Let a running doppler worker reconfigure the rig for the new transponder
+        if self.tracking_session.active:
+            self.tracking_session.post('transponder', tpxname)
+        self._notify('transponder', tpxname)
+
+    def offset_profiles(self):
+        """Stored offsets as [satellite, transponder, rx_offset, tx_offset] lists"""
+        if not self.config.has_section('offset_profiles'):
+            return []
+        # Format SATNAME,TRANSPONDER,RXoffset,TXoffset
+        return [value.split(',') for (key, value) in self.config.items('offset_profiles')]
+
+    def can_track(self):
+        """True once a transponder with a downlink frequency and TLE data is selected"""
+        return self.satellite.F != 0 and self.satellite.tledata != ""
+
+    def set_subtone(self, tone_name):
+        self.subtone = tone_name
+        # While tracking the doppler worker owns the rig, so it applies the tone between two updates
+        if self.tracking_session.active:
+            self.tracking_session.post('tone', tone_name)
+        else:
+            try:
+                self.apply_subtone(tone_name)
+            except Exception as e:
+                logging.error(f"Error setting subtone: {e}")
+        self._notify('subtone', tone_name)
+
+    def set_rx_offset(self, offset):
+        """Set the RX offset in Hz, values outside +/- max_offset_rx are rejected"""
+        offset = int(offset)
+        if not -self.max_offset_rx <= offset <= self.max_offset_rx:
+            logging.warning(f"RX offset {offset} outside allowed range [-{self.max_offset_rx}, {self.max_offset_rx}]")
+            return False
+        with self._lock:
+            if offset == self.rx_offset:
+                return True
+            self._apply_rx_offset(offset)
+        # Wake the doppler worker so the new offset is applied without waiting for its next cycle
+        if self.tracking_session.active:
+            self.tracking_session.post('offset', offset)
+        self._notify('rx_offset', offset)
+        return True
+
+    def _apply_rx_offset(self, offset):
+        self.rx_offset = offset
+        self.satellite.new_cal = 1
+        self.satellite.F_cal = offset + self.afc_offset
+
+    def _apply_afc_offset(self, correction):
+        """Called from the AFC thread with its new correction in Hz"""
+        with self._lock:
+            self.afc_offset = correction
+            self.satellite.new_cal = 1
+            self.satellite.F_cal = self.rx_offset + correction
+        # Same wake-up as a manual offset change, the worker recalculates at once
+        if self.tracking_session.active:
+            self.tracking_session.post('offset', self.rx_offset)
+
+    def sync_to_memory(self):
+        """Reset the satellite frequencies to the SQF values (Memory to VFO)"""
+        self.satellite.F = self.satellite.F_init
+        self.satellite.I = self.satellite.I_init
+
+    ### Tracking
+
+    def start_tracking(self):
+        with self._lock:
+            if self.tracking_session.active:
+                logging.warning("Tracking already active")
+                return False
+            if not self.can_track():
+                logging.warning("Cannot start tracking, no transponder with TLE data selected")
+                return False
+            self.tracking_session.start()
+            self._doppler_thread = threading.Thread(target=self.calc_doppler, name="DopplerWorker", daemon=True)
+            self._doppler_thread.start()
+        # Set pass recorder to active tracking state
+        if self.pass_recorder is not None:
+            self.pass_recorder.set_tracking_active(True)
+        if self.beacon_afc is not None:
+            self.beacon_afc.start()
+        # Start rotator thread
+        if self.rotator_enabled:
+            self.start_rotator_thread()
+        self.station.start_rotators()
+        self._notify('tracking', True)
+        return True
+
+    def stop_tracking(self):
+        # Wakes the doppler worker immediately, also resets the frequency pause state
+        self.tracking_session.stop()
+        self.interactive = False
+        # Set pass recorder to inactive tracking state
+        if self.pass_recorder is not None:
+            self.pass_recorder.set_tracking_active(False)
+        if self.beacon_afc is not None:
+            self.beacon_afc.stop()
+        # Stop rotator thread and park
+        if self.rotator_enabled:
+            self.stop_rotator_thread()
+            self.park_rotators()
+        self.station.stop_rotators()
+        self._notify('tracking', False)
+
+    def pause_frequency_updates(self):
+        """Pause frequency updates while keeping rotator tracking active"""
+        self.tracking_session.set_paused(True)
+        logging.info("Frequency updates paused - rotator tracking continues")
+        self._notify('frequency_pause', True)
+
+    def resume_frequency_updates(self):
+        self.tracking_session.set_paused(False)
+        logging.info("Frequency updates resumed")
+        self._notify('frequency_pause', False)
+
+    def toggle_frequency_updates(self):
+        if self.tracking_session.paused:
+            self.resume_frequency_updates()
+        else:
+            self.pause_frequency_updates()
+
+    ### Doppler worker, the only thread talking to the rig while tracking
+
+    def apply_subtone(self, tone_name):
+        """Program the selected subtone on the uplink VFO"""
+        if self.satellite.rig_satmode == 1:
+            self.rig.setVFO("Sub")
+        else:
+            self.rig.setVFO("VFOB")
+            
+        if self.rig_type == "US":
+            if tone_name == "67 Hz":
+                self.rig.setToneSQLHz(str(670))
+                self.rig.setToneSquelchOn(1)
+            elif tone_name == "71.9 Hz":
+                self.rig.setToneSQLHz(str(719))
+                self.rig.setToneSquelchOn(1)
+            elif tone_name == "74.4 Hz":
+                self.rig.setToneSQLHz(str(744))
+                self.rig.setToneSquelchOn(1)
+            elif tone_name == "141.3 Hz":
+                self.rig.setToneSQLHz(str(1413))
+                self.rig.setToneSquelchOn(1)
+            elif tone_name == "None":
+                self.rig.setToneSquelchOn(0)
+        elif self.rig_type == "EU":
+            if tone_name == "67 Hz":
+                self.rig.setToneHz(str(670))
+                self.rig.setToneOn(1)
+            elif tone_name == "71.9 Hz":
+                self.rig.setToneHz(str(719))
+                self.rig.setToneOn(1)
+            elif tone_name == "74.4 Hz":
+                self.rig.setToneHz(str(744))
+                self.rig.setToneOn(1)
+            elif tone_name == "141.3 Hz":
+                self.rig.setToneHz(str(1413))
+                self.rig.setToneOn(1)
+            elif tone_name == "None":
+                self.rig.setToneOn(0)
+
+    def setup_rig_for_tracking(self):
+        """Put the rig into the transponder's satellite/split mode and write the initial frequencies"""
+        
+        #################################
+        #       INIT RADIOS
+        #################################
+
+        if self.radio == "910" and self.satellite.rig_satmode == 0 and self.rx_tpx_only == False:
+            self.rig.setSatelliteMode(0)
+            self.rig.setSplitOn(1)
+        elif self.radio == "910" and self.satellite.rig_satmode == 0 and self.rx_tpx_only == True:
+            self.rig.setSatelliteMode(0)
+            self.rig.setSplitOn(0)
+        elif self.radio == "910" and self.satellite.rig_satmode == 1:
+            self.rig.setSatelliteMode(1)
+            self.rig.setSplitOn(0)
+        elif ( self.radio == "705" or "818" ) and self.opmode == False and self.satellite.rig_satmode == 0: #not implemented yet
+            logging.error("*** Not implemented yet mate***")
+            sys.exit()
+
+        #################################
+        #       SETUP DOWNLINK & UPLINK
+        #################################
+
+        if self.radio == "910":
+            # Testing current satmode config for V/U or U/V and swapping if needed
+            self.rig.setVFO("Main")
+            freq_str = self.rig.getFrequency()
+            try:
+                # Handle case where getFrequency returns hex error codes like 'FD'
+                if freq_str and freq_str.isdigit():
+                    curr_band = int(freq_str)
+                else:
+                    logging.warning(f"ICOM getFrequency returned non-numeric value: {freq_str}, skipping band check")
+                    curr_band = 0  # Default value, will not trigger exchange
+            except (ValueError, TypeError) as e:
+                logging.warning(f"Error parsing ICOM frequency '{freq_str}': {e}, skipping band check")
+                curr_band = 0  # Default value, will not trigger exchange
+            
+            if curr_band > 400000000 and self.satellite.F_RIG < 400000000:
+                self.rig.setExchange()
+            elif curr_band < 200000000 and self.satellite.F_RIG > 200000000:
+                self.rig.setExchange()
+                    
+            self.doppler_thres, self.interactive = self.rig.setup_vfos(self.satellite.rig_satmode,self.satellite.downmode, self.satellite.upmode, self.doppler_thres_fm, self.doppler_thres_linear)
+            
+        elif self.radio != "910":
+            logging.error("*** Not implemented yet mate***")
+            sys.exit()
+
+        self.rig.setVFO("Main") 
+
+        date_val = strftime('%Y/%m/%d %H:%M:%S', gmtime())
+        self.observer.date = ephem.Date(date_val)
+
+        self.satellite.F_RIG = rx_dopplercalc(self.satellite.tledata, self.satellite.F, self.observer)
+        self.satellite.I_RIG = tx_dopplercalc(self.satellite.tledata, self.satellite.I, self.observer)
+        
+        if self.satellite.rig_satmode == 1:
+            self.rig.setVFO("Main")
+            if self.rig_type == "US":
+                self.rig.setToneSquelchOn(0)
+            elif self.rig_type == "EU":
+                self.rig.setToneOn(0)
+            self.rig.setFrequency(str(int(self.satellite.F_RIG)))
+            self.rig.setVFO("SUB")
+            self.rig.setFrequency(str(int(self.satellite.I_RIG)))
+        else:
+            self.rig.setVFO("VFOA")
+            if self.rig_type == "US":
+                self.rig.setToneSquelchOn(0)
+            elif self.rig_type == "EU":
+                self.rig.setToneOn(0)
+            self.rig.setFrequency(str(int(self.satellite.F_RIG)))
+            if self.rx_tpx_only == False:
+                self.rig.setVFO("VFOB")
+                self.rig.setFrequency(str(int(self.satellite.I_RIG)))
+                self.interactive = False #for SSB packet sats
+                self.rig.setVFO("VFOA")
+            else:
+                self.rig.setSplitOn(0)
+
+    def calc_doppler(self):
+        session = self.tracking_session
+        # A worker left over from a previous session must not keep running after a quick stop/start
+        generation = session.generation
+        rig_ready = False
+        
+        while session.running(generation):
+            rig = self.rig
+            try:
+                if not rig_ready:
+                    self.setup_rig_for_tracking()
+                    rig_ready = True
+                self.doppler_loop(session, generation)
+            except Exception as e:
+                self.rig_stats.error()
+                logging.critical(f"ICOM rig communication error: {e}")
+                logging.warning("Rig connection lost, waiting for the rig supervisor to reconnect...")
+                self.rig_supervisor.report_failure(rig, str(e))
+                # Stay in this worker, it resumes with the last frequencies once a new rig has been handed over
+                while session.running(generation) and self.rig is rig:
+                    session.wait(0.5, wake_on_command=False)
+        session.worker_finished()
+
+    def restore_rig_frequencies(self):
+        """Write the last doppler corrected frequencies to a reconnected rig without repeating the VFO setup"""
+        if self.satellite.rig_satmode == 1:
+            self.rig.setVFO("MAIN")
+            self.rig.setFrequency(str(int(self.satellite.F_RIG)))
+            self.rig.setVFO("SUB")
+            self.rig.setFrequency(str(int(self.satellite.I_RIG)))
+            self.rig.setVFO("MAIN")
+        else:
+            self.rig.setVFO("VFOA")
+            self.rig.setFrequency(str(int(self.satellite.F_RIG)))
+            if self.rx_tpx_only == False:
+                self.rig.setVFO("VFOB")
+                self.rig.setFrequency(str(int(self.satellite.I_RIG)))
+                self.rig.setVFO("VFOA")
+        logging.info("Resumed doppler tracking on reconnected rig")
+
+    def doppler_loop(self, session, generation):
+        
+        user_Freq = 0;
+        user_Freq_history = [0, 0, 0, 0]
+        vfo_not_moving = 0
+        vfo_not_moving_old = 0
+        ptt_state = 0
+        ptt_state_old = 0
+
+        # Ensure that initial frequencies are always written 
+        tracking_init = 1
+        last_freq_update = 0  # Track last frequency update time
+        min_freq_update_interval = 0.030  # Minimum 30ms between frequency updates (optimized for high latitude)
+
+        while session.running(generation):
+            # Apply changes queued by the GUI/web API from this thread, the only one talking to the rig
+            for command, args in session.take_commands():
+                if command == 'transponder':
+                    self.setup_rig_for_tracking()
+                    tracking_init = 1
+                elif command == 'tone':
+                    self.apply_subtone(*args)
+                    # Back to the RX VFO, the update branches below expect it selected
+                    self.rig.setVFO("Main" if self.satellite.rig_satmode == 1 else "VFOA")
+                elif command == 'rig':
+                    self.restore_rig_frequencies()
+                    tracking_init = 1
+                # 'offset' needs no action here, F_cal is already set and the wake-up recalculates at once
+            if not session.running(generation):
+                break
+            a = datetime.now()
+            #date_val = strftime('%Y/%m/%d %H:%M:%S', gmtime())
+            date_val = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M:%S.%f')[:-3]
+            self.observer.date = ephem.Date(date_val)
+
+
+            if self.interactive == True:
+                
+                # Set RX VFO as standard
+                if self.satellite.rig_satmode == 1:
+                    self.rig.setVFO("Main")
+                else:
+                    self.rig.setVFO("VFOA")
+                    
+                # read current RX
+                try:
+                    user_Freq = int(self.rig.getFrequency())
+                    updated_rx = 1
+                    user_Freq_history.pop(0)
+                    user_Freq_history.append(user_Freq)
+                except:
+                    updated_rx = 0
+                    user_Freq = 0
+                
+                vfo_not_moving_old = vfo_not_moving
+                vfo_not_moving = user_Freq_history.count(user_Freq_history[0]) == len(user_Freq_history)
+                #print("Last n frequencies: " +str(user_Freq_history) +" --> no change: " + str(vfo_not_moving))
+                # check for valid received freq and if dial is not moving (last two read frequencies are the same)
+                if user_Freq > 0 and updated_rx == 1 and vfo_not_moving and self.satellite.new_cal == 0:
+                    # check if there is an offset from the dial and move up/downlink accordingly
+                    if abs(user_Freq - self.satellite.F_RIG) > 1:
+                        if True:
+                            if user_Freq > self.satellite.F_RIG:
+                                delta_F = user_Freq - self.satellite.F_RIG
+                                if self.satellite.mode == "REV":
+                                    self.satellite.I -= delta_F
+                                    self.satellite.I_RIG -= delta_F
+                                    self.satellite.F += delta_F
+                                else:
+                                    self.satellite.I += delta_F
+                                    self.satellite.I_RIG += delta_F
+                                    self.satellite.F += delta_F
+                            else:
+                                delta_F = self.satellite.F_RIG - user_Freq
+                                if self.satellite.mode == "REV":
+                                    self.satellite.I += delta_F
+                                    self.satellite.I_RIG += delta_F
+                                    self.satellite.F -= delta_F
+                                else:
+                                    self.satellite.I -= delta_F
+                                    self.satellite.I_RIG -= delta_F
+                                    self.satellite.F -= delta_F
+                            self.satellite.F_RIG = user_Freq
+                                    
+                # check if dial isn't moving, might be skipable as later conditional check yields the same         
+                if updated_rx and vfo_not_moving and vfo_not_moving_old:#old_user_Freq == user_Freq and False:
+                    # Use predictive doppler for linear satellites if enabled, especially around TCA
+                    if self.satellite.downmode in ["USB", "LSB", "CW"] and self.predictive_doppler:
+                        # Use the new adaptive prediction algorithm - no need to pass prediction_time
+                        # The function now automatically determines optimal prediction time internally
+                        new_rx_doppler = rx_dopplercalc_predictive(self.satellite.tledata, self.satellite.F + self.satellite.F_cal, self.observer)
+                    else:
+                        # Use standard calculation for FM satellites or when predictive doppler is disabled
+                        new_rx_doppler = round(rx_dopplercalc(self.satellite.tledata, self.satellite.F + self.satellite.F_cal, self.observer))
+                        
+                    if abs(new_rx_doppler-self.satellite.F_RIG) > self.doppler_thres and not session.paused:
+                        rx_doppler = new_rx_doppler
+                        if self.satellite.rig_satmode == 1:
+                            self.rig.setVFO("Main")
+                        else:
+                            self.rig.setVFO("VFOA")
+                        
+                        self.rig.setFrequency(str(rx_doppler))
+                        self.satellite.F_RIG = rx_doppler
+                
+                    # Apply predictive correction to TX as well for linear satellites
+                    if self.satellite.upmode in ["USB", "LSB", "CW"]:
+                        # Use the new adaptive prediction algorithm - no need to pass prediction_time
+                        # The function now automatically determines optimal prediction time internally
+                        new_tx_doppler = tx_dopplercalc_predictive(self.satellite.tledata, self.satellite.I, self.observer)
+                    else:
+                        # Use standard calculation for FM satellites
+                        new_tx_doppler = round(tx_dopplercalc(self.satellite.tledata, self.satellite.I, self.observer))
+                        
+                    if abs(new_tx_doppler-self.satellite.I_RIG) > self.doppler_thres and not session.paused:
+                        tx_doppler = new_tx_doppler
+                        if self.satellite.rig_satmode == 1:
+                            self.rig.setVFO("SUB")
+                        else:
+                            self.rig.setVFO("VFOB")
+                            # Don't switch VFO when PTT is pushed, to avoid switching VFO while TX 
+                            # Only check PTT status for radios that support it (not IC-910)
+                            if self.rig.radio_model != '910':
+                                while session.active and self.rig.isPttOff() == 0:
+                                    session.wait(0.1, wake_on_command=False)
+                                
+                        self.rig.setFrequency(str(tx_doppler))
+                        self.satellite.I_RIG = tx_doppler
+                    session.wait(0.2)
+            # FM sats, no dial input accepted!
+            elif self.satellite.rig_satmode == 1:
+                new_rx_doppler = round(rx_dopplercalc(self.satellite.tledata,self.satellite.F + self.satellite.F_cal, self.observer))
+                new_tx_doppler = round(tx_dopplercalc(self.satellite.tledata,self.satellite.I, self.observer))
+                if (abs(new_rx_doppler-self.satellite.F_RIG) > self.doppler_thres or tracking_init == 1) and not session.paused:
+                        tracking_init = 0
+                        rx_doppler = new_rx_doppler
+                        self.rig.setVFO("MAIN")
+                        self.rig.setFrequency(str(rx_doppler))
+                        self.satellite.F_RIG = rx_doppler
+                if (abs(new_tx_doppler-self.satellite.I_RIG) > self.doppler_thres or tracking_init == 1) and not session.paused:
+                        tracking_init = 0
+                        tx_doppler = new_tx_doppler
+                        self.rig.setVFO("SUB")
+                        self.rig.setFrequency(str(tx_doppler))
+                        self.satellite.I_RIG = tx_doppler
+                        self.rig.setVFO("MAIN")
+                if self.doppler_thres > 0:
+                    session.wait(FM_UPDATE_TIME) # Slower update rate on FM, max on linear sats
+                    
+            else:
+                # Non-interactive mode for linear satellites (SSB packet, etc.)
+                # Use predictive doppler for better TCA tracking if enabled
+                if self.satellite.downmode in ["USB", "LSB", "CW"] and self.predictive_doppler:
+                    # Use the new adaptive prediction algorithm - automatically determines optimal prediction time
+                    new_rx_doppler = rx_dopplercalc_predictive(self.satellite.tledata, self.satellite.F + self.satellite.F_cal, self.observer)
+                    new_tx_doppler = tx_dopplercalc_predictive(self.satellite.tledata, self.satellite.I, self.observer)
+                else:
+                    # Standard calculation for FM or other modes, or when predictive doppler is disabled
+                    new_rx_doppler = round(rx_dopplercalc(self.satellite.tledata,self.satellite.F + self.satellite.F_cal, self.observer))
+                    new_tx_doppler = round(tx_dopplercalc(self.satellite.tledata,self.satellite.I, self.observer))
+                # PTT checking only supported on radios other than IC-910
+                if self.rig.radio_model != '910':
+                    # 0 = PTT is pressed
+                    # 1 = PTT is released
+                    ptt_state_old = ptt_state
+                    ptt_state = self.rig.isPttOff()
+                    # Check for RX -> TX transition
+                    if  ptt_state_old and ptt_state == 0 and abs(new_tx_doppler-self.satellite.I_RIG) > self.doppler_thres and not session.paused:
+                        #self.rig.setVFO("VFOB")
+                        logging.debug("TX inititated")
+                        tx_doppler = new_tx_doppler
+                        self.satellite.I_RIG = tx_doppler
+                        self.rig.setFrequency(str(tx_doppler))
+                    if  ptt_state and abs(new_rx_doppler-self.satellite.F_RIG) > self.doppler_thres and not session.paused:
+                        rx_doppler = new_rx_doppler
+                        self.satellite.F_RIG = rx_doppler
+                        self.rig.setVFO("VFOA")
+                        self.rig.setFrequency(str(rx_doppler))
+                else:
+                    # IC-910: Simple frequency updates without PTT checking
+                    # Skip health checks during rapid updates to avoid interference
+                    
+                    # Use adaptive threshold based on doppler rate - optimized for high latitude (57.63°N)
+                    current_doppler_rate = abs(self.satellite.down_doppler_rate) + abs(self.satellite.up_doppler_rate)
+                    if current_doppler_rate > 2500:  # Extreme doppler rate - much smaller threshold
+                        adaptive_thres = max(50, self.doppler_thres // 2)  # Half threshold, minimum 50Hz
+                    elif current_doppler_rate > 1500:  # Very high doppler rate - smaller threshold
+                        adaptive_thres = max(75, self.doppler_thres * 2 // 3)  # 2/3 threshold, minimum 75Hz
+                    elif current_doppler_rate > 800:  # High doppler rate
+                        adaptive_thres = max(100, self.doppler_thres * 3 // 4)  # 3/4 threshold, minimum 100Hz
+                    else:
+                        adaptive_thres = self.doppler_thres  # Normal threshold
+                    
+                    # Check minimum time between frequency updates to avoid overwhelming radio
+                    current_time = time.time()
+                    time_since_last_update = current_time - last_freq_update
+                    
+                    if time_since_last_update >= min_freq_update_interval:
+                        if abs(new_rx_doppler-self.satellite.F_RIG) > adaptive_thres and not session.paused:
+                            rx_doppler = new_rx_doppler
+                            self.satellite.F_RIG = rx_doppler
+                            self.rig.setVFO("VFOA")
+                            self.rig.setFrequency(str(rx_doppler))
+                            last_freq_update = current_time
+                                
+                        if abs(new_tx_doppler-self.satellite.I_RIG) > adaptive_thres and not session.paused:
+                            tx_doppler = new_tx_doppler
+                            self.satellite.I_RIG = tx_doppler
+                            self.rig.setVFO("VFOB")
+                            self.rig.setFrequency(str(tx_doppler))
+                            # Small delay after TX frequency update to let radio process
+                            session.wait(0.01)
+                            last_freq_update = current_time
+                # Adaptive sleep based on doppler rate - optimized for high latitude (57.63°N)
+                doppler_rate = abs(self.satellite.down_doppler_rate) + abs(self.satellite.up_doppler_rate)
+                if doppler_rate > 3000:  # Extreme doppler rate (very high latitude near TCA)
+                    session.wait(0.010)  # 10ms - maximum safe speed for radio
+                elif doppler_rate > 2000:  # Very high doppler rate (high latitude near TCA)
+                    session.wait(0.012)  # 12ms - very fast but safe
+                elif doppler_rate > 1000:  # High doppler rate (approaching TCA)
+                    session.wait(0.015)  # 15ms for rapid changes
+                elif doppler_rate > 500:  # Medium-high doppler rate
+                    session.wait(0.020)  # 20ms for moderate-rapid changes
+                elif doppler_rate > 100:  # Medium doppler rate
+                    session.wait(0.025)  # 25ms for moderate changes
+                else:
+                    session.wait(0.030)  # 30ms for slow changes
+                
+            self.satellite.new_cal = 0
+            self.rig_stats.loop()
+            session.wait(0.01)
+            #b = datetime.now()
+            #c = b - a
+            #print("Ups:" +str(1000000/c.microseconds))
+
+    ### Orbit
+
+    def _orbit_loop(self):
+        """Orbital computation for displays, rotator, pass recorder and Cloudlog"""
+        last_next_event = 0.0
+        while not self._shutdown.wait(ORBIT_TICK_INTERVAL):
+            if self.satellite.tledata == "":
+                continue
+            try:
+                self._orbit_tick()
+                now = time.monotonic()
+                if now - last_next_event >= NEXT_EVENT_INTERVAL:
+                    last_next_event = now
+                    date_val = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M:%S.%f')[:-3]
+                    self._event_observer.date = ephem.Date(date_val)
+                    self.next_event = str(sat_next_event_calc(self.satellite.tledata, self._event_observer))
+            except Exception as e:
+                logging.warning(f"Error in orbit computation: {e}")
+
+    def _orbit_tick(self):
+        sat = self.satellite
+        tledata = sat.tledata
+        date_val = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M:%S.%f')[:-3]
+        self._tick_observer.date = ephem.Date(date_val)
+
+        # ★ SINGLE ORBITAL COMPUTATION ★ - replaces 7-10 individual compute calls
+        tledata.compute(self._tick_observer)
+
+        # Doppler calculations using direct property access (no additional compute calls)
+        sat.down_doppler_old = sat.down_doppler
+        # Match original rx_doppler_val_calc format: format(..., '.2f') then convert to float
+        rx_doppler_raw = -tledata.range_velocity * sat.F / C
+        sat.down_doppler = float(format(rx_doppler_raw, '.2f'))
+        sat.down_doppler_rate = ((sat.down_doppler - sat.down_doppler_old)/2)/ORBIT_TICK_INTERVAL
+        # Use higher rate limit for linear satellites (USB, LSB, CW) as they have legitimate high doppler rates at TCA
+        max_doppler_rate = 2000.0 if sat.downmode in ["USB", "LSB", "CW"] else 500.0
+        if abs(sat.down_doppler_rate) > max_doppler_rate:
+            # Cap the rate instead of stopping updates completely
+            sat.down_doppler_rate = max_doppler_rate if sat.down_doppler_rate > 0 else -max_doppler_rate
+            logging.debug(f"Capped RX doppler rate to {sat.down_doppler_rate} Hz/s")
+
+        sat.up_doppler_old = sat.up_doppler
+        # Match original tx_doppler_val_calc format: format(..., '.2f') then convert to float
+        tx_doppler_raw = tledata.range_velocity * sat.I / C
+        sat.up_doppler = float(format(tx_doppler_raw, '.2f'))
+        sat.up_doppler_rate = ((sat.up_doppler - sat.up_doppler_old)/2)/ORBIT_TICK_INTERVAL
+        # Use higher rate limit for linear satellites (USB, LSB, CW) as they have legitimate high doppler rates at TCA
+        max_uplink_rate = 2000.0 if sat.upmode in ["USB", "LSB", "CW"] else 500.0
+        if abs(sat.up_doppler_rate) > max_uplink_rate:
+            # Cap the rate instead of stopping updates completely
+            sat.up_doppler_rate = max_uplink_rate if sat.up_doppler_rate > 0 else -max_uplink_rate
+            logging.debug(f"Capped TX doppler rate to {sat.up_doppler_rate} Hz/s")
+
+        # All satellite position data using single computation (no additional compute calls)
+        self.sat_elevation = round(tledata.alt / math.pi * 180.0, 2)
+        self.sat_azimuth = round(tledata.az / math.pi * 180.0, 2)
+        self.sat_height = round(float(tledata.elevation) / 1000.0, 2)
+        self.sat_eclipsed = bool(tledata.eclipsed)
+
+        # Update pass recorder with current elevation
+        if sat.name and self.pass_recorder is not None:
+            try:
+                self.pass_recorder.update_elevation(self.sat_elevation, sat.name)
+            except Exception as e:
+                logging.error(f"Error updating pass recorder: {e}")
+
+        # Cloudlog: only log if F or I changed and satellite is above horizon
+        if self.sat_elevation > 0.0 and (sat.F != self._last_cloudlog_F or sat.I != self._last_cloudlog_I):
+            self.post_to_cloudlog()
+
+        self.publish_telemetry()
+
+    ### Cloudlog
+
+    def post_to_cloudlog(self):
+        """Send the current frequencies and modes to Cloudlog in the background"""
+        if not self.cloudlog_enabled:
+            logging.debug("Cloudlog: Disabled in config.ini")
+            return
+        if not self.cloudlog_api_key or not self.cloudlog_url:
+            logging.warning("Cloudlog API key or URL not set in config.ini")
+            return
+        sat = self.satellite
+        worker = CloudlogWorker(
+            sat=sat,
+            tx_freq=sat.I,
+            rx_freq=sat.F,
+            tx_mode=sat.upmode,
+            rx_mode=sat.downmode,
+            sat_name=sat.name,
+            log_url=self.cloudlog_url,
+            log_api_key=self.cloudlog_api_key
+        )
+        worker.start()
+        self._last_cloudlog_F = sat.F
+        self._last_cloudlog_I = sat.I
+
+    ### Rotator
+
+    def get_current_az_el(self):
+        # Returns (az, el) as floats for the current satellite
+        try:
+            # The rotator thread computes with its own observer
+            observer = self._make_observer()
+            observer.date = ephem.now()
+            self.satellite.tledata.compute(observer)
+            az = float(self.satellite.tledata.az / math.pi * 180.0)
+            el = float(self.satellite.tledata.alt / math.pi * 180.0)
+            return az, el
+        except Exception as e:
+            logging.error(f"Error getting current az/el: {e}")
+            return self.rotator_az_park, self.rotator_el_park
+
+    def best_rotator_azimuth(self, current_az, target_az, az_max):
+        """
+        Returns the best azimuth to command the rotator to, considering overlap.
+        """
+        current_az = current_az % az_max
+        target_az = target_az % az_max
+        direct_diff = abs(target_az - current_az)
+        overlap_target = target_az
+        if az_max > 360:
+            # Try using overlap (e.g., 370 instead of 10)
+            if target_az < 90 and current_az > 270:
+                overlap_target = target_az + 360
+            elif target_az > 270 and current_az < 90:
+                overlap_target = target_az - 360
+        overlap_diff = abs(overlap_target - current_az)
+        if overlap_diff < direct_diff:
+            return overlap_target
+        else:
+            return target_az
+
+    def plan_rotator_pass(self, current_az, current_el):
+        """Plan the rotator commands from now to LOS, called by the rotator thread at AOS"""
+        tle_lines = self.satellite.tle_lines
+        if not tle_lines:
+            return None
+        # The planner computes hundreds of positions, give it a body and observer of its own
+        plan = rotator_planner.plan_pass(
+            ephem.readtle(*tle_lines),
+            self._make_observer(),
+            current_az,
+            current_el,
+            self.rotator_az_min,
+            self.rotator_az_max,
+            self.rotator_el_max,
+            self.rotator_az_slew_rate,
+            self.rotator_el_slew_rate,
+            self.rotator_min_elevation,
+            tolerance=self.rotator_beamwidth / 2.0
+        )
+        if plan:
+            az_values = [command[1] for command in plan.commands]
+            logging.info(f"Rotator pass plan: {plan.mode} mode, az {min(az_values):.0f}-{max(az_values):.0f}°, "
+                         f"{len(plan.schedule())} commands over {plan.los - plan.aos:.0f} s, "
+                         f"{plan.off_target:.0f} s off target, {plan.total_slew:.0f}° slew")
+        return plan
+
+    def read_rotator_position(self):
+        """Last rotator position from the RotatorIO cache, no serial I/O"""
+        if not self.rotator:
+            return None, None
+        return self.rotator_position
+
+    def _on_rotator_position(self, az, el):
+        """Called by the RotatorIO thread after every position poll"""
+        self.rotator_position = (az, el)
+        if hasattr(self, '_telemetry_lock'):
+            self.publish_telemetry()
+
+    def rotator_set_position(self, az, el):
+        # Defensive: ensure az, el are always float to avoid TypeError
+        az = float(az)
+        el = float(el)
+        if self.rotator:
+            # Get current rotator azimuth for shortest-path logic
+            current_az, _ = self.rotator.get_position()
+            if current_az is not None:
+                az_to_send = self.best_rotator_azimuth(current_az, az, self.rotator_az_max)
+            else:
+                az_to_send = az
+            self.rotator.set_position(az_to_send, el)
+
+    def rotator_park(self, az_park, el_park):
+        # Defensive: ensure arguments are always float to avoid TypeError in rotator.set_position
+        az_park = float(az_park)
+        el_park = float(el_park)
+        if self.rotator:
+            self.rotator.park(az_park, el_park)
+
+    def park_rotators(self):
+        self.rotator_park(self.rotator_az_park, self.rotator_el_park)
+
+    def stop_rotators(self):
+        if self.rotator:
+            self.rotator.stop()
+        logging.info("Rotator stopped.")
+
+    def start_rotator_thread(self):
+        if self.rotator_enabled and self.rotator and not self.rotator_thread:
+            # Slew rates learned during earlier passes are kept unless the configured rates changed
+            configured = (self.rotator_az_slew_rate, self.rotator_el_slew_rate)
+            if self.rotator_slew_model is None or self.rotator_slew_model.configured != configured:
+                self.rotator_slew_model = rotator_planner.SlewModel(*configured)
+            self.rotator_thread = rotator.RotatorThread(
+                self.rotator,
+                self.get_current_az_el,
+                self.rotator_min_elevation,
+                self.rotator_az_park,
+                self.rotator_el_park,
+                plan_pass_func=self.plan_rotator_pass if self.rotator_pass_planner else None,
+                slew_model=self.rotator_slew_model,
+                deadband=rotator_planner.deadband_for_beamwidth(self.rotator_beamwidth)
+            )
+            self.rotator_thread.daemon = True
+            self.rotator_thread.start()
+            logging.debug("Rotator thread started.")
+
+    def stop_rotator_thread(self):
+        if self.rotator_thread:
+            self.rotator_thread.stop()
+            self.rotator_thread.join(timeout=2)
+            self.rotator_thread = None
+            logging.debug("Rotator thread stopped.")
+
+    ### Telemetry
+
+    def publish_telemetry(self):
+        """Build a snapshot of the current state and swap it in"""
+        sat = self.satellite
+        rotator_az, rotator_el = self.rotator_position if self.rotator else (None, None)
+        with self._telemetry_lock:
+            self.telemetry = TelemetrySnapshot(
+                timestamp=time.time(),
+                tracking=self.tracking_session.active,
+                frequency_paused=self.tracking_session.paused,
+                satellite=sat.name or None,
+                transponder=self.transponder_name,
+                subtone=self.subtone,
+                rx_offset=self.rx_offset,
+                afc_offset=self.afc_offset,
+                afc_locked=self.beacon_afc.locked if self.beacon_afc is not None and self.beacon_afc.enabled else None,
+                downlink_freq=sat.F,
+                uplink_freq=sat.I,
+                downlink_mode=sat.downmode,
+                uplink_mode=sat.upmode,
+                tle_age=sat.tle_age,
+                rig_downlink_freq=sat.F_RIG,
+                rig_uplink_freq=sat.I_RIG,
+                down_doppler=sat.down_doppler,
+                up_doppler=sat.up_doppler,
+                down_doppler_rate=sat.down_doppler_rate,
+                up_doppler_rate=sat.up_doppler_rate,
+                sat_azimuth=self.sat_azimuth,
+                sat_elevation=self.sat_elevation,
+                sat_height=self.sat_height,
+                sat_eclipsed=self.sat_eclipsed,
+                next_event=self.next_event,
+                rotator_enabled=self.rotator_enabled,
+                rotator_azimuth=None if rotator_az is None else float(rotator_az),
+                rotator_elevation=None if rotator_el is None else float(rotator_el)
+            )
+        return self.telemetry
+
+    ### Status
+
+    def status(self):
+        """Full status as sent to web and remote clients"""
+        return self.telemetry.to_status()
+
+    def station_stats(self):
+        """Per device throughput of the last statistics interval, counters since startup before the first"""
+        return self.station.last_report or self.station.totals()
@@ -0,0 +1,114 @@
+"""
+Tracking session control for the Doppler worker and its helper threads.
+
+The Doppler loop used to poll module level flags (TRACKING_ACTIVE,
+FREQUENCY_UPDATES_PAUSED, DOPPLER_UPDATE_LOCK) between sleeps, so a stop or
+a transponder change only landed after the current sleep expired. The
+session keeps that state behind a condition variable: workers sleep with
+wait() and are woken immediately when tracking stops or a command is queued.
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+
+# Targets used when reporting how long stop/shutdown took
+STOP_LATENCY_TARGET = 0.1   # seconds from stop() until the worker has left its loop
+SHUTDOWN_TIME_TARGET = 1.0  # seconds for the complete closeEvent()
+
+
+class TrackingSession:
+    """Run state and command queue shared by the GUI and the tracking worker"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = False
+        self._paused = False
+        self._commands = deque()
+        self._stop_requested_at = None
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """Number of the current session, incremented by every start()"""
+        return self._generation
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def start(self):
+        """Mark tracking as active and drop commands left over from a previous session"""
+        with self._cond:
+            self._generation += 1
+            self._active = True
+            self._paused = False
+            self._commands.clear()
+            self._stop_requested_at = None
+            self._cond.notify_all()
+
+    def stop(self):
+        """Stop tracking and wake every thread waiting on this session"""
+        with self._cond:
+            if self._active:
+                self._stop_requested_at = time.monotonic()
+            self._active = False
+            self._paused = False
+            self._cond.notify_all()
+
+    def set_paused(self, paused):
+        """Pause or resume frequency updates while keeping the session alive"""
+        with self._cond:
+            self._paused = bool(paused)
+            self._cond.notify_all()
+
+    def running(self, generation):
+        """True while the session started as the given generation is still active"""
+        return self._active and self._generation == generation
+
+    def post(self, command, *args):
+        """Queue a command for the tracking worker and wake it up"""
+        with self._cond:
+            self._commands.append((command, args))
+            self._cond.notify_all()
+
+    def take_commands(self):
+        """Return and clear all queued commands, oldest first"""
+        with self._cond:
+            commands = list(self._commands)
+            self._commands.clear()
+            return commands
+
+    def wait(self, timeout, wake_on_command=True):
+        """
+        Sleep for up to timeout seconds.
+
+        Returns early when the session is stopped or, unless wake_on_command
+        is False, when a command has been queued. Returns True while the
+        session is still active.
+        """
+        with self._cond:
+            if wake_on_command:
+                self._cond.wait_for(lambda: not self._active or self._commands, timeout)
+            else:
+                self._cond.wait_for(lambda: not self._active, timeout)
+            return self._active
+
+    def worker_finished(self, name="Doppler worker"):
+        """Report how long a worker needed to react to the last stop request"""
+        with self._cond:
+            requested_at = self._stop_requested_at
+            self._stop_requested_at = None
+        if requested_at is None:
+            return None
+        latency = time.monotonic() - requested_at
+        if latency > STOP_LATENCY_TARGET:
+            logging.warning(f"{name} stopped {latency * 1000:.0f} ms after stop request (target {STOP_LATENCY_TARGET * 1000:.0f} ms)")
+        else:
+            logging.debug(f"{name} stopped {latency * 1000:.0f} ms after stop request")
+        return latency
@@ -1,6 +1,7 @@
 from flask import Flask, request, send_file
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from configparser import ConfigParser
+import contextvars
 import os
 import sys
 import threading
@@ -8,219 +9,222 @@ import time
 import logging
 from datetime import datetime
 
+from lib.web_topics import DEFAULT_TOPICS, STREAM_TOPICS, SubscriptionHub, WebLogHandler
+
 flask_app = Flask(__name__)
 socketio = SocketIO(flask_app, cors_allowed_origins="*")
 
-main_window = None
-status_broadcast_thread = None
-should_run_status_broadcast = False
-
-# Satellite list cache
-satellite_list_cache = None
-satellite_list_file = None
-
-# Add a helper function for thread-safe execution of UI operations
-def run_on_ui_thread(func, *args, **kwargs):
-    """Run the given function on the UI thread safely"""
-    # Import here to avoid circular imports
-    from PySide6.QtCore import QMetaObject, Qt, QObject
-    
-    # Check if we're already on the main thread (by checking thread affinity)
-    if hasattr(main_window, 'thread') and threading.current_thread() == main_window.thread():
-        # If we're already on the main thread, just call the function directly
-        return func(*args, **kwargs)
-    else:
-        # We need a simpler approach that doesn't directly pass the function
-        # Using a single-shot timer is a reliable way to execute code on the main thread
-        from PySide6.QtCore import QTimer
-        
-        # Create a mutable container for the result
-        result_container = {'result': None, 'completed': False, 'error': None}
-        
-        # Define a slot that will be called on the main thread
-        def callback():
-            try:
-                result_container['result'] = func(*args, **kwargs)
-                result_container['completed'] = True
-            except Exception as e:
-                result_container['error'] = str(e)
-                result_container['completed'] = True
-                print(f"Error in UI thread callback: {e}")
-                import traceback
-                traceback.print_exc()
-        
-        # Use a single-shot timer to run on the main thread
-        timer = QTimer()
-        timer.timeout.connect(callback)
-        timer.setSingleShot(True)
-        
-        # Ensure timer is properly cleaned up after use
-        def cleanup_callback():
-            try:
-                result_container['result'] = func(*args, **kwargs)
-                result_container['completed'] = True
-            except Exception as e:
-                result_container['error'] = str(e)
-                result_container['completed'] = True
-                print(f"Error in UI thread callback: {e}")
-                import traceback
-                traceback.print_exc()
-            finally:
-                # Clean up the timer to prevent memory leaks
-                timer.deleteLater()
-        
-        timer.timeout.disconnect()  # Clear any existing connections
-        timer.timeout.connect(cleanup_callback)
-        timer.start(0)  # 0 ms = run as soon as possible
-        
-        # Wait for a reasonable time for the operation to complete
-        # This is a simple approach - in a production environment, you might want
-        # a more sophisticated approach with proper waiting and timeout mechanisms
-        max_wait = 10  # Maximum wait time in seconds
-        wait_interval = 0.1  # Check interval in seconds
-        waited = 0
-        
-        while not result_container['completed'] and waited < max_wait:
-            time.sleep(wait_interval)
-            waited += wait_interval
-        
-        if result_container['error']:
-            raise Exception(f"Error in UI thread: {result_container['error']}")
-        
-        if not result_container['completed']:
-            print("Warning: UI thread operation timed out")
-            
-        return result_container['result']
-
-def register_window(window):
-    global main_window
-    main_window = window
-    load_satellite_list()  # Load satellite list at startup
-    # Start periodic status broadcast
-    start_status_broadcast_thread()
-
-def status_broadcast_worker():
-    """Background worker that periodically broadcasts status to all clients"""
-    global should_run_status_broadcast
-    should_run_status_broadcast = True
-    
-    while should_run_status_broadcast:
+engine = None
+telemetry_thread = None
+should_run_telemetry = False
+telemetry_rate = 5.0
+hub = SubscriptionHub(telemetry_rate)  # topics of the clients, see lib/web_topics.py
+log_handler = None
+async_server = None  # lib.web_async.AsyncWebServer in asyncio mode ([web_api] async_mode)
+handlers = {}  # event -> handler, also served by the asyncio server
+
+# Client whose event an asyncio mode handler is running for (lib.web_async.ClientContext)
+client_context = contextvars.ContextVar('web_api_client', default=None)
+
+# Handlers that may block on the engine lock, the rig or the catalog. In
+# asyncio mode they run on a worker thread per group (commands in order), all other
+# handlers only read snapshots, cached lists and the hub and run on the event loop.
+BLOCKING_EVENTS = {
+    'start_tracking': 'commands', 'stop_tracking': 'commands',
+    'select_satellite': 'commands', 'select_transponder': 'commands',
+    'set_subtone': 'commands', 'set_rx_offset': 'commands',
+    'park_rotator': 'commands', 'stop_rotator': 'commands',
+    'pause_frequency_updates': 'commands', 'resume_frequency_updates': 'commands',
+    'debug_main_window': 'commands',
+    'get_recordings': 'catalog', 'rescan_recordings': 'catalog',
+}
+
+def on_event(event):
+    """Register a Socket.IO event handler with Flask-SocketIO and for the asyncio server"""
+    def register(handler):
+        handlers[event] = handler
+        socketio.on(event)(handler)
+        return handler
+    return register
+
+def client_sid():
+    """Session id of the client whose event is being handled"""
+    context = client_context.get()
+    return context.sid if context is not None else request.sid
+
+def reply(event, data):
+    """Send an event to the client whose event is being handled, outside a handler to the clients of its topic"""
+    context = client_context.get()
+    if context is not None:
+        # Sent by the asyncio server once the handler returned
+        context.replies.append((event, data))
+        return
+    try:
+        emit(event, data)
+    except RuntimeError:  # Not in a request context
+        safe_emit(event, data)
+
+def register_engine(tracking_engine):
+    global engine
+    engine = tracking_engine
+    # Forward engine changes to all web clients, whichever front end caused them
+    engine.add_listener(on_engine_event)
+    # Stream telemetry changes instead of periodic full status broadcasts
+    start_telemetry_thread()
+
+def on_engine_event(event, value):
+    """Tracking engine listener, called from the thread that made the change"""
+    if event == 'satellite':
+        broadcast_satellite_change(value)
+    elif event == 'transponder':
+        broadcast_transponder_change(value)
+    elif event == 'subtone':
+        broadcast_subtone_change(value)
+    elif event == 'rx_offset':
+        safe_emit('status', {'rx_offset': value})
+    elif event == 'tracking':
+        broadcast_tracking_state(value)
+    elif event == 'frequency_pause':
+        broadcast_frequency_pause_state(value)
+    elif event in ('recording', 'pass_analysis'):
+        # Catalog topic: a recording was added, or its analysis finished
+        safe_emit(event, value)
+
+def load_telemetry_config():
+    """Telemetry stream rate from config.ini, 0 turns the streams off"""
+    global telemetry_rate
+    try:
+        config = ConfigParser()
+        config.read('config.ini')
+        rate = config.getfloat('web_api', 'telemetry_rate', fallback=5.0)
+    except Exception:
+        rate = 5.0
+    telemetry_rate = 0.0 if rate <= 0 else min(max(rate, 0.2), 50.0)
+
+def telemetry_worker():
+    """Send the due stream frames and coalesced events of all rooms, tick_rate times per second"""
+    global should_run_telemetry
+    tick_rate = hub.rate
+    period = 1.0 / tick_rate
+    next_tick = time.monotonic()
+    last_recorder = None
+    while should_run_telemetry:
+        next_tick += period
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick = time.monotonic()  # Fell behind, do not send a burst to catch up
         try:
-            if main_window:
-                # Determine broadcast interval based on tracking status
-                tracking_active = False
-                try:
-                    tracking_active = main_window.Stopbutton.isEnabled()
-                except AttributeError:
-                    pass
-                
-                # Send the status broadcast
-                broadcast_full_status()
-                
-                # Adjust sleep interval based on tracking status:
-                # - When tracking: update every 15 seconds
-                # - When not tracking: update much less frequently (every 2 minutes)
-                if tracking_active:
-                    time.sleep(15)  # 15 seconds when actively tracking
-                else:
-                    time.sleep(120)  # 2 minutes when idle
+            if not engine:
+                continue
+            # Recorder state is looked at once a second, and only while someone subscribed to it
+            if hub.ticks % max(1, round(tick_rate)) == 0 and hub.has_topic('recorder'):
+                recorder = engine.recorder_status()
+                if recorder != last_recorder:
+                    last_recorder = recorder
+                    safe_emit('recorder', recorder)
+            for room, event, data in hub.tick(engine.telemetry if telemetry_rate > 0 else None):
+                emit_to(room, event, data)
         except Exception as e:
-            print(f"Error in status broadcast thread: {e}")
-            time.sleep(60)  # On error, wait a minute before trying again
+            logging.error(f"Error in telemetry thread: {e}")
+            time.sleep(1)
 
-def start_status_broadcast_thread():
-    """Start a background thread that broadcasts status updates"""
-    global status_broadcast_thread, should_run_status_broadcast
+def start_telemetry_thread():
+    """Start the thread that sends stream frames and coalesced events to the rooms"""
+    global telemetry_thread, should_run_telemetry, hub
     
     # Stop any existing thread
-    stop_status_broadcast_thread()
+    stop_telemetry_thread()
     
-    # Start new thread
-    should_run_status_broadcast = True
-    status_broadcast_thread = threading.Thread(target=status_broadcast_worker, daemon=True)
+    load_telemetry_config()
+    # Without streams the thread still flushes coalesced events
+    hub = SubscriptionHub(telemetry_rate or 5.0, streams=telemetry_rate > 0)
+    should_run_telemetry = True
+    telemetry_thread = threading.Thread(target=telemetry_worker, name="WebTelemetry", daemon=True)
+    telemetry_thread.start()
+    if telemetry_rate > 0:
+        logging.info(f"Started web API telemetry stream at {telemetry_rate:g} Hz")
+    else:
+        logging.info("Web API telemetry stream disabled")
+
+def stop_telemetry_thread():
+    """Stop the telemetry stream thread"""
+    global telemetry_thread, should_run_telemetry
     
-    # Set lower priority for this thread (if the platform supports it)
+    if telemetry_thread and telemetry_thread.is_alive():
+        should_run_telemetry = False
+        telemetry_thread.join(timeout=1.0)
+        logging.info("Stopped web API telemetry stream")
+    update_log_handler()
+
+def emit_to(room, event, data):
+    """Send an event to a room, from any thread"""
     try:
-        # Set thread priority to lowest level using OS-specific approach
-        import platform
-        if platform.system() == 'Windows':
-            # Import Windows-specific threading library
-            import ctypes
-            # Set the thread to lowest priority when it starts
-            status_broadcast_thread.start()
-            # THREAD_PRIORITY_BELOW_NORMAL = -1
-            # THREAD_PRIORITY_LOWEST = -2 
-            # THREAD_PRIORITY_IDLE = -15
-            ctypes.windll.kernel32.SetThreadPriority(
-                ctypes.windll.kernel32.GetCurrentThread(), -2)
-            logging.debug("Set WebSocket broadcast thread to low priority")
-        elif platform.system() == 'Linux' or platform.system() == 'Darwin':
-            # For Unix-based systems use nice
-            import os
-            status_broadcast_thread.start()
-            os.nice(10)  # Lower priority by increasing nice value
-            logging.debug("Set WebSocket broadcast thread to low priority (nice 10)")
+        if async_server is not None:
+            async_server.emit(event, data, room)
         else:
-            # Default case - just start the thread normally
-            status_broadcast_thread.start()
+            socketio.emit(event, data, to=room)
     except Exception as e:
-        # If priority setting fails, still start the thread normally
-        logging.warning(f"Failed to set thread priority, using default: {e}")
-        if not status_broadcast_thread.is_alive():
-            status_broadcast_thread.start()
-    
-    print("Started status broadcast thread")
-
-def stop_status_broadcast_thread():
-    """Stop the background status broadcast thread"""
-    global status_broadcast_thread, should_run_status_broadcast
-    
-    if status_broadcast_thread and status_broadcast_thread.is_alive():
-        should_run_status_broadcast = False
-        status_broadcast_thread.join(timeout=1.0)
-        print("Stopped status broadcast thread")
+        logging.error(f"Error sending {event} to room {room}: {e}")
 
 def safe_emit(event, data):
-    """Safely emit events to all clients with error handling"""
-    try:
-        # Try the standard emit method first
-        socketio.emit(event, data)
-    except Exception as e1:
-        # If it fails, try alternatives
-        try:
-            print(f"Standard emit failed: {e1}. Trying namespace emit...")
-            # Try emitting to the default namespace
-            socketio.emit(event, data, namespace='/')
-        except Exception as e2:
-            print(f"Namespace emit failed: {e2}. Trying direct emit...")
-            try:
-                # If all else fails, send to all connected clients
-                for sid in socketio.server.sockets:
-                    socketio.emit(event, data, room=sid)
-            except Exception as e3:
-                print(f"Direct emit failed: {e3}. Unable to broadcast event: {event}")
+    """Send an event to the clients subscribed to its topic, coalesced with the next update of rooms that just had one"""
+    for room, event, data in hub.publish(event, data):
+        emit_to(room, event, data)
+
+def update_log_handler():
+    """Attach the log handler while anyone subscribes to the logs topic, so logging costs nothing otherwise"""
+    global log_handler
+    wanted = should_run_telemetry and hub.has_topic('logs')
+    if wanted and log_handler is None:
+        log_handler = WebLogHandler(hub)
+        logging.getLogger().addHandler(log_handler)
+    elif not wanted and log_handler is not None:
+        logging.getLogger().removeHandler(log_handler)
+        log_handler = None
+
+def set_subscription(sid, topics, max_rate=None):
+    """Move a client into the rooms of its topics and rate, returns the topics that were refused"""
+    joined, left, refused = hub.subscribe(sid, topics, max_rate)
+    context = client_context.get()
+    if context is not None:
+        # The asyncio server changes the rooms before sending the replies
+        context.left.extend(left)
+        context.joined.extend(joined)
+    else:
+        for room in left:
+            leave_room(room, sid=sid)
+        for room in joined:
+            join_room(room, sid=sid)
+    update_log_handler()
+    # A stream only makes sense from a keyframe on
+    for topic in STREAM_TOPICS:
+        if topic in topics:
+            keyframe = hub.keyframe(sid, topic)
+            if keyframe is not None:
+                reply(topic, keyframe)
+    return refused
 
 @flask_app.route('/')
 def index():
     return send_file('web_api_client.html')
 
-@socketio.on('connect')
+@on_event('connect')
 def handle_connect():
-    if main_window:
+    # Until it subscribes to something else the client gets the status and the telemetry stream
+    set_subscription(client_sid(), DEFAULT_TOPICS)
+    if engine:
         # Get current status when client connects
+        telemetry = engine.telemetry
         status = {
-            'tracking': main_window.Stopbutton.isEnabled(),
-            'satellite': main_window.my_satellite.name if hasattr(main_window, 'my_satellite') else None,
-            'transponder': getattr(main_window, 'my_transponder_name', None) if hasattr(main_window, 'my_transponder_name') else None,
-            'rx_offset': main_window.rxoffsetbox.value() if hasattr(main_window, 'rxoffsetbox') else 0
+            'tracking': telemetry.tracking,
+            'satellite': telemetry.satellite,
+            'transponder': telemetry.transponder,
+            'rx_offset': telemetry.rx_offset,
+            'subtone': telemetry.subtone
         }
-        
-        # Add subtone if available
-        if hasattr(main_window, 'combo3'):
-            status['subtone'] = main_window.combo3.currentText()
-            
-        # Use socket directly since this is already in a request context
-        emit('status', status)
+        reply('status', status)
         
         # Try to send the satellite list
         try:
@@ -228,163 +232,75 @@ def handle_connect():
         except Exception as e:
             import traceback
             print(f"Error in handle_connect when getting satellite list: {str(e)}\n{traceback.format_exc()}")
-            
-            # Fallback: try to read directly from doppler.sqf
-            try:
-                # Try multiple ways to get the SQF file path
-                sqffile = None
-                
-                # Method 1: Direct attribute
-                if hasattr(main_window, 'SQFILE'):
-                    sqffile = main_window.SQFILE
-                    print(f"Fallback: Using SQFILE attribute: {sqffile}")
-                
-                # Method 2: From global scope of the module
-                elif hasattr(main_window, '__module__') and main_window.__module__ in sys.modules:
-                    module = sys.modules[main_window.__module__]
-                    if hasattr(module, 'SQFILE'):
-                        sqffile = module.SQFILE
-                        print(f"Fallback: Using SQFILE from module globals: {sqffile}")
-                
-                # Method 3: From config
-                if not sqffile:
-                    try:
-                        import configparser
-                        config = configparser.ConfigParser()
-                        config.read('config.ini')
-                        sqffile = config.get('satellite', 'sqffile')
-                        print(f"Fallback: Using SQFILE from config.ini: {sqffile}")
-                    except Exception as config_e:
-                        print(f"Fallback: Failed to get sqffile from config: {config_e}")
-                
-                # Method 4: Default fallback
-                if not sqffile:
-                    sqffile = 'doppler.sqf'
-                    print(f"Fallback: Using default sqffile: {sqffile}")
-                
-                satlist = []
-                with open(sqffile, 'r') as h:
-                    sqfdata = h.readlines() 
-                    for line in sqfdata:
-                        # Skip comment lines
-                        if line.strip().startswith(';'):
-                            continue
-                            
-                        if ',' in line:
-                            newitem = str(line.split(",")[0].strip())
-                            if newitem:
-                                satlist.append(newitem)
-                
-                # Remove duplicates while preserving order
-                unique_satlist = []
-                for sat in satlist:
-                    if sat not in unique_satlist:
-                        unique_satlist.append(sat)
-                
-                # Return the current selection as well
-                current_sat = None
-                if hasattr(main_window, 'my_satellite'):
-                    current_sat = main_window.my_satellite.name
-                
-                # Use socket directly since this is already in a request context
-                emit('satellite_list', {
-                    'satellites': unique_satlist,
-                    'current': current_sat
-                })
-                print(f"Successfully loaded {len(unique_satlist)} satellites using fallback method")
-            except Exception as fallback_error:
-                print(f"Fallback also failed: {fallback_error}")
-                # Use socket directly since this is already in a request context
-                emit('status', {'error': 'Could not load satellite list. Please check the server logs.'})
-
-@socketio.on('get_status')
+            reply('status', {'error': 'Could not load satellite list. Please check the server logs.'})
+
+@on_event('disconnect')
+def handle_disconnect():
+    hub.unsubscribe(client_sid())
+    update_log_handler()
+
+@on_event('subscribe')
+def handle_subscribe(data=None):
+    """Replace the client's topics: {topics: ['rotator', ...], max_rate: 1}, max_rate in updates per second"""
+    data = data or {}
+    topics = data.get('topics', DEFAULT_TOPICS)
+    if isinstance(topics, str):
+        topics = [topics]
+    try:
+        max_rate = float(data['max_rate']) if data.get('max_rate') is not None else None
+    except (TypeError, ValueError):
+        max_rate = None
+    refused = set_subscription(client_sid(), list(topics), max_rate)
+    reply('subscribed', dict(hub.subscription(client_sid()), refused=refused))
+
+@on_event('get_status')
 def handle_get_status():
-    if main_window:
-        status = {
-            'tracking': main_window.Stopbutton.isEnabled(),
-            'satellite': main_window.my_satellite.name if hasattr(main_window, 'my_satellite') else None,
-            'transponder': getattr(main_window, 'my_transponder_name', None) if hasattr(main_window, 'my_transponder_name') else None,
-            'rx_offset': main_window.rxoffsetbox.value() if hasattr(main_window, 'rxoffsetbox') else 0
-        }
-        if hasattr(main_window, 'combo3'):
-            status['subtone'] = main_window.combo3.currentText()
-        if hasattr(main_window, 'my_satellite') and main_window.my_satellite.name:
-            sat = main_window.my_satellite
-            status.update({
-                'satellite_info': {
-                    'name': sat.name,
-                    'downlink_freq': sat.F if hasattr(sat, 'F') else None,
-                    'uplink_freq': sat.I if hasattr(sat, 'I') else None,
-                    'downlink_mode': sat.downmode if hasattr(sat, 'downmode') else None,
-                    'uplink_mode': sat.upmode if hasattr(sat, 'upmode') else None,
-                    'tle_age': sat.tle_age if hasattr(sat, 'tle_age') else None
-                }
-            })
-            if hasattr(main_window, 'log_sat_status_ele_val') and hasattr(main_window, 'log_sat_status_azi_val'):
-                status['satellite_position'] = {
-                    'elevation': main_window.log_sat_status_ele_val.text(),
-                    'azimuth': main_window.log_sat_status_azi_val.text()
-                }
-            if hasattr(main_window, 'rxdoppler_val') and hasattr(main_window, 'txdoppler_val'):
-                status['doppler'] = {
-                    'downlink': main_window.rxdoppler_val.text(),
-                    'uplink': main_window.txdoppler_val.text()
-                }
-        # Add rotator enabled flag
-        rotator_enabled = getattr(main_window, 'ROTATOR_ENABLED', False)
-        status['rotator_enabled'] = rotator_enabled
-        # Add rotator info
-        if rotator_enabled and hasattr(main_window, 'rotator_az_label') and hasattr(main_window, 'rotator_el_label'):
-            def strip_prefix(text, prefix):
-                if text.startswith(prefix):
-                    return text[len(prefix):].strip()
-                return text
-            az = main_window.rotator_az_label.text()
-            el = main_window.rotator_el_label.text()
-            az = strip_prefix(az, 'Azimuth:')
-            el = strip_prefix(el, 'Elevation:')
-            status['rotator'] = {
-                'azimuth': az,
-                'elevation': el
-            }
-        elif not rotator_enabled:
-            status['rotator'] = {
-                'azimuth': 'Disabled',
-                'elevation': 'Disabled'
-            }
-        emit('status', status)
-
-@socketio.on('start_tracking')
+    if engine:
+        reply('status', engine.status())
+
+@on_event('get_telemetry')
+def handle_get_telemetry(data=None):
+    """Keyframe of the client's telemetry or rotator stream, for a gap in the sequence numbers"""
+    topic = (data or {}).get('topic', 'telemetry')
+    keyframe = hub.keyframe(client_sid(), topic) if topic in STREAM_TOPICS else None
+    if keyframe is not None:
+        reply(topic, keyframe)
+
+@on_event('start_tracking')
 def handle_start_tracking():
-    if main_window:
-        main_window.web_api_proxy.start_tracking.emit()
-        emit('status', {
-            'tracking': True,
-            'satellite': main_window.my_satellite.name if hasattr(main_window, 'my_satellite') else None,
-            'transponder': getattr(main_window, 'my_transponder_name', None) if hasattr(main_window, 'my_transponder_name') else None
+    if engine:
+        engine.start_tracking()
+        telemetry = engine.telemetry
+        reply('status', {
+            'tracking': telemetry.tracking,
+            'satellite': telemetry.satellite,
+            'transponder': telemetry.transponder
         })
 
-@socketio.on('stop_tracking')
+@on_event('stop_tracking')
 def handle_stop_tracking():
-    if main_window:
-        main_window.web_api_proxy.stop_tracking.emit()
-        emit('status', {
+    if engine:
+        engine.stop_tracking()
+        telemetry = engine.telemetry
+        reply('status', {
             'tracking': False,
-            'satellite': main_window.my_satellite.name if hasattr(main_window, 'my_satellite') else None,
-            'transponder': getattr(main_window, 'my_transponder_name', None) if hasattr(main_window, 'my_transponder_name') else None
+            'satellite': telemetry.satellite,
+            'transponder': telemetry.transponder
         })
 
-@socketio.on('select_satellite')
+@on_event('select_satellite')
 def handle_select_satellite(data):
-    if main_window:
+    if engine:
         try:
             sat_name = data.get('satellite')
             if not sat_name:
-                emit('status', {'error': 'No satellite specified'})
+                reply('status', {'error': 'No satellite specified'})
                 return
-            # Emit signal to main thread
-            main_window.web_api_proxy.select_satellite.emit(sat_name)
-            emit('status', {'satellite': sat_name})
+            if sat_name not in engine.satellite_list():
+                reply('status', {'error': f'Unknown satellite: {sat_name}'})
+                return
+            engine.select_satellite(sat_name)
+            reply('status', {'satellite': sat_name})
             handle_get_transponder_list({'satellite': sat_name})
             try:
                 broadcast_full_status()
@@ -394,18 +310,21 @@ def handle_select_satellite(data):
             import traceback
             error_details = traceback.format_exc()
             print(f"Error selecting satellite: {str(e)}\n{error_details}")
-            emit('status', {'error': f'Error selecting satellite: {str(e)}'})
+            reply('status', {'error': f'Error selecting satellite: {str(e)}'})
 
-@socketio.on('select_transponder')
+@on_event('select_transponder')
 def handle_select_transponder(data):
-    if main_window:
+    if engine:
         try:
             tpx_name = data.get('transponder')
             if not tpx_name:
-                emit('status', {'error': 'No transponder specified'})
+                reply('status', {'error': 'No transponder specified'})
+                return
+            if tpx_name not in engine.transponders:
+                reply('status', {'error': f'Unknown transponder: {tpx_name}'})
                 return
-            main_window.web_api_proxy.select_transponder.emit(tpx_name)
-            emit('status', {'transponder': tpx_name})
+            engine.select_transponder(tpx_name)
+            reply('status', {'transponder': tpx_name})
             try:
                 broadcast_full_status()
             except Exception as e:
@@ -414,18 +333,18 @@ def handle_select_transponder(data):
             import traceback
             error_details = traceback.format_exc()
             print(f"Error selecting transponder: {str(e)}\n{error_details}")
-            emit('status', {'error': f'Error selecting transponder: {str(e)}'})
+            reply('status', {'error': f'Error selecting transponder: {str(e)}'})
 
-@socketio.on('set_subtone')
+@on_event('set_subtone')
 def handle_set_subtone(data):
-    if main_window:
+    if engine:
         try:
             tone = data.get('subtone')
             if tone is None:
-                emit('status', {'error': 'No subtone specified'})
+                reply('status', {'error': 'No subtone specified'})
                 return
-            main_window.web_api_proxy.set_subtone.emit(tone)
-            emit('status', {'subtone': tone})
+            engine.set_subtone(tone)
+            reply('status', {'subtone': tone})
             try:
                 broadcast_full_status()
             except Exception as e:
@@ -434,23 +353,25 @@ def handle_set_subtone(data):
             import traceback
             error_details = traceback.format_exc()
             print(f"Error setting subtone: {str(e)}\n{error_details}")
-            emit('status', {'error': f'Error setting subtone: {str(e)}'})
+            reply('status', {'error': f'Error setting subtone: {str(e)}'})
 
-@socketio.on('set_rx_offset')
+@on_event('set_rx_offset')
 def handle_set_rx_offset(data):
-    if main_window:
+    if engine:
         try:
             offset_str = data.get('offset')
             if offset_str is None:
-                emit('status', {'error': 'No RX offset specified'})
+                reply('status', {'error': 'No RX offset specified'})
                 return
             try:
                 offset = int(offset_str)
             except (ValueError, TypeError):
-                emit('status', {'error': f'Invalid RX offset value: {offset_str}. Must be an integer.'})
+                reply('status', {'error': f'Invalid RX offset value: {offset_str}. Must be an integer.'})
                 return
-            main_window.web_api_proxy.set_rx_offset.emit(offset)
-            emit('status', {'rx_offset': offset})
+            if not engine.set_rx_offset(offset):
+                reply('status', {'error': f'RX offset {offset} outside allowed range'})
+                return
+            reply('status', {'rx_offset': offset})
             try:
                 broadcast_full_status()
             except Exception as e:
@@ -459,231 +380,158 @@ def handle_set_rx_offset(data):
             import traceback
             error_details = traceback.format_exc()
             print(f"Error setting RX offset: {str(e)}\n{error_details}")
-            emit('status', {'error': f'Error setting RX offset: {str(e)}'})
+            reply('status', {'error': f'Error setting RX offset: {str(e)}'})
 
-@socketio.on('get_satellite_list')
+@on_event('get_satellite_list')
 def handle_get_satellite_list():
-    if main_window:
+    if engine:
         try:
-            # Use the cached satellite list
-            unique_satlist = satellite_list_cache if satellite_list_cache is not None else []
-            current_sat = main_window.my_satellite.name if hasattr(main_window, 'my_satellite') else None
-            # Check if we're in a request context
-            try:
-                from flask import request
-                if request:
-                    emit('satellite_list', {
-                        'satellites': unique_satlist,
-                        'current': current_sat
-                    })
-                    print(f"Emitted satellite list in request context")
-            except (RuntimeError, ImportError):
-                safe_emit('satellite_list', {
-                    'satellites': unique_satlist,
-                    'current': current_sat
-                })
-                print(f"Emitted satellite list using safe_emit")
+            # The engine caches the satellite list, the current satellite comes from the snapshot
+            reply('satellite_list', {
+                'satellites': engine.satellite_list(),
+                'current': engine.telemetry.satellite
+            })
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
             print(f"Error getting satellite list: {str(e)}\n{error_details}")
-            try:
-                from flask import request
-                if request:
-                    emit('status', {'error': f'Error getting satellite list: {str(e)}'})
-            except (RuntimeError, ImportError):
-                safe_emit('status', {'error': f'Error getting satellite list: {str(e)}'})
+            reply('status', {'error': f'Error getting satellite list: {str(e)}'})
 
-@socketio.on('get_transponder_list')
+@on_event('get_transponder_list')
 def handle_get_transponder_list(data):
-    if main_window:
+    if engine:
         try:
             satellite_name = data.get('satellite')
             if not satellite_name:
-                try:
-                    # First try using the request-specific emit
-                    from flask import request
-                    if request:
-                        emit('status', {'error': 'No satellite specified for transponder list'})
-                except (RuntimeError, ImportError):
-                    safe_emit('status', {'error': 'No satellite specified for transponder list'})
+                reply('status', {'error': 'No satellite specified for transponder list'})
                 return
-                
-            # Try multiple ways to get the SQF file path
-            sqffile = None
-            
-            # Method 1: Direct attribute
-            if hasattr(main_window, 'SQFILE'):
-                sqffile = main_window.SQFILE
-                print(f"Using SQFILE attribute: {sqffile}")
-            
-            # Method 2: From global scope of the module
-            elif hasattr(main_window, '__module__') and main_window.__module__ in sys.modules:
-                module = sys.modules[main_window.__module__]
-                if hasattr(module, 'SQFILE'):
-                    sqffile = module.SQFILE
-                    print(f"Using SQFILE from module globals: {sqffile}")
-            
-            # Method 3: From config
-            if not sqffile:
-                try:
-                    import configparser
-                    config = configparser.ConfigParser()
-                    config.read('config.ini')
-                    sqffile = config.get('satellite', 'sqffile')
-                    print(f"Using SQFILE from config.ini: {sqffile}")
-                except Exception as e:
-                    print(f"Failed to get sqffile from config: {e}")
-              # Method 4: Default fallback
-            if not sqffile:
-                sqffile = 'doppler.sqf'
-                print(f"Using default sqffile: {sqffile}")
-                    
-            tpxlist = []
-            with open(sqffile, 'r') as h:
-                sqfdata = h.readlines()
-                for line in sqfdata:
-                    # Skip comment lines
-                    if line.strip().startswith(';'):
-                        continue
-                        
-                    parts = line.strip().split(',')
-                    if len(parts) > 8 and parts[0].strip() == satellite_name:
-                        tpx_name = parts[8].strip()
-                        if tpx_name:
-                            tpxlist.append(tpx_name)
-            
-            # Remove duplicates while preserving order
-            unique_tpxlist = []
-            for tpx in tpxlist:
-                if tpx not in unique_tpxlist:
-                    unique_tpxlist.append(tpx)
-            
-            # Return the current selection as well
-            current_tpx = getattr(main_window, 'my_transponder_name', None) if hasattr(main_window, 'my_transponder_name') else None
-            
-            # Check if we're in a request context
-            try:
-                # First try using the request-specific emit
-                from flask import request
-                if request:
-                    # Use socket directly since this is already in a request context
-                    emit('transponder_list', {
-                        'transponders': unique_tpxlist,
-                        'current': current_tpx
-                    })
-                    print(f"Emitted transponder list in request context")
-            except (RuntimeError, ImportError):
-                # If not in a request context, use the safe_emit function
-                safe_emit('transponder_list', {
-                    'transponders': unique_tpxlist,
-                    'current': current_tpx
-                })
-                print(f"Emitted transponder list using safe_emit")
-                
-            print(f"Successfully loaded {len(unique_tpxlist)} transponders for {satellite_name}")
+            # Cached by the engine until the SQF file is reloaded; the current selection as well
+            unique_tpxlist = engine.transponder_list(satellite_name)
+            reply('transponder_list', {
+                'transponders': unique_tpxlist,
+                'current': engine.transponder_name
+            })
+            logging.debug(f"Sent {len(unique_tpxlist)} transponders for {satellite_name}")
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
             print(f"Error getting transponder list: {str(e)}\n{error_details}")
-            try:
-                # First try using the request-specific emit
-                from flask import request
-                if request:
-                    # Use socket directly since this is already in a request context
-                    emit('status', {'error': f'Error getting transponder list: {str(e)}'})
-            except (RuntimeError, ImportError):
-                # If not in a request context, use the safe_emit function
-                safe_emit('status', {'error': f'Error getting transponder list: {str(e)}'})
-
-@socketio.on('debug_main_window')
+            reply('status', {'error': f'Error getting transponder list: {str(e)}'})
+
+@on_event('debug_main_window')
 def handle_debug_main_window():
-    """Debug endpoint to inspect main_window attributes"""
-    if main_window:
+    """Debug endpoint to inspect the tracking engine state"""
+    if engine:
         try:
             # Get basic attributes
             attrs = []
-            for attr in dir(main_window):
+            for attr in dir(engine):
                 if not attr.startswith('__'):
                     attrs.append(attr)
             
-            # Check specific attributes we're using
-            sqf_exists = hasattr(main_window, 'SQFILE')
-            sqf_value = getattr(main_window, 'SQFILE', 'not found') if sqf_exists else 'not found'
-            
-            configur_exists = False
-            configur_value = 'not found'
-            if hasattr(main_window, 'configur'):
-                configur_exists = True
-                try:
-                    configur_value = str(main_window.configur.sections())
-                except:
-                    configur_value = 'exists but cannot be stringified'
-            
-            # Check for subtone combo box
-            subtone_exists = hasattr(main_window, 'combo3')
-            subtone_value = 'not found'
-            if subtone_exists:
-                try:
-                    subtone_value = main_window.combo3.currentText()
-                except:
-                    subtone_value = 'exists but cannot get value'
-            
-            # Use socket directly since this is already in a request context
-            emit('debug_info', {
+            reply('debug_info', {
                 'attributes': attrs,
-                'has_SQFILE': sqf_exists,
-                'SQFILE_value': sqf_value,
-                'has_configur': configur_exists,
-                'configur_value': configur_value,
-                'has_subtone_combo': subtone_exists,
-                'subtone_value': subtone_value
+                'has_SQFILE': True,
+                'SQFILE_value': engine.sqf_file,
+                'has_configur': True,
+                'configur_value': str(engine.config.sections()),
+                'has_subtone_combo': True,
+                'subtone_value': engine.subtone
             })
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
             print(f"Error in debug handler: {str(e)}\n{error_details}")
-            # Use socket directly since this is already in a request context
-            emit('status', {'error': f'Error in debug handler: {str(e)}'})
+            reply('status', {'error': f'Error in debug handler: {str(e)}'})
 
-@socketio.on('park_rotator')
+@on_event('park_rotator')
 def handle_park_rotator():
-    if main_window and hasattr(main_window, 'park_rotators'):
-        main_window.park_rotators()
+    if engine:
+        engine.park_rotators()
         handle_get_status()
 
-@socketio.on('stop_rotator')
+@on_event('stop_rotator')
 def handle_stop_rotator():
-    if main_window and hasattr(main_window, 'stop_rotators'):
-        main_window.stop_rotators()
+    if engine:
+        engine.stop_rotators()
         handle_get_status()
 
-@socketio.on('pause_frequency_updates')
+@on_event('get_station_stats')
+def handle_get_station_stats():
+    if engine:
+        reply('station_stats', engine.station_stats())
+
+@on_event('get_recordings')
+def handle_get_recordings(data=None):
+    """Query the recording catalog: satellite, since, until (unix time), min_elevation, min_snr, format, order, limit, offset"""
+    if engine:
+        if engine.recording_catalog is None:
+            reply('recordings', {'error': 'Recording catalog not available'})
+            return
+        data = data or {}
+        filters = {key: data[key] for key in ('satellite', 'since', 'until', 'min_elevation', 'min_snr', 'format')
+                   if data.get(key) is not None}
+        try:
+            recordings = engine.search_recordings(order=data.get('order', 'start_time'),
+                                                  descending=bool(data.get('descending', True)),
+                                                  limit=min(int(data.get('limit', 100)), 1000),
+                                                  offset=int(data.get('offset', 0)), **filters)
+            reply('recordings', {'recordings': recordings, 'total': engine.recording_catalog.count(**filters),
+                                'satellites': engine.recording_catalog.satellites()})
+        except Exception as e:
+            logging.error(f"Error querying the recording catalog: {e}")
+            reply('recordings', {'error': f'Error querying the recording catalog: {str(e)}'})
+
+@on_event('rescan_recordings')
+def handle_rescan_recordings():
+    if engine:
+        reply('recordings_rescan', engine.rescan_recordings(wait=True) or {'error': 'Recording catalog not available'})
+
+@on_event('pause_frequency_updates')
 def handle_pause_frequency_updates():
-    if main_window and hasattr(main_window, 'pause_frequency_updates'):
-        main_window.pause_frequency_updates()
+    if engine:
+        engine.pause_frequency_updates()
         handle_get_status()
 
-@socketio.on('resume_frequency_updates')
+@on_event('resume_frequency_updates')
 def handle_resume_frequency_updates():
-    if main_window and hasattr(main_window, 'resume_frequency_updates'):
-        main_window.resume_frequency_updates()
+    if engine:
+        engine.resume_frequency_updates()
         handle_get_status()
 
 def run_socketio():
+    """Serve the web API until the process exits, blocks the calling thread"""
+    global async_server
     try:
         # Try to read port from config file
         config = ConfigParser()
         config.read('config.ini')
         port = config.getint('web_api', 'port', fallback=5000)
         debug = config.getboolean('web_api', 'debug', fallback=False)
+        mode = config.get('web_api', 'async_mode', fallback='threading').strip().lower()
     except:
         # Default values if config can't be read
         port = 5000
         debug = False
-    
-    # Start the Flask SocketIO server
-    socketio.run(flask_app, host='0.0.0.0', port=port, debug=debug, use_reloader=False)
+        mode = 'threading'
+
+    if mode == 'asyncio':
+        # One event loop thread for all clients instead of a thread per client
+        try:
+            from lib.web_async import AsyncWebServer
+        except ImportError as e:
+            logging.warning(f"Web API asyncio mode needs aiohttp ({e}), using threading mode")
+        else:
+            async_server = AsyncWebServer()
+            logging.info(f"Web API serving in asyncio mode on port {port}")
+            async_server.run('0.0.0.0', port)
+            return
+    elif mode != 'threading':
+        logging.warning(f"Unknown web API async_mode '{mode}', using threading mode")
+
+    # Start the Flask SocketIO server, a thread per client
+    socketio.run(flask_app, host='0.0.0.0', port=port, debug=debug, use_reloader=False,
+                 allow_unsafe_werkzeug=True)
 
 # These functions will be called from the main application when changes occur
 def broadcast_satellite_change(satellite_name):
@@ -695,207 +543,48 @@ def broadcast_satellite_change(satellite_name):
             handle_get_transponder_list({'satellite': satellite_name})
         except Exception as e:
             print(f"Error getting transponders after satellite change: {e}")
-        
-        # Also broadcast to remote if available
-        try:
-            import sys
-            if 'lib.remote_client' in sys.modules:
-                from lib import remote_client
-                remote_client.broadcast_satellite_change(satellite_name)
-        except ImportError:
-            pass
 
 def broadcast_transponder_change(transponder_name):
     """Broadcast transponder changes to all web clients"""
     if transponder_name:
         safe_emit('status', {'transponder': transponder_name})
-        
-        # Also broadcast to remote if available
-        try:
-            import sys
-            if 'lib.remote_client' in sys.modules:
-                from lib import remote_client
-                remote_client.broadcast_transponder_change(transponder_name)
-        except ImportError:
-            pass
 
 def broadcast_subtone_change(subtone):
     """Broadcast subtone changes to all web clients"""
     if subtone is not None:
         safe_emit('status', {'subtone': subtone})
-        
-        # Also broadcast to remote if available
-        try:
-            import sys
-            if 'lib.remote_client' in sys.modules:
-                from lib import remote_client
-                remote_client.broadcast_subtone_change(subtone)
-        except ImportError:
-            pass
 
 def broadcast_tracking_state(is_tracking):
     """Broadcast tracking state changes to all web clients"""
     safe_emit('status', {'tracking': is_tracking})
-    
-    # Also broadcast to remote if available
-    try:
-        import sys
-        if 'lib.remote_client' in sys.modules:
-            from lib import remote_client
-            remote_client.broadcast_tracking_state(is_tracking)
-    except ImportError:
-        pass
 
 def broadcast_frequency_pause_state(is_paused):
     """Broadcast frequency pause state changes to all web clients"""
     safe_emit('status', {'frequency_updates_paused': is_paused})
-    
-    # Also broadcast to remote if available
-    try:
-        import sys
-        if 'lib.remote_client' in sys.modules:
-            from lib import remote_client
-            remote_client.broadcast_frequency_pause_state(is_paused)
-    except ImportError:
-        pass
 
 def broadcast_full_status():
-    if main_window:
+    if engine:
         try:
-            status = {
-                'tracking': main_window.Stopbutton.isEnabled(),
-                'satellite': main_window.my_satellite.name if hasattr(main_window, 'my_satellite') else None,
-                'transponder': getattr(main_window, 'my_transponder_name', None) if hasattr(main_window, 'my_transponder_name') else None,
-                'rx_offset': main_window.rxoffsetbox.value() if hasattr(main_window, 'rxoffsetbox') else 0
-            }
-            if hasattr(main_window, 'combo3'):
-                status['subtone'] = main_window.combo3.currentText()
-            if hasattr(main_window, 'my_satellite') and main_window.my_satellite.name:
-                sat = main_window.my_satellite
-                status.update({
-                    'satellite_info': {
-                        'name': sat.name,
-                        'downlink_freq': sat.F if hasattr(sat, 'F') else None,
-                        'uplink_freq': sat.I if hasattr(sat, 'I') else None,
-                        'downlink_mode': sat.downmode if hasattr(sat, 'downmode') else None,
-                        'uplink_mode': sat.upmode if hasattr(sat, 'upmode') else None,
-                        'tle_age': sat.tle_age if hasattr(sat, 'tle_age') else None
-                    }
-                })
-                if hasattr(main_window, 'log_sat_status_ele_val') and hasattr(main_window, 'log_sat_status_azi_val'):
-                    status['satellite_position'] = {
-                        'elevation': main_window.log_sat_status_ele_val.text(),
-                        'azimuth': main_window.log_sat_status_azi_val.text()
-                    }
-                if hasattr(main_window, 'rxdoppler_val') and hasattr(main_window, 'txdoppler_val'):
-                    status['doppler'] = {
-                        'downlink': main_window.rxdoppler_val.text(),
-                        'uplink': main_window.txdoppler_val.text()
-                    }
-            # Add rotator enabled flag
-            rotator_enabled = getattr(main_window, 'ROTATOR_ENABLED', False)
-            status['rotator_enabled'] = rotator_enabled
-            # Add rotator info
-            if rotator_enabled and hasattr(main_window, 'rotator_az_label') and hasattr(main_window, 'rotator_el_label'):
-                def strip_prefix(text, prefix):
-                    if text.startswith(prefix):
-                        return text[len(prefix):].strip()
-                    return text
-                az = main_window.rotator_az_label.text()
-                el = main_window.rotator_el_label.text()
-                az = strip_prefix(az, 'Azimuth:')
-                el = strip_prefix(el, 'Elevation:')
-                status['rotator'] = {
-                    'azimuth': az,
-                    'elevation': el
-                }
-            elif not rotator_enabled:
-                status['rotator'] = {
-                    'azimuth': 'Disabled',
-                    'elevation': 'Disabled'
-                }
-            safe_emit('status', status)
+            safe_emit('status', engine.status())
             try:
                 handle_get_satellite_list()
             except Exception as e:
                 print(f"Error getting satellite list for broadcast: {e}")
-                
-            # Also broadcast to remote if available
-            try:
-                import sys
-                if 'lib.remote_client' in sys.modules:
-                    from lib import remote_client
-                    remote_client.broadcast_full_status()
-            except ImportError:
-                pass
         except Exception as e:
             print(f"Error broadcasting full status: {e}")
 
-def load_satellite_list():
-    global satellite_list_cache, satellite_list_file
-    # Try multiple ways to get the SQF file path
-    sqffile = None
-    if hasattr(main_window, 'SQFILE'):
-        sqffile = main_window.SQFILE
-    elif hasattr(main_window, '__module__') and main_window.__module__ in sys.modules:
-        module = sys.modules[main_window.__module__]
-        if hasattr(module, 'SQFILE'):
-            sqffile = module.SQFILE
-    if not sqffile:
-        try:
-            import configparser
-            config = configparser.ConfigParser()
-            config.read('config.ini')
-            sqffile = config.get('satellite', 'sqffile')
-        except Exception as e:
-            print(f"Error reading config.ini: {e}")
-    if not sqffile:
-        sqffile = 'doppler.sqf'
-    satellite_list_file = sqffile
-    satlist = []
-    
-    try:
-        with open(sqffile, 'r') as h:
-            sqfdata = h.readlines()
-            for line in sqfdata:
-                # Skip comment lines
-                if line.strip().startswith(';'):
-                    continue
-                    
-                parts = line.strip().split(',')
-                if parts and len(parts) > 0:
-                    sat_name = parts[0].strip() 
-                    if sat_name:
-                        satlist.append(sat_name)
-        # Remove duplicates while preserving order
-        unique_satlist = []
-        for sat in satlist:
-            if sat not in unique_satlist:
-                unique_satlist.append(sat)
-        satellite_list_cache = unique_satlist
-        print(f"Satellite list loaded: {len(unique_satlist)} satellites from {sqffile}")
-    except Exception as e:
-        print(f"Error loading satellite list: {e}")
-        satellite_list_cache = []
-
-def refresh_satellite_list():
-    load_satellite_list()
-
 def broadcast_satellite_list_update():
     """Broadcast updated satellite list to all connected web clients"""
+    if not engine:
+        return
     try:
         # Reload satellite list from file
-        refresh_satellite_list()
-        
-        # Get current satellite selection
-        current_sat = None
-        if main_window and hasattr(main_window, 'my_satellite'):
-            current_sat = main_window.my_satellite.name
+        satellites = engine.reload_satellite_list()
             
         # Broadcast the updated list to all clients
         safe_emit('satellite_list', {
-            'satellites': satellite_list_cache if satellite_list_cache is not None else [],
-            'current': current_sat
+            'satellites': satellites,
+            'current': engine.satellite.name or None
         })
         print(f"Broadcasted updated satellite list to all web clients")
     except Exception as e:
@@ -0,0 +1,121 @@
+"""
+asyncio server for the web API, [web_api] async_mode = asyncio.
+
+In threading mode Flask-SocketIO serves every client from a thread of its
+own, so a room full of dashboards means hundreds of threads taking turns at
+the GIL with the engine's orbit and Doppler threads. This server runs the
+same handlers (lib.web_api.handlers) on one asyncio event loop, with
+python-socketio's AsyncServer on aiohttp. Handlers that only read the
+telemetry snapshot, cached lists and the subscription hub run on the loop;
+those in web_api.BLOCKING_EVENTS run on one worker thread per group, so a
+slow rig command or catalog query never holds up the other clients and
+commands keep their order. What a handler sends back is collected in its
+ClientContext and sent once it returns. Other threads (the telemetry
+thread, engine listeners) send through emit(), which hands the work to the
+loop.
+
+Nothing is monkey patched, the engine's threads stay ordinary threads.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent import futures
+
+import socketio
+from aiohttp import web
+
+from lib import web_api
+
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web_api_client.html')
+
+
+class ClientContext:
+    """What one handler call sends back and the rooms it changes, applied by the server after the call"""
+
+    __slots__ = ('sid', 'replies', 'joined', 'left')
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.replies = []  # (event, data)
+        self.joined = []
+        self.left = []
+
+
+class AsyncWebServer:
+    """The web_api handlers on an asyncio event loop, run() serves on the calling thread"""
+
+    def __init__(self):
+        # Connected before the connect handler runs, so its replies reach the client
+        self.server = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*', always_connect=True)
+        self.app = web.Application()
+        self.server.attach(self.app)
+        self.app.router.add_get('/', self.index)
+        self.loop = None
+        self._loop_thread = None
+        self._tasks = set()
+        self._workers = {group: futures.ThreadPoolExecutor(1, thread_name_prefix=f"WebAPI-{group}")
+                         for group in set(web_api.BLOCKING_EVENTS.values())}
+        for event, handler in web_api.handlers.items():
+            self.server.on(event, self._wrap(event, handler, web_api.BLOCKING_EVENTS.get(event)))
+
+    def run(self, host, port):
+        """Serve until the process exits"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(self.app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        self._loop_thread = threading.get_ident()
+        self.loop = loop
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(runner.cleanup())
+            for worker in self._workers.values():
+                worker.shutdown(wait=False)
+
+    def emit(self, event, data, room):
+        """Send an event to a room from any thread, dropped while the server is not running yet"""
+        loop = self.loop
+        if loop is None:
+            return
+        send = self.server.emit(event, data, to=room)
+        if threading.get_ident() == self._loop_thread:
+            task = loop.create_task(send)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(send, loop)
+
+    async def index(self, request):
+        return web.FileResponse(INDEX_FILE)
+
+    def _wrap(self, event, handler, group):
+        # environ and auth of connect, the reason of disconnect: the handlers take neither
+        lifecycle = event in ('connect', 'disconnect')
+
+        async def on_event(sid, *args):
+            context = ClientContext(sid)
+            args = () if lifecycle else args
+            if group is None:
+                self._call(context, handler, args)
+            else:
+                await self.loop.run_in_executor(self._workers[group], self._call, context, handler, args)
+            for room in context.left:
+                await self.server.leave_room(sid, room)
+            for room in context.joined:
+                await self.server.enter_room(sid, room)
+            for reply_event, data in context.replies:
+                await self.server.emit(reply_event, data, to=sid)
+        return on_event
+
+    def _call(self, context, handler, args):
+        token = web_api.client_context.set(context)
+        try:
+            handler(*args)
+        except Exception as e:
+            logging.error(f"Error in web API handler {handler.__name__}: {e}")
+        finally:
+            web_api.client_context.reset(token)
@@ -0,0 +1,227 @@
+"""
+Topic subscriptions of the web API clients.
+
+Each client subscribes to some topics and names the highest update rate it
+wants. Clients with the same topic and rate share a Socket.IO room, and the
+hub keeps per room what has to go out next: a TelemetryStream for the
+streamed topics (telemetry, rotator), and for the others the events that
+arrived since the room's last update, coalesced (status fields merged,
+lists and recorder state replaced by the newest, log lines batched). Work
+and traffic follow the rooms in use: a topic nobody subscribed to costs
+nothing, and any number of phones showing az/el once a second share one
+rotator stream.
+
+The hub does not talk to Socket.IO. Its methods return the rooms to join or
+leave and (room, event, data) tuples that lib.web_api emits.
+"""
+
+import logging
+import math
+import threading
+import time
+
+from lib.telemetry import TelemetryStream
+
+TOPICS = ('status', 'telemetry', 'rotator', 'catalog', 'recorder', 'logs')
+STREAM_TOPICS = ('telemetry', 'rotator')
+DEFAULT_TOPICS = ('status', 'telemetry')  # clients that never subscribe
+
+# Topic of each event sent to the clients, others belong to 'status'
+EVENT_TOPICS = {
+    'status': 'status', 'satellite_list': 'status', 'transponder_list': 'status', 'tle_update_complete': 'status',
+    'telemetry': 'telemetry',
+    'rotator': 'rotator',
+    'recording': 'catalog', 'pass_analysis': 'catalog',
+    'recorder': 'recorder',
+    'log': 'logs',
+}
+
+# Events of which only the newest pending one is sent, status dicts are merged instead
+LATEST_ONLY = ('satellite_list', 'transponder_list', 'recorder')
+
+# Snapshot fields of the rotator stream
+ROTATOR_FIELDS = ('satellite', 'sat_azimuth', 'sat_elevation', 'rotator_enabled', 'rotator_azimuth', 'rotator_elevation')
+
+HEARTBEAT = 5.0      # seconds, empty stream frame when nothing changed
+MAX_LOG_LINES = 200  # log lines kept per room until its next update
+
+
+class Room:
+    """Clients of one topic at the same update interval"""
+
+    def __init__(self, topic, every):
+        self.topic = topic
+        self.every = every  # hub ticks between two updates
+        self.name = f"{topic}/{every}"
+        self.members = set()
+        if topic == 'telemetry':
+            self.stream = TelemetryStream()
+        elif topic == 'rotator':
+            self.stream = TelemetryStream(ROTATOR_FIELDS)
+        else:
+            self.stream = None
+        self.pending = []  # [event, data] waiting for the next update
+        self.last_sent = None  # hub tick of the last update
+        self.last_frame = 0.0  # monotonic time of the last stream frame
+
+    def due(self, tick):
+        return self.last_sent is None or tick - self.last_sent >= self.every
+
+
+class SubscriptionHub:
+    """Topics and rate of every client, grouped into rooms"""
+
+    def __init__(self, rate, streams=True):
+        self.rate = rate  # ticks per second, the fastest update rate
+        self.streams = streams  # telemetry and rotator streams available
+        self._lock = threading.Lock()
+        self.rooms = {}  # name -> Room
+        self.clients = {}  # sid -> (topics, every)
+        self.ticks = 0
+
+    def interval(self, max_rate):
+        """Ticks between updates for a client asking for at most max_rate per second"""
+        if not max_rate or max_rate <= 0:
+            return 1
+        return max(1, math.ceil(self.rate / max_rate - 1e-9))
+
+    def subscribe(self, sid, topics=DEFAULT_TOPICS, max_rate=None):
+        """Set the topics and rate of a client, returns (rooms joined, rooms left, topics refused)"""
+        refused = [t for t in topics if t not in TOPICS or (t in STREAM_TOPICS and not self.streams)]
+        topics = tuple(t for t in dict.fromkeys(topics) if t not in refused)
+        every = self.interval(max_rate)
+        with self._lock:
+            old = self._rooms_of(sid)
+            self.clients[sid] = (topics, every)
+            new = []
+            for topic in topics:
+                name = f"{topic}/{every}"
+                if name not in self.rooms:
+                    self.rooms[name] = Room(topic, every)
+                self.rooms[name].members.add(sid)
+                new.append(self.rooms[name])
+            left = [room for room in old if room not in new]
+            self._leave(sid, left)
+        return [room.name for room in new if room not in old], [room.name for room in left], refused
+
+    def unsubscribe(self, sid):
+        """Forget a client, returns the rooms it left"""
+        with self._lock:
+            rooms = self._rooms_of(sid)
+            self.clients.pop(sid, None)
+            self._leave(sid, rooms)
+        return [room.name for room in rooms]
+
+    def subscription(self, sid):
+        topics, every = self.clients.get(sid, ((), 1))
+        return {'topics': list(topics), 'max_rate': self.rate / every}
+
+    def has_topic(self, topic):
+        with self._lock:
+            return any(room.topic == topic for room in self.rooms.values())
+
+    def keyframe(self, sid, topic):
+        """Whole state of the client's stream of topic, None if it is not subscribed"""
+        topics, every = self.clients.get(sid, ((), 1))
+        room = self.rooms.get(f"{topic}/{every}") if topic in topics else None
+        if room is None or room.stream is None:
+            return None
+        return room.stream.keyframe()
+
+    def publish(self, event, data):
+        """Queue an event for the rooms of its topic, returns what can be sent right away"""
+        topic = EVENT_TOPICS.get(event, 'status')
+        out = []
+        with self._lock:
+            for room in self.rooms.values():
+                if room.topic == topic:
+                    self._coalesce(room, event, data)
+                    if room.due(self.ticks):
+                        out.extend(self._flush(room))
+        return out
+
+    def add_log(self, line):
+        """Log line for the logs rooms, sent with their next update (never right away, emitting may log)"""
+        with self._lock:
+            for room in self.rooms.values():
+                if room.topic == 'logs':
+                    self._coalesce(room, 'log', line)
+
+    def tick(self, snapshot=None):
+        """Advance one tick, returns the stream frames and coalesced events that are due"""
+        out = []
+        now = time.monotonic()
+        values = None
+        with self._lock:
+            self.ticks += 1
+            for room in self.rooms.values():
+                if not room.due(self.ticks):
+                    continue
+                if room.stream is not None:
+                    if snapshot is None:
+                        continue
+                    if values is None:
+                        values = snapshot.to_stream()
+                    frame = room.stream.update(snapshot, values)
+                    if frame is None and now - room.last_frame >= HEARTBEAT:
+                        frame = room.stream.heartbeat()
+                    if frame is not None:
+                        room.last_frame = now
+                        room.last_sent = self.ticks
+                        out.append((room.name, room.topic, frame))
+                elif room.pending:
+                    out.extend(self._flush(room))
+        return out
+
+    def _rooms_of(self, sid):
+        topics, every = self.clients.get(sid, ((), 1))
+        return [self.rooms[f"{t}/{every}"] for t in topics if f"{t}/{every}" in self.rooms]
+
+    def _leave(self, sid, rooms):
+        for room in rooms:
+            room.members.discard(sid)
+            if not room.members:
+                del self.rooms[room.name]
+
+    def _coalesce(self, room, event, data):
+        for item in room.pending:
+            if item[0] != event:
+                continue
+            if event == 'status':
+                item[1].update(data)
+                return
+            if event == 'log':
+                item[1]['lines'].append(data)
+                if len(item[1]['lines']) > MAX_LOG_LINES:
+                    del item[1]['lines'][0]
+                    item[1]['dropped'] += 1
+                return
+            if event in LATEST_ONLY:
+                item[1] = data
+                return
+        if event == 'status':
+            data = dict(data)
+        elif event == 'log':
+            data = {'lines': [data], 'dropped': 0}
+        room.pending.append([event, data])
+
+    def _flush(self, room):
+        out = [(room.name, event, data) for event, data in room.pending]
+        room.pending = []
+        room.last_sent = self.ticks
+        return out
+
+
+class WebLogHandler(logging.Handler):
+    """Hands formatted log records to the hub's logs rooms, attached while anyone subscribes to them"""
+
+    def __init__(self, hub, level=logging.INFO):
+        super().__init__(level)
+        self.hub = hub
+        self.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s', '%H:%M:%S'))
+
+    def emit(self, record):
+        try:
+            self.hub.add_log(self.format(record))
+        except Exception:
+            self.handleError(record)
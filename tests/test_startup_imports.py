@@ -0,0 +1,25 @@
+"""
+Startup cost of disabled features: the audio features (pass recording,
+analysis, AFC) need numpy, which must not be loaded with the engine.
+
+    python -m pytest -q tests
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class StartupImportTest(unittest.TestCase):
+    def test_engine_import_does_not_load_numpy(self):
+        # A fresh interpreter, whatever this one imported already does not count
+        code = "import sys, lib.tracking_engine; print('numpy' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()